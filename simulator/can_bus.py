@@ -53,6 +53,7 @@ class CANBusSimulator:
         self.message_rate = config.get('message_rate', 10)
         self.include_standard = config.get('include_standard', True)
         self.include_proprietary = config.get('include_proprietary', True)
+        self.dm1_faults = config.get('dm1_faults', [])
 
         # Load PGN profiles
         self.standard_pgns = []
@@ -162,6 +163,48 @@ class CANBusSimulator:
             channel=self.interface
         )
 
+    def generate_dm1_messages(self) -> List[CANMessage]:
+        """Generate J1939 DM1 (active fault) broadcasts for configured faults.
+
+        One DTC fits in a single frame; more are sent with the BAM transport
+        protocol (TP.CM announce followed by TP.DT packets).
+        """
+        by_source: Dict[int, List[Dict]] = {}
+        for fault in self.dm1_faults:
+            by_source.setdefault(fault.get('source_address', 0), []).append(fault)
+
+        messages = []
+        now = time.time()
+        for source_address, faults in sorted(by_source.items()):
+            # Lamp status: amber warning lamp on while faults are active
+            payload = bytearray([0x04, 0xFF])
+            for fault in faults:
+                spn = fault['spn']
+                payload += bytes([
+                    spn & 0xFF,
+                    (spn >> 8) & 0xFF,
+                    ((spn >> 11) & 0xE0) | (fault['fmi'] & 0x1F),
+                    fault.get('occurrence_count', 1) & 0x7F,
+                ])
+
+            if len(payload) <= 8:
+                payload += b'\xFF' * (8 - len(payload))
+                can_id = (6 << 26) | (0xFECA << 8) | source_address
+                messages.append(CANMessage(can_id, bytes(payload), now, self.interface))
+                continue
+
+            packets = (len(payload) + 6) // 7
+            announce = bytes([32, len(payload) & 0xFF, len(payload) >> 8, packets,
+                              0xFF, 0xCA, 0xFE, 0x00])
+            messages.append(CANMessage((7 << 26) | (0xECFF << 8) | source_address,
+                                       announce, now, self.interface))
+            for seq in range(packets):
+                chunk = bytes(payload[seq * 7:(seq + 1) * 7]).ljust(7, b'\xFF')
+                messages.append(CANMessage((7 << 26) | (0xEBFF << 8) | source_address,
+                                           bytes([seq + 1]) + chunk, now, self.interface))
+
+        return messages
+
     def send_message(self, msg: CANMessage):
         """Send message to CAN bus."""
         if self.bus:
@@ -203,6 +246,7 @@ class CANBusSimulator:
 
         start_time = time.time()
         message_count = 0
+        last_dm1 = 0.0
 
         try:
             while duration_seconds is None or time.time() - start_time < duration_seconds:
@@ -224,6 +268,13 @@ class CANBusSimulator:
                     self.send_message(msg)
                     message_count += 1
 
+                # DM1 is broadcast once per second while faults are active
+                if self.dm1_faults and time.time() - last_dm1 >= 1.0:
+                    for dm1 in self.generate_dm1_messages():
+                        self.send_message(dm1)
+                        message_count += 1
+                    last_dm1 = time.time()
+
                 # Sleep to maintain message rate
                 time.sleep(1.0 / self.message_rate)
 
@@ -243,6 +294,7 @@ class CANBusSimulator:
             "manufacturers": self.manufacturers,
             "standard_pgns": len(self.standard_pgns),
             "proprietary_pgns": len(self.proprietary_pgns),
+            "dm1_faults": len(self.dm1_faults),
         }
 
 
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Emergency Diagnostics Liberator - In-Memory Code Index
+
+Loads the code database once at startup and answers SPN/FMI lookups from
+dictionaries instead of running a SQL query per code. The "manufacturer
+specific first, generic fallback" choice is precomputed per code, and SPN
+categories are resolved with a bisect over non-overlapping intervals.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+GENERIC_MANUFACTURER = 'Universal'
+
+UNKNOWN_CODE = {
+    'description': 'Code not found in database',
+    'severity': 'Unknown',
+    'causes': 'Unknown',
+    'tests': 'Consult manufacturer documentation',
+    'complexity': 'Unknown',
+    'manufacturer': 'Unknown',
+}
+
+
+def normalize_manufacturer(name: Optional[str]) -> Optional[str]:
+    """Normalize manufacturer names so 'John Deere' matches 'johndeere'."""
+    if not name or name.lower() == 'auto':
+        return None
+    return ''.join(name.lower().split())
+
+
+def parse_code(code: str) -> Optional[Tuple[int, int]]:
+    """Parse an SPN_FMI code string into (spn, fmi)."""
+    if '_' not in code:
+        return None
+    spn, fmi = code.split('_', 1)
+    try:
+        return int(spn), int(fmi)
+    except ValueError:
+        return None
+
+
+class CodeIndex:
+    """Preloaded SPN/FMI lookup table with category resolution."""
+
+    def __init__(self):
+        # (spn, fmi) -> {normalized manufacturer: entry}
+        self.entries: Dict[Tuple[int, int], Dict[str, Dict]] = {}
+        # (spn, fmi) -> entry chosen when no manufacturer is selected
+        self.default: Dict[Tuple[int, int], Dict] = {}
+        # Elementary SPN intervals: starts, ends and narrowest category
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._categories: List[str] = []
+
+    @classmethod
+    def load(cls, db_conn: sqlite3.Connection) -> 'CodeIndex':
+        """Build the index from an open code database."""
+        index = cls()
+        index._load_codes(db_conn)
+        index._load_categories(db_conn)
+        return index
+
+    def _load_codes(self, db_conn):
+        cursor = db_conn.cursor()
+        cursor.execute('''
+            SELECT c.spn, c.fmi, c.manufacturer_id, c.description, c.severity,
+                   c.common_causes, c.suggested_tests, c.repair_complexity, m.name
+            FROM codes c
+            LEFT JOIN manufacturers m ON c.manufacturer_id = m.id
+        ''')
+
+        ranked: Dict[Tuple[int, int], Tuple[Tuple[int, int], Dict]] = {}
+        for spn, fmi, manufacturer_id, description, severity, causes, tests, complexity, name in cursor:
+            key = (spn, fmi)
+            entry = {
+                'description': description,
+                'severity': severity,
+                'causes': causes,
+                'tests': tests,
+                'complexity': complexity,
+                'manufacturer': name or 'Unknown',
+            }
+            self.entries.setdefault(key, {})[normalize_manufacturer(name) or ''] = entry
+
+            # Manufacturer-specific beats generic; ties keep the old
+            # ORDER BY manufacturer_id DESC behaviour.
+            rank = (0 if name == GENERIC_MANUFACTURER else 1, manufacturer_id or 0)
+            if key not in ranked or rank > ranked[key][0]:
+                ranked[key] = (rank, entry)
+
+        self.default = {key: entry for key, (_, entry) in ranked.items()}
+
+    def _load_categories(self, db_conn):
+        cursor = db_conn.cursor()
+        cursor.execute('''
+            SELECT name, spn_range_start, spn_range_end
+            FROM code_categories
+            WHERE spn_range_start IS NOT NULL AND spn_range_end IS NOT NULL
+        ''')
+        ranges = cursor.fetchall()
+
+        # Categories nest (Emissions inside Engine System), so split the SPN
+        # axis at every boundary and give each piece its narrowest category.
+        bounds = sorted({start for _, start, _ in ranges} | {end + 1 for _, _, end in ranges})
+        for lo, hi in zip(bounds, bounds[1:]):
+            covering = [(end - start, name) for name, start, end in ranges
+                        if start <= lo and hi - 1 <= end]
+            if covering:
+                self._starts.append(lo)
+                self._ends.append(hi - 1)
+                self._categories.append(min(covering)[1])
+
+    def __len__(self):
+        return len(self.default)
+
+    def category(self, spn: int) -> Optional[str]:
+        """Return the narrowest category whose SPN range contains `spn`."""
+        pos = bisect_right(self._starts, spn) - 1
+        if pos >= 0 and spn <= self._ends[pos]:
+            return self._categories[pos]
+        return None
+
+    def lookup(self, spn: int, fmi: int, manufacturer: Optional[str] = None) -> Optional[Dict]:
+        """Best entry for a code, preferring `manufacturer` when given."""
+        key = (spn, fmi)
+        if manufacturer:
+            per_manufacturer = self.entries.get(key)
+            if per_manufacturer:
+                entry = per_manufacturer.get(normalize_manufacturer(manufacturer))
+                if entry:
+                    return entry
+                generic = per_manufacturer.get(normalize_manufacturer(GENERIC_MANUFACTURER))
+                if generic:
+                    return generic
+        return self.default.get(key)
+
+    def interpret(self, spn: int, fmi: int, manufacturer: Optional[str] = None) -> Dict:
+        """Interpretation dict for a code, with an 'Unknown' fallback."""
+        entry = self.lookup(spn, fmi, manufacturer) or UNKNOWN_CODE
+        result = {'spn': spn, 'fmi': fmi}
+        result.update(entry)
+        result['category'] = self.category(spn) or 'Unknown'
+        return result
+
+    def interpret_many(self, codes, manufacturer: Optional[str] = None) -> List[Dict]:
+        """Interpret many SPN_FMI code strings, skipping unparseable ones."""
+        results = []
+        for code in codes:
+            parsed = parse_code(code)
+            if parsed:
+                results.append(self.interpret(parsed[0], parsed[1], manufacturer))
+        return results
+
+
+def main():
+    """Load the index and interpret codes from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Emergency Diagnostics Liberator - Code index lookup'
+    )
+    parser.add_argument('codes', nargs='*', help='Codes in SPN_FMI format (e.g. 91_0)')
+    parser.add_argument('--code-db', default='/opt/emergency-diagnostics/codes.db',
+                        help='Path to code database')
+    parser.add_argument('--manufacturer', default='auto',
+                        help='Preferred manufacturer (johndeere, caseih, agco, etc.)')
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.code_db)
+        start = time.perf_counter()
+        index = CodeIndex.load(conn)
+        load_ms = (time.perf_counter() - start) * 1000
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Error loading code database: {e}")
+        sys.exit(1)
+
+    print(f"Loaded {len(index)} codes in {load_ms:.1f} ms")
+
+    start = time.perf_counter()
+    results = index.interpret_many(args.codes, normalize_manufacturer(args.manufacturer))
+    lookup_ms = (time.perf_counter() - start) * 1000
+
+    for result in results:
+        print(f"  SPN {result['spn']} FMI {result['fmi']} [{result['category']}]: "
+              f"{result['description']} ({result['severity']})")
+    print(f"Interpreted {len(results)} codes in {lookup_ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
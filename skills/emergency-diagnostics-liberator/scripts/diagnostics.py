@@ -9,6 +9,7 @@ Reads codes, interprets them, and provides repair guidance.
 import argparse
 import sqlite3
 import sys
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
@@ -26,6 +27,14 @@ try:
 except ImportError:
     CAN_AVAILABLE = False
 
+from code_index import CodeIndex, normalize_manufacturer, parse_code
+from fault_history import FaultHistory, ensure_history_schema
+from j1939_dm import DMDecoder, iter_bus_frames, watch_bus
+from sensor_capture import SensorCapture, parse_parameter_list
+
+# DM1 is broadcast once per second; listen long enough to see every ECU twice
+DM1_READ_WINDOW = 2.5
+
 class EmergencyDiagnostics:
     """Main diagnostics class for emergency equipment diagnostics."""
 
@@ -35,6 +44,12 @@ class EmergencyDiagnostics:
         self.connection = None
         self.db_conn = None
         self.session_id = None
+        self.code_index = None
+        self.history = None
+        self.fault_decoder = DMDecoder(stale_after=5.0)
+        self.decoder_lock = threading.Lock()
+        self.connection_lock = threading.Lock()
+        self.capture = None
 
     def connect(self):
         """Connect to equipment diagnostic interface."""
@@ -100,6 +115,9 @@ class EmergencyDiagnostics:
 
         try:
             self.db_conn = sqlite3.connect(db_path)
+            self.code_index = CodeIndex.load(self.db_conn)
+            ensure_history_schema(self.db_conn)
+            self.history = FaultHistory(self.db_conn)
             return True
         except Exception as e:
             print(f"Error opening database: {e}")
@@ -126,7 +144,8 @@ class EmergencyDiagnostics:
         print("Reading codes from OBD-II...")
 
         codes = []
-        dtc = self.connection.query(obd.commands.GET_DTC)
+        with self.connection_lock:
+            dtc = self.connection.query(obd.commands.GET_DTC)
 
         if dtc is not None:
             raw_codes = dtc.value
@@ -138,65 +157,116 @@ class EmergencyDiagnostics:
         return codes
 
     def _read_codes_can(self):
-        """Read codes via CAN bus (J1939)."""
+        """Read codes via CAN bus (J1939 DM1, single-frame and multi-packet)."""
+        if not self.connection:
+            print("Not connected to equipment")
+            return []
+
         print("Reading codes via CAN bus...")
-        # Simplified - real implementation would parse J1939 DM1 messages
-        # This is a placeholder for CAN-based code reading
-        print("Note: Full J1939 code reading requires additional implementation")
-        return []
+
+        # While capturing, the capture thread owns the bus and feeds the decoder
+        if not (self.capture and self.capture.running):
+            for ts, can_id, data in iter_bus_frames(self.connection, DM1_READ_WINDOW):
+                self.fault_decoder.feed(can_id, data, ts)
+
+        with self.decoder_lock:
+            faults = self.fault_decoder.active_faults()
+            codes = self.fault_decoder.active_codes()
+        print(f"Found {len(codes)} code(s) from {len(faults)} ECU(s)")
+
+        return codes
+
+    def watch_faults(self):
+        """Stream DM1/DM2 fault changes until interrupted."""
+        if self.config['interface_type'] != 'can' or not self.connection:
+            print("Fault watch requires a CAN connection")
+            return
+        if self.capture and self.capture.running:
+            print("Stop the sensor capture before watching faults")
+            return
+
+        print("Watching for fault changes (Ctrl+C to stop)...")
+
+        try:
+            for event in watch_bus(self.connection, self.fault_decoder):
+                print(event)
+        except KeyboardInterrupt:
+            print("")
+
+    def start_capture(self):
+        """Start background sensor capture for this session."""
+        if not self.connection or not self.session_id:
+            print("Capture requires a connection and an active session")
+            return
+        if self.capture and self.capture.running:
+            print("Capture already running")
+            return
+
+        can_mode = self.config['interface_type'] == 'can'
+        try:
+            self.capture = SensorCapture(
+                self.connection,
+                self.config['interface_type'],
+                parse_parameter_list(self.config['capture_params']),
+                self.config['code_db'],
+                self.session_id,
+                rate_hz=self.config['capture_rate'],
+                pre_trigger=self.config['pre_trigger'],
+                post_trigger=self.config['post_trigger'],
+                connection_lock=self.connection_lock,
+                on_frame=self._on_capture_frame if can_mode else None,
+            )
+            self.capture.start()
+        except (ValueError, ImportError) as e:
+            print(f"Error starting capture: {e}")
+            return
+
+        print(f"Capturing {len(self.capture.parameters)} parameter(s) at "
+              f"{self.config['capture_rate']:.0f} Hz")
+        if can_mode:
+            print("Capture triggers automatically when a new DM1 fault is raised")
+
+    def _on_capture_frame(self, ts, can_id, data):
+        """Feed frames seen by the capture thread to the fault decoder."""
+        with self.decoder_lock:
+            events = self.fault_decoder.feed(can_id, data, ts)
+        for event in events:
+            if event.event == 'raised' and event.dm == 'DM1':
+                print(f"\n{event}")
+                if self.capture.trigger():
+                    print("Capture triggered by fault")
+
+    def stop_capture(self):
+        """Stop background capture, writing any pending trigger."""
+        if not self.capture or not self.capture.running:
+            print("Capture not running")
+            return
+        self.capture.stop()
+        self.capture.print_status()
 
     def interpret_code(self, code):
-        """Interpret a diagnostic code using database."""
-        if not self.db_conn:
+        """Interpret a diagnostic code using the preloaded code index."""
+        if not self.code_index:
             return None
 
-        # Parse code (simplified - real implementation would handle OBD-II and J1939 formats)
-        # For now, assume J1939 format: SPN_FMI
-        if '_' in code:
-            parts = code.split('_')
-            spn = int(parts[0])
-            fmi = int(parts[1])
-        else:
+        # J1939 format: SPN_FMI
+        parsed = parse_code(code)
+        if not parsed:
             # Try OBD-II format (P-code)
             print(f"OBD-II code interpretation not fully implemented: {code}")
             return None
 
-        # Query database
-        cursor = self.db_conn.cursor()
-        cursor.execute('''
-            SELECT c.description, c.severity, c.common_causes, c.suggested_tests, c.repair_complexity,
-                   m.name as manufacturer
-            FROM codes c
-            LEFT JOIN manufacturers m ON c.manufacturer_id = m.id
-            WHERE c.spn = ? AND c.fmi = ?
-            ORDER BY c.manufacturer_id DESC
-            LIMIT 1
-        ''', (spn, fmi))
-
-        result = cursor.fetchone()
-
-        if result:
-            return {
-                'spn': spn,
-                'fmi': fmi,
-                'description': result[0],
-                'severity': result[1],
-                'causes': result[2],
-                'tests': result[3],
-                'complexity': result[4],
-                'manufacturer': result[5]
-            }
-        else:
-            return {
-                'spn': spn,
-                'fmi': fmi,
-                'description': 'Code not found in database',
-                'severity': 'Unknown',
-                'causes': 'Unknown',
-                'tests': 'Consult manufacturer documentation',
-                'complexity': 'Unknown',
-                'manufacturer': 'Unknown'
-            }
+        return self.code_index.interpret(parsed[0], parsed[1], self._preferred_manufacturer())
+
+    def interpret_codes(self, codes):
+        """Interpret a batch of codes (e.g. from a fleet sweep) in one pass."""
+        if not self.code_index:
+            return []
+        return self.code_index.interpret_many(codes, self._preferred_manufacturer())
+
+    def _preferred_manufacturer(self):
+        """Manufacturer whose codes take precedence, or None for auto."""
+        return normalize_manufacturer(self.config.get('manufacturer'))
 
     def display_code(self, interpretation):
         """Display code interpretation in human-readable format."""
@@ -221,6 +291,7 @@ class EmergencyDiagnostics:
 
         print("")
         print(f"Description: {interpretation['description']}")
+        print(f"System: {interpretation['category']}")
         print("")
 
         if interpretation['manufacturer'] != 'Unknown':
@@ -269,29 +340,28 @@ class EmergencyDiagnostics:
         self.session_id = cursor.lastrowid
         print(f"Session started: ID {self.session_id}")
 
-    def log_codes(self, codes):
-        """Log codes from current session."""
+    def log_codes(self, interpretations):
+        """Log already-interpreted codes from current session."""
         if not self.db_conn or not self.session_id:
             return
 
-        cursor = self.db_conn.cursor()
-        for code in codes:
-            interpretation = self.interpret_code(code)
-            if interpretation:
-                cursor.execute('''
-                    INSERT INTO session_codes (session_id, spn, fmi, description, severity, status)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    self.session_id,
-                    interpretation['spn'],
-                    interpretation['fmi'],
-                    interpretation['description'],
-                    interpretation['severity'],
-                    'Active'
-                ))
+        self.db_conn.executemany('''
+            INSERT INTO session_codes (session_id, spn, fmi, description, severity, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                self.session_id,
+                interpretation['spn'],
+                interpretation['fmi'],
+                interpretation['description'],
+                interpretation['severity'],
+                'Active'
+            )
+            for interpretation in interpretations if interpretation
+        ])
 
         self.db_conn.commit()
-        print(f"Logged {len(codes)} codes to session")
+        print(f"Logged {len(interpretations)} codes to session")
 
     def generate_report(self):
         """Generate diagnostic report for current session."""
@@ -308,6 +378,10 @@ class EmergencyDiagnostics:
 
         codes = cursor.fetchall()
 
+        cursor.execute('SELECT vin FROM diagnostic_sessions WHERE id = ?', (self.session_id,))
+        row = cursor.fetchone()
+        vin = row[0] if row and row[0] not in (None, 'Unknown') else None
+
         print("")
         print("=" * 60)
         print("DIAGNOSTIC REPORT")
@@ -318,12 +392,19 @@ class EmergencyDiagnostics:
         print("Codes Found:")
         for code in codes:
             print(f"  SPN {code[0]} FMI {code[1]}: {code[2]} [{code[3]}]")
+            history = self.history.code_history(vin, code[0], code[1]) if vin and self.history else None
+            if history and history['sessions'] > 1:
+                print(f"    Recurring: seen in {history['sessions']} sessions on this machine "
+                      f"since {history['first_seen']}")
         print("")
         print("=" * 60)
         print("")
 
     def close(self):
         """Close connections."""
+        if self.capture and self.capture.running:
+            self.capture.stop()
+
         if self.connection:
             if self.config['interface_type'] == 'obd2':
                 self.connection.close()
@@ -351,6 +432,9 @@ def interactive_mode(diagnostics):
             elif cmd == 'help':
                 print("Available commands:")
                 print("  read    - Read diagnostic codes")
+                print("  watch   - Stream fault changes (CAN only)")
+                print("  capture start|trigger|status|stop")
+                print("          - Record live sensor data around a fault")
                 print("  clear   - Clear codes (with confirmation)")
                 print("  info    - Show connection info")
                 print("  report  - Generate diagnostic report")
@@ -359,13 +443,34 @@ def interactive_mode(diagnostics):
             elif cmd == 'read':
                 codes = diagnostics.read_codes()
                 if codes:
-                    for code in codes:
-                        interpretation = diagnostics.interpret_code(code)
+                    interpretations = [diagnostics.interpret_code(code) for code in codes]
+                    for interpretation in interpretations:
                         diagnostics.display_code(interpretation)
-                    diagnostics.log_codes(codes)
+                    diagnostics.log_codes(interpretations)
                 else:
                     print("No codes found")
 
+            elif cmd == 'watch':
+                diagnostics.watch_faults()
+
+            elif cmd.startswith('capture'):
+                action = cmd.split()[1] if len(cmd.split()) > 1 else 'status'
+                if action == 'start':
+                    diagnostics.start_capture()
+                elif not diagnostics.capture:
+                    print("Capture not started")
+                elif action == 'trigger':
+                    if diagnostics.capture.trigger():
+                        print(f"Triggered; recording {diagnostics.config['post_trigger']:.0f}s more")
+                    else:
+                        print("Capture already triggered")
+                elif action == 'status':
+                    diagnostics.capture.print_status()
+                elif action == 'stop':
+                    diagnostics.stop_capture()
+                else:
+                    print(f"Unknown capture action: {action}")
+
             elif cmd == 'clear':
                 if diagnostics.config['warn_before_clear']:
                     confirm = input("Are you sure you want to clear codes? (yes/no): ")
@@ -436,6 +541,14 @@ def main():
                        help='Require confirmation for actions')
     parser.add_argument('--warn-before-clear', default='true',
                        help='Warn before clearing codes')
+    parser.add_argument('--capture-params', default='190,110,100,105,102,168',
+                       help='Parameters to capture (SPNs for CAN, OBD command names for OBD-II)')
+    parser.add_argument('--capture-rate', type=float, default=20.0,
+                       help='Capture rate per parameter (Hz)')
+    parser.add_argument('--pre-trigger', type=float, default=60.0,
+                       help='Seconds of data kept before a capture trigger')
+    parser.add_argument('--post-trigger', type=float, default=30.0,
+                       help='Seconds of data recorded after a capture trigger')
 
     args = parser.parse_args()
 
@@ -454,6 +567,10 @@ def main():
         'safety_override_disabled': args.safety_override_disabled,
         'require_confirmation': args.require_confirmation,
         'warn_before_clear': args.warn_before_clear,
+        'capture_params': args.capture_params,
+        'capture_rate': args.capture_rate,
+        'pre_trigger': args.pre_trigger,
+        'post_trigger': args.post_trigger,
     }
 
     # Initialize diagnostics
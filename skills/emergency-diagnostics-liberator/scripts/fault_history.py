@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Emergency Diagnostics Liberator - Diagnostic Session History Analytics
+
+Cross-session questions over diagnostic_sessions/session_codes: which
+faults keep coming back on which machine, which faults show up together,
+and how long a machine runs between repeats of the same fault.
+
+A `fault_history` table keyed by (vin, spn, fmi) is maintained by a
+trigger on every session_codes insert, so recurring-fault queries never
+scan the raw history. Co-occurrence and time-between-failures run
+against indexed session_codes/diagnostic_sessions.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from typing import Dict, List, Optional
+
+from code_index import parse_code
+
+HISTORY_SCHEMA = '''
+    CREATE INDEX IF NOT EXISTS idx_session_codes_session ON session_codes(session_id);
+    CREATE INDEX IF NOT EXISTS idx_session_codes_code ON session_codes(spn, fmi);
+    CREATE INDEX IF NOT EXISTS idx_sessions_vin_time ON diagnostic_sessions(vin, timestamp);
+
+    CREATE TABLE IF NOT EXISTS fault_history (
+        vin TEXT NOT NULL,
+        spn INTEGER NOT NULL,
+        fmi INTEGER NOT NULL,
+        sessions INTEGER NOT NULL,
+        first_seen TIMESTAMP,
+        last_seen TIMESTAMP,
+        last_session_id INTEGER,
+        PRIMARY KEY (vin, spn, fmi)
+    );
+    CREATE INDEX IF NOT EXISTS idx_fault_history_sessions ON fault_history(sessions);
+
+    -- Count each code once per session even if several ECUs report it
+    CREATE TRIGGER IF NOT EXISTS trg_session_codes_history
+    AFTER INSERT ON session_codes
+    BEGIN
+        INSERT INTO fault_history (vin, spn, fmi, sessions, first_seen, last_seen, last_session_id)
+        SELECT COALESCE(s.vin, 'Unknown'), NEW.spn, NEW.fmi, 1, s.timestamp, s.timestamp, NEW.session_id
+        FROM diagnostic_sessions s
+        WHERE s.id = NEW.session_id
+        ON CONFLICT (vin, spn, fmi) DO UPDATE SET
+            sessions = sessions + (excluded.last_session_id != last_session_id),
+            first_seen = MIN(first_seen, excluded.first_seen),
+            last_seen = MAX(last_seen, excluded.last_seen),
+            last_session_id = excluded.last_session_id;
+    END;
+'''
+
+
+def ensure_history_schema(db_conn: sqlite3.Connection) -> bool:
+    """Create indexes, fault_history and its trigger; backfill if new.
+
+    Returns True when the aggregation table had to be (re)built.
+    """
+    existing = db_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_session_codes_history'"
+    ).fetchone()
+    db_conn.executescript(HISTORY_SCHEMA)
+    if existing:
+        return False
+    rebuild_history(db_conn)
+    return True
+
+
+def rebuild_history(db_conn: sqlite3.Connection):
+    """Recompute fault_history from the full session history."""
+    with db_conn:
+        db_conn.execute('DELETE FROM fault_history')
+        db_conn.execute('''
+            INSERT INTO fault_history (vin, spn, fmi, sessions, first_seen, last_seen, last_session_id)
+            SELECT COALESCE(s.vin, 'Unknown'), c.spn, c.fmi, COUNT(DISTINCT c.session_id),
+                   MIN(s.timestamp), MAX(s.timestamp), MAX(c.session_id)
+            FROM session_codes c
+            JOIN diagnostic_sessions s ON s.id = c.session_id
+            GROUP BY COALESCE(s.vin, 'Unknown'), c.spn, c.fmi
+        ''')
+
+
+class FaultHistory:
+    """Query API over the diagnostic session history."""
+
+    def __init__(self, db_conn: sqlite3.Connection):
+        self.db_conn = db_conn
+
+    def _query(self, query: str, params) -> List[Dict]:
+        cursor = self.db_conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        return [dict(row) for row in cursor.execute(query, params)]
+
+    def recurring_faults(self, vin: Optional[str] = None, min_sessions: int = 2,
+                         limit: int = 50) -> List[Dict]:
+        """Faults seen in at least `min_sessions` sessions on the same machine."""
+        query = '''
+            SELECT vin, spn, fmi, sessions, first_seen, last_seen,
+                   (julianday(last_seen) - julianday(first_seen)) / (sessions - 1) AS mean_days_between
+            FROM fault_history
+            WHERE sessions >= ? AND vin != 'Unknown'
+        '''
+        params: list = [max(2, min_sessions)]
+        if vin:
+            query += ' AND vin = ?'
+            params.append(vin)
+        query += ' ORDER BY sessions DESC, last_seen DESC LIMIT ?'
+        params.append(limit)
+        return self._query(query, params)
+
+    def code_history(self, vin: str, spn: int, fmi: int) -> Optional[Dict]:
+        """Aggregated history of one code on one machine."""
+        rows = self._query('''
+            SELECT vin, spn, fmi, sessions, first_seen, last_seen
+            FROM fault_history
+            WHERE vin = ? AND spn = ? AND fmi = ?
+        ''', (vin, spn, fmi))
+        return rows[0] if rows else None
+
+    def co_occurring(self, spn: Optional[int] = None, fmi: Optional[int] = None,
+                     vin: Optional[str] = None, min_count: int = 2,
+                     limit: int = 50) -> List[Dict]:
+        """Pairs of faults reported in the same session, most frequent first.
+
+        With a code given, only pairs involving that code are returned.
+        """
+        joins = ''
+        conditions = []
+        params: list = []
+
+        if spn is not None and fmi is not None:
+            conditions.append('a.spn = ? AND a.fmi = ? AND NOT (b.spn = a.spn AND b.fmi = a.fmi)')
+            params.extend([spn, fmi])
+        else:
+            conditions.append('(a.spn < b.spn OR (a.spn = b.spn AND a.fmi < b.fmi))')
+
+        if vin:
+            joins = 'JOIN diagnostic_sessions s ON s.id = a.session_id'
+            conditions.append('s.vin = ?')
+            params.append(vin)
+
+        params.extend([min_count, limit])
+        query = f'''
+            SELECT a.spn AS spn_a, a.fmi AS fmi_a, b.spn AS spn_b, b.fmi AS fmi_b,
+                   COUNT(DISTINCT a.session_id) AS sessions
+            FROM session_codes a
+            JOIN session_codes b ON b.session_id = a.session_id
+            {joins}
+            WHERE {' AND '.join(conditions)}
+            GROUP BY a.spn, a.fmi, b.spn, b.fmi
+            HAVING sessions >= ?
+            ORDER BY sessions DESC
+            LIMIT ?
+        '''
+        return self._query(query, params)
+
+    def time_between_failures(self, spn: int, fmi: int,
+                              vin: Optional[str] = None) -> List[Dict]:
+        """Per machine: sessions with the code and gaps (days) between them."""
+        vin_filter = 'AND s.vin = ?' if vin else ''
+        params: list = [spn, fmi] + ([vin] if vin else [])
+        query = f'''
+            WITH hits AS (
+                SELECT DISTINCT s.vin AS vin, s.id AS session_id, s.timestamp AS timestamp
+                FROM session_codes c
+                JOIN diagnostic_sessions s ON s.id = c.session_id
+                WHERE c.spn = ? AND c.fmi = ? AND s.vin != 'Unknown' {vin_filter}
+            ),
+            gaps AS (
+                SELECT vin, timestamp,
+                       julianday(timestamp) - julianday(LAG(timestamp) OVER (
+                           PARTITION BY vin ORDER BY timestamp, session_id)) AS gap
+                FROM hits
+            )
+            SELECT vin, COUNT(*) AS sessions, MIN(timestamp) AS first_seen,
+                   MAX(timestamp) AS last_seen, AVG(gap) AS mean_days, MIN(gap) AS min_days,
+                   MAX(gap) AS max_days
+            FROM gaps
+            GROUP BY vin
+            HAVING sessions >= 2
+            ORDER BY mean_days
+        '''
+        return self._query(query, params)
+
+
+def _format_days(days) -> str:
+    return '-' if days is None else f"{days:.1f}d"
+
+
+def main():
+    """Command-line access to the history analytics."""
+    parser = argparse.ArgumentParser(
+        description='Emergency Diagnostics Liberator - Diagnostic history analytics'
+    )
+    parser.add_argument('command', choices=['recurring', 'cooccur', 'mtbf', 'rebuild'],
+                        help='Analysis to run')
+    parser.add_argument('--code-db', default='/opt/emergency-diagnostics/codes.db',
+                        help='Path to code database')
+    parser.add_argument('--vin', help='Limit to one machine')
+    parser.add_argument('--code', help='Code in SPN_FMI format (required for mtbf)')
+    parser.add_argument('--min-count', type=int, default=2,
+                        help='Minimum sessions for recurring faults / co-occurring pairs')
+    parser.add_argument('--limit', type=int, default=25, help='Maximum rows')
+    args = parser.parse_args()
+
+    code = parse_code(args.code) if args.code else None
+    if args.command == 'mtbf' and not code:
+        print("Error: mtbf requires --code SPN_FMI")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.code_db)
+    if ensure_history_schema(conn):
+        print("Built fault_history from existing sessions")
+    history = FaultHistory(conn)
+    start = time.perf_counter()
+
+    if args.command == 'rebuild':
+        rebuild_history(conn)
+        print("fault_history rebuilt")
+
+    elif args.command == 'recurring':
+        rows = history.recurring_faults(args.vin, args.min_count, args.limit)
+        print(f"{'VIN':<20} {'SPN':>6} {'FMI':>4} {'Sessions':>8} {'Mean gap':>9}  Last seen")
+        for r in rows:
+            print(f"{r['vin']:<20} {r['spn']:>6} {r['fmi']:>4} {r['sessions']:>8} "
+                  f"{_format_days(r['mean_days_between']):>9}  {r['last_seen']}")
+
+    elif args.command == 'cooccur':
+        spn, fmi = code if code else (None, None)
+        rows = history.co_occurring(spn, fmi, args.vin, args.min_count, args.limit)
+        for r in rows:
+            print(f"SPN {r['spn_a']} FMI {r['fmi_a']} + SPN {r['spn_b']} FMI {r['fmi_b']}: "
+                  f"{r['sessions']} session(s)")
+
+    elif args.command == 'mtbf':
+        rows = history.time_between_failures(code[0], code[1], args.vin)
+        print(f"{'VIN':<20} {'Sessions':>8} {'Mean':>8} {'Min':>8} {'Max':>8}")
+        for r in rows:
+            print(f"{r['vin']:<20} {r['sessions']:>8} {_format_days(r['mean_days']):>8} "
+                  f"{_format_days(r['min_days']):>8} {_format_days(r['max_days']):>8}")
+
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Emergency Diagnostics Liberator - Fleet Diagnostics Sweep
+
+Non-interactive season-start check of a whole fleet. Reads codes from
+many machines concurrently (one worker per interface), gives each machine
+its own timeout and retry budget, writes the results to
+diagnostic_sessions/session_codes in batched transactions and prints a
+consolidated severity-ranked report.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import obd
+    OBD_AVAILABLE = True
+except ImportError:
+    OBD_AVAILABLE = False
+
+try:
+    import can
+    CAN_AVAILABLE = True
+except ImportError:
+    CAN_AVAILABLE = False
+
+from code_index import CodeIndex, normalize_manufacturer
+from j1939_dm import PGN_DM1, DMDecoder, iter_bus_frames
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_RETRIES = 2
+DEFAULT_WORKERS = 16
+DEFAULT_BATCH_SIZE = 10
+
+# DM1 is broadcast once per second; two periods catch every ECU
+DM1_LISTEN_WINDOW = 2.5
+
+SEVERITY_RANK = {'CRITICAL': 0, 'WARNING': 1, 'ADVISORY': 2}
+
+
+@dataclass
+class Machine:
+    """One inventory entry."""
+    name: str
+    interface_type: str = 'can'
+    can_interface: str = 'can0'
+    bustype: str = 'socketcan'
+    port: str = '/dev/ttyUSB0'
+    type: str = 'Unknown'
+    make: str = 'Unknown'
+    model: str = 'Unknown'
+    vin: str = 'Unknown'
+    protocol: str = 'auto'
+    timeout: float = DEFAULT_TIMEOUT
+    retries: int = DEFAULT_RETRIES
+
+
+@dataclass
+class MachineResult:
+    """Outcome of reading one machine."""
+    machine: Machine
+    status: str                     # 'ok', 'failed'
+    codes: List[Dict] = field(default_factory=list)
+    attempts: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    session_id: Optional[int] = None
+
+    @property
+    def critical_count(self) -> int:
+        return sum(1 for c in self.codes if c['severity'].upper() == 'CRITICAL')
+
+
+def load_inventory(path: str) -> List[Machine]:
+    """Load a JSON fleet inventory (list of machines or {"machines": [...]})."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    entries = data['machines'] if isinstance(data, dict) else data
+    known = Machine.__dataclass_fields__
+    return [Machine(**{k: v for k, v in entry.items() if k in known}) for entry in entries]
+
+
+def _read_can(machine: Machine, deadline: float) -> List[tuple]:
+    """Listen for DM1 broadcasts; returns (ecu, spn, fmi) tuples.
+
+    DM1 is broadcast every second even with no active faults, so a window
+    without any DM1 means the machine is off or the bus is down, not clean.
+    """
+    if not CAN_AVAILABLE:
+        raise RuntimeError("python-can library not available")
+
+    bus = can.interface.Bus(channel=machine.can_interface, bustype=machine.bustype)
+    try:
+        decoder = DMDecoder()
+        window = min(DM1_LISTEN_WINDOW, max(0.0, deadline - time.time()))
+        for ts, can_id, data in iter_bus_frames(bus, window):
+            decoder.feed(can_id, data, ts)
+    finally:
+        bus.shutdown()
+
+    if decoder.frames_seen == 0:
+        raise ConnectionError(f"No CAN traffic on {machine.can_interface}")
+    if not any(pgn == PGN_DM1 for pgn, _ in decoder.state):
+        raise ConnectionError(f"No DM1 received on {machine.can_interface} "
+                              f"({decoder.frames_seen} frames seen)")
+
+    return [
+        (f"0x{source:02X}", fault.spn, fault.fmi)
+        for source, faults in decoder.active_faults().items()
+        for fault in faults
+    ]
+
+
+def _read_obd2(machine: Machine, deadline: float) -> List[tuple]:
+    """Query stored DTCs over OBD-II; returns (ecu, code, None) tuples."""
+    if not OBD_AVAILABLE:
+        raise RuntimeError("python-obd library not available")
+
+    connection = obd.OBD(portstr=machine.port, baudrate=115200,
+                         timeout=max(0.1, deadline - time.time()), fast=True)
+    try:
+        if not connection.is_connected():
+            raise ConnectionError(f"Could not connect on {machine.port}")
+        response = connection.query(obd.commands.GET_DTC)
+        if response is None or response.is_null():
+            return []
+        return [('OBD', str(code[0] if isinstance(code, tuple) else code), None)
+                for code in response.value]
+    finally:
+        connection.close()
+
+
+def read_machine(machine: Machine, index: CodeIndex) -> MachineResult:
+    """Read and interpret one machine's codes within its own budget."""
+    start = time.time()
+    reader = _read_can if machine.interface_type == 'can' else _read_obd2
+    manufacturer = normalize_manufacturer(machine.make)
+    error = None
+
+    for attempt in range(1, machine.retries + 2):
+        deadline = time.time() + machine.timeout
+        try:
+            raw = reader(machine, deadline)
+            codes = []
+            for ecu, spn, fmi in raw:
+                if fmi is None:
+                    codes.append({'spn': None, 'fmi': None, 'ecu': ecu, 'description': spn,
+                                  'severity': 'Unknown', 'category': 'Unknown'})
+                    continue
+                interpretation = index.interpret(spn, fmi, manufacturer)
+                interpretation['ecu'] = ecu
+                codes.append(interpretation)
+            return MachineResult(machine, 'ok', codes, attempt, time.time() - start)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if attempt <= machine.retries:
+                time.sleep(min(2.0 ** (attempt - 1), max(0.0, deadline - time.time())))
+
+    return MachineResult(machine, 'failed', [], machine.retries + 1, time.time() - start, error)
+
+
+def write_results(db_conn: sqlite3.Connection, results: List[MachineResult]):
+    """Write one batch of results in a single transaction."""
+    with db_conn:
+        code_rows = []
+        for result in results:
+            machine = result.machine
+            # session_codes needs an SPN/FMI, so OBD-II P-codes stay in the report only
+            stored = [code for code in result.codes if code['spn'] is not None]
+            cursor = db_conn.execute('''
+                INSERT INTO diagnostic_sessions (equipment_type, equipment_make, equipment_model, vin,
+                                                 interface_type, protocol, total_codes, critical_codes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                machine.type, machine.make, machine.model, machine.vin,
+                machine.interface_type, machine.protocol,
+                len(stored) if result.status == 'ok' else None,
+                sum(1 for c in stored if c['severity'].upper() == 'CRITICAL') if result.status == 'ok' else None,
+            ))
+            result.session_id = cursor.lastrowid
+            code_rows.extend(
+                (result.session_id, code['spn'], code['fmi'], code['description'],
+                 code['severity'], code['ecu'], 'Active')
+                for code in stored
+            )
+
+        db_conn.executemany('''
+            INSERT INTO session_codes (session_id, spn, fmi, description, severity, ecu, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', code_rows)
+
+
+def sweep(machines: List[Machine], index: CodeIndex, db_conn: Optional[sqlite3.Connection],
+          workers: int = DEFAULT_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE) -> List[MachineResult]:
+    """Read all machines concurrently, persisting results as batches fill."""
+    results = []
+    pending = []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(machines)))) as pool:
+        futures = {pool.submit(read_machine, machine, index): machine for machine in machines}
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            pending.append(result)
+
+            status = f"{len(result.codes)} code(s)" if result.status == 'ok' else f"FAILED: {result.error}"
+            print(f"  [{len(results)}/{len(machines)}] {result.machine.name}: {status} "
+                  f"({result.elapsed:.1f}s, {result.attempts} attempt(s))")
+
+            if db_conn and len(pending) >= batch_size:
+                write_results(db_conn, pending)
+                pending = []
+
+    if db_conn and pending:
+        write_results(db_conn, pending)
+
+    return results
+
+
+def _severity_key(severity: str) -> int:
+    return SEVERITY_RANK.get((severity or '').upper(), len(SEVERITY_RANK))
+
+
+def build_report(results: List[MachineResult]) -> Dict:
+    """Consolidate results into a severity-ranked fleet report."""
+    by_code: Dict[tuple, Dict] = {}
+    for result in results:
+        for code in result.codes:
+            key = (code['spn'], code['fmi'], code['description'])
+            entry = by_code.setdefault(key, {
+                'spn': code['spn'],
+                'fmi': code['fmi'],
+                'description': code['description'],
+                'severity': code['severity'],
+                'category': code.get('category', 'Unknown'),
+                'machines': [],
+            })
+            if result.machine.name not in entry['machines']:
+                entry['machines'].append(result.machine.name)
+
+    codes = sorted(by_code.values(),
+                   key=lambda c: (_severity_key(c['severity']), -len(c['machines']), c['spn'] or 0))
+
+    machines = sorted(
+        ({
+            'name': r.machine.name,
+            'vin': r.machine.vin,
+            'status': r.status,
+            'session_id': r.session_id,
+            'total_codes': len(r.codes),
+            'critical_codes': r.critical_count,
+            'worst_severity': min((c['severity'] for c in r.codes), key=_severity_key, default=None),
+            'error': r.error,
+        } for r in results),
+        key=lambda m: (m['status'] != 'failed', _severity_key(m['worst_severity']),
+                       -m['total_codes'], m['name'])
+    )
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machines_checked': len(results),
+        'machines_failed': sum(1 for r in results if r.status == 'failed'),
+        'machines_with_codes': sum(1 for r in results if r.codes),
+        'codes': codes,
+        'machines': machines,
+    }
+
+
+def print_report(report: Dict):
+    """Print the consolidated fleet report."""
+    print("")
+    print("=" * 60)
+    print("FLEET DIAGNOSTIC SWEEP")
+    print("=" * 60)
+    print(f"Timestamp: {report['timestamp']}")
+    print(f"Machines checked: {report['machines_checked']} "
+          f"({report['machines_failed']} unreachable, {report['machines_with_codes']} with codes)")
+    print("")
+
+    print("Machines (worst first):")
+    for m in report['machines']:
+        if m['status'] == 'failed':
+            print(f"  {m['name']:<24} UNREACHABLE  {m['error']}")
+        elif m['total_codes']:
+            print(f"  {m['name']:<24} {m['worst_severity'].upper():<12} "
+                  f"{m['total_codes']} code(s), {m['critical_codes']} critical")
+        else:
+            print(f"  {m['name']:<24} OK")
+    print("")
+
+    if report['codes']:
+        print("Codes across fleet (most severe, most widespread first):")
+        for c in report['codes']:
+            label = f"SPN {c['spn']} FMI {c['fmi']}" if c['spn'] is not None else 'OBD'
+            print(f"  [{c['severity'].upper():<8}] {label}: {c['description']}")
+            print(f"             {len(c['machines'])} machine(s): {', '.join(c['machines'])}")
+        print("")
+    print("=" * 60)
+
+
+def main():
+    """Sweep a fleet inventory and report."""
+    parser = argparse.ArgumentParser(
+        description='Emergency Diagnostics Liberator - Fleet diagnostics sweep'
+    )
+    parser.add_argument('inventory', help='Fleet inventory JSON file')
+    parser.add_argument('--code-db', default='/opt/emergency-diagnostics/codes.db',
+                        help='Path to code database')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Machines read concurrently')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Machines written per database transaction')
+    parser.add_argument('--report-dir', default='/var/log/emergency-diagnostics/reports',
+                        help='Directory for the JSON sweep report')
+    parser.add_argument('--no-save', action='store_true',
+                        help='Do not write sessions to the database')
+    args = parser.parse_args()
+
+    try:
+        machines = load_inventory(args.inventory)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error loading inventory: {e}")
+        sys.exit(1)
+
+    if not os.path.exists(args.code_db):
+        print(f"Error: Database not found at {args.code_db}")
+        sys.exit(1)
+
+    db_conn = sqlite3.connect(args.code_db)
+    index = CodeIndex.load(db_conn)
+
+    print(f"Sweeping {len(machines)} machine(s) with {min(args.workers, len(machines))} worker(s)...")
+    start = time.time()
+    results = sweep(machines, index, None if args.no_save else db_conn,
+                    args.workers, args.batch_size)
+    print(f"Sweep finished in {time.time() - start:.1f}s")
+    db_conn.close()
+
+    report = build_report(results)
+    print_report(report)
+
+    if os.path.isdir(args.report_dir):
+        path = os.path.join(args.report_dir,
+                            f"fleet-sweep-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Emergency Diagnostics Liberator - J1939 DM1/DM2 Fault Stream Decoder
+
+Decodes J1939 diagnostic messages (DM1 active faults, DM2 previously
+active faults) from a stream of CAN frames. Handles single-frame messages
+and multi-packet messages carried by the transport protocol (BAM and
+RTS/CTS), keeps the live set of faults per ECU, and reports only changes
+(fault raised or cleared) so callers are not flooded by the 1 Hz DM1
+broadcast.
+
+Frames can come from a python-can bus (SocketCAN, vcan) or from a text
+log in the format printed by the farm data simulator or `candump -L`.
+"""
+
+import argparse
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import can
+    CAN_AVAILABLE = True
+except ImportError:
+    CAN_AVAILABLE = False
+
+# Parameter group numbers
+PGN_DM1 = 0xFECA          # 65226 - Active diagnostic trouble codes
+PGN_DM2 = 0xFECB          # 65227 - Previously active diagnostic trouble codes
+PGN_REQUEST = 0xEA00      # 59904 - Request PGN
+PGN_TP_CM = 0xEC00        # 60416 - Transport protocol connection management
+PGN_TP_DT = 0xEB00        # 60160 - Transport protocol data transfer
+
+DM_NAMES = {PGN_DM1: 'DM1', PGN_DM2: 'DM2'}
+
+# TP.CM control bytes
+TP_CM_RTS = 16
+TP_CM_CTS = 17
+TP_CM_EOM_ACK = 19
+TP_CM_BAM = 32
+TP_CM_ABORT = 255
+
+GLOBAL_ADDRESS = 0xFF
+
+# A BAM/RTS session that stops receiving packets is dropped after this long
+# (J1939-21 T1/T2 timeouts are 750 ms and 1250 ms).
+TP_SESSION_TIMEOUT = 1.25
+
+# Simulator output: "2026-03-01T10:00:00.123 vcan0 0x18FECA00 [8] 00 FF ..."
+SIMULATOR_LINE = re.compile(
+    r'^(?P<ts>\S+)\s+(?P<channel>\S+)\s+0x(?P<id>[0-9A-Fa-f]+)\s+\[(?P<dlc>\d)\]\s*(?P<data>(?:[0-9A-Fa-f]{2}\s*)*)$'
+)
+# candump -L output: "(1709287200.123456) vcan0 18FECA00#00FF..."
+CANDUMP_LINE = re.compile(
+    r'^\((?P<ts>[\d.]+)\)\s+(?P<channel>\S+)\s+(?P<id>[0-9A-Fa-f]+)#(?P<data>[0-9A-Fa-f]*)$'
+)
+
+
+@dataclass(frozen=True)
+class Fault:
+    """A single diagnostic trouble code as carried in DM1/DM2."""
+    spn: int
+    fmi: int
+    oc: int
+    cm: int
+
+    @property
+    def code(self) -> str:
+        """Code string in the SPN_FMI format used by the code database."""
+        return f"{self.spn}_{self.fmi}"
+
+
+@dataclass
+class FaultEvent:
+    """A change in the fault set of one ECU."""
+    event: str              # 'raised' or 'cleared'
+    dm: str                 # 'DM1' or 'DM2'
+    source_address: int
+    fault: Fault
+    timestamp: float
+
+    def __str__(self):
+        when = datetime.fromtimestamp(self.timestamp).strftime('%H:%M:%S.%f')[:-3]
+        return (f"{when} {self.dm} ECU 0x{self.source_address:02X} "
+                f"{self.event.upper():7} SPN {self.fault.spn} FMI {self.fault.fmi} "
+                f"OC {self.fault.oc}")
+
+
+@dataclass
+class EcuFaultState:
+    """Live fault state reported by one ECU for one DM message."""
+    lamps: int = 0
+    faults: Dict[Tuple[int, int], Fault] = field(default_factory=dict)
+    last_seen: float = 0.0
+
+
+@dataclass
+class _TransportSession:
+    """Reassembly buffer for one multi-packet transfer."""
+    pgn: int
+    size: int
+    packets: int
+    buffer: bytearray
+    next_sequence: int = 1
+    last_update: float = 0.0
+
+
+def parse_can_id(can_id: int) -> Tuple[int, int, int, int]:
+    """Split a 29-bit J1939 identifier into (priority, pgn, source, destination)."""
+    priority = (can_id >> 26) & 0x7
+    pdu_format = (can_id >> 16) & 0xFF
+    pdu_specific = (can_id >> 8) & 0xFF
+    source_address = can_id & 0xFF
+
+    if pdu_format < 240:
+        # PDU1: PS field is the destination address, not part of the PGN
+        pgn = (can_id >> 8) & 0x3FF00
+        destination = pdu_specific
+    else:
+        pgn = (can_id >> 8) & 0x3FFFF
+        destination = GLOBAL_ADDRESS
+
+    return priority, pgn, source_address, destination
+
+
+def decode_dtc(data, offset: int = 0) -> Fault:
+    """Decode one 4-byte DTC (SPN conversion method version 4 layout)."""
+    b2 = data[offset + 2]
+    b3 = data[offset + 3]
+    spn = data[offset] | (data[offset + 1] << 8) | ((b2 & 0xE0) << 11)
+    return Fault(spn=spn, fmi=b2 & 0x1F, oc=b3 & 0x7F, cm=b3 >> 7)
+
+
+def decode_dm_payload(data) -> Tuple[int, List[Fault]]:
+    """Decode a DM1/DM2 payload into (lamp status, list of faults).
+
+    Bytes 0-1 hold the lamp status, followed by 4 bytes per DTC. An all-zero
+    DTC means "no faults" and 0xFF filler is ignored.
+    """
+    if len(data) < 2:
+        return 0, []
+
+    lamps = data[0] | (data[1] << 8)
+    faults = []
+    for offset in range(2, len(data) - 3, 4):
+        chunk = data[offset:offset + 4]
+        if chunk == b'\xff\xff\xff\xff' or not any(chunk[:3]):
+            continue
+        faults.append(decode_dtc(data, offset))
+
+    return lamps, faults
+
+
+def build_request(pgn: int, source_address: int = 0xF9,
+                  destination: int = GLOBAL_ADDRESS) -> Tuple[int, bytes]:
+    """Build a Request PGN frame asking for `pgn` (e.g. DM2 on demand)."""
+    can_id = (6 << 26) | (PGN_REQUEST << 8) | (destination << 8) | source_address
+    return can_id, bytes([pgn & 0xFF, (pgn >> 8) & 0xFF, (pgn >> 16) & 0xFF])
+
+
+class DMDecoder:
+    """Streaming DM1/DM2 decoder that tracks live faults per ECU.
+
+    Feed every received frame to `feed()`; it returns the list of fault
+    changes caused by that frame (usually empty). Frames that are not
+    DM1/DM2 or transport protocol are rejected with a couple of integer
+    comparisons, so the decoder keeps up with a fully loaded bus.
+    """
+
+    def __init__(self, stale_after: Optional[float] = None):
+        """stale_after: seconds without DM1 before an ECU's faults are cleared."""
+        self.stale_after = stale_after
+        self.state: Dict[Tuple[int, int], EcuFaultState] = {}
+        self._sessions: Dict[Tuple[int, int], _TransportSession] = {}
+        self.frames_seen = 0
+        self.messages_decoded = 0
+
+    def feed(self, arbitration_id: int, data, timestamp: Optional[float] = None) -> List[FaultEvent]:
+        """Process one CAN frame and return any fault changes it caused."""
+        self.frames_seen += 1
+        pdu_format = (arbitration_id >> 16) & 0xFF
+
+        # Fast path: DM1/DM2 are PDU2 messages in the 0xFE page
+        if pdu_format == 0xFE:
+            pgn = (arbitration_id >> 8) & 0x3FFFF
+            if pgn != PGN_DM1 and pgn != PGN_DM2:
+                return []
+            ts = time.time() if timestamp is None else timestamp
+            return self._apply(pgn, arbitration_id & 0xFF, data, ts)
+
+        if pdu_format == 0xEC or pdu_format == 0xEB:
+            ts = time.time() if timestamp is None else timestamp
+            return self._feed_transport(pdu_format, arbitration_id, data, ts)
+
+        return []
+
+    def feed_message(self, msg) -> List[FaultEvent]:
+        """Process a python-can Message."""
+        if not msg.is_extended_id:
+            return []
+        return self.feed(msg.arbitration_id, msg.data, msg.timestamp or None)
+
+    def _feed_transport(self, pdu_format, arbitration_id, data, ts) -> List[FaultEvent]:
+        source = arbitration_id & 0xFF
+        destination = (arbitration_id >> 8) & 0xFF
+        key = (source, destination)
+
+        if pdu_format == 0xEC:
+            if len(data) < 8:
+                return []
+            control = data[0]
+            if control == TP_CM_BAM or control == TP_CM_RTS:
+                pgn = data[5] | (data[6] << 8) | (data[7] << 16)
+                if pgn != PGN_DM1 and pgn != PGN_DM2:
+                    # Not ours; drop any stale session on the same link
+                    self._sessions.pop(key, None)
+                    return []
+                size = data[1] | (data[2] << 8)
+                self._sessions[key] = _TransportSession(
+                    pgn=pgn, size=size, packets=data[3],
+                    buffer=bytearray(), last_update=ts
+                )
+            elif control == TP_CM_ABORT:
+                self._sessions.pop(key, None)
+            return []
+
+        session = self._sessions.get(key)
+        if session is None or not data:
+            return []
+
+        if data[0] != session.next_sequence or ts - session.last_update > TP_SESSION_TIMEOUT:
+            # Lost or out-of-order packet: the transfer cannot be completed
+            del self._sessions[key]
+            return []
+
+        session.buffer += data[1:8]
+        session.next_sequence += 1
+        session.last_update = ts
+
+        if session.next_sequence > session.packets or len(session.buffer) >= session.size:
+            del self._sessions[key]
+            return self._apply(session.pgn, source, bytes(session.buffer[:session.size]), ts)
+
+        return []
+
+    def _apply(self, pgn: int, source: int, data, ts: float) -> List[FaultEvent]:
+        """Replace the fault set of one ECU and report the differences."""
+        self.messages_decoded += 1
+        lamps, faults = decode_dm_payload(data)
+        dm = DM_NAMES[pgn]
+
+        state = self.state.get((pgn, source))
+        if state is None:
+            state = self.state[(pgn, source)] = EcuFaultState()
+        state.lamps = lamps
+        state.last_seen = ts
+
+        current = {(f.spn, f.fmi): f for f in faults}
+        previous = state.faults
+        if current.keys() == previous.keys():
+            # Same faults; occurrence counts may have moved, keep them fresh
+            state.faults = current
+            return []
+
+        events = []
+        for key, fault in current.items():
+            if key not in previous:
+                events.append(FaultEvent('raised', dm, source, fault, ts))
+        for key, fault in previous.items():
+            if key not in current:
+                events.append(FaultEvent('cleared', dm, source, fault, ts))
+
+        state.faults = current
+        return events
+
+    def expire(self, now: Optional[float] = None) -> List[FaultEvent]:
+        """Clear DM1 faults of ECUs that stopped broadcasting."""
+        if self.stale_after is None:
+            return []
+
+        now = time.time() if now is None else now
+        events = []
+        for (pgn, source), state in self.state.items():
+            if pgn != PGN_DM1 or not state.faults:
+                continue
+            if now - state.last_seen > self.stale_after:
+                for fault in state.faults.values():
+                    events.append(FaultEvent('cleared', 'DM1', source, fault, now))
+                state.faults = {}
+        return events
+
+    def active_faults(self, pgn: int = PGN_DM1) -> Dict[int, List[Fault]]:
+        """Current faults per source address for DM1 (default) or DM2."""
+        return {
+            source: list(state.faults.values())
+            for (state_pgn, source), state in sorted(self.state.items())
+            if state_pgn == pgn and state.faults
+        }
+
+    def active_codes(self, pgn: int = PGN_DM1) -> List[str]:
+        """Current faults as de-duplicated SPN_FMI code strings."""
+        codes = []
+        for faults in self.active_faults(pgn).values():
+            for fault in faults:
+                if fault.code not in codes:
+                    codes.append(fault.code)
+        return codes
+
+
+def parse_log_line(line: str) -> Optional[Tuple[float, int, bytes]]:
+    """Parse one simulator or `candump -L` log line into (timestamp, id, data)."""
+    line = line.strip()
+    match = SIMULATOR_LINE.match(line)
+    if match:
+        try:
+            ts = datetime.fromisoformat(match.group('ts')).timestamp()
+        except ValueError:
+            ts = time.time()
+        data = bytes.fromhex(match.group('data'))
+        return ts, int(match.group('id'), 16), data
+
+    match = CANDUMP_LINE.match(line)
+    if match:
+        return float(match.group('ts')), int(match.group('id'), 16), bytes.fromhex(match.group('data'))
+
+    return None
+
+
+def iter_log_frames(lines: Iterable[str]) -> Iterator[Tuple[float, int, bytes]]:
+    """Yield frames from log lines, skipping anything unparseable."""
+    for line in lines:
+        frame = parse_log_line(line)
+        if frame:
+            yield frame
+
+
+def iter_bus_frames(bus, duration: Optional[float] = None) -> Iterator[Tuple[float, int, bytes]]:
+    """Yield extended frames from a python-can bus for `duration` seconds."""
+    deadline = None if duration is None else time.time() + duration
+    while deadline is None or time.time() < deadline:
+        msg = bus.recv(timeout=0.1)
+        if msg is None or not msg.is_extended_id:
+            continue
+        yield msg.timestamp or time.time(), msg.arbitration_id, msg.data
+
+
+def send_request(bus, pgn: int, source_address: int = 0xF9) -> bool:
+    """Broadcast a Request for `pgn` on a python-can bus; False if the send fails."""
+    can_id, data = build_request(pgn, source_address)
+    try:
+        bus.send(can.Message(arbitration_id=can_id, data=data, is_extended_id=True))
+    except can.CanError:
+        return False
+    return True
+
+
+def watch_bus(bus, decoder: DMDecoder, duration: Optional[float] = None,
+              request_dm2: bool = True) -> Iterator[FaultEvent]:
+    """Yield fault changes from a python-can bus for `duration` seconds.
+
+    Expiry runs once a second on the host clock whether or not frames
+    arrive, so a bus that goes silent still clears its stale DM1 faults.
+    Frames are stamped with the same clock for that reason. With
+    `request_dm2` a DM2 request is broadcast first so previously active
+    faults are reported too.
+    """
+    if request_dm2 and not send_request(bus, PGN_DM2):
+        print("Warning: DM2 request could not be sent")
+
+    now = time.time()
+    deadline = None if duration is None else now + duration
+    last_expire = now
+    while deadline is None or now < deadline:
+        msg = bus.recv(timeout=0.1)
+        now = time.time()
+        if msg is not None and msg.is_extended_id:
+            yield from decoder.feed(msg.arbitration_id, msg.data, now)
+        if now - last_expire >= 1.0:
+            yield from decoder.expire(now)
+            last_expire = now
+
+
+def main():
+    """Watch DM1/DM2 fault changes on a CAN interface or in a log."""
+    parser = argparse.ArgumentParser(
+        description='Emergency Diagnostics Liberator - J1939 DM1/DM2 fault stream decoder'
+    )
+    parser.add_argument('--can-interface', default='can0',
+                        help='CAN interface name (e.g. can0, vcan0)')
+    parser.add_argument('--bustype', default='socketcan',
+                        help='python-can interface type')
+    parser.add_argument('--log', help="Decode a simulator/candump log file instead ('-' for stdin)")
+    parser.add_argument('--duration', type=float,
+                        help='Stop after this many seconds (live bus only)')
+    parser.add_argument('--stale-after', type=float, default=5.0,
+                        help='Clear DM1 faults of an ECU silent for this many seconds')
+    parser.add_argument('--no-dm2-request', action='store_true',
+                        help='Listen only; do not request DM2 at start (live bus only)')
+    args = parser.parse_args()
+
+    decoder = DMDecoder(stale_after=args.stale_after)
+    start = time.time()
+
+    try:
+        if args.log:
+            # Log timestamps drive expiry; a silent stretch ends at the next frame
+            handle = sys.stdin if args.log == '-' else open(args.log, 'r')
+            last_expire = 0.0
+            for ts, can_id, data in iter_log_frames(handle):
+                for event in decoder.feed(can_id, data, ts):
+                    print(event)
+                if ts - last_expire >= 1.0:
+                    for event in decoder.expire(ts):
+                        print(event)
+                    last_expire = ts
+        else:
+            if not CAN_AVAILABLE:
+                print("Error: python-can library not available")
+                print("Install with: pip3 install python-can")
+                sys.exit(1)
+            bus = can.interface.Bus(channel=args.can_interface, bustype=args.bustype)
+            for event in watch_bus(bus, decoder, args.duration, not args.no_dm2_request):
+                print(event)
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = time.time() - start
+    print("")
+    print(f"Frames: {decoder.frames_seen}, DM messages: {decoder.messages_decoded}, "
+          f"elapsed {elapsed:.1f}s")
+    for source, faults in decoder.active_faults().items():
+        codes = ', '.join(f"SPN {f.spn} FMI {f.fmi}" for f in faults)
+        print(f"  ECU 0x{source:02X}: {codes}")
+
+
+if __name__ == '__main__':
+    main()
@@ -31,6 +31,10 @@ DIAG_REPORT_DIR="${DIAG_REPORT_DIR:-/var/log/emergency-diagnostics/reports}"
 SAFETY_OVERRIDE_DISABLED="${SAFETY_OVERRIDE_DISABLED:-true}"
 REQUIRE_CONFIRMATION="${REQUIRE_CONFIRMATION:-true}"
 WARN_BEFORE_CLEAR="${WARN_BEFORE_CLEAR:-true}"
+CAPTURE_PARAMS="${CAPTURE_PARAMS:-190,110,100,105,102,168}"
+CAPTURE_RATE_HZ="${CAPTURE_RATE_HZ:-20}"
+CAPTURE_PRE_TRIGGER="${CAPTURE_PRE_TRIGGER:-60}"
+CAPTURE_POST_TRIGGER="${CAPTURE_POST_TRIGGER:-30}"
 
 # Colors
 RED='\033[0;31m'
@@ -179,7 +183,11 @@ python3 "$SCRIPT_DIR/diagnostics.py" \
     --report-dir "$DIAG_REPORT_DIR" \
     --safety-override-disabled "$SAFETY_OVERRIDE_DISABLED" \
     --require-confirmation "$REQUIRE_CONFIRMATION" \
-    --warn-before-clear "$WARN_BEFORE_CLEAR"
+    --warn-before-clear "$WARN_BEFORE_CLEAR" \
+    --capture-params "$CAPTURE_PARAMS" \
+    --capture-rate "$CAPTURE_RATE_HZ" \
+    --pre-trigger "$CAPTURE_PRE_TRIGGER" \
+    --post-trigger "$CAPTURE_POST_TRIGGER"
 
 # Cleanup on exit
 echo ""
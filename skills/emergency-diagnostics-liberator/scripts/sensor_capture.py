@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Emergency Diagnostics Liberator - High-Rate Sensor Capture
+
+Records live parameters around an intermittent fault. A background thread
+either polls OBD-II PIDs or passively decodes J1939 SPNs from CAN
+broadcasts into an in-memory ring buffer that holds the pre-trigger
+window. On trigger it keeps recording for the post-trigger window, then
+writes the whole capture into `sensor_data` in one transaction.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_RATE_HZ = 20.0
+DEFAULT_PRE_TRIGGER = 60.0
+DEFAULT_POST_TRIGGER = 30.0
+
+
+@dataclass(frozen=True)
+class SpnDefinition:
+    """Location and scaling of one SPN inside its parameter group."""
+    spn: int
+    name: str
+    pgn: int
+    start_byte: int
+    length: int
+    resolution: float
+    offset: float
+    unit: str
+
+
+# Common engine/vehicle SPNs (J1939-71 broadcast parameter groups)
+J1939_SPNS = {
+    definition.spn: definition for definition in [
+        SpnDefinition(91, 'Accelerator Pedal Position', 0xF003, 1, 1, 0.4, 0, '%'),
+        SpnDefinition(190, 'Engine Speed', 0xF004, 3, 2, 0.125, 0, 'rpm'),
+        SpnDefinition(110, 'Engine Coolant Temperature', 0xFEEE, 0, 1, 1, -40, 'C'),
+        SpnDefinition(175, 'Engine Oil Temperature', 0xFEEE, 2, 2, 0.03125, -273, 'C'),
+        SpnDefinition(94, 'Fuel Delivery Pressure', 0xFEEF, 0, 1, 4, 0, 'kPa'),
+        SpnDefinition(100, 'Engine Oil Pressure', 0xFEEF, 3, 1, 4, 0, 'kPa'),
+        SpnDefinition(111, 'Engine Coolant Level', 0xFEEF, 7, 1, 0.4, 0, '%'),
+        SpnDefinition(84, 'Wheel-Based Vehicle Speed', 0xFEF1, 1, 2, 1 / 256, 0, 'km/h'),
+        SpnDefinition(183, 'Engine Fuel Rate', 0xFEF2, 0, 2, 0.05, 0, 'L/h'),
+        SpnDefinition(172, 'Air Inlet Temperature', 0xFEF5, 5, 1, 1, -40, 'C'),
+        SpnDefinition(102, 'Boost Pressure', 0xFEF6, 1, 1, 2, 0, 'kPa'),
+        SpnDefinition(105, 'Intake Manifold Temperature', 0xFEF6, 2, 1, 1, -40, 'C'),
+        SpnDefinition(168, 'Battery Potential', 0xFEF7, 4, 2, 0.05, 0, 'V'),
+        SpnDefinition(247, 'Engine Total Hours', 0xFEE5, 0, 4, 0.05, 0, 'h'),
+    ]
+}
+
+# Values at or above these raw limits mean "error" / "not available"
+_RAW_LIMITS = {1: 0xFA, 2: 0xFAFF, 4: 0xFAFFFFFF}
+
+
+@dataclass
+class Sample:
+    """One recorded parameter value."""
+    timestamp: float
+    spn: int
+    name: str
+    value: float
+    unit: str
+
+
+def parse_parameter_list(text: str) -> List[str]:
+    """Split a comma-separated parameter list (SPNs or OBD command names)."""
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+
+class SensorCapture:
+    """Background capture of live parameters with a pre-trigger ring buffer.
+
+    mode 'can' decodes J1939 broadcasts from a python-can bus; mode 'obd2'
+    polls python-obd commands. `on_frame` (CAN only) receives every frame
+    so other decoders can share the bus while capture owns it.
+    """
+
+    def __init__(self, connection, mode: str, parameters: List[str],
+                 db_path: str, session_id: int,
+                 rate_hz: float = DEFAULT_RATE_HZ,
+                 pre_trigger: float = DEFAULT_PRE_TRIGGER,
+                 post_trigger: float = DEFAULT_POST_TRIGGER,
+                 connection_lock: Optional[threading.Lock] = None,
+                 on_frame: Optional[Callable[[float, int, bytes], None]] = None):
+        self.connection = connection
+        self.mode = mode
+        self.db_path = db_path
+        self.session_id = session_id
+        self.rate_hz = rate_hz
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.connection_lock = connection_lock or threading.Lock()
+        self.on_frame = on_frame
+
+        self.parameters = self._resolve_parameters(parameters)
+        capacity = max(1, int(pre_trigger * rate_hz * max(1, len(self.parameters))))
+        self.buffer: deque = deque(maxlen=capacity)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._post_samples: Optional[List[Sample]] = None
+        self._trigger_time: Optional[float] = None
+        self._last_sample: Dict[int, float] = {}
+
+        self.started_at: Optional[float] = None
+        self.sample_counts: Dict[int, int] = {}
+        self.captures_written = 0
+        self.last_result: Optional[str] = None
+
+    def _resolve_parameters(self, parameters):
+        """Map configured names to SPN definitions or OBD commands."""
+        resolved = {}
+        if self.mode == 'can':
+            by_pgn: Dict[int, List[SpnDefinition]] = {}
+            for item in parameters:
+                definition = J1939_SPNS.get(int(item)) if item.isdigit() else None
+                if definition is None:
+                    print(f"Warning: SPN {item} has no decoding definition, skipping")
+                    continue
+                resolved[definition.spn] = definition
+                by_pgn.setdefault(definition.pgn, []).append(definition)
+            self._by_pgn = by_pgn
+        else:
+            import obd
+            for item in parameters:
+                command = getattr(obd.commands, item.upper(), None)
+                if command is None:
+                    print(f"Warning: unknown OBD command {item}, skipping")
+                    continue
+                pid = int(command.command[-2:], 16)
+                resolved[pid] = command
+        return resolved
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def triggered(self) -> bool:
+        return self._trigger_time is not None
+
+    def start(self):
+        """Start the background capture thread."""
+        if self.running:
+            return
+        if not self.parameters:
+            raise ValueError("No capturable parameters configured")
+
+        self._stop.clear()
+        self.started_at = time.time()
+        target = self._run_can if self.mode == 'can' else self._run_obd
+        self._thread = threading.Thread(target=target, name='sensor-capture', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop capturing; an in-progress trigger is written first."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        if self.triggered:
+            self._finish_trigger()
+
+    def trigger(self) -> bool:
+        """Freeze the pre-trigger window and start the post-trigger window."""
+        with self._lock:
+            if self._trigger_time is not None:
+                return False
+            self._trigger_time = time.time()
+            self._post_samples = list(self.buffer)
+        return True
+
+    def _record(self, sample: Sample):
+        with self._lock:
+            if self._post_samples is not None:
+                self._post_samples.append(sample)
+            else:
+                self.buffer.append(sample)
+            self.sample_counts[sample.spn] = self.sample_counts.get(sample.spn, 0) + 1
+
+    def _check_trigger(self, now: float):
+        if self._trigger_time is not None and now - self._trigger_time >= self.post_trigger:
+            self._finish_trigger()
+
+    def _run_can(self):
+        """Passively decode J1939 broadcasts, limited to rate_hz per SPN."""
+        min_interval = 1.0 / self.rate_hz
+        by_pgn = self._by_pgn
+        while not self._stop.is_set():
+            msg = self.connection.recv(timeout=0.1)
+            now = time.time()
+            self._check_trigger(now)
+            if msg is None or not msg.is_extended_id:
+                continue
+
+            ts = msg.timestamp or now
+            if self.on_frame:
+                self.on_frame(ts, msg.arbitration_id, msg.data)
+
+            can_id = msg.arbitration_id
+            pgn = (can_id >> 8) & (0x3FFFF if ((can_id >> 16) & 0xFF) >= 240 else 0x3FF00)
+            definitions = by_pgn.get(pgn)
+            if not definitions:
+                continue
+
+            data = msg.data
+            for definition in definitions:
+                if ts - self._last_sample.get(definition.spn, 0.0) < min_interval:
+                    continue
+                end = definition.start_byte + definition.length
+                if len(data) < end:
+                    continue
+                raw = int.from_bytes(data[definition.start_byte:end], 'little')
+                if raw > _RAW_LIMITS[definition.length]:
+                    continue
+                self._last_sample[definition.spn] = ts
+                self._record(Sample(ts, definition.spn, definition.name,
+                                    raw * definition.resolution + definition.offset,
+                                    definition.unit))
+
+    def _run_obd(self):
+        """Poll OBD-II commands at rate_hz (the adapter may not keep up)."""
+        interval = 1.0 / self.rate_hz
+        next_cycle = time.time()
+        while not self._stop.is_set():
+            for pid, command in self.parameters.items():
+                with self.connection_lock:
+                    response = self.connection.query(command)
+                if response is None or response.is_null():
+                    continue
+                value = response.value
+                magnitude = getattr(value, 'magnitude', value)
+                try:
+                    magnitude = float(magnitude)
+                except (TypeError, ValueError):
+                    continue
+                unit = str(getattr(value, 'units', ''))
+                self._record(Sample(time.time(), pid, command.name, magnitude, unit))
+
+            now = time.time()
+            self._check_trigger(now)
+            next_cycle += interval
+            if next_cycle > now:
+                time.sleep(next_cycle - now)
+            else:
+                # Falling behind: do not try to catch up with a burst
+                next_cycle = now
+
+    def _finish_trigger(self):
+        """Write pre- and post-trigger samples and re-arm."""
+        with self._lock:
+            samples = self._post_samples or []
+            trigger_time = self._trigger_time
+            self._post_samples = None
+            self._trigger_time = None
+            self.buffer.clear()
+
+        if trigger_time is None:
+            return
+
+        written = self.write_samples(samples)
+        self.captures_written += 1
+        self.last_result = (f"Capture at {datetime.fromtimestamp(trigger_time).strftime('%H:%M:%S')}: "
+                            f"{written} samples written to session {self.session_id}")
+        print(self.last_result)
+
+    def write_samples(self, samples: List[Sample]) -> int:
+        """Bulk-insert samples into sensor_data in one transaction."""
+        if not samples:
+            return 0
+
+        rows = [
+            (self.session_id, s.spn, s.name, s.value, s.unit,
+             datetime.fromtimestamp(s.timestamp).isoformat(sep=' ', timespec='milliseconds'))
+            for s in samples
+        ]
+        # sqlite connections are per-thread; the writer opens its own
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO sensor_data (session_id, spn, parameter_name, value, unit, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+        finally:
+            conn.close()
+        return len(rows)
+
+    def stats(self) -> Dict:
+        """Configured vs achieved sample rates per parameter."""
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        with self._lock:
+            counts = dict(self.sample_counts)
+            buffered = len(self.buffer)
+        parameters = []
+        for key, parameter in self.parameters.items():
+            count = counts.get(key, 0)
+            parameters.append({
+                'spn': key,
+                'name': parameter.name,
+                'samples': count,
+                'achieved_hz': count / elapsed if elapsed > 0 else 0.0,
+            })
+        return {
+            'mode': self.mode,
+            'running': self.running,
+            'triggered': self.triggered,
+            'target_hz': self.rate_hz,
+            'elapsed': elapsed,
+            'buffered': buffered,
+            'buffer_capacity': self.buffer.maxlen,
+            'captures_written': self.captures_written,
+            'parameters': parameters,
+        }
+
+    def print_status(self):
+        """Print capture state and achieved-rate report."""
+        stats = self.stats()
+        state = 'triggered' if stats['triggered'] else ('running' if stats['running'] else 'stopped')
+        print(f"Capture {state} ({stats['mode']}), target {stats['target_hz']:.0f} Hz, "
+              f"{stats['elapsed']:.0f}s elapsed")
+        print(f"Buffer: {stats['buffered']}/{stats['buffer_capacity']} samples "
+              f"({self.pre_trigger:.0f}s pre-trigger, {self.post_trigger:.0f}s post-trigger)")
+        for parameter in stats['parameters']:
+            print(f"  {parameter['spn']:>5} {parameter['name']:<32} "
+                  f"{parameter['achieved_hz']:6.1f} Hz ({parameter['samples']} samples)")
+        if self.last_result:
+            print(self.last_result)
@@ -11,6 +11,8 @@ import os
 import sys
 from pathlib import Path
 
+from fault_history import ensure_history_schema
+
 # Database path
 CODE_DB_PATH = os.environ.get('CODE_DB_PATH', '/opt/emergency-diagnostics/codes.db')
 
@@ -107,6 +109,9 @@ def create_database():
         )
     ''')
 
+    # Indexes, fault_history aggregation table and its maintenance trigger
+    ensure_history_schema(conn)
+
     conn.commit()
     print("Database structure created successfully")
     return conn, cursor
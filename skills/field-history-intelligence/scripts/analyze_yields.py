@@ -9,26 +9,33 @@ import argparse
 import sys
 from datetime import datetime, timedelta
 
+from query_cache import QueryCache
+from yield_summary import TREND_YEARS, ensure_summary_schema, refresh_summaries
+
+# Tables the yield reports depend on (for query cache invalidation)
+YIELD_TABLES = ['fields', 'seasons', 'planting', 'harvest']
+
 def analyze_yields(conn, field_name=None, years=None):
     """Analyze yield data from database"""
+    refresh_summaries(conn)
     cursor = conn.cursor()
 
-    # Build query
+    # Build query (one row per field, season and variety)
     query = """
         SELECT
             f.name AS field_name,
-            s.year,
-            h.variety,
-            h.yield,
-            h.moisture,
-            h.test_weight,
-            p.planting_date,
-            h.harvest_date
-        FROM harvest h
-        JOIN fields f ON h.field_id = f.id
-        JOIN seasons s ON h.season_id = s.id
-        LEFT JOIN planting p ON h.field_id = p.field_id AND h.season_id = p.season_id
-        WHERE h.yield IS NOT NULL
+            y.year,
+            y.variety,
+            y.yield_sum / y.records,
+            y.moisture_sum / NULLIF(y.moisture_n, 0),
+            y.test_weight_sum / NULLIF(y.test_weight_n, 0),
+            y.planting_date,
+            y.last_harvest,
+            y.records,
+            y.yield_sum
+        FROM yield_summary y
+        JOIN fields f ON y.field_id = f.id
+        WHERE 1 = 1
     """
     params = []
 
@@ -37,10 +44,10 @@ def analyze_yields(conn, field_name=None, years=None):
         params.append(field_name)
 
     if years:
-        query += f" AND s.year IN ({','.join(['?'] * len(years))})"
+        query += f" AND y.year IN ({','.join(['?'] * len(years))})"
         params.extend(years)
 
-    query += " ORDER BY f.name, s.year DESC"
+    query += " ORDER BY f.name, y.year DESC"
 
     cursor.execute(query, params)
     results = cursor.fetchall()
@@ -59,12 +66,16 @@ def analyze_yields(conn, field_name=None, years=None):
     # Print results
     total_yield = 0
     total_records = 0
+    lines = []
 
     for row in results:
-        field_name, year, variety, yield_val, moisture, test_weight, planting_date, harvest_date = row
-        print(f"{field_name:<20} {year:<6} {variety:<20} {yield_val:<10.1f} {moisture:<10.1f} {planting_date or 'N/A':<12} {harvest_date:<12}")
-        total_yield += yield_val
-        total_records += 1
+        field, year, variety, yield_val, moisture, test_weight, planting_date, harvest_date, records, yield_sum = row
+        moisture = f"{moisture:.1f}" if moisture is not None else 'N/A'
+        lines.append(f"{field:<20} {year:<6} {variety or 'N/A':<20} {yield_val:<10.1f} {moisture:<10} "
+                     f"{planting_date or 'N/A':<12} {harvest_date or 'N/A':<12}")
+        total_yield += yield_sum
+        total_records += records
+    print("\n".join(lines))
 
     # Print summary
     print("-"*120)
@@ -79,53 +90,86 @@ def analyze_yields(conn, field_name=None, years=None):
 
 def analyze_field_trend(conn, field_name):
     """Analyze yield trend for a specific field"""
+    refresh_summaries(conn)
     cursor = conn.cursor()
 
-    query = """
-        SELECT s.year, AVG(h.yield) as avg_yield, COUNT(*) as variety_count
-        FROM harvest h
-        JOIN fields f ON h.field_id = f.id
-        JOIN seasons s ON h.season_id = s.id
-        WHERE f.name = ? AND h.yield IS NOT NULL
-        GROUP BY s.year
-        ORDER BY s.year DESC
-        LIMIT 10
-    """
+    cursor.execute("""
+        SELECT t.years, t.slope
+        FROM field_trend t
+        JOIN fields f ON t.field_id = f.id
+        WHERE f.name = ?
+    """, (field_name,))
+    trend = cursor.fetchone()
+
+    if not trend or trend[0] < 3:
+        return
 
-    cursor.execute(query, (field_name,))
+    cursor.execute("""
+        SELECT y.year, SUM(y.yield_sum) / SUM(y.records) AS avg_yield, SUM(y.records) AS variety_count
+        FROM yield_summary y
+        JOIN fields f ON y.field_id = f.id
+        WHERE f.name = ?
+        GROUP BY y.year
+        ORDER BY y.year DESC
+        LIMIT ?
+    """, (field_name, TREND_YEARS))
     results = cursor.fetchall()
 
-    if len(results) >= 3:
-        print(f"\n{field_name} - Yield Trend (Last 10 years):")
-        print("-"*40)
+    years, slope = trend
+    print(f"\n{field_name} - Yield Trend (Last {TREND_YEARS} years):")
+    print("-"*40)
 
-        # Calculate trend
-        years = [r[0] for r in reversed(results)]
-        yields = [r[1] for r in reversed(results)]
+    if slope is not None:
+        print(f"Trend: {slope:.1f} bu/ac/year")
 
-        # Simple linear trend calculation
-        if len(years) > 1:
-            n = len(years)
-            sum_x = sum(years)
-            sum_y = sum(yields)
-            sum_xy = sum(x * y for x, y in zip(years, yields))
-            sum_x2 = sum(x**2 for x in years)
+        if slope > 2:
+            print("Trend: POSITIVE (improving)")
+        elif slope < -2:
+            print("Trend: NEGATIVE (declining)")
+        else:
+            print("Trend: STABLE")
 
-            slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x**2)
-            intercept = (sum_y - slope * sum_x) / n
+    print("\nYearly breakdown:")
+    for year, avg_yield, count in results:
+        print(f"  {year}: {avg_yield:.1f} bu/ac ({count} varieties)")
 
-            print(f"Trend: {slope:.1f} bu/ac/year")
+def rank_varieties(conn, crop=None, min_field_seasons=1, limit=20):
+    """Print variety rankings by average yield"""
+    refresh_summaries(conn)
+    cursor = conn.cursor()
 
-            if slope > 2:
-                print("Trend: POSITIVE (improving)")
-            elif slope < -2:
-                print("Trend: NEGATIVE (declining)")
-            else:
-                print("Trend: STABLE")
+    query = """
+        SELECT crop, variety, avg_yield, min_yield, max_yield, field_seasons, first_year, last_year
+        FROM variety_summary
+        WHERE field_seasons >= ?
+    """
+    params = [min_field_seasons]
+    if crop:
+        query += " AND crop = ?"
+        params.append(crop)
+    query += " ORDER BY crop, avg_yield DESC"
 
-        print("\nYearly breakdown:")
-        for year, avg_yield, count in results:
-            print(f"  {year}: {avg_yield:.1f} bu/ac ({count} varieties)")
+    cursor.execute(query, params)
+    results = cursor.fetchall()
+
+    if not results:
+        print("No variety data found")
+        return
+
+    print("\n" + "="*90)
+    print("VARIETY RANKINGS")
+    print("="*90)
+    print(f"{'Crop':<12} {'Variety':<24} {'Avg':>8} {'Min':>8} {'Max':>8} {'Fields':>7}  Years")
+    print("-"*90)
+
+    shown = {}
+    for crop_name, variety, avg_yield, min_yield, max_yield, field_seasons, first_year, last_year in results:
+        shown[crop_name] = shown.get(crop_name, 0) + 1
+        if shown[crop_name] > limit:
+            continue
+        print(f"{crop_name:<12} {variety or 'N/A':<24} {avg_yield:>8.1f} {min_yield:>8.1f} "
+              f"{max_yield:>8.1f} {field_seasons:>7}  {first_year}-{last_year}")
+    print("="*90)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -146,6 +190,20 @@ def main():
         type=int,
         help='Years to analyze (default: all years)'
     )
+    parser.add_argument(
+        '--varieties',
+        action='store_true',
+        help='Show variety rankings instead of the yield report'
+    )
+    parser.add_argument(
+        '--crop',
+        help='Crop for variety rankings (default: all crops)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the query cache'
+    )
 
     args = parser.parse_args()
 
@@ -157,7 +215,14 @@ def main():
         sys.exit(1)
 
     try:
-        analyze_yields(conn, args.field, args.years)
+        ensure_summary_schema(conn)
+        cache = QueryCache(conn, enabled=False if args.no_cache else None)
+        if args.varieties:
+            cache.run_report('analyze-yields', {'varieties': True, 'crop': args.crop},
+                             YIELD_TABLES, rank_varieties, conn, args.crop)
+        else:
+            cache.run_report('analyze-yields', {'field': args.field, 'years': args.years},
+                             YIELD_TABLES, analyze_yields, conn, args.field, args.years)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         conn.close()
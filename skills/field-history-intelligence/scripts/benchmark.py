@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Query Benchmark
+Time imports, summaries and the report paths against a field history database
+
+Point it at a database built by generate_benchmark_data.py (or generate
+one with --generate). Each case runs --repeat times and reports median
+and best latency, rows processed and rows/s, followed by database size
+and table row counts. Use --output to save the results as JSON, so runs
+before and after a change can be compared.
+
+The import case loads a harvest CSV into a scratch season and deletes it
+afterwards, so the database is left as it was.
+"""
+
+import sqlite3
+import argparse
+import csv
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date
+
+from analyze_yields import YIELD_TABLES, analyze_field_trend, analyze_yields, rank_varieties
+from import_csv import import_csv
+from profitability import crop_profitability, ensure_profit_schema, refresh_profitability
+from query_cache import QueryCache
+from search import ensure_search_schema, search_records
+from weather_series import ensure_weather_series_schema, rebuild_weather_series, window_totals
+from yield_summary import ensure_summary_schema, rebuild_summaries, refresh_summaries
+import yield_analytics
+
+SCRATCH_SEASON = 'Benchmark Import'
+
+REPORTED_TABLES = ['fields', 'seasons', 'planting', 'harvest', 'inputs', 'financial_records',
+                   'observations', 'soil_tests', 'weather']
+
+
+def _quiet(func, *args, **kwargs):
+    """Call a print-based report with its output discarded."""
+    with redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def _count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class Benchmark:
+    """Runs named cases and collects their timings."""
+
+    def __init__(self, conn, repeat=3):
+        self.conn = conn
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, name, func, rows=None, setup=None, teardown=None):
+        """Time func() `repeat` times; `rows` is the number of rows one call processes."""
+        timings = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+            if teardown:
+                teardown()
+
+        median = statistics.median(timings)
+        result = {
+            'case': name,
+            'median_ms': median * 1000,
+            'best_ms': min(timings) * 1000,
+            'rows': rows,
+            'rows_per_s': rows / median if rows and median > 0 else None,
+        }
+        self.results.append(result)
+        count = f"{rows:>12,}" if rows else f"{'':>12}"
+        rate = f"{result['rows_per_s']:>14,.0f}" if result['rows_per_s'] else f"{'':>14}"
+        print(f"  {name:<34} {result['median_ms']:>10.1f} {result['best_ms']:>10.1f} {count} {rate}")
+        return result
+
+
+def import_case(bench, tmpdir, rows_per_field=10):
+    """Harvest CSV import into a scratch season, removed after each run."""
+    conn = bench.conn
+    fields = [name for (name,) in conn.execute("SELECT name FROM fields ORDER BY id")]
+    path = os.path.join(tmpdir, 'harvest.csv')
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['field_name', 'season', 'harvest_date', 'variety', 'yield', 'moisture', 'test_weight'])
+        for name in fields:
+            for i in range(rows_per_field):
+                writer.writerow([name, SCRATCH_SEASON, f"{date.today().year}-10-{i % 28 + 1:02d}",
+                                 'BENCH-1', 180.5, 17.2, 56.0])
+
+    def setup():
+        with conn:
+            conn.execute("INSERT INTO seasons (name, year, crop_type) VALUES (?, ?, 'Corn')",
+                         (SCRATCH_SEASON, date.today().year + 100))
+
+    def teardown():
+        with conn:
+            conn.execute("""
+                DELETE FROM harvest WHERE season_id IN (SELECT id FROM seasons WHERE name = ?)
+            """, (SCRATCH_SEASON,))
+            conn.execute("DELETE FROM seasons WHERE name = ?", (SCRATCH_SEASON,))
+        refresh_summaries(conn)
+        refresh_profitability(conn)
+
+    bench.run('import_csv harvest', lambda: _quiet(import_csv, conn, path, 'harvest'),
+              len(fields) * rows_per_field, setup, teardown)
+
+
+def run_benchmarks(conn, repeat=3):
+    """Run every case; returns the list of results."""
+    bench = Benchmark(conn, repeat)
+    ensure_summary_schema(conn)
+    ensure_weather_series_schema(conn)
+    ensure_profit_schema(conn)
+    ensure_search_schema(conn)
+    refresh_profitability(conn)
+
+    harvest_rows = _count(conn, 'harvest')
+    weather_rows = _count(conn, 'weather')
+    first_field = conn.execute("SELECT name FROM fields ORDER BY id LIMIT 1").fetchone()
+    first_field = first_field[0] if first_field else ''
+    windows = [(field_id, planted, harvested) for field_id, planted, harvested in conn.execute("""
+        SELECT p.field_id, MIN(p.planting_date), MAX(h.harvest_date)
+        FROM planting p
+        JOIN harvest h ON h.field_id = p.field_id AND h.season_id = p.season_id
+        GROUP BY p.field_id, p.season_id
+    """)]
+
+    print(f"  {'Case':<34} {'Median ms':>10} {'Best ms':>10} {'Rows':>12} {'Rows/s':>14}")
+    print("  " + "-"*84)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        import_case(bench, tmpdir)
+
+    bench.run('yield summaries rebuild', lambda: rebuild_summaries(conn), harvest_rows)
+    bench.run('analyze_yields (all fields)', lambda: _quiet(analyze_yields, conn), harvest_rows)
+    bench.run('analyze_yields (one field)', lambda: _quiet(analyze_yields, conn, first_field))
+    bench.run('analyze_field_trend', lambda: _quiet(analyze_field_trend, conn, first_field))
+    bench.run('rank_varieties', lambda: _quiet(rank_varieties, conn))
+
+    cache = QueryCache(conn, enabled=True, expiration=0)
+    params = {'benchmark': True}
+    cached_report = lambda: _quiet(cache.run_report, 'benchmark', params, YIELD_TABLES, analyze_yields, conn)
+    cached_report()
+    bench.run('query cache hit (analyze_yields)', cached_report)
+    with conn:
+        conn.execute("DELETE FROM query_cache WHERE tool = 'benchmark'")
+        conn.execute("DELETE FROM query_cache_metrics WHERE tool = 'benchmark'")
+
+    if yield_analytics.NUMPY_AVAILABLE:
+        def anomalies():
+            matrix = yield_analytics.load_yield_matrix(conn)
+            gdd, precip = yield_analytics.load_weather_matrix(conn, matrix)
+            yield_analytics.attention_table(matrix, yield_analytics.analyze(matrix, gdd, precip))
+        bench.run('field anomalies (numpy)', anomalies, harvest_rows + weather_rows)
+
+    def profit_rebuild():
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO profit_dirty_seasons SELECT id FROM seasons")
+        refresh_profitability(conn)
+    bench.run('profitability rebuild', profit_rebuild, harvest_rows + _count(conn, 'inputs'))
+    bench.run('profitability crop report', lambda: crop_profitability(conn))
+
+    bench.run('weather running totals rebuild', lambda: rebuild_weather_series(conn), weather_rows)
+    bench.run('weather windows (all seasons)', lambda: window_totals(conn, windows), len(windows))
+    bench.run('search observations', lambda: search_records(conn, 'rootworm'))
+    bench.run('search with field/date filter',
+              lambda: search_records(conn, 'spot', first_field, None, '2010-01-01', '2020-12-31'))
+
+    return bench.results
+
+
+def database_stats(conn, path):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return {
+        'file_mb': os.path.getsize(path) / 1024 / 1024,
+        'pages_mb': page_size * page_count / 1024 / 1024,
+        'rows': {table: _count(conn, table) for table in REPORTED_TABLES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark field history imports and queries'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/benchmark.db',
+        help='Path to SQLite database to benchmark'
+    )
+    parser.add_argument(
+        '--generate',
+        action='store_true',
+        help='Generate the database first (overwrites it)'
+    )
+    parser.add_argument('--fields', type=int, default=2000, help='Fields to generate (default: 2000)')
+    parser.add_argument('--seasons', type=int, default=25, help='Seasons to generate (default: 25)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case (default: 3)')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+
+    args = parser.parse_args()
+
+    if args.generate:
+        from generate_benchmark_data import generate
+        from init_database import create_schema
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+        conn = sqlite3.connect(args.database)
+        create_schema(conn)
+        print(f"Generating {args.fields} fields x {args.seasons} seasons")
+        generate(conn, args.fields, args.seasons, date.today().year - args.seasons)
+        conn.execute("ANALYZE")
+        conn.close()
+    elif not os.path.exists(args.database):
+        print(f"Database not found: {args.database}", file=sys.stderr)
+        print("Run generate_benchmark_data.py or pass --generate", file=sys.stderr)
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.database)
+    print("\n" + "="*88)
+    print(f"FIELD HISTORY BENCHMARK - {args.database}")
+    print("="*88)
+
+    try:
+        results = run_benchmarks(conn, args.repeat)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        stats = database_stats(conn, args.database)
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+    conn.close()
+
+    print(f"\nDatabase size: {stats['file_mb']:,.1f} MB")
+    for table, rows in stats['rows'].items():
+        print(f"  {table:<20} {rows:>12,} rows")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'database': args.database, 'sqlite_version': sqlite3.sqlite_version,
+                       'repeat': args.repeat, 'cases': results, 'database_stats': stats}, f, indent=2)
+        print(f"\nResults written to: {args.output}")
+
+if __name__ == '__main__':
+    main()
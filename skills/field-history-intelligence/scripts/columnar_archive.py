@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Columnar Archive
+Export field history to partitioned Arrow files for fast analytics
+
+Each field-keyed table is written as uncompressed Arrow IPC files under
+<archive>/<table>/year=<year>/part-<n>.arrow. Rows in a file are sorted
+by field with per-field row ranges in the schema metadata, so the reader
+memory-maps files and prunes by year and field without copying. fields
+and seasons are written as a single file each.
+
+Syncs are incremental: rows with an id above the table's watermark are
+appended as new part files, and triggers record the (table, field, year)
+partitions touched by UPDATE/DELETE so only those years are rewritten.
+Changing a season's year needs a --full sync.
+"""
+
+import sqlite3
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from itertools import groupby
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_ARCHIVE = '/opt/field-history/archive'
+MANIFEST_FILE = '_manifest.json'
+COMPACT_PARTS = 8
+
+_SEASON_YEAR = "(SELECT year FROM seasons WHERE id = {row}.season_id)"
+
+# Partitioned tables and how each row's year is derived
+PARTITIONED_TABLES = {
+    'planting': _SEASON_YEAR,
+    'harvest': _SEASON_YEAR,
+    'inputs': _SEASON_YEAR,
+    'equipment_usage': _SEASON_YEAR,
+    'financial_records': _SEASON_YEAR,
+    'weather': "CAST(strftime('%Y', {row}.date) AS INTEGER)",
+    'soil_tests': "CAST(strftime('%Y', {row}.test_date) AS INTEGER)",
+    'observations': "CAST(strftime('%Y', {row}.observation_date) AS INTEGER)",
+}
+
+# Small dimension tables, rewritten whole on every sync
+DIMENSION_TABLES = ['fields', 'seasons']
+
+
+def archive_schema_sql():
+    """Change-tracking table and UPDATE/DELETE triggers for every partitioned table."""
+    statements = ["""
+        CREATE TABLE IF NOT EXISTS archive_dirty (
+            table_name TEXT NOT NULL,
+            field_id INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            PRIMARY KEY (table_name, field_id, year)
+        ) WITHOUT ROWID;
+    """]
+    for table, year_expr in PARTITIONED_TABLES.items():
+        old_year = year_expr.format(row='OLD')
+        new_year = year_expr.format(row='NEW')
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_archive_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO archive_dirty
+                SELECT '{table}', OLD.field_id, {old_year} WHERE {old_year} IS NOT NULL;
+                INSERT OR IGNORE INTO archive_dirty
+                SELECT '{table}', NEW.field_id, {new_year} WHERE {new_year} IS NOT NULL;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_archive_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO archive_dirty
+                SELECT '{table}', OLD.field_id, {old_year} WHERE {old_year} IS NOT NULL;
+            END;
+        """)
+    return '\n'.join(statements)
+
+
+def ensure_archive_schema(conn):
+    """Create the change-tracking table and triggers."""
+    conn.executescript(archive_schema_sql())
+
+
+def _column_types(conn, table):
+    return [(row[1], (row[2] or '').upper()) for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _arrow_type(declared):
+    if 'INT' in declared or 'BOOL' in declared:
+        return pa.int64()
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return pa.float64()
+    if declared == 'DATE':
+        return pa.date32()
+    return pa.string()
+
+
+def _to_arrow(columns, rows):
+    """Build an Arrow table column by column from SQLite rows."""
+    arrays = []
+    names = []
+    for (name, declared), values in zip(columns, zip(*rows) if rows else [()] * len(columns)):
+        arrow_type = _arrow_type(declared)
+        if arrow_type == pa.date32():
+            array = pc.strptime(pa.array(values, type=pa.string()), format='%Y-%m-%d',
+                                unit='s', error_is_null=True).cast(pa.date32())
+        elif arrow_type == pa.string():
+            array = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        else:
+            array = pa.array(values, type=arrow_type)
+        arrays.append(array)
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _write_year(table, path):
+    """Write a year of rows (sorted by field_id) as one record batch.
+
+    Row ranges per field are kept in the schema metadata so readers can
+    slice single fields out of the memory-mapped file without copying.
+    """
+    field_ids = table.column('field_id').to_numpy()
+    starts = [0] + [i for i in range(1, len(field_ids)) if field_ids[i] != field_ids[i - 1]]
+    ranges = {int(field_ids[lo]): [lo, hi]
+              for lo, hi in zip(starts, starts[1:] + [len(field_ids)]) if len(field_ids)}
+    schema = table.schema.with_metadata({b'field_ranges': json.dumps(ranges).encode()})
+
+    tmp = path + '.tmp'
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table.combine_chunks(), max_chunksize=max(len(field_ids), 1))
+    os.replace(tmp, path)
+
+
+def _year_dir(archive, table, year):
+    return os.path.join(archive, table, f"year={year}")
+
+
+def _part_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory)
+                  if name.startswith('part-') and name.endswith('.arrow'))
+
+
+def _next_part(directory):
+    parts = _part_files(directory)
+    number = int(parts[-1][5:10]) + 1 if parts else 0
+    return os.path.join(directory, f"part-{number:05d}.arrow")
+
+
+def _read_ipc(path, fields=None, columns=None):
+    """Memory-map one part file, optionally only the rows of `fields`."""
+    data = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if columns:
+        data = data.select(columns)
+    if fields is None:
+        return data
+    ranges = json.loads((data.schema.metadata or {}).get(b'field_ranges', b'{}'))
+    slices = [data.slice(lo, hi - lo) for field_id, (lo, hi) in sorted(ranges.items(), key=lambda r: int(r[0]))
+              if int(field_id) in fields]
+    return pa.concat_tables(slices) if slices else None
+
+
+class ArchiveSync:
+    """Incremental SQLite -> Arrow archive synchronization."""
+
+    def __init__(self, conn, archive):
+        self.conn = conn
+        self.archive = archive
+        self.manifest_path = os.path.join(archive, MANIFEST_FILE)
+        self.manifest = {'watermarks': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def _save_manifest(self):
+        self.manifest['synced_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _select(self, table):
+        columns = _column_types(self.conn, table)
+        year_expr = PARTITIONED_TABLES[table].format(row='t')
+        select = ', '.join(f"t.{name}" for name, _ in columns)
+        return columns + [('year', 'INTEGER')], \
+            f"SELECT {select}, {year_expr} AS year FROM {table} t"
+
+    def _write_rows(self, table, columns, rows):
+        """Write rows sorted by (year, field_id) as one new part file per year."""
+        written = 0
+        for year, group in groupby(rows, key=lambda r: r[-1]):
+            group = list(group)
+            directory = _year_dir(self.archive, table, year)
+            os.makedirs(directory, exist_ok=True)
+            _write_year(_to_arrow(columns, group), _next_part(directory))
+            written += len(group)
+        return written
+
+    def sync_table(self, table, full=False):
+        """Append new rows and rewrite changed years; returns (appended, rewritten)."""
+        columns, select = self._select(table)
+        watermark = 0 if full else self.manifest['watermarks'].get(table, 0)
+        if full:
+            shutil.rmtree(os.path.join(self.archive, table), ignore_errors=True)
+
+        # Years with UPDATE/DELETE changes are rewritten from scratch
+        dirty_years = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT year FROM archive_dirty WHERE table_name = ? ORDER BY year", (table,)
+        )]
+        rewritten = 0
+        if dirty_years and not full:
+            for year in dirty_years:
+                shutil.rmtree(_year_dir(self.archive, table, year), ignore_errors=True)
+                rows = self.conn.execute(
+                    f"SELECT * FROM ({select}) WHERE year = ? AND id <= ? ORDER BY field_id, id",
+                    (year, watermark)
+                ).fetchall()
+                rewritten += self._write_rows(table, columns, rows)
+
+        max_id = self.conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+        rows = self.conn.execute(
+            f"SELECT * FROM ({select}) WHERE id > ? AND id <= ? AND year IS NOT NULL "
+            f"ORDER BY year, field_id, id",
+            (watermark, max_id)
+        ).fetchall()
+        appended = self._write_rows(table, columns, rows)
+
+        with self.conn:
+            self.conn.execute("DELETE FROM archive_dirty WHERE table_name = ?", (table,))
+        self.manifest['watermarks'][table] = max_id
+        self.manifest.setdefault('schemas', {})[table] = [name for name, _ in columns]
+        return appended, rewritten
+
+    def sync_dimension(self, table):
+        columns = _column_types(self.conn, table)
+        rows = self.conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+        path = os.path.join(self.archive, f"{table}.arrow")
+        data = _to_arrow(columns, rows)
+        tmp = path + '.tmp'
+        with pa.OSFile(tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, data.schema) as writer:
+                writer.write_table(data)
+        os.replace(tmp, path)
+        return len(rows)
+
+    def compact(self, table, max_parts=COMPACT_PARTS):
+        """Merge years that have accumulated many incremental part files."""
+        merged = 0
+        root = os.path.join(self.archive, table)
+        if not os.path.isdir(root):
+            return 0
+        for year_dir in os.listdir(root):
+            directory = os.path.join(root, year_dir)
+            parts = _part_files(directory)
+            if len(parts) <= max_parts:
+                continue
+            data = pa.concat_tables([_read_ipc(os.path.join(directory, p)) for p in parts])
+            order = pc.sort_indices(data, sort_keys=[('field_id', 'ascending'), ('id', 'ascending')])
+            target = _next_part(directory)
+            _write_year(data.take(order), target)
+            for p in parts:
+                os.remove(os.path.join(directory, p))
+            merged += 1
+        return merged
+
+    def sync(self, tables=None, full=False):
+        """Sync the archive; returns {table: (appended, rewritten)}."""
+        os.makedirs(self.archive, exist_ok=True)
+        ensure_archive_schema(self.conn)
+        results = {}
+        for table in DIMENSION_TABLES:
+            results[table] = (self.sync_dimension(table), 0)
+        for table in tables or PARTITIONED_TABLES:
+            results[table] = self.sync_table(table, full)
+            self.compact(table)
+        self._save_manifest()
+        return results
+
+
+class ColumnarArchive:
+    """Reader API over a synced archive; files are memory-mapped."""
+
+    def __init__(self, archive=DEFAULT_ARCHIVE):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for the columnar archive")
+        self.archive = archive
+
+    def years(self, table):
+        root = os.path.join(self.archive, table)
+        if not os.path.isdir(root):
+            return []
+        return sorted(int(name[5:]) for name in os.listdir(root) if name.startswith('year='))
+
+    def read_table(self, table, columns=None, years=None, fields=None):
+        """Arrow table for `table`, pruned by year and field id (zero-copy)."""
+        if table in DIMENSION_TABLES:
+            return _read_ipc(os.path.join(self.archive, f"{table}.arrow"), columns=columns)
+
+        fields = set(fields) if fields else None
+        tables = []
+        for year in self.years(table):
+            if years and year not in years:
+                continue
+            directory = _year_dir(self.archive, table, year)
+            for name in _part_files(directory):
+                data = _read_ipc(os.path.join(directory, name), fields, columns)
+                if data is not None and data.num_rows:
+                    tables.append(data)
+        if not tables:
+            return None
+        return pa.concat_tables(tables, promote_options='default')
+
+    def to_numpy(self, table, columns, years=None, fields=None):
+        """{column: numpy array}; numeric columns without nulls are zero-copy."""
+        data = self.read_table(table, columns, years, fields)
+        if data is None:
+            return {name: None for name in columns}
+        data = data.combine_chunks()
+        return {name: data.column(name).to_numpy() for name in columns}
+
+    def to_pandas(self, table, columns=None, years=None, fields=None):
+        """pandas DataFrame for `table`."""
+        data = self.read_table(table, columns, years, fields)
+        return data.to_pandas() if data is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Sync field history into a partitioned Arrow archive'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument(
+        '--archive',
+        default=DEFAULT_ARCHIVE,
+        help='Archive directory'
+    )
+    parser.add_argument(
+        '--tables',
+        nargs='+',
+        choices=list(PARTITIONED_TABLES.keys()),
+        help='Tables to sync (default: all)'
+    )
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Rewrite the archive from scratch (needed after changing season years)'
+    )
+
+    args = parser.parse_args()
+
+    if not PYARROW_AVAILABLE:
+        print("Error: pyarrow is required (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        results = ArchiveSync(conn, args.archive).sync(args.tables, args.full)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+    conn.close()
+
+    print(f"Archive: {args.archive}")
+    for table, (appended, rewritten) in results.items():
+        if appended or rewritten:
+            print(f"  {table:<18} {appended:>9} rows written  {rewritten:>9} rows rewritten")
+    print(f"Synced in {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Benchmark Data Generator
+Fill a new database with a synthetic multi-year farm history
+
+Creates the init_database.py schema and bulk-loads fields, seasons,
+planting, harvest, inputs, financial records, soil tests and daily
+weather for a configurable number of fields and seasons. Yields follow
+a per-field base, a slow trend, a shared weather effect per year and
+noise, so the analysis scripts have realistic patterns to find. Output
+is deterministic for a given --seed.
+"""
+
+import sqlite3
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from import_csv import begin_bulk_load, end_bulk_load
+from init_database import create_schema
+from profitability import refresh_profitability
+from search import rebuild_search_index
+from weather_series import refresh_weather_series
+from yield_summary import refresh_summaries
+
+CHUNK_SIZE = 50000
+
+CROPS = {
+    # crop: (base yield bu/ac, yield sd, planting month, harvest month, varieties)
+    'Corn': (185.0, 18.0, 4, 10, ['P1197AM', 'DKC62-08', 'NK0760', 'P1366AML', 'DKC58-06', 'LC1488']),
+    'Soybeans': (55.0, 6.0, 5, 10, ['AG2433', 'P22A14X', 'S20-H5', 'AG3031', 'XO2231E']),
+    'Wheat': (70.0, 8.0, 10, 7, ['Pioneer 25R40', 'AgriMAXX 505', 'Kaskaskia']),
+}
+
+INPUTS = {
+    'Corn': [('fertilizer', 'Anhydrous NH3', 'lb/ac', 180, 0.45), ('fertilizer', 'MAP 11-52-0', 'lb/ac', 150, 0.38),
+             ('herbicide', 'Acuron', 'qt/ac', 3.0, 18.0), ('fungicide', 'Trivapro', 'oz/ac', 13.7, 1.9)],
+    'Soybeans': [('fertilizer', 'Potash 0-0-60', 'lb/ac', 120, 0.30), ('herbicide', 'Enlist One', 'oz/ac', 32, 0.55),
+                 ('insecticide', 'Warrior II', 'oz/ac', 1.9, 3.1)],
+    'Wheat': [('fertilizer', 'Urea 46-0-0', 'lb/ac', 110, 0.32), ('herbicide', 'Huskie', 'oz/ac', 13.5, 1.2)],
+}
+
+SOIL_TYPES = ['Drummer silty clay loam', 'Flanagan silt loam', 'Sable silty clay loam', 'Catlin silt loam']
+DRAINAGE = ['poor', 'somewhat poor', 'moderate', 'well']
+SCOUTING = ['corn rootworm beetles on silks', 'tar spot lesions lower canopy', 'waterhemp escapes in rows',
+            'hail damage on upper leaves', 'ponding in low spot', 'gray leaf spot moderate pressure',
+            'aphids above threshold', 'good stand, uniform emergence', 'nitrogen deficiency firing']
+
+
+def rotation(field_index, year):
+    """Corn/soybean rotation with wheat every seventh year on some fields."""
+    if field_index % 5 == 0 and year % 7 == 0:
+        return 'Wheat'
+    return 'Corn' if (field_index + year) % 2 else 'Soybeans'
+
+
+def _chunks(conn, sql, rows):
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            with conn:
+                conn.executemany(sql, chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        with conn:
+            conn.executemany(sql, chunk)
+        count += len(chunk)
+    return count
+
+
+class HistoryGenerator:
+    """Deterministic synthetic field history."""
+
+    def __init__(self, fields, seasons, start_year, weather='growing', seed=42):
+        self.fields = fields
+        self.years = list(range(start_year, start_year + seasons))
+        self.weather = weather
+        self.rng = random.Random(seed)
+        self.field_acres = [round(self.rng.uniform(35, 240), 1) for _ in range(fields)]
+        self.field_base = [self.rng.gauss(1.0, 0.08) for _ in range(fields)]
+        self.field_trend = [self.rng.gauss(0.006, 0.01) for _ in range(fields)]
+        # One weather effect per year, shared by all fields
+        self.year_effect = {year: self.rng.gauss(1.0, 0.07) for year in self.years}
+        self.season_ids = {}
+
+    def field_rows(self):
+        for i in range(self.fields):
+            yield (f"Field {i + 1:04d}", f"Farm {i // 50 + 1}", self.field_acres[i],
+                   self.rng.choice(SOIL_TYPES), self.rng.choice(DRAINAGE))
+
+    def season_rows(self):
+        season_id = 0
+        for year in self.years:
+            for crop in CROPS:
+                season_id += 1
+                self.season_ids[(year, crop)] = season_id
+                yield (season_id, f"{year} {crop}", year, crop)
+
+    def _plan(self):
+        for f in range(self.fields):
+            for year in self.years:
+                crop = rotation(f, year)
+                yield f, year, crop, self.season_ids[(year, crop)]
+
+    def planting_rows(self):
+        for f, year, crop, season_id in self._plan():
+            _, _, month, _, varieties = CROPS[crop]
+            planted = date(year, month, 1) + timedelta(self.rng.randint(10, 40))
+            if crop == 'Wheat':
+                planted = date(year - 1, 10, self.rng.randint(1, 25))
+            yield (f + 1, season_id, self.rng.choice(varieties), planted.isoformat(),
+                   self.rng.uniform(30000, 36000) if crop == 'Corn' else self.rng.uniform(120000, 160000),
+                   30.0, 2.0, 'planter')
+
+    def harvest_rows(self):
+        for f, year, crop, season_id in self._plan():
+            base, sd, _, month, varieties = CROPS[crop]
+            expected = base * self.field_base[f] * self.year_effect[year] * \
+                (1 + self.field_trend[f] * (year - self.years[0]))
+            for _ in range(self.rng.choice((1, 1, 2))):
+                harvested = date(year, month, 1) + timedelta(self.rng.randint(0, 30))
+                yield (f + 1, season_id, self.rng.choice(varieties), harvested.isoformat(),
+                       round(max(0.0, self.rng.gauss(expected, sd * 0.5)), 1),
+                       round(self.rng.uniform(14, 22), 1), round(self.rng.uniform(54, 60), 1))
+
+    def input_rows(self):
+        for f, year, crop, season_id in self._plan():
+            acres = self.field_acres[f]
+            for input_type, product, unit, rate, price in INPUTS[crop]:
+                if self.rng.random() < 0.2:
+                    continue
+                applied = date(year, 4, 1) + timedelta(self.rng.randint(0, 90))
+                quantity = rate * acres
+                yield (f + 1, season_id, applied.isoformat(), input_type, product, rate, unit,
+                       'ground', round(quantity, 1), price, round(quantity * price, 2),
+                       self.rng.choice(['', '', 'applied ahead of rain', 'windy, some drift']))
+
+    def financial_rows(self):
+        for f, year, crop, season_id in self._plan():
+            acres = self.field_acres[f]
+            yield (f + 1, season_id, f"{year}-03-01", 'rent', 'Cash rent',
+                   round(acres * self.rng.uniform(220, 320), 2), '')
+            if self.rng.random() < 0.5:
+                yield (f + 1, season_id, f"{year}-12-15", 'grain_sales', f"{crop} sold at elevator",
+                       round(acres * self.rng.uniform(500, 1100), 2), '')
+
+    def observation_rows(self):
+        for f, year, crop, season_id in self._plan():
+            for _ in range(self.rng.randint(0, 3)):
+                seen = date(year, 5, 15) + timedelta(self.rng.randint(0, 100))
+                yield (f + 1, season_id, seen.isoformat(), 'scouting',
+                       self.rng.choice(['low', 'moderate', 'high']), self.rng.choice(SCOUTING))
+
+    def soil_rows(self):
+        for f in range(self.fields):
+            for year in self.years[::4]:
+                yield (f + 1, f"{year}-11-{self.rng.randint(1, 28):02d}", 'Midwest Labs', '0-6in',
+                       round(self.rng.uniform(5.6, 7.2), 1), round(self.rng.uniform(2.5, 5.5), 1),
+                       round(self.rng.uniform(15, 60)), round(self.rng.uniform(120, 300)),
+                       round(self.rng.uniform(12, 28), 1))
+
+    def weather_rows(self):
+        if self.weather == 'none':
+            return
+        first, last = ((4, 1), (10, 31)) if self.weather == 'growing' else ((1, 1), (12, 31))
+        for year in self.years:
+            start = date(year, *first)
+            days = (date(year, *last) - start).days + 1
+            # Same regional weather for every field, plus a little local noise
+            regional = []
+            for d in range(days):
+                day = start + timedelta(d)
+                seasonal = 45 + 35 * max(0.0, 1 - abs(day.timetuple().tm_yday - 200) / 150)
+                high = self.rng.gauss(seasonal + 10, 6)
+                regional.append((day.isoformat(), high, high - self.rng.uniform(12, 24),
+                                 self.rng.expovariate(4) if self.rng.random() < 0.3 else 0.0))
+            for f in range(self.fields):
+                offset = self.rng.gauss(0, 1)
+                for day, high, low, rain in regional:
+                    yield (f + 1, day, round(rain, 2), round(high + offset, 1), round(low + offset, 1))
+
+
+def generate(conn, fields, seasons, start_year, weather='growing', seed=42, verbose=True):
+    """Bulk-load a synthetic history; returns {table: rows}."""
+    generator = HistoryGenerator(fields, seasons, start_year, weather, seed)
+    loads = [
+        ('fields', "INSERT INTO fields (name, farm_name, acres, soil_type, drainage_rating) VALUES (?, ?, ?, ?, ?)",
+         generator.field_rows),
+        ('seasons', "INSERT INTO seasons (id, name, year, crop_type) VALUES (?, ?, ?, ?)",
+         generator.season_rows),
+        ('planting', "INSERT INTO planting (field_id, season_id, variety, planting_date, seeding_rate, "
+                     "row_spacing, depth, method) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+         generator.planting_rows),
+        ('harvest', "INSERT INTO harvest (field_id, season_id, variety, harvest_date, yield, moisture, "
+                    "test_weight) VALUES (?, ?, ?, ?, ?, ?, ?)",
+         generator.harvest_rows),
+        ('inputs', "INSERT INTO inputs (field_id, season_id, application_date, input_type, product_name, rate, "
+                   "rate_unit, method, total_quantity, cost_per_unit, total_cost, notes) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+         generator.input_rows),
+        ('financial_records', "INSERT INTO financial_records (field_id, season_id, record_date, category, "
+                              "description, amount, notes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+         generator.financial_rows),
+        ('observations', "INSERT INTO observations (field_id, season_id, observation_date, category, severity, "
+                         "description) VALUES (?, ?, ?, ?, ?, ?)",
+         generator.observation_rows),
+        ('soil_tests', "INSERT INTO soil_tests (field_id, test_date, lab_name, sample_depth, ph, organic_matter, "
+                       "phosphorus, potassium, cec) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+         generator.soil_rows),
+        ('weather', "INSERT INTO weather (field_id, date, precipitation, max_temp, min_temp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+         generator.weather_rows),
+    ]
+
+    counts = {}
+    previous_synchronous = begin_bulk_load(conn)
+    try:
+        for table, sql, rows in loads:
+            start = time.perf_counter()
+            counts[table] = _chunks(conn, sql, rows())
+            elapsed = time.perf_counter() - start
+            if verbose:
+                rate = counts[table] / elapsed if elapsed > 0 else 0.0
+                print(f"  {table:<18} {counts[table]:>11,} rows  {elapsed:>7.1f}s  ({rate:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        refresh_summaries(conn)
+        refresh_weather_series(conn)
+        refresh_profitability(conn)
+        rebuild_search_index(conn)
+        if verbose:
+            print(f"  {'derived tables':<18} {'':>11}       {time.perf_counter() - start:>7.1f}s")
+    finally:
+        end_bulk_load(conn, previous_synchronous)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic field history database for benchmarking'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/benchmark.db',
+        help='Path to the SQLite database to create'
+    )
+    parser.add_argument('--fields', type=int, default=2000, help='Number of fields (default: 2000)')
+    parser.add_argument('--seasons', type=int, default=25, help='Number of years (default: 25)')
+    parser.add_argument('--start-year', type=int, help='First year (default: seasons back from this year)')
+    parser.add_argument(
+        '--weather',
+        choices=['growing', 'full', 'none'],
+        default='growing',
+        help='Daily weather for April-October, the full year, or none (default: growing)'
+    )
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--force', action='store_true', help='Overwrite an existing database')
+
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        if not args.force:
+            print(f"Database already exists: {args.database}", file=sys.stderr)
+            print("Use --force to overwrite", file=sys.stderr)
+            sys.exit(1)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    db_dir = os.path.dirname(args.database)
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir)
+
+    start_year = args.start_year or date.today().year - args.seasons
+    conn = sqlite3.connect(args.database)
+    start = time.perf_counter()
+    try:
+        create_schema(conn)
+        print(f"Generating {args.fields} fields x {args.seasons} seasons ({start_year}-{start_year + args.seasons - 1})")
+        counts = generate(conn, args.fields, args.seasons, start_year, args.weather, args.seed)
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.database) / 1024 / 1024
+    print(f"\nGenerated {sum(counts.values()):,} rows in {elapsed:.1f}s, {size:,.1f} MB: {args.database}")
+
+if __name__ == '__main__':
+    main()
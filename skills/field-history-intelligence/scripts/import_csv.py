@@ -2,154 +2,368 @@
 """
 Field History Intelligence - Data Import Script (CSV)
 Import field data from CSV files
+
+Rows are streamed from the CSV, converted in chunks and inserted with
+executemany in sized transactions. Field and season names are resolved
+from maps loaded once, bad rows are written to a side file instead of
+aborting the import, and throughput is reported in rows/s.
 """
 
 import sqlite3
 import csv
 import argparse
 import sys
-from datetime import datetime
+import time
+from datetime import date, datetime
+
+from query_cache import bump_data_version
+from weather_series import ensure_weather_series_schema, refresh_weather_series
+from yield_summary import ensure_summary_schema, refresh_summaries
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Columns after field_name/season, with converters. Columns marked
+# required are NOT NULL in the schema and reject the row when empty.
+# Tables without a season_id are marked seasonal=False. Aliases list
+# alternative header spellings used by autodetection (import_directory.py).
+DATA_TYPES = {
+    'planting': {
+        'table': 'planting',
+        'columns': [
+            ('variety', 'text', True),
+            ('planting_date', 'date', True),
+            ('seeding_rate', 'real', False),
+            ('row_spacing', 'real', False),
+            ('depth', 'real', False),
+            ('method', 'text', False),
+        ],
+    },
+    'harvest': {
+        'table': 'harvest',
+        'columns': [
+            ('harvest_date', 'date', True),
+            ('variety', 'text', False),
+            ('yield', 'real', False),
+            ('moisture', 'real', False),
+            ('test_weight', 'real', False),
+        ],
+    },
+    'inputs': {
+        'table': 'inputs',
+        'columns': [
+            ('application_date', 'date', True),
+            ('input_type', 'text', True),
+            ('product_name', 'text', False),
+            ('rate', 'real', False),
+            ('rate_unit', 'text', False),
+            ('method', 'text', False),
+            ('total_cost', 'real', False),
+        ],
+    },
+    'soil_tests': {
+        'table': 'soil_tests',
+        'seasonal': False,
+        'columns': [
+            ('test_date', 'date', True),
+            ('lab_name', 'text', False),
+            ('sample_depth', 'text', False),
+            ('ph', 'real', False),
+            ('organic_matter', 'real', False),
+            ('nitrogen', 'real', False),
+            ('phosphorus', 'real', False),
+            ('potassium', 'real', False),
+            ('calcium', 'real', False),
+            ('magnesium', 'real', False),
+            ('sulfur', 'real', False),
+            ('boron', 'real', False),
+            ('zinc', 'real', False),
+            ('iron', 'real', False),
+            ('manganese', 'real', False),
+            ('copper', 'real', False),
+            ('cec', 'real', False),
+            ('textural_class', 'text', False),
+            ('notes', 'text', False),
+        ],
+    },
+    'weather': {
+        'table': 'weather',
+        'seasonal': False,
+        'columns': [
+            ('date', 'date', True),
+            ('precipitation', 'real', False),
+            ('max_temp', 'real', False),
+            ('min_temp', 'real', False),
+            ('avg_temp', 'real', False),
+            ('humidity', 'real', False),
+            ('wind_speed', 'real', False),
+            ('soil_temp_2in', 'real', False),
+            ('soil_temp_4in', 'real', False),
+            ('growing_degree_days', 'real', False),
+            ('notes', 'text', False),
+        ],
+    },
+}
+
+ALIASES = {
+    'field_name': ['field', 'fieldname', 'field_id_name'],
+    'season': ['season_name', 'crop_season'],
+    'variety': ['hybrid', 'hybrid_variety', 'seed'],
+    'planting_date': ['plant_date', 'date_planted', 'planted'],
+    'seeding_rate': ['population', 'seed_rate', 'seeds_per_acre'],
+    'harvest_date': ['harvested', 'date_harvested'],
+    'yield': ['yield_bu_ac', 'yield_bu_acre', 'bu_ac', 'bu_acre', 'dry_yield'],
+    'moisture': ['moisture_pct', 'harvest_moisture'],
+    'test_weight': ['test_wt', 'tw'],
+    'application_date': ['applied', 'date_applied', 'app_date'],
+    'input_type': ['type', 'category'],
+    'product_name': ['product'],
+    'rate_unit': ['unit', 'units'],
+    'total_cost': ['cost', 'total'],
+    'test_date': ['sample_date', 'date_sampled'],
+    'lab_name': ['lab', 'laboratory'],
+    'sample_depth': ['depth_in', 'depth'],
+    'organic_matter': ['om', 'om_pct'],
+    'nitrogen': ['n', 'no3_n'],
+    'phosphorus': ['p', 'p_bray', 'p_olsen'],
+    'potassium': ['k'],
+    'precipitation': ['precip', 'rain', 'rainfall', 'precip_in'],
+    'max_temp': ['tmax', 'high', 'high_temp'],
+    'min_temp': ['tmin', 'low', 'low_temp'],
+    'avg_temp': ['tavg', 'mean_temp'],
+    'growing_degree_days': ['gdd'],
+}
+
+
+def _to_text(value):
+    value = value.strip() if value else value
+    return value or None
+
+
+def _to_real(value):
+    value = value.strip() if value else value
+    return float(value) if value else None
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%Y/%m/%d', '%m/%d/%y')
+
+
+def _to_date(value):
+    value = value.strip() if value else value
+    if not value:
+        return None
+    # Normalize to ISO so date ranges and ordering work in SQL
+    value = value.split()[0].split('T')[0]
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS[1:]:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value}")
+
+
+CONVERTERS = {'text': _to_text, 'real': _to_real, 'date': _to_date}
+
+
+def load_name_maps(conn):
+    """Load field and season name -> id maps once per import."""
+    field_ids = dict(conn.execute("SELECT name, id FROM fields"))
+    season_ids = dict(conn.execute("SELECT name, id FROM seasons"))
+    return field_ids, season_ids
+
+
+def expected_columns(data_type):
+    """CSV headers a data type is imported from."""
+    spec = DATA_TYPES[data_type]
+    keys = ['field_name', 'season'] if spec.get('seasonal', True) else ['field_name']
+    return keys + [name for name, _, _ in spec['columns']]
+
+
+def insert_sql(data_type):
+    """INSERT statement for a data type (field_id, [season_id,] columns...)."""
+    spec = DATA_TYPES[data_type]
+    keys = ['field_id', 'season_id'] if spec.get('seasonal', True) else ['field_id']
+    columns = keys + [name for name, _, _ in spec['columns']]
+    return (f"INSERT INTO {spec['table']} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['?'] * len(columns))})")
+
+
+def convert_row(row, spec, field_ids, season_ids, default_season=None):
+    """Convert one CSV row to an insert tuple; raises ValueError if invalid."""
+    field_name = row.get('field_name')
+    field_id = field_ids.get(field_name)
+    if field_id is None:
+        raise ValueError(f"Field not found: {field_name}")
+
+    values = [field_id]
+    if spec.get('seasonal', True):
+        season_name = row.get('season') or default_season
+        season_id = season_ids.get(season_name)
+        if season_id is None:
+            raise ValueError(f"Season not found: {season_name}")
+        values.append(season_id)
+
+    for name, kind, required in spec['columns']:
+        value = CONVERTERS[kind](row.get(name))
+        if value is None and required:
+            raise ValueError(f"Missing required value: {name}")
+        values.append(value)
+    return tuple(values)
+
 
-def import_csv(conn, csv_file, data_type, season=None):
+def begin_bulk_load(conn):
+    """Switch to import-time PRAGMAs; returns the settings to restore."""
+    previous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    return previous
+
+
+def end_bulk_load(conn, previous_synchronous):
+    """Restore durable settings after a bulk load."""
+    conn.execute(f"PRAGMA synchronous={int(previous_synchronous)}")
+
+
+# Errors caused by the row's values; anything else (a locked database,
+# a full disk) aborts the import instead of rejecting rows
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.InterfaceError, OverflowError)
+
+
+def insert_chunk(conn, sql, chunk, rejects):
+    """Insert one chunk in its own transaction.
+
+    If the batch fails on bad values (e.g. a constraint the converters did
+    not catch), fall back to row-by-row inserts so only the offending rows
+    are rejected.
+    """
+    try:
+        with conn:
+            conn.executemany(sql, [values for _, values in chunk])
+        return len(chunk)
+    except ROW_ERRORS:
+        inserted = 0
+        with conn:
+            for row, values in chunk:
+                try:
+                    conn.execute(sql, values)
+                    inserted += 1
+                except ROW_ERRORS as e:
+                    rejects.append((row, str(e)))
+        return inserted
+
+
+class RejectWriter:
+    """Lazily created side file holding rejected rows and the reason."""
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = list(fieldnames) + ['error']
+        self.handle = None
+        self.writer = None
+        self.count = 0
+
+    def write(self, rejects):
+        if not rejects:
+            return
+        if self.writer is None:
+            self.handle = open(self.path, 'w', newline='')
+            self.writer = csv.DictWriter(self.handle, fieldnames=self.fieldnames,
+                                         extrasaction='ignore')
+            self.writer.writeheader()
+        for row, error in rejects:
+            self.writer.writerow(dict(row, error=error))
+        self.count += len(rejects)
+        rejects.clear()
+
+    def close(self):
+        if self.handle:
+            self.handle.close()
+
+
+def import_csv(conn, csv_file, data_type, season=None, batch_size=DEFAULT_BATCH_SIZE,
+               rejects_file=None):
     """Import data from CSV file"""
-    cursor = conn.cursor()
-
-    # Map data types to tables
-    data_type_map = {
-        'planting': {
-            'table': 'planting',
-            'columns': ['field_name', 'season', 'variety', 'planting_date', 'seeding_rate', 'row_spacing', 'depth', 'method']
-        },
-        'harvest': {
-            'table': 'harvest',
-            'columns': ['field_name', 'season', 'harvest_date', 'variety', 'yield', 'moisture', 'test_weight']
-        },
-        'inputs': {
-            'table': 'inputs',
-            'columns': ['field_name', 'season', 'application_date', 'input_type', 'product_name', 'rate', 'rate_unit', 'method', 'total_cost']
-        },
-    }
-
-    if data_type not in data_type_map:
+    if data_type not in DATA_TYPES:
         print(f"Unknown data type: {data_type}")
-        print(f"Supported types: {', '.join(data_type_map.keys())}")
+        print(f"Supported types: {', '.join(DATA_TYPES.keys())}")
         return False
 
-    table_info = data_type_map[data_type]
-    table = table_info['table']
-    expected_columns = table_info['columns']
+    spec = DATA_TYPES[data_type]
+    expected = expected_columns(data_type)
 
-    # Read CSV file
     try:
-        with open(csv_file, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
+        handle = open(csv_file, 'r', newline='')
     except Exception as e:
         print(f"Error reading CSV file: {e}")
         return False
 
-    # Validate columns
-    actual_columns = list(rows[0].keys()) if rows else []
-    missing_columns = set(expected_columns) - set(actual_columns)
+    with handle:
+        reader = csv.DictReader(handle)
 
-    if missing_columns:
-        print(f"Missing columns in CSV: {missing_columns}")
-        print(f"Expected: {expected_columns}")
-        print(f"Found: {actual_columns}")
-        return False
+        # Validate columns
+        actual_columns = reader.fieldnames or []
+        missing_columns = set(expected) - set(actual_columns)
+        if season:
+            missing_columns.discard('season')
+
+        if missing_columns:
+            print(f"Missing columns in CSV: {missing_columns}")
+            print(f"Expected: {expected}")
+            print(f"Found: {actual_columns}")
+            return False
+
+        ensure_summary_schema(conn)
+        ensure_weather_series_schema(conn)
+        field_ids, season_ids = load_name_maps(conn)
+        sql = insert_sql(data_type)
+        reject_writer = RejectWriter(rejects_file or f"{csv_file}.rejects.csv", actual_columns)
+        previous_synchronous = begin_bulk_load(conn)
 
-    # Import data
-    imported = 0
-    errors = 0
+        imported = 0
+        total = 0
+        chunk = []
+        rejects = []
+        start = time.perf_counter()
 
-    for row in rows:
         try:
-            # Get field_id
-            field_name = row.get('field_name')
-            cursor.execute("SELECT id FROM fields WHERE name = ?", (field_name,))
-            field_result = cursor.fetchone()
-
-            if not field_result:
-                print(f"Field not found: {field_name}")
-                errors += 1
-                continue
-
-            field_id = field_result[0]
-
-            # Get season_id
-            season_name = row.get('season')
-            cursor.execute("SELECT id FROM seasons WHERE name = ?", (season_name,))
-            season_result = cursor.fetchone()
-
-            if not season_result:
-                print(f"Season not found: {season_name}")
-                errors += 1
-                continue
-
-            season_id = season_result[0]
-
-            # Build insert based on data type
-            if data_type == 'planting':
-                cursor.execute("""
-                    INSERT INTO planting (
-                        field_id, season_id, variety, planting_date,
-                        seeding_rate, row_spacing, depth, method
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    field_id, season_id,
-                    row.get('variety'),
-                    row.get('planting_date'),
-                    float(row.get('seeding_rate', 0)) if row.get('seeding_rate') else None,
-                    float(row.get('row_spacing', 0)) if row.get('row_spacing') else None,
-                    float(row.get('depth', 0)) if row.get('depth') else None,
-                    row.get('method')
-                ))
-
-            elif data_type == 'harvest':
-                cursor.execute("""
-                    INSERT INTO harvest (
-                        field_id, season_id, harvest_date, variety,
-                        yield, moisture, test_weight
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    field_id, season_id,
-                    row.get('harvest_date'),
-                    row.get('variety'),
-                    float(row.get('yield', 0)) if row.get('yield') else None,
-                    float(row.get('moisture', 0)) if row.get('moisture') else None,
-                    float(row.get('test_weight', 0)) if row.get('test_weight') else None,
-                ))
-
-            elif data_type == 'inputs':
-                cursor.execute("""
-                    INSERT INTO inputs (
-                        field_id, season_id, application_date,
-                        input_type, product_name, rate, rate_unit,
-                        method, total_cost
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    field_id, season_id,
-                    row.get('application_date'),
-                    row.get('input_type'),
-                    row.get('product_name'),
-                    float(row.get('rate', 0)) if row.get('rate') else None,
-                    row.get('rate_unit'),
-                    row.get('method'),
-                    float(row.get('total_cost', 0)) if row.get('total_cost') else None,
-                ))
-
-            imported += 1
-
-        except Exception as e:
-            print(f"Error importing row: {e}")
-            errors += 1
-
-    conn.commit()
+            for row in reader:
+                total += 1
+                try:
+                    chunk.append((row, convert_row(row, spec, field_ids, season_ids, season)))
+                except ValueError as e:
+                    rejects.append((row, str(e)))
+
+                if len(chunk) >= batch_size:
+                    imported += insert_chunk(conn, sql, chunk, rejects)
+                    chunk = []
+                    reject_writer.write(rejects)
+
+            if chunk:
+                imported += insert_chunk(conn, sql, chunk, rejects)
+            reject_writer.write(rejects)
+            refresh_summaries(conn)
+            refresh_weather_series(conn)
+            if imported:
+                bump_data_version(conn, spec['table'])
+        finally:
+            end_bulk_load(conn, previous_synchronous)
+            reject_writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
 
     print(f"\nImport Summary:")
     print(f"  Imported: {imported} records")
-    print(f"  Errors: {errors}")
-    print(f"  Total: {len(rows)} rows")
+    print(f"  Errors: {reject_writer.count}")
+    print(f"  Total: {total} rows")
+    print(f"  Time: {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    if reject_writer.count:
+        print(f"  Rejected rows written to: {reject_writer.path}")
 
     return True
 
@@ -168,9 +382,23 @@ def main():
     )
     parser.add_argument(
         'data_type',
-        choices=['planting', 'harvest', 'inputs'],
+        choices=list(DATA_TYPES.keys()),
         help='Type of data to import'
     )
+    parser.add_argument(
+        '--season',
+        help='Season name for rows without a season column'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help='Rows per transaction'
+    )
+    parser.add_argument(
+        '--rejects',
+        help='File for rejected rows (default: <csv_file>.rejects.csv)'
+    )
 
     args = parser.parse_args()
 
@@ -182,7 +410,8 @@ def main():
         sys.exit(1)
 
     try:
-        success = import_csv(conn, args.csv_file, args.data_type)
+        success = import_csv(conn, args.csv_file, args.data_type, args.season,
+                             args.batch_size, args.rejects)
         if not success:
             sys.exit(1)
     except Exception as e:
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Directory Import
+Import a directory tree of CSV exports in mixed layouts
+
+Each file's data type and column mapping are detected from its header
+row. Files are hashed, parsed and validated in a process pool; the main
+process is the only writer and bulk-inserts each file in one transaction
+together with its manifest entry, so re-runs skip files already imported.
+"""
+
+import sqlite3
+import csv
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from import_csv import (
+    ALIASES, DATA_TYPES, RejectWriter, begin_bulk_load, convert_row, end_bulk_load,
+    insert_sql, load_name_maps
+)
+from query_cache import bump_data_version
+from weather_series import ensure_weather_series_schema, refresh_weather_series
+from yield_summary import ensure_summary_schema, refresh_summaries
+
+MANIFEST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS import_manifest (
+        file_hash TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        data_type TEXT NOT NULL,
+        rows_imported INTEGER NOT NULL,
+        rows_rejected INTEGER NOT NULL,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+HASH_BLOCK_SIZE = 1 << 20
+
+# Set in each worker by _init_worker
+_worker_state = {}
+
+
+def normalize_header(header):
+    """'Yield (bu/ac)' -> 'yield_bu_ac'"""
+    return re.sub(r'[^a-z0-9]+', '_', (header or '').lower()).strip('_')
+
+
+def detect_layout(headers, season=None):
+    """Pick the data type whose columns best match `headers`.
+
+    Returns (data_type, mapping) where mapping is {csv header: column},
+    or (None, reason) when no type, or more than one, fits.
+    """
+    normalized = {normalize_header(h): h for h in headers if h}
+    candidates = []
+
+    for data_type, spec in DATA_TYPES.items():
+        seasonal = spec.get('seasonal', True)
+        wanted = ['field_name'] + (['season'] if seasonal else []) + \
+            [name for name, _, _ in spec['columns']]
+
+        mapping = {}
+        for column in wanted:
+            for name in [column] + ALIASES.get(column, []):
+                header = normalized.get(name)
+                if header is not None and header not in mapping:
+                    mapping[header] = column
+                    break
+
+        matched = set(mapping.values())
+        required = {'field_name'} | {name for name, _, req in spec['columns'] if req}
+        if seasonal and not season:
+            required.add('season')
+        if required <= matched:
+            candidates.append((len(matched), data_type, mapping))
+
+    if not candidates:
+        return None, 'no data type matches the headers'
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    if len(candidates) > 1 and candidates[0][0] == candidates[1][0]:
+        return None, f"ambiguous headers ({candidates[0][1]} or {candidates[1][1]})"
+    _, data_type, mapping = candidates[0]
+    return data_type, mapping
+
+
+def file_hash(path):
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_csv_files(directory):
+    """All .csv files under `directory`, skipping our own reject files."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith('.csv') and not name.endswith('.rejects.csv'):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def _init_worker(field_ids, season_ids, known_hashes, season):
+    _worker_state.update(field_ids=field_ids, season_ids=season_ids,
+                         known_hashes=known_hashes, season=season)
+
+
+def parse_file(path):
+    """Hash, detect and convert one file (runs in a worker process)."""
+    result = {'path': path, 'hash': None, 'data_type': None, 'rows': [],
+              'rejects': [], 'headers': [], 'error': None, 'skipped': False}
+    try:
+        result['hash'] = file_hash(path)
+        if result['hash'] in _worker_state['known_hashes']:
+            result['skipped'] = True
+            return result
+
+        with open(path, 'r', newline='') as handle:
+            reader = csv.reader(handle)
+            headers = next(reader, [])
+            result['headers'] = headers
+
+            data_type, mapping = detect_layout(headers, _worker_state['season'])
+            if data_type is None:
+                result['error'] = mapping
+                return result
+            result['data_type'] = data_type
+
+            spec = DATA_TYPES[data_type]
+            positions = [(i, mapping[h]) for i, h in enumerate(headers) if h in mapping]
+            field_ids = _worker_state['field_ids']
+            season_ids = _worker_state['season_ids']
+            season = _worker_state['season']
+
+            for values in reader:
+                if not any(values):
+                    continue
+                row = {column: values[i] if i < len(values) else None for i, column in positions}
+                try:
+                    result['rows'].append(convert_row(row, spec, field_ids, season_ids, season))
+                except ValueError as e:
+                    result['rejects'].append((dict(zip(headers, values)), str(e)))
+    except (OSError, csv.Error, UnicodeDecodeError) as e:
+        result['error'] = str(e)
+    return result
+
+
+def write_file_result(conn, result):
+    """Insert one parsed file and its manifest entry in a single transaction."""
+    with conn:
+        if result['rows']:
+            conn.executemany(insert_sql(result['data_type']), result['rows'])
+        conn.execute("""
+            INSERT INTO import_manifest (file_hash, path, data_type, rows_imported, rows_rejected)
+            VALUES (?, ?, ?, ?, ?)
+        """, (result['hash'], result['path'], result['data_type'],
+              len(result['rows']), len(result['rejects'])))
+
+
+def import_directory(conn, directory, season=None, workers=None, force=False):
+    """Import every CSV under `directory`; returns a summary dict."""
+    conn.execute(MANIFEST_SCHEMA)
+    conn.commit()
+    ensure_summary_schema(conn)
+    ensure_weather_series_schema(conn)
+
+    paths = find_csv_files(directory)
+    known_hashes = set() if force else {
+        row[0] for row in conn.execute("SELECT file_hash FROM import_manifest")
+    }
+    field_ids, season_ids = load_name_maps(conn)
+
+    summary = {'files': len(paths), 'imported': 0, 'skipped': 0, 'failed': 0,
+               'rows': 0, 'rejected': 0, 'by_type': {}}
+    start = time.perf_counter()
+    previous_synchronous = begin_bulk_load(conn)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(field_ids, season_ids, known_hashes, season)) as pool:
+            futures = [pool.submit(parse_file, path) for path in paths]
+            for future in as_completed(futures):
+                result = future.result()
+                path = result['path']
+
+                if result['skipped'] or result['hash'] in known_hashes:
+                    summary['skipped'] += 1
+                    continue
+                if result['error']:
+                    summary['failed'] += 1
+                    print(f"  SKIP {path}: {result['error']}")
+                    continue
+
+                if force:
+                    conn.execute("DELETE FROM import_manifest WHERE file_hash = ?", (result['hash'],))
+                try:
+                    write_file_result(conn, result)
+                except sqlite3.DatabaseError as e:
+                    summary['failed'] += 1
+                    print(f"  FAIL {path}: {e}")
+                    continue
+                known_hashes.add(result['hash'])
+
+                rows, rejected = len(result['rows']), len(result['rejects'])
+                if rejected:
+                    writer = RejectWriter(f"{path}.rejects.csv", result['headers'])
+                    writer.write(result['rejects'])
+                    writer.close()
+
+                summary['imported'] += 1
+                summary['rows'] += rows
+                summary['rejected'] += rejected
+                summary['by_type'][result['data_type']] = \
+                    summary['by_type'].get(result['data_type'], 0) + rows
+                print(f"  {result['data_type']:<11} {rows:>8} rows {rejected:>6} rejected  {path}")
+
+        refresh_summaries(conn)
+        refresh_weather_series(conn)
+        if summary['by_type']:
+            bump_data_version(conn, *(DATA_TYPES[t]['table'] for t in summary['by_type']))
+    finally:
+        end_bulk_load(conn, previous_synchronous)
+
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import a directory of field data CSV files'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument(
+        'directory',
+        help='Directory to scan for CSV files'
+    )
+    parser.add_argument(
+        '--season',
+        help='Season name for files without a season column'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Parser processes (default: CPU count)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-import files already listed in the manifest'
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        summary = import_directory(conn, args.directory, args.season, args.workers, args.force)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+
+    conn.close()
+
+    rate = summary['rows'] / summary['seconds'] if summary['seconds'] > 0 else 0.0
+    print(f"\nImport Summary:")
+    print(f"  Files: {summary['files']} ({summary['imported']} imported, "
+          f"{summary['skipped']} already imported, {summary['failed']} failed)")
+    for data_type, rows in sorted(summary['by_type'].items()):
+        print(f"  {data_type}: {rows} records")
+    print(f"  Rejected rows: {summary['rejected']}")
+    print(f"  Time: {summary['seconds']:.2f}s ({rate:,.0f} rows/s)")
+
+    if summary['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,11 @@ import sys
 import os
 from pathlib import Path
 
+from yield_summary import ensure_summary_schema
+from profitability import ensure_profit_schema
+from search import ensure_search_schema
+from weather_series import ensure_weather_series_schema
+
 def create_schema(conn):
     """Create all database tables and indexes"""
     cursor = conn.cursor()
@@ -237,6 +242,7 @@ def create_schema(conn):
         "CREATE INDEX IF NOT EXISTS idx_soil_tests_field ON soil_tests(field_id)",
         "CREATE INDEX IF NOT EXISTS idx_weather_field ON weather(field_id)",
         "CREATE INDEX IF NOT EXISTS idx_weather_date ON weather(date)",
+        "CREATE INDEX IF NOT EXISTS idx_weather_field_date ON weather(field_id, date)",
         "CREATE INDEX IF NOT EXISTS idx_observation_field ON observations(field_id)",
     ]
 
@@ -244,6 +250,12 @@ def create_schema(conn):
         cursor.execute(index_sql)
 
     conn.commit()
+
+    # Materialized yield summaries and their change-tracking triggers
+    ensure_summary_schema(conn)
+    ensure_profit_schema(conn)
+    ensure_weather_series_schema(conn)
+    ensure_search_schema(conn)
     print("Database schema created successfully")
 
 def insert_sample_data(conn, sample=False):
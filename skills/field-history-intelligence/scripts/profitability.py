@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Profitability Engine
+Cost per acre, cost per bushel, margin and input ROI from field history
+
+Costs come from inputs (total_cost, or quantity x unit cost) plus
+financial_records expenses such as rent, insurance or custom hire.
+Revenue comes from financial_records sales and payments; where a
+field-season has none it is estimated as production x crop price.
+Record input purchases in `inputs` only, not again as expenses.
+
+Results are cached per season in profit_field_season and
+profit_product. Triggers mark seasons whose inputs, harvest or financial
+records changed and refresh_profitability() recomputes only those, one
+set-based aggregation per season.
+"""
+
+import sqlite3
+import argparse
+import json
+import sys
+import time
+
+# $/bu used when a field-season has no recorded sales
+DEFAULT_PRICES = {
+    'corn': 4.50,
+    'soybeans': 11.50,
+    'wheat': 6.00,
+    'oats': 3.75,
+    'sorghum': 4.25,
+}
+
+REVENUE_CATEGORIES = (
+    'revenue', 'sales', 'grain_sales', 'crop_sales', 'insurance_claim',
+    'insurance_payment', 'government_payment', 'program_payment',
+)
+
+PROFIT_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_inputs_season_field ON inputs(season_id, field_id);
+    CREATE INDEX IF NOT EXISTS idx_financial_season_field ON financial_records(season_id, field_id);
+
+    CREATE TABLE IF NOT EXISTS profit_field_season (
+        season_id INTEGER NOT NULL,
+        field_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        crop TEXT NOT NULL,
+        acres REAL,
+        yield_bu_ac REAL,
+        production_bu REAL,
+        revenue REAL,
+        revenue_estimated INTEGER NOT NULL,
+        input_cost REAL NOT NULL,
+        other_cost REAL NOT NULL,
+        total_cost REAL NOT NULL,
+        cost_per_acre REAL,
+        cost_per_bu REAL,
+        margin REAL,
+        margin_per_acre REAL,
+        roi REAL,
+        PRIMARY KEY (season_id, field_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_profit_field ON profit_field_season(field_id, year);
+
+    -- Per crop, season and product: yield response vs same-crop fields without it
+    CREATE TABLE IF NOT EXISTS profit_product (
+        season_id INTEGER NOT NULL,
+        crop TEXT NOT NULL,
+        input_type TEXT NOT NULL,
+        product_name TEXT NOT NULL,
+        fields INTEGER NOT NULL,
+        acres REAL,
+        cost REAL NOT NULL,
+        cost_per_acre REAL,
+        yield_with REAL,
+        yield_without REAL,
+        response_bu_ac REAL,
+        roi REAL,
+        PRIMARY KEY (season_id, crop, input_type, product_name)
+    );
+
+    CREATE TABLE IF NOT EXISTS profit_dirty_seasons (
+        season_id INTEGER PRIMARY KEY
+    );
+
+    CREATE TABLE IF NOT EXISTS profit_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+# Tables whose changes make a season's profitability stale
+_TRACKED_TABLES = ['inputs', 'harvest', 'financial_records']
+
+
+def _trigger_sql():
+    statements = []
+    for table in _TRACKED_TABLES:
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_profit_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO profit_dirty_seasons VALUES (NEW.season_id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_profit_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO profit_dirty_seasons VALUES (OLD.season_id);
+                INSERT OR IGNORE INTO profit_dirty_seasons VALUES (NEW.season_id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_profit_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO profit_dirty_seasons VALUES (OLD.season_id);
+            END;
+        """)
+    statements.append("""
+        CREATE TRIGGER IF NOT EXISTS trg_fields_profit_acres AFTER UPDATE OF acres ON fields
+        BEGIN
+            INSERT OR IGNORE INTO profit_dirty_seasons
+            SELECT DISTINCT season_id FROM profit_field_season WHERE field_id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_seasons_profit_update AFTER UPDATE OF year, crop_type ON seasons
+        BEGIN
+            INSERT OR IGNORE INTO profit_dirty_seasons VALUES (NEW.id);
+        END;
+    """)
+    return '\n'.join(statements)
+
+
+def ensure_profit_schema(conn):
+    """Create result tables and change-tracking triggers; mark all seasons if new."""
+    existing = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profit_dirty_seasons'"
+    ).fetchone()
+    conn.executescript(PROFIT_SCHEMA + _trigger_sql())
+    if not existing:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO profit_dirty_seasons SELECT id FROM seasons")
+        return True
+    return False
+
+
+def _check_prices(conn, prices):
+    """Mark every season dirty when the price basis differs from the cached one."""
+    basis = json.dumps(prices, sort_keys=True)
+    row = conn.execute("SELECT value FROM profit_meta WHERE key = 'prices'").fetchone()
+    if row and row[0] == basis:
+        return
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO profit_dirty_seasons SELECT id FROM seasons")
+        conn.execute("INSERT OR REPLACE INTO profit_meta VALUES ('prices', ?)", (basis,))
+
+
+def refresh_profitability(conn, prices=None):
+    """Recompute seasons marked dirty; returns the number of seasons refreshed."""
+    prices = {k.lower(): v for k, v in (prices or DEFAULT_PRICES).items()}
+    _check_prices(conn, prices)
+
+    seasons = [row[0] for row in conn.execute("SELECT season_id FROM profit_dirty_seasons")]
+    if not seasons:
+        return 0
+
+    revenue_categories = ','.join(f"'{c}'" for c in REVENUE_CATEGORIES)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.crop_prices")
+        conn.execute("CREATE TEMP TABLE crop_prices (crop TEXT PRIMARY KEY, price REAL)")
+        conn.executemany("INSERT INTO temp.crop_prices VALUES (?, ?)", prices.items())
+
+        conn.execute("""
+            DELETE FROM profit_field_season
+            WHERE season_id IN (SELECT season_id FROM profit_dirty_seasons)
+        """)
+        conn.execute(f"""
+            INSERT INTO profit_field_season
+            WITH dirty AS (
+                SELECT s.id AS season_id, s.year, LOWER(COALESCE(s.crop_type, 'unknown')) AS crop
+                FROM profit_dirty_seasons d
+                JOIN seasons s ON s.id = d.season_id
+            ),
+            input_costs AS (
+                SELECT i.season_id, i.field_id,
+                       SUM(COALESCE(i.total_cost, i.total_quantity * i.cost_per_unit, 0)) AS cost
+                FROM inputs i
+                JOIN dirty d ON d.season_id = i.season_id
+                GROUP BY i.season_id, i.field_id
+            ),
+            money AS (
+                SELECT r.season_id, r.field_id,
+                       SUM(CASE WHEN LOWER(r.category) IN ({revenue_categories}) THEN r.amount END) AS revenue,
+                       SUM(CASE WHEN LOWER(COALESCE(r.category, '')) NOT IN ({revenue_categories})
+                                THEN ABS(r.amount) ELSE 0 END) AS other_cost
+                FROM financial_records r
+                JOIN dirty d ON d.season_id = r.season_id
+                GROUP BY r.season_id, r.field_id
+            ),
+            yields AS (
+                SELECT h.season_id, h.field_id, AVG(h.yield) AS yield_bu_ac
+                FROM harvest h
+                JOIN dirty d ON d.season_id = h.season_id
+                WHERE h.yield IS NOT NULL
+                GROUP BY h.season_id, h.field_id
+            ),
+            keys AS (
+                SELECT season_id, field_id FROM input_costs
+                UNION SELECT season_id, field_id FROM money
+                UNION SELECT season_id, field_id FROM yields
+            ),
+            base AS (
+                SELECT k.season_id, k.field_id, d.year, d.crop, f.acres, y.yield_bu_ac,
+                       y.yield_bu_ac * f.acres AS production_bu,
+                       COALESCE(m.revenue, y.yield_bu_ac * f.acres * p.price) AS revenue,
+                       m.revenue IS NULL AS revenue_estimated,
+                       COALESCE(c.cost, 0) AS input_cost,
+                       COALESCE(m.other_cost, 0) AS other_cost
+                FROM keys k
+                JOIN dirty d ON d.season_id = k.season_id
+                JOIN fields f ON f.id = k.field_id
+                LEFT JOIN input_costs c ON c.season_id = k.season_id AND c.field_id = k.field_id
+                LEFT JOIN money m ON m.season_id = k.season_id AND m.field_id = k.field_id
+                LEFT JOIN yields y ON y.season_id = k.season_id AND y.field_id = k.field_id
+                LEFT JOIN temp.crop_prices p ON p.crop = d.crop
+            )
+            SELECT season_id, field_id, year, crop, acres, yield_bu_ac, production_bu, revenue,
+                   revenue_estimated, input_cost, other_cost, input_cost + other_cost,
+                   (input_cost + other_cost) / NULLIF(acres, 0),
+                   (input_cost + other_cost) / NULLIF(production_bu, 0),
+                   revenue - (input_cost + other_cost),
+                   (revenue - (input_cost + other_cost)) / NULLIF(acres, 0),
+                   (revenue - (input_cost + other_cost)) / NULLIF(input_cost + other_cost, 0)
+            FROM base
+        """)
+
+        conn.execute("""
+            DELETE FROM profit_product
+            WHERE season_id IN (SELECT season_id FROM profit_dirty_seasons)
+        """)
+        conn.execute("""
+            INSERT INTO profit_product
+            WITH applied AS (
+                SELECT i.season_id, i.field_id, i.input_type, COALESCE(i.product_name, '') AS product_name,
+                       SUM(COALESCE(i.total_cost, i.total_quantity * i.cost_per_unit, 0)) AS cost
+                FROM inputs i
+                WHERE i.season_id IN (SELECT season_id FROM profit_dirty_seasons)
+                GROUP BY i.season_id, i.field_id, i.input_type, COALESCE(i.product_name, '')
+            ),
+            crop_totals AS (
+                SELECT season_id, crop, SUM(yield_bu_ac * acres) AS bu, SUM(acres) AS acres
+                FROM profit_field_season
+                WHERE season_id IN (SELECT season_id FROM profit_dirty_seasons)
+                  AND yield_bu_ac IS NOT NULL AND acres > 0
+                GROUP BY season_id, crop
+            ),
+            products AS (
+                SELECT a.season_id, p.crop, a.input_type, a.product_name,
+                       COUNT(*) AS fields, SUM(p.acres) AS acres, SUM(a.cost) AS cost,
+                       SUM(CASE WHEN p.yield_bu_ac IS NOT NULL THEN p.yield_bu_ac * p.acres END) AS bu,
+                       SUM(CASE WHEN p.yield_bu_ac IS NOT NULL THEN p.acres END) AS yield_acres
+                FROM applied a
+                JOIN profit_field_season p ON p.season_id = a.season_id AND p.field_id = a.field_id
+                GROUP BY a.season_id, p.crop, a.input_type, a.product_name
+            ),
+            response AS (
+                SELECT pr.*, pr.bu / NULLIF(pr.yield_acres, 0) AS yield_with,
+                       (t.bu - pr.bu) / NULLIF(t.acres - pr.yield_acres, 0) AS yield_without
+                FROM products pr
+                LEFT JOIN crop_totals t ON t.season_id = pr.season_id AND t.crop = pr.crop
+            )
+            SELECT r.season_id, r.crop, r.input_type, r.product_name, r.fields, r.acres, r.cost,
+                   r.cost / NULLIF(r.acres, 0), r.yield_with, r.yield_without,
+                   r.yield_with - r.yield_without,
+                   ((r.yield_with - r.yield_without) * r.yield_acres * cp.price - r.cost) / NULLIF(r.cost, 0)
+            FROM response r
+            LEFT JOIN temp.crop_prices cp ON cp.crop = r.crop
+        """)
+
+        conn.execute("DELETE FROM profit_dirty_seasons")
+        conn.execute("DROP TABLE temp.crop_prices")
+
+    return len(seasons)
+
+
+def field_profitability(conn, field_name=None, years=None, crop=None):
+    """Per field-season results, most profitable per acre first."""
+    query = """
+        SELECT f.name, p.year, p.crop, p.acres, p.yield_bu_ac, p.revenue, p.revenue_estimated,
+               p.total_cost, p.cost_per_acre, p.cost_per_bu, p.margin, p.margin_per_acre, p.roi
+        FROM profit_field_season p
+        JOIN fields f ON f.id = p.field_id
+        WHERE 1 = 1
+    """
+    params = []
+    if field_name:
+        query += " AND f.name = ?"
+        params.append(field_name)
+    if years:
+        query += f" AND p.year IN ({','.join(['?'] * len(years))})"
+        params.extend(years)
+    if crop:
+        query += " AND p.crop = ?"
+        params.append(crop.lower())
+    query += " ORDER BY p.year DESC, p.margin_per_acre DESC"
+    return conn.execute(query, params).fetchall()
+
+
+def crop_profitability(conn, years=None):
+    """Crop x year roll-up of the field-season results."""
+    query = """
+        SELECT year, crop, COUNT(*), SUM(acres), SUM(production_bu) / NULLIF(SUM(acres), 0),
+               SUM(total_cost) / NULLIF(SUM(acres), 0),
+               SUM(total_cost) / NULLIF(SUM(production_bu), 0),
+               SUM(margin) / NULLIF(SUM(acres), 0),
+               SUM(margin) / NULLIF(SUM(total_cost), 0)
+        FROM profit_field_season
+    """
+    params = []
+    if years:
+        query += f" WHERE year IN ({','.join(['?'] * len(years))})"
+        params.extend(years)
+    query += " GROUP BY year, crop ORDER BY year DESC, crop"
+    return conn.execute(query, params).fetchall()
+
+
+def product_roi(conn, years=None, crop=None, limit=25):
+    """Products ranked by ROI of their estimated yield response."""
+    query = """
+        SELECT s.year, p.crop, p.input_type, p.product_name, p.fields, p.cost_per_acre,
+               p.response_bu_ac, p.roi
+        FROM profit_product p
+        JOIN seasons s ON s.id = p.season_id
+        WHERE p.roi IS NOT NULL
+    """
+    params = []
+    if years:
+        query += f" AND s.year IN ({','.join(['?'] * len(years))})"
+        params.extend(years)
+    if crop:
+        query += " AND p.crop = ?"
+        params.append(crop.lower())
+    query += " ORDER BY p.roi DESC LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def _fmt(value, spec, width):
+    return f"{'N/A':>{width}}" if value is None else format(value, spec).rjust(width)
+
+
+def parse_prices(values):
+    """['corn=4.75', 'soybeans=12'] -> price dict on top of the defaults."""
+    prices = dict(DEFAULT_PRICES)
+    for item in values or []:
+        crop, _, price = item.partition('=')
+        prices[crop.strip().lower()] = float(price)
+    return prices
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Field and input profitability from field history'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument(
+        'report',
+        nargs='?',
+        choices=['fields', 'crops', 'products'],
+        default='crops',
+        help='Report to show (default: crops)'
+    )
+    parser.add_argument('--field', help='Field name')
+    parser.add_argument('--years', nargs='+', type=int, help='Years to include')
+    parser.add_argument('--crop', help='Crop to include')
+    parser.add_argument(
+        '--price',
+        action='append',
+        metavar='CROP=PRICE',
+        help='Crop price in $/bu for estimated revenue (repeatable)'
+    )
+    parser.add_argument('--limit', type=int, default=25, help='Rows for the products report')
+
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        start = time.perf_counter()
+        ensure_profit_schema(conn)
+        refreshed = refresh_profitability(conn, parse_prices(args.price))
+        elapsed = time.perf_counter() - start
+
+        if args.report == 'fields':
+            rows = field_profitability(conn, args.field, args.years, args.crop)
+            print(f"{'Field':<20} {'Year':<5} {'Crop':<10} {'Yield':>7} {'Cost/ac':>9} "
+                  f"{'Cost/bu':>8} {'Margin/ac':>10} {'ROI':>7}")
+            print("-"*84)
+            for name, year, crop, acres, yld, revenue, estimated, cost, cpa, cpb, margin, mpa, roi in rows:
+                print(f"{name:<20} {year:<5} {crop:<10} {_fmt(yld, '.1f', 7)} {_fmt(cpa, ',.2f', 9)} "
+                      f"{_fmt(cpb, '.2f', 8)} {_fmt(mpa, ',.2f', 10)} {_fmt(roi, '.0%', 7)}"
+                      f"{' *' if estimated else ''}")
+            print("* revenue estimated from yield x price")
+
+        elif args.report == 'crops':
+            rows = crop_profitability(conn, args.years)
+            print(f"{'Year':<5} {'Crop':<10} {'Fields':>6} {'Acres':>9} {'Yield':>7} {'Cost/ac':>9} "
+                  f"{'Cost/bu':>8} {'Margin/ac':>10} {'ROI':>7}")
+            print("-"*80)
+            for year, crop, fields, acres, yld, cpa, cpb, mpa, roi in rows:
+                print(f"{year:<5} {crop:<10} {fields:>6} {_fmt(acres, ',.0f', 9)} {_fmt(yld, '.1f', 7)} "
+                      f"{_fmt(cpa, ',.2f', 9)} {_fmt(cpb, '.2f', 8)} {_fmt(mpa, ',.2f', 10)} "
+                      f"{_fmt(roi, '.0%', 7)}")
+
+        else:
+            rows = product_roi(conn, args.years, args.crop, args.limit)
+            print(f"{'Year':<5} {'Crop':<10} {'Type':<12} {'Product':<24} {'Fields':>6} "
+                  f"{'Cost/ac':>8} {'Resp bu':>8} {'ROI':>7}")
+            print("-"*86)
+            for year, crop, input_type, product, fields, cpa, response, roi in rows:
+                print(f"{year:<5} {crop:<10} {input_type:<12} {product or 'N/A':<24} {fields:>6} "
+                      f"{_fmt(cpa, '.2f', 8)} {_fmt(response, '+.1f', 8)} {_fmt(roi, '.0%', 7)}")
+
+        print(f"\n({refreshed} season(s) recomputed in {elapsed:.2f}s)")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
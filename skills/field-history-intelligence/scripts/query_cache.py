@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Query Result Cache
+Persistent cache for repeated tool calls
+
+Results are stored in a sidecar table of the field database, keyed by
+tool name and normalized parameters. Each entry records the version of
+every table it read; importers bump those versions through
+bump_data_version() and triggers bump them on any edit to fields and
+seasons, which makes dependent entries stale. Hit, miss and
+stale counts are kept per tool so cache effectiveness can be reported.
+
+Honors ENABLE_QUERY_CACHE and CACHE_EXPIRATION (seconds) from .env.
+"""
+
+import sqlite3
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+DEFAULT_EXPIRATION = 3600
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS query_cache (
+        cache_key TEXT PRIMARY KEY,
+        tool TEXT NOT NULL,
+        params TEXT NOT NULL,
+        versions TEXT NOT NULL,
+        result TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS query_cache_metrics (
+        tool TEXT PRIMARY KEY,
+        hits INTEGER NOT NULL DEFAULT 0,
+        misses INTEGER NOT NULL DEFAULT 0,
+        stale INTEGER NOT NULL DEFAULT 0,
+        saved_seconds REAL NOT NULL DEFAULT 0
+    );
+"""
+
+
+# Edited in place rather than loaded by importers, so triggers bump their versions
+TRIGGER_VERSIONED_TABLES = ['fields', 'seasons']
+
+
+def _version_trigger_sql(table):
+    return '\n'.join(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            INSERT INTO data_versions (table_name, version) VALUES ('{table}', 1)
+            ON CONFLICT (table_name) DO UPDATE SET
+                version = version + 1,
+                updated_at = CURRENT_TIMESTAMP;
+        END;
+    """ for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+
+def ensure_cache_schema(conn):
+    conn.executescript(CACHE_SCHEMA)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in TRIGGER_VERSIONED_TABLES:
+        if table in existing:
+            conn.executescript(_version_trigger_sql(table))
+
+
+def bump_data_version(conn, *tables):
+    """Mark tables as changed; called by importers after each load."""
+    ensure_cache_schema(conn)
+    with conn:
+        conn.executemany("""
+            INSERT INTO data_versions (table_name, version) VALUES (?, 1)
+            ON CONFLICT (table_name) DO UPDATE SET
+                version = version + 1,
+                updated_at = CURRENT_TIMESTAMP
+        """, [(table,) for table in tables])
+
+
+def normalize_params(params):
+    """Canonical form of tool parameters: no empty values, sorted lists, trimmed strings."""
+    normalized = {}
+    for key, value in params.items():
+        if value is None or value == [] or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(value)
+        normalized[key] = value
+    return normalized
+
+
+def _env_enabled():
+    return os.environ.get('ENABLE_QUERY_CACHE', 'true').lower() not in ('0', 'false', 'no', 'off')
+
+
+class QueryCache:
+    """Versioned result cache backed by the field database."""
+
+    def __init__(self, conn, enabled=None, expiration=None):
+        self.conn = conn
+        self.enabled = _env_enabled() if enabled is None else enabled
+        self.expiration = expiration if expiration is not None else \
+            float(os.environ.get('CACHE_EXPIRATION', DEFAULT_EXPIRATION))
+        if self.enabled:
+            ensure_cache_schema(conn)
+
+    def versions(self, tables):
+        placeholders = ','.join(['?'] * len(tables))
+        current = dict(self.conn.execute(
+            f"SELECT table_name, version FROM data_versions WHERE table_name IN ({placeholders})",
+            list(tables)
+        ))
+        return {table: current.get(table, 0) for table in sorted(tables)}
+
+    @staticmethod
+    def key(tool, params):
+        payload = json.dumps([tool, normalize_params(params)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _count(self, tool, column, seconds=0.0):
+        with self.conn:
+            self.conn.execute(f"""
+                INSERT INTO query_cache_metrics (tool, {column}, saved_seconds) VALUES (?, 1, ?)
+                ON CONFLICT (tool) DO UPDATE SET
+                    {column} = {column} + 1,
+                    saved_seconds = saved_seconds + excluded.saved_seconds
+            """, (tool, seconds))
+
+    def get(self, tool, params, tables):
+        """Cached result, or None on a miss (stale entries are dropped)."""
+        if not self.enabled:
+            return None
+        cache_key = self.key(tool, params)
+        row = self.conn.execute(
+            "SELECT versions, result, created_at FROM query_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            self._count(tool, 'misses')
+            return None
+
+        versions, result, created_at = row
+        expired = self.expiration > 0 and time.time() - created_at > self.expiration
+        if expired or json.loads(versions) != self.versions(tables):
+            with self.conn:
+                self.conn.execute("DELETE FROM query_cache WHERE cache_key = ?", (cache_key,))
+            self._count(tool, 'stale')
+            return None
+
+        payload = json.loads(result)
+        with self.conn:
+            self.conn.execute("UPDATE query_cache SET hits = hits + 1 WHERE cache_key = ?", (cache_key,))
+        self._count(tool, 'hits', payload.get('seconds', 0.0))
+        return payload['value']
+
+    def put(self, tool, params, tables, value, seconds=0.0):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self.conn:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO query_cache (cache_key, tool, params, versions, result, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (self.key(tool, params), tool,
+                  json.dumps(normalize_params(params), sort_keys=True, default=str),
+                  json.dumps(self.versions(tables)),
+                  json.dumps({'value': value, 'seconds': seconds}, default=str), now))
+            if self.expiration > 0:
+                self.conn.execute("DELETE FROM query_cache WHERE created_at < ?",
+                                  (now - self.expiration,))
+
+    def cached(self, tool, params, tables, compute):
+        """Return the cached value for (tool, params) or compute and store it."""
+        value = self.get(tool, params, tables)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        self.put(tool, params, tables, value, time.perf_counter() - start)
+        return value
+
+    def run_report(self, tool, params, tables, report, *args, **kwargs):
+        """Run a print-based report through the cache and print its output."""
+        def capture():
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                report(*args, **kwargs)
+            return buffer.getvalue()
+
+        output = self.cached(tool, params, tables, capture)
+        sys.stdout.write(output)
+
+    def stats(self):
+        """Per-tool hit/miss counts and cache size."""
+        if not self.enabled:
+            return {}
+        tools = {}
+        for tool, hits, misses, stale, saved in self.conn.execute(
+                "SELECT tool, hits, misses, stale, saved_seconds FROM query_cache_metrics ORDER BY tool"):
+            lookups = hits + misses + stale
+            tools[tool] = {
+                'hits': hits,
+                'misses': misses,
+                'stale': stale,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'saved_seconds': saved,
+            }
+        entries = self.conn.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+        return {'entries': entries, 'tools': tools}
+
+    def clear(self, reset_metrics=False):
+        with self.conn:
+            self.conn.execute("DELETE FROM query_cache")
+            if reset_metrics:
+                self.conn.execute("DELETE FROM query_cache_metrics")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Inspect or clear the field history query cache'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument(
+        'command',
+        choices=['stats', 'clear', 'versions'],
+        help='stats: hit/miss metrics; clear: drop cached results; versions: table data versions'
+    )
+    parser.add_argument(
+        '--reset-metrics',
+        action='store_true',
+        help='With clear, also reset hit/miss counters'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    cache = QueryCache(conn, enabled=True)
+
+    if args.command == 'stats':
+        stats = cache.stats()
+        print(f"Cached results: {stats['entries']}")
+        print(f"{'Tool':<20} {'Hits':>8} {'Misses':>8} {'Stale':>8} {'Hit rate':>9} {'Saved':>9}")
+        for tool, s in stats['tools'].items():
+            print(f"{tool:<20} {s['hits']:>8} {s['misses']:>8} {s['stale']:>8} "
+                  f"{s['hit_rate']:>8.0%} {s['saved_seconds']:>8.2f}s")
+    elif args.command == 'clear':
+        cache.clear(args.reset_metrics)
+        print("Query cache cleared")
+    else:
+        for table, version, updated_at in conn.execute(
+                "SELECT table_name, version, updated_at FROM data_versions ORDER BY table_name"):
+            print(f"  {table:<20} v{version:<6} {updated_at}")
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
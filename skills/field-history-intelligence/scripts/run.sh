@@ -78,11 +78,17 @@ case $choice in
         echo "Use: python3 scripts/compare_varieties.py"
         ;;
     4)
-        read -p "CSV file path: " csv_file
-        read -p "Data type (planting, harvest, inputs): " data_type
-        python3 "$SCRIPT_DIR/import_csv.py" \
-            --database "$DATABASE_PATH" \
-            "$csv_file" "$data_type"
+        read -p "CSV file or directory path: " csv_file
+        if [ -d "$csv_file" ]; then
+            python3 "$SCRIPT_DIR/import_directory.py" \
+                --database "$DATABASE_PATH" \
+                "$csv_file"
+        else
+            read -p "Data type (planting, harvest, inputs, soil_tests, weather): " data_type
+            python3 "$SCRIPT_DIR/import_csv.py" \
+                --database "$DATABASE_PATH" \
+                "$csv_file" "$data_type"
+        fi
         ;;
     5)
         echo "Report generation not yet implemented"
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Record Search
+Full-text search over scouting observations, input notes and financial memos
+
+record_search is an FTS5 index with one row per source record. Triggers
+on observations, inputs and financial_records keep it in sync, so a
+search never scans the source tables. Results are ranked with bm25 and
+can be filtered by field, record type and date range.
+
+Queries accept FTS5 syntax (OR, NOT, "phrases", prefix*); anything that
+does not parse is searched as plain words.
+"""
+
+import sqlite3
+import argparse
+import sys
+import time
+
+# source -> (rowid code, date column, heading SQL, body SQL)
+SEARCH_SOURCES = {
+    'observations': (
+        1, 'observation_date',
+        "COALESCE({r}.category, '') || ' ' || COALESCE({r}.severity, '')",
+        "COALESCE({r}.description, '') || ' ' || COALESCE({r}.location_in_field, '') || ' ' "
+        "|| COALESCE({r}.action_taken, '')",
+    ),
+    'inputs': (
+        2, 'application_date',
+        "COALESCE({r}.input_type, '') || ' ' || COALESCE({r}.product_name, '')",
+        "COALESCE({r}.notes, '') || ' ' || COALESCE({r}.weather_conditions, '')",
+    ),
+    'financial_records': (
+        3, 'record_date',
+        "COALESCE({r}.category, '')",
+        "COALESCE({r}.description, '') || ' ' || COALESCE({r}.notes, '')",
+    ),
+}
+
+# Heading matches (category, product) weigh more than free-text matches
+BM25_WEIGHTS = (0.0, 0.0, 0.0, 0.0, 2.0, 1.0)
+
+SEARCH_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS record_search USING fts5(
+        source UNINDEXED,
+        source_id UNINDEXED,
+        field_id UNINDEXED,
+        record_date UNINDEXED,
+        heading,
+        body,
+        tokenize = 'porter unicode61'
+    );
+"""
+
+
+def _rowid(code, r):
+    """Stable FTS rowid for a source record, unique across sources."""
+    return f"{r}.id * 4 + {code}"
+
+
+def _select_sql(source, r):
+    code, date_column, heading, body = SEARCH_SOURCES[source]
+    return (f"{_rowid(code, r)}, '{source}', {r}.id, {r}.field_id, {r}.{date_column}, "
+            f"{heading.format(r=r)}, {body.format(r=r)}")
+
+
+def _trigger_sql():
+    statements = []
+    columns = "(rowid, source, source_id, field_id, record_date, heading, body)"
+    for source, (code, *_) in SEARCH_SOURCES.items():
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{source}_search_insert AFTER INSERT ON {source}
+            BEGIN
+                INSERT INTO record_search {columns} SELECT {_select_sql(source, 'NEW')};
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{source}_search_update AFTER UPDATE ON {source}
+            BEGIN
+                DELETE FROM record_search WHERE rowid = {_rowid(code, 'OLD')};
+                INSERT INTO record_search {columns} SELECT {_select_sql(source, 'NEW')};
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{source}_search_delete AFTER DELETE ON {source}
+            BEGIN
+                DELETE FROM record_search WHERE rowid = {_rowid(code, 'OLD')};
+            END;
+        """)
+    return '\n'.join(statements)
+
+
+def ensure_search_schema(conn):
+    """Create the search index and its triggers; build it if new.
+
+    Returns True when the index had to be built from scratch.
+    """
+    existing = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'record_search'"
+    ).fetchone()
+    conn.executescript(SEARCH_SCHEMA + _trigger_sql())
+    if existing:
+        return False
+    rebuild_search_index(conn)
+    return True
+
+
+def rebuild_search_index(conn):
+    """Re-index every source record; returns the number of rows indexed."""
+    with conn:
+        conn.execute("DELETE FROM record_search")
+        for source in SEARCH_SOURCES:
+            conn.execute(f"""
+                INSERT INTO record_search (rowid, source, source_id, field_id, record_date, heading, body)
+                SELECT {_select_sql(source, 'r')} FROM {source} r
+            """)
+        conn.execute("INSERT INTO record_search (record_search) VALUES ('optimize')")
+    return conn.execute("SELECT COUNT(*) FROM record_search").fetchone()[0]
+
+
+def plain_query(text):
+    """Quote each word so punctuation in free text is not read as FTS syntax."""
+    words = [word.replace('"', '""') for word in text.split()]
+    return ' '.join(f'"{word}"' for word in words if word)
+
+
+def search_records(conn, query, field_name=None, sources=None, start_date=None,
+                   end_date=None, limit=25):
+    """Best-matching records as (source, source_id, field, date, heading, snippet, score)."""
+    sql = """
+        SELECT s.source, s.source_id, f.name, s.record_date, s.heading,
+               snippet(record_search, 5, '[', ']', '...', 12),
+               bm25(record_search, {weights}) AS score
+        FROM record_search s
+        LEFT JOIN fields f ON f.id = s.field_id
+        WHERE record_search MATCH ?
+    """.format(weights=', '.join(str(w) for w in BM25_WEIGHTS))
+    params = []
+    if field_name:
+        sql += " AND s.field_id = (SELECT id FROM fields WHERE name = ?)"
+        params.append(field_name)
+    if sources:
+        sql += f" AND s.source IN ({','.join(['?'] * len(sources))})"
+        params.extend(sources)
+    if start_date:
+        sql += " AND s.record_date >= ?"
+        params.append(start_date)
+    if end_date:
+        sql += " AND s.record_date <= ?"
+        params.append(end_date)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    try:
+        return conn.execute(sql, [query] + params).fetchall()
+    except sqlite3.OperationalError:
+        # Not a valid FTS5 expression (e.g. "tar spot: bad"); search the words
+        return conn.execute(sql, [plain_query(query)] + params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Search field history observations, input notes and financial memos'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument('search_term', nargs='?', help='Words or FTS5 query (e.g. rootworm OR beetle)')
+    parser.add_argument(
+        '--table',
+        dest='tables',
+        nargs='+',
+        choices=sorted(SEARCH_SOURCES),
+        help='Record types to search (default: all)'
+    )
+    parser.add_argument('--field', help='Field name')
+    parser.add_argument('--from', dest='start_date', help='Earliest record date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end_date', help='Latest record date (YYYY-MM-DD)')
+    parser.add_argument('--limit', type=int, default=25, help='Maximum results (default: 25)')
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Re-index all records'
+    )
+
+    args = parser.parse_args()
+
+    if not args.search_term and not args.rebuild:
+        parser.error('search_term is required unless --rebuild is given')
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if not ensure_search_schema(conn) and args.rebuild:
+            rebuild_search_index(conn)
+        if not args.search_term:
+            total = conn.execute("SELECT COUNT(*) FROM record_search").fetchone()[0]
+            print(f"Search index rebuilt: {total} records")
+            conn.close()
+            return
+
+        start = time.perf_counter()
+        results = search_records(conn, args.search_term, args.field, args.tables,
+                                 args.start_date, args.end_date, args.limit)
+        elapsed = time.perf_counter() - start
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+
+    print(f"Search: {args.search_term}")
+    print("="*120)
+    for source, source_id, field, record_date, heading, snippet, score in results:
+        print(f"{record_date or 'N/A':<11} {field or 'N/A':<20} {source:<18} #{source_id:<7} {heading.strip()}")
+        print(f"{'':<12}{snippet.strip()}")
+    print(f"\n{len(results)} result(s) in {elapsed * 1000:.1f} ms")
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -48,6 +48,7 @@ echo "Installing Python packages..."
 PACKAGES=(
     "pandas>=1.3"
     "numpy>=1.21"
+    "pyarrow>=14"
     "matplotlib>=3.4"
     "Pillow>=8.3"
     "pytesseract>=0.3.8"
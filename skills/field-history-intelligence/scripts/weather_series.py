@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Weather Time Series
+Cumulative GDD and precipitation per field for fast window queries
+
+weather_cumulative holds one row per field and day with running totals
+of growing degree days and precipitation. Triggers on weather record the
+earliest changed date per field and refresh_weather_series() rewrites
+only the running totals from that date on, so appending new days is
+cheap. Any (field, start, end) window is then the difference of two
+index lookups instead of a scan and sum of the daily rows.
+
+Days without a recorded GDD value use the 86/50 F method on max/min temp.
+"""
+
+import sqlite3
+import argparse
+import sys
+import time
+
+WEATHER_SERIES_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_weather_field_date ON weather(field_id, date);
+
+    CREATE TABLE IF NOT EXISTS weather_cumulative (
+        field_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        gdd REAL NOT NULL,
+        precipitation REAL NOT NULL,
+        days INTEGER NOT NULL,
+        PRIMARY KEY (field_id, date)
+    ) WITHOUT ROWID;
+
+    -- Earliest date per field whose running totals are stale
+    CREATE TABLE IF NOT EXISTS weather_cumulative_dirty (
+        field_id INTEGER PRIMARY KEY,
+        from_date DATE NOT NULL
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_weather_series_insert AFTER INSERT ON weather
+    BEGIN
+        INSERT INTO weather_cumulative_dirty VALUES (NEW.field_id, NEW.date)
+        ON CONFLICT (field_id) DO UPDATE SET from_date = MIN(from_date, excluded.from_date);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_weather_series_update
+    AFTER UPDATE OF field_id, date, growing_degree_days, precipitation, max_temp, min_temp ON weather
+    BEGIN
+        INSERT INTO weather_cumulative_dirty VALUES (OLD.field_id, OLD.date)
+        ON CONFLICT (field_id) DO UPDATE SET from_date = MIN(from_date, excluded.from_date);
+        INSERT INTO weather_cumulative_dirty VALUES (NEW.field_id, NEW.date)
+        ON CONFLICT (field_id) DO UPDATE SET from_date = MIN(from_date, excluded.from_date);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_weather_series_delete AFTER DELETE ON weather
+    BEGIN
+        INSERT INTO weather_cumulative_dirty VALUES (OLD.field_id, OLD.date)
+        ON CONFLICT (field_id) DO UPDATE SET from_date = MIN(from_date, excluded.from_date);
+    END;
+"""
+
+DAILY_GDD = """
+    COALESCE(growing_degree_days,
+             MAX(0, (MIN(MAX(max_temp, 50), 86) + MIN(MAX(min_temp, 50), 86)) / 2.0 - 50),
+             0)
+"""
+
+
+def ensure_weather_series_schema(conn):
+    """Create the cumulative table, index and triggers; build it if new.
+
+    Returns True when the running totals had to be built from scratch.
+    """
+    existing = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weather_cumulative_dirty'"
+    ).fetchone()
+    conn.executescript(WEATHER_SERIES_SCHEMA)
+    if existing:
+        return False
+    rebuild_weather_series(conn)
+    return True
+
+
+def rebuild_weather_series(conn):
+    """Recompute running totals for every field."""
+    with conn:
+        conn.execute("DELETE FROM weather_cumulative")
+        conn.execute("""
+            INSERT OR REPLACE INTO weather_cumulative_dirty
+            SELECT field_id, MIN(date) FROM weather GROUP BY field_id
+        """)
+    return refresh_weather_series(conn)
+
+
+def refresh_weather_series(conn):
+    """Rewrite running totals from each dirty field's earliest changed date.
+
+    Returns the number of fields refreshed.
+    """
+    dirty = conn.execute("SELECT COUNT(*) FROM weather_cumulative_dirty").fetchone()[0]
+    if not dirty:
+        return 0
+
+    with conn:
+        # Totals carried in from the last untouched day before each dirty range
+        conn.execute("DROP TABLE IF EXISTS temp.weather_carry")
+        conn.execute("""
+            CREATE TEMP TABLE weather_carry (
+                field_id INTEGER PRIMARY KEY, from_date DATE, gdd REAL, precipitation REAL, days INTEGER
+            )
+        """)
+        conn.execute("""
+            INSERT INTO temp.weather_carry
+            SELECT d.field_id, d.from_date,
+                   COALESCE(c.gdd, 0) AS gdd,
+                   COALESCE(c.precipitation, 0) AS precipitation,
+                   COALESCE(c.days, 0) AS days
+            FROM weather_cumulative_dirty d
+            LEFT JOIN weather_cumulative c ON c.field_id = d.field_id AND c.date = (
+                SELECT MAX(date) FROM weather_cumulative
+                WHERE field_id = d.field_id AND date < d.from_date
+            )
+        """)
+        conn.execute("""
+            DELETE FROM weather_cumulative
+            WHERE (field_id, date) IN (
+                SELECT c.field_id, c.date
+                FROM weather_carry k
+                JOIN weather_cumulative c ON c.field_id = k.field_id AND c.date >= k.from_date
+            )
+        """)
+        conn.execute(f"""
+            INSERT INTO weather_cumulative (field_id, date, gdd, precipitation, days)
+            SELECT daily.field_id, daily.date,
+                   k.gdd + SUM(daily.gdd) OVER w,
+                   k.precipitation + SUM(daily.precipitation) OVER w,
+                   k.days + COUNT(*) OVER w
+            FROM (
+                SELECT w.field_id, w.date,
+                       SUM({DAILY_GDD}) AS gdd,
+                       SUM(COALESCE(w.precipitation, 0)) AS precipitation
+                FROM weather w
+                JOIN weather_carry k ON k.field_id = w.field_id AND w.date >= k.from_date
+                GROUP BY w.field_id, w.date
+            ) daily
+            JOIN weather_carry k ON k.field_id = daily.field_id
+            WINDOW w AS (PARTITION BY daily.field_id ORDER BY daily.date)
+        """)
+        conn.execute("DELETE FROM weather_cumulative_dirty")
+        conn.execute("DROP TABLE temp.weather_carry")
+
+    return dirty
+
+
+def window_totals(conn, windows):
+    """GDD, precipitation and recorded days for many (field_id, start, end) windows.
+
+    Dates are inclusive ISO strings. Each window is answered as the
+    difference of the running totals at `end` and the day before `start`,
+    all in one statement. Returns a list of (gdd, precipitation, days)
+    in input order.
+    """
+    refresh_weather_series(conn)
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.weather_windows")
+        conn.execute("""
+            CREATE TEMP TABLE weather_windows (
+                idx INTEGER PRIMARY KEY, field_id INTEGER, start_date DATE, end_date DATE
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO temp.weather_windows VALUES (?, ?, ?, ?)",
+            ((i, field_id, str(start), str(end)) for i, (field_id, start, end) in enumerate(windows))
+        )
+        rows = conn.execute("""
+            SELECT w.idx,
+                   COALESCE(e.gdd, 0) - COALESCE(s.gdd, 0),
+                   COALESCE(e.precipitation, 0) - COALESCE(s.precipitation, 0),
+                   COALESCE(e.days, 0) - COALESCE(s.days, 0)
+            FROM temp.weather_windows w
+            LEFT JOIN weather_cumulative e ON e.field_id = w.field_id AND e.date = (
+                SELECT MAX(date) FROM weather_cumulative
+                WHERE field_id = w.field_id AND date <= w.end_date
+            )
+            LEFT JOIN weather_cumulative s ON s.field_id = w.field_id AND s.date = (
+                SELECT MAX(date) FROM weather_cumulative
+                WHERE field_id = w.field_id AND date < w.start_date
+            )
+            ORDER BY w.idx
+        """).fetchall()
+        conn.execute("DROP TABLE temp.weather_windows")
+    return [(gdd, precip, days) for _, gdd, precip, days in rows]
+
+
+def season_windows(conn, season_name):
+    """Planting-to-harvest windows for every field in a season."""
+    return conn.execute("""
+        SELECT f.id, f.name, MIN(p.planting_date), MAX(h.harvest_date)
+        FROM seasons s
+        JOIN planting p ON p.season_id = s.id
+        JOIN harvest h ON h.season_id = s.id AND h.field_id = p.field_id
+        JOIN fields f ON f.id = p.field_id
+        WHERE s.name = ?
+        GROUP BY f.id, f.name
+        ORDER BY f.name
+    """, (season_name,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Cumulative GDD and precipitation between planting and harvest'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument('--season', help='Season name (e.g., "2024 Corn")')
+    parser.add_argument('--field', help='Field name (with --start and --end)')
+    parser.add_argument('--start', help='Window start date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Window end date (YYYY-MM-DD)')
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Recompute all running totals'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        start = time.perf_counter()
+        if not ensure_weather_series_schema(conn):
+            if args.rebuild:
+                rebuild_weather_series(conn)
+            else:
+                refresh_weather_series(conn)
+
+        if args.season:
+            rows = season_windows(conn, args.season)
+            windows = [(field_id, planted, harvested) for field_id, _, planted, harvested in rows]
+        elif args.field and args.start and args.end:
+            field = conn.execute("SELECT id FROM fields WHERE name = ?", (args.field,)).fetchone()
+            if not field:
+                print(f"Field not found: {args.field}", file=sys.stderr)
+                sys.exit(1)
+            rows = [(field[0], args.field, args.start, args.end)]
+            windows = [(field[0], args.start, args.end)]
+        else:
+            total = conn.execute("SELECT COUNT(*) FROM weather_cumulative").fetchone()[0]
+            print(f"Weather running totals up to date: {total} field-days "
+                  f"({time.perf_counter() - start:.2f}s)")
+            conn.close()
+            return
+
+        totals = window_totals(conn, windows)
+        elapsed = time.perf_counter() - start
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+
+    print(f"{'Field':<20} {'Start':<11} {'End':<11} {'GDD':>8} {'Precip':>8} {'Days':>5}")
+    print("-"*68)
+    for (_, name, window_start, window_end), (gdd, precip, days) in zip(rows, totals):
+        print(f"{name:<20} {window_start:<11} {window_end:<11} {gdd:>8.0f} {precip:>8.2f} {days:>5}")
+    print(f"\n{len(totals)} window(s) in {elapsed:.2f}s")
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
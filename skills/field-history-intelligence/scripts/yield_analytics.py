@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Multi-Field Yield Analytics
+Trend and anomaly analysis across every field at once
+
+Yields for all fields come from yield_summary in one query and are laid
+out as a (field x crop) by year matrix. One vectorized pass computes:
+
+- robust per-series trends (Theil-Sen slope, median intercept)
+- deviation-from-trend z-scores (median/MAD scaled)
+- year-over-year z-scores against other fields of the same crop
+- weather-adjusted residuals from growing-season GDD and precipitation
+- outlier flags and a ranked list of fields needing attention
+"""
+
+import sqlite3
+import argparse
+import csv
+import sys
+import warnings
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from query_cache import QueryCache
+from yield_summary import ensure_summary_schema, refresh_summaries
+
+# Tables the analysis depends on (for query cache invalidation)
+ANALYTICS_TABLES = ['fields', 'seasons', 'planting', 'harvest', 'weather']
+
+# Growing season used for weather totals (April-September)
+SEASON_MONTHS = ('04', '09')
+OUTLIER_Z = 2.5
+DECLINE_SLOPE = -2.0  # bu/ac/year, same threshold as analyze_field_trend
+RECENT_YEARS = 5
+MAD_SCALE = 1.4826
+
+
+def load_yield_matrix(conn, crop=None):
+    """Load yields as arrays: one row per (field, crop), one column per year."""
+    query = """
+        SELECT y.field_id, f.name, y.crop, y.year, SUM(y.yield_sum) / SUM(y.records)
+        FROM yield_summary y
+        JOIN fields f ON f.id = y.field_id
+    """
+    params = []
+    if crop:
+        query += " WHERE y.crop = ?"
+        params.append(crop)
+    query += " GROUP BY y.field_id, y.crop, y.year"
+    rows = conn.execute(query, params).fetchall()
+    if not rows:
+        return None
+
+    series = sorted({(r[0], r[1], r[2]) for r in rows})
+    series_index = {(field_id, crop_name): i for i, (field_id, _, crop_name) in enumerate(series)}
+    first_year = min(r[3] for r in rows)
+    years = np.arange(first_year, max(r[3] for r in rows) + 1)
+
+    yields = np.full((len(series), len(years)), np.nan)
+    s = np.fromiter((series_index[(r[0], r[2])] for r in rows), dtype=np.intp, count=len(rows))
+    t = np.fromiter((r[3] - first_year for r in rows), dtype=np.intp, count=len(rows))
+    yields[s, t] = [r[4] for r in rows]
+
+    return {
+        'field_ids': np.array([field_id for field_id, _, _ in series]),
+        'field_names': [name for _, name, _ in series],
+        'crops': np.array([crop_name for _, _, crop_name in series]),
+        'years': years,
+        'yields': yields,
+    }
+
+
+def load_weather_matrix(conn, matrix):
+    """Growing-season GDD and precipitation totals aligned with the yield matrix."""
+    shape = matrix['yields'].shape
+    gdd = np.full(shape, np.nan)
+    precip = np.full(shape, np.nan)
+
+    rows = conn.execute("""
+        SELECT field_id, CAST(strftime('%Y', date) AS INTEGER) AS year,
+               SUM(growing_degree_days), SUM(precipitation)
+        FROM weather
+        WHERE strftime('%m', date) BETWEEN ? AND ?
+        GROUP BY field_id, year
+    """, SEASON_MONTHS).fetchall()
+    if not rows:
+        return gdd, precip
+
+    first_year = matrix['years'][0]
+    by_field = {}
+    for i, field_id in enumerate(matrix['field_ids']):
+        by_field.setdefault(int(field_id), []).append(i)
+
+    for field_id, year, gdd_total, precip_total in rows:
+        t = year - first_year
+        if 0 <= t < shape[1]:
+            for i in by_field.get(field_id, ()):
+                gdd[i, t] = np.nan if gdd_total is None else gdd_total
+                precip[i, t] = np.nan if precip_total is None else precip_total
+    return gdd, precip
+
+
+def theil_sen(years, yields):
+    """Per-row Theil-Sen slope and intercept, ignoring missing years."""
+    x = years - years[0]
+    dx = x[None, :] - x[:, None]                       # (T, T)
+    upper = np.triu(np.ones_like(dx, dtype=bool), k=1)
+    dy = yields[:, None, :] - yields[:, :, None]       # (S, T, T)
+    pair_slopes = np.where(upper, dy / np.where(dx == 0, 1, dx), np.nan)
+    pair_slopes = pair_slopes.reshape(len(yields), -1)
+
+    valid = np.isfinite(pair_slopes).any(axis=1)
+    slope = np.full(len(yields), np.nan)
+    slope[valid] = np.nanmedian(pair_slopes[valid], axis=1)
+    intercept = np.full(len(yields), np.nan)
+    intercept[valid] = np.nanmedian(yields[valid] - slope[valid, None] * x, axis=1)
+    return slope, intercept
+
+
+def robust_z(values):
+    """Median/MAD z-scores along each row."""
+    center = np.nanmedian(values, axis=1, keepdims=True)
+    mad = np.nanmedian(np.abs(values - center), axis=1, keepdims=True) * MAD_SCALE
+    # Fall back to the standard deviation when more than half the values tie
+    std = np.nanstd(values, axis=1, keepdims=True)
+    scale = np.where(mad > 0, mad, std)
+    return np.where(scale > 0, (values - center) / scale, 0.0)
+
+
+def weather_adjust(residuals, gdd, precip, crops):
+    """Remove the part of the detrended residual explained by weather.
+
+    A linear model on standardized GDD, precipitation and precipitation
+    squared is fitted per crop across all fields and years with weather.
+    Cells without weather keep their unadjusted residual.
+    """
+    adjusted = residuals.copy()
+    coefficients = {}
+    for crop_name in np.unique(crops):
+        rows = crops == crop_name
+        r = residuals[rows]
+        g = gdd[rows]
+        p = precip[rows]
+        ok = np.isfinite(r) & np.isfinite(g) & np.isfinite(p)
+        if ok.sum() < 10:
+            continue
+
+        g_std = (g - g[ok].mean()) / (g[ok].std() or 1.0)
+        p_std = (p - p[ok].mean()) / (p[ok].std() or 1.0)
+        design = np.stack([np.ones_like(g_std), g_std, p_std, p_std ** 2], axis=-1)
+        beta, *_ = np.linalg.lstsq(design[ok], r[ok], rcond=None)
+
+        block = adjusted[rows]
+        block[ok] = r[ok] - design[ok] @ beta
+        adjusted[rows] = block
+        coefficients[str(crop_name)] = beta
+    return adjusted, coefficients
+
+
+def yoy_z(yields, crops):
+    """Change from the previous observed year, z-scored against same-crop fields.
+
+    "Previous" is the last year the series has a yield, so rotations
+    compare corn with the last corn year rather than with soybeans.
+    """
+    observed = np.isfinite(yields)
+    positions = np.where(observed, np.arange(yields.shape[1]), -1)
+    last_seen = np.maximum.accumulate(positions, axis=1)
+    previous = np.full_like(last_seen, -1)
+    previous[:, 1:] = last_seen[:, :-1]
+
+    rows = np.arange(len(yields))[:, None]
+    change = np.where(observed & (previous >= 0),
+                      yields - yields[rows, np.maximum(previous, 0)], np.nan)
+
+    z = np.full(yields.shape, np.nan)
+    for crop_name in np.unique(crops):
+        block_rows = crops == crop_name
+        block = change[block_rows]
+        mean = np.nanmean(block, axis=0, keepdims=True)
+        std = np.nanstd(block, axis=0, keepdims=True)
+        z[block_rows] = np.where(std > 0, (block - mean) / std, 0.0)
+    return np.where(np.isfinite(change), z, np.nan)
+
+
+def analyze(matrix, gdd=None, precip=None):
+    """Run the full vectorized analysis over a yield matrix."""
+    # Series with no data in some year are expected; empty-slice warnings are noise
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return _analyze(matrix, gdd, precip)
+
+
+def _analyze(matrix, gdd, precip):
+    years = matrix['years']
+    yields = matrix['yields']
+    crops = matrix['crops']
+    x = years - years[0]
+
+    slope, intercept = theil_sen(years, yields)
+    fitted = intercept[:, None] + slope[:, None] * x
+    residuals = yields - fitted
+    trend_z = robust_z(residuals)
+
+    if gdd is not None and precip is not None:
+        adjusted, coefficients = weather_adjust(residuals, gdd, precip, crops)
+    else:
+        adjusted, coefficients = residuals, {}
+    adjusted_z = robust_z(adjusted)
+    change_z = yoy_z(yields, crops)
+
+    observed = np.isfinite(yields)
+    outliers = observed & (np.abs(adjusted_z) > OUTLIER_Z)
+    low_outliers = observed & (adjusted_z < -OUTLIER_Z)
+
+    # Latest observed year per series
+    last = np.where(observed.any(axis=1),
+                    yields.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1), 0)
+    rows = np.arange(len(yields))
+    recent = observed & (x[None, :] >= (x[last] - RECENT_YEARS + 1)[:, None])
+
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'residuals': residuals,
+        'trend_z': trend_z,
+        'adjusted': adjusted,
+        'adjusted_z': adjusted_z,
+        'yoy_z': change_z,
+        'outliers': outliers,
+        'weather_coefficients': coefficients,
+        'years_observed': observed.sum(axis=1),
+        'last_index': last,
+        'last_year': years[last],
+        'last_yield': yields[rows, last],
+        'last_adjusted_z': adjusted_z[rows, last],
+        'last_yoy_z': change_z[rows, last],
+        'recent_low_outliers': (low_outliers & recent).sum(axis=1),
+    }
+
+
+def attention_table(matrix, results, min_years=3):
+    """Fields ranked by how much attention they need (highest score first)."""
+    slope = results['slope']
+    last_z = np.nan_to_num(results['last_adjusted_z'])
+    last_yoy = np.nan_to_num(results['last_yoy_z'])
+    low = results['recent_low_outliers']
+
+    decline = np.clip(-(np.nan_to_num(slope) / abs(DECLINE_SLOPE)), 0, None)
+    score = decline + np.clip(-last_z, 0, None) + 0.5 * np.clip(-last_yoy, 0, None) + low
+    eligible = results['years_observed'] >= min_years
+    order = np.argsort(-np.where(eligible, score, -np.inf), kind='stable')
+
+    table = []
+    for i in order:
+        if not eligible[i]:
+            break
+        reasons = []
+        if slope[i] < DECLINE_SLOPE:
+            reasons.append(f"declining {slope[i]:.1f} bu/ac/yr")
+        if last_z[i] < -OUTLIER_Z:
+            reasons.append(f"{results['last_year'][i]} weather-adjusted low")
+        elif last_z[i] < -1:
+            reasons.append(f"{results['last_year'][i]} below trend")
+        if last_yoy[i] < -OUTLIER_Z:
+            reasons.append("dropped more than peers")
+        if low[i]:
+            reasons.append(f"{low[i]} low outlier(s) in last {RECENT_YEARS} yrs")
+
+        table.append({
+            'field': matrix['field_names'][i],
+            'crop': str(matrix['crops'][i]),
+            'years': int(results['years_observed'][i]),
+            'slope': round(float(slope[i]), 2),
+            'last_year': int(results['last_year'][i]),
+            'last_yield': round(float(results['last_yield'][i]), 1),
+            'adjusted_z': round(float(last_z[i]), 2),
+            'yoy_z': round(float(last_yoy[i]), 2),
+            'low_outliers': int(low[i]),
+            'score': round(float(score[i]), 2),
+            'reasons': '; '.join(reasons),
+        })
+    return table
+
+
+def export_table(table, path):
+    """Write the attention table as CSV."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(table[0].keys()) if table else ['field'])
+        writer.writeheader()
+        writer.writerows(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Trend and anomaly analysis across all fields'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument(
+        '--crop',
+        help='Limit to one crop (default: all crops)'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=25,
+        help='Number of fields to show'
+    )
+    parser.add_argument(
+        '--min-years',
+        type=int,
+        default=3,
+        help='Minimum years of yield data for a field to be ranked'
+    )
+    parser.add_argument(
+        '--output',
+        help='Write the full ranked table to this CSV file'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the query cache'
+    )
+
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        print("Error: numpy is required (pip install numpy)", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    def compute():
+        refresh_summaries(conn)
+        matrix = load_yield_matrix(conn, args.crop)
+        if matrix is None:
+            return {'table': []}
+        gdd, precip = load_weather_matrix(conn, matrix)
+        results = analyze(matrix, gdd, precip)
+        return {
+            'table': attention_table(matrix, results, args.min_years),
+            'first_year': int(matrix['years'][0]),
+            'last_year': int(matrix['years'][-1]),
+            'weather_crops': sorted(results['weather_coefficients']),
+        }
+
+    try:
+        ensure_summary_schema(conn)
+        cache = QueryCache(conn, enabled=False if args.no_cache else None)
+        report = cache.cached('field-anomalies', {'crop': args.crop, 'min_years': args.min_years},
+                              ANALYTICS_TABLES, compute)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        conn.close()
+        sys.exit(1)
+
+    conn.close()
+
+    table = report['table']
+    if not table:
+        print("No yield data found")
+        return
+
+    print("\n" + "="*120)
+    print("FIELDS NEEDING ATTENTION")
+    print("="*120)
+    print(f"{'Field':<20} {'Crop':<10} {'Yrs':>4} {'Trend':>7} {'Last':>6} {'Yield':>7} "
+          f"{'Adj z':>6} {'YoY z':>6} {'Score':>6}  Reasons")
+    print("-"*120)
+    for row in table[:args.top]:
+        print(f"{row['field']:<20} {row['crop']:<10} {row['years']:>4} {row['slope']:>7.1f} "
+              f"{row['last_year']:>6} {row['last_yield']:>7.1f} {row['adjusted_z']:>6.2f} "
+              f"{row['yoy_z']:>6.2f} {row['score']:>6.2f}  {row['reasons']}")
+    print("="*120)
+    print(f"{len(table)} field-crop series analyzed over "
+          f"{report['first_year']}-{report['last_year']}")
+    if report['weather_crops']:
+        print(f"Weather-adjusted using growing-season GDD and precipitation for: "
+              f"{', '.join(report['weather_crops'])}")
+
+    if args.output:
+        export_table(table, args.output)
+        print(f"Ranked table written to: {args.output}")
+
+if __name__ == '__main__':
+    main()
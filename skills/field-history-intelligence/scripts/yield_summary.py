@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Field History Intelligence - Yield Summary Tables
+Materialized yield statistics for reports and trend analysis
+
+Triggers on harvest, planting and seasons record which (field, season)
+pairs changed in yield_summary_dirty. refresh_summaries() recomputes
+only those pairs, then the per-field trend and the variety rankings of
+the affected fields and crops, so reports never join the raw tables.
+Importers refresh after each load; readers refresh before querying.
+"""
+
+import sqlite3
+import argparse
+import sys
+import time
+
+TREND_YEARS = 10
+
+SUMMARY_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_harvest_field_season ON harvest(field_id, season_id);
+    CREATE INDEX IF NOT EXISTS idx_planting_field_season ON planting(field_id, season_id);
+
+    -- Field x season x variety yield statistics
+    CREATE TABLE IF NOT EXISTS yield_summary (
+        field_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        variety TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        crop TEXT NOT NULL,
+        records INTEGER NOT NULL,
+        yield_sum REAL NOT NULL,
+        yield_min REAL,
+        yield_max REAL,
+        moisture_sum REAL,
+        moisture_n INTEGER NOT NULL,
+        test_weight_sum REAL,
+        test_weight_n INTEGER NOT NULL,
+        planting_date DATE,
+        first_harvest DATE,
+        last_harvest DATE,
+        PRIMARY KEY (field_id, season_id, variety)
+    );
+    CREATE INDEX IF NOT EXISTS idx_yield_summary_year ON yield_summary(year);
+    CREATE INDEX IF NOT EXISTS idx_yield_summary_crop ON yield_summary(crop, variety);
+
+    -- Least-squares yield trend over each field's last TREND_YEARS years
+    CREATE TABLE IF NOT EXISTS field_trend (
+        field_id INTEGER PRIMARY KEY,
+        years INTEGER NOT NULL,
+        first_year INTEGER,
+        last_year INTEGER,
+        slope REAL,
+        intercept REAL
+    );
+
+    CREATE TABLE IF NOT EXISTS variety_summary (
+        crop TEXT NOT NULL,
+        variety TEXT NOT NULL,
+        field_seasons INTEGER NOT NULL,
+        records INTEGER NOT NULL,
+        avg_yield REAL,
+        min_yield REAL,
+        max_yield REAL,
+        first_year INTEGER,
+        last_year INTEGER,
+        PRIMARY KEY (crop, variety)
+    );
+
+    CREATE TABLE IF NOT EXISTS yield_summary_dirty (
+        field_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        PRIMARY KEY (field_id, season_id)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_harvest_summary_insert AFTER INSERT ON harvest
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (NEW.field_id, NEW.season_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_harvest_summary_update AFTER UPDATE ON harvest
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (OLD.field_id, OLD.season_id);
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (NEW.field_id, NEW.season_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_harvest_summary_delete AFTER DELETE ON harvest
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (OLD.field_id, OLD.season_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_planting_summary_insert AFTER INSERT ON planting
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (NEW.field_id, NEW.season_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_planting_summary_update AFTER UPDATE OF field_id, season_id, planting_date ON planting
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (OLD.field_id, OLD.season_id);
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (NEW.field_id, NEW.season_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_planting_summary_delete AFTER DELETE ON planting
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty VALUES (OLD.field_id, OLD.season_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_seasons_summary_update AFTER UPDATE OF year, crop_type ON seasons
+    BEGIN
+        INSERT OR IGNORE INTO yield_summary_dirty
+        SELECT DISTINCT field_id, season_id FROM yield_summary WHERE season_id = NEW.id;
+    END;
+"""
+
+
+def ensure_summary_schema(conn):
+    """Create summary tables and triggers; build them if new.
+
+    Returns True when the summaries had to be built from scratch.
+    """
+    existing = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'yield_summary_dirty'"
+    ).fetchone()
+    conn.executescript(SUMMARY_SCHEMA)
+    if existing:
+        return False
+    rebuild_summaries(conn)
+    return True
+
+
+def rebuild_summaries(conn):
+    """Mark every (field, season) with harvest data dirty and refresh."""
+    with conn:
+        conn.execute("DELETE FROM yield_summary")
+        conn.execute("DELETE FROM field_trend")
+        conn.execute("DELETE FROM variety_summary")
+        conn.execute("""
+            INSERT OR IGNORE INTO yield_summary_dirty
+            SELECT DISTINCT field_id, season_id FROM harvest
+        """)
+    return refresh_summaries(conn)
+
+
+def refresh_summaries(conn):
+    """Recompute summaries for (field, season) pairs changed since the last refresh.
+
+    Returns the number of pairs refreshed.
+    """
+    dirty = conn.execute("SELECT COUNT(*) FROM yield_summary_dirty").fetchone()[0]
+    if not dirty:
+        return 0
+
+    with conn:
+        # Crops touched before and after the change, for the variety rankings
+        conn.execute("DROP TABLE IF EXISTS temp.dirty_crops")
+        conn.execute("""
+            CREATE TEMP TABLE dirty_crops AS
+            SELECT DISTINCT y.crop AS crop
+            FROM yield_summary y
+            JOIN yield_summary_dirty d ON d.field_id = y.field_id AND d.season_id = y.season_id
+            UNION
+            SELECT DISTINCT COALESCE(s.crop_type, 'unknown')
+            FROM yield_summary_dirty d
+            JOIN seasons s ON s.id = d.season_id
+        """)
+
+        conn.execute("""
+            DELETE FROM yield_summary
+            WHERE (field_id, season_id) IN (SELECT field_id, season_id FROM yield_summary_dirty)
+        """)
+        conn.execute("""
+            INSERT INTO yield_summary
+            SELECT h.field_id, h.season_id, COALESCE(h.variety, ''), s.year,
+                   COALESCE(s.crop_type, 'unknown'), COUNT(*), SUM(h.yield),
+                   MIN(h.yield), MAX(h.yield), SUM(h.moisture), COUNT(h.moisture),
+                   SUM(h.test_weight), COUNT(h.test_weight),
+                   (SELECT MIN(p.planting_date) FROM planting p
+                    WHERE p.field_id = h.field_id AND p.season_id = h.season_id),
+                   MIN(h.harvest_date), MAX(h.harvest_date)
+            FROM yield_summary_dirty d
+            JOIN harvest h ON h.field_id = d.field_id AND h.season_id = d.season_id
+            JOIN seasons s ON s.id = h.season_id
+            WHERE h.yield IS NOT NULL
+            GROUP BY h.field_id, h.season_id, COALESCE(h.variety, '')
+        """)
+
+        conn.execute("""
+            DELETE FROM field_trend
+            WHERE field_id IN (SELECT DISTINCT field_id FROM yield_summary_dirty)
+        """)
+        conn.execute("""
+            INSERT INTO field_trend (field_id, years, first_year, last_year, slope, intercept)
+            WITH field_years AS (
+                SELECT field_id, year, SUM(yield_sum) / SUM(records) AS y,
+                       ROW_NUMBER() OVER (PARTITION BY field_id ORDER BY year DESC) AS rn
+                FROM yield_summary
+                WHERE field_id IN (SELECT DISTINCT field_id FROM yield_summary_dirty)
+                GROUP BY field_id, year
+            ),
+            sums AS (
+                SELECT field_id, COUNT(*) AS n, MIN(year) AS first_year, MAX(year) AS last_year,
+                       SUM(year) AS sx, SUM(y) AS sy, SUM(year * y) AS sxy,
+                       SUM(1.0 * year * year) AS sxx
+                FROM field_years
+                WHERE rn <= ?
+                GROUP BY field_id
+            )
+            SELECT field_id, n, first_year, last_year, slope,
+                   CASE WHEN slope IS NULL THEN NULL ELSE (sy - slope * sx) / n END
+            FROM (
+                SELECT *, CASE WHEN n > 1 THEN (n * sxy - sx * sy) / (n * sxx - sx * sx) END AS slope
+                FROM sums
+            )
+        """, (TREND_YEARS,))
+
+        conn.execute("DELETE FROM variety_summary WHERE crop IN (SELECT crop FROM dirty_crops)")
+        conn.execute("""
+            INSERT INTO variety_summary
+            SELECT crop, variety, COUNT(*), SUM(records), SUM(yield_sum) / SUM(records),
+                   MIN(yield_min), MAX(yield_max), MIN(year), MAX(year)
+            FROM yield_summary
+            WHERE crop IN (SELECT crop FROM dirty_crops)
+            GROUP BY crop, variety
+        """)
+
+        conn.execute("DELETE FROM yield_summary_dirty")
+        conn.execute("DROP TABLE temp.dirty_crops")
+
+    return dirty
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Refresh or rebuild yield summary tables'
+    )
+    parser.add_argument(
+        '--database',
+        default='/opt/field-history/field-data.db',
+        help='Path to SQLite database'
+    )
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Recompute all summaries from the raw tables'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(args.database)
+    except Exception as e:
+        print(f"Error connecting to database: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if ensure_summary_schema(conn):
+        print("Built yield summaries from existing data")
+    elif args.rebuild:
+        refreshed = rebuild_summaries(conn)
+        print(f"Rebuilt yield summaries ({refreshed} field-seasons)")
+    else:
+        refreshed = refresh_summaries(conn)
+        print(f"Refreshed {refreshed} field-seasons")
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    conn.close()
+
+if __name__ == '__main__':
+    main()
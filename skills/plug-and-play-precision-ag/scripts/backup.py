@@ -1,15 +1,462 @@
 #!/usr/bin/env python3
 """
-Backup Script (Stub)
-Full implementation would backup all precision agriculture data
+Backup for Plug-and-Play Precision Agriculture
+Incremental, compressed snapshots of the precision-ag database
+
+A snapshot is taken with SQLite's online backup API, a few thousand pages
+per step, so the field computer keeps logging while it runs. The copy is
+then cut into chunks of whole pages (default 64) and each chunk is
+hashed. Chunks already stored by an earlier snapshot are not written
+again; new ones are appended to a pack file through a streaming zstd
+compressor (zlib when the zstandard package is missing). A nightly backup
+of a database where only today's tracks changed therefore stores only
+the pages those tracks touched.
+
+Backup directory layout:
+
+    snapshots/<id>.json    page size, database size and the chunk hashes in order
+    packs/<id>.pack        compressed stream of the chunks new in that snapshot
+    packs/<id>.json        hash and length of every chunk in the pack
+
+Restoring a snapshot streams each pack it needs once and writes its
+chunks into place.
 """
 
 import sys
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+DEFAULT_BACKUP_PATH = '/var/lib/precision-ag/backups'
+DEFAULT_CHUNK_PAGES = 64
+DEFAULT_STEP_PAGES = 2048
+STEP_SLEEP = 0.005          # seconds between backup steps, to let writers in
+MAX_RESTARTS = 3            # restarted copies before finishing in one step
+PACK_MAGIC = b'PAGP1'
+READ_SIZE = 1 << 20
+
+
+def chunk_hash(data):
+    """Content hash of a chunk"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class _Restarted(Exception):
+    """Stepped online backup restarted too often by concurrent writes"""
+
+
+class PackWriter:
+    """Append chunks to a compressed pack file"""
+
+    def __init__(self, path, codec, level=3):
+        self.path = Path(path)
+        self.codec = codec
+        self.chunks = []
+        self.file = open(self.path, 'wb')
+        self.file.write(PACK_MAGIC + codec.encode().ljust(4, b'\0'))
+        if codec == 'zstd':
+            self.stream = zstandard.ZstdCompressor(level=level).stream_writer(self.file, closefd=False)
+            self.compressor = None
+        else:
+            self.stream = None
+            self.compressor = zlib.compressobj(level)
+
+    def add(self, digest, data):
+        """Append one chunk"""
+        if self.stream is not None:
+            self.stream.write(data)
+        else:
+            self.file.write(self.compressor.compress(data))
+        self.chunks.append([digest, len(data)])
+
+    def close(self):
+        """Finish the stream and write the pack index
+
+        Returns:
+            int: Compressed bytes written
+        """
+        if self.stream is not None:
+            self.stream.flush(zstandard.FLUSH_FRAME)
+            self.stream.close()
+        else:
+            self.file.write(self.compressor.flush())
+        size = self.file.tell()
+        self.file.close()
+        with open(self.path.with_suffix('.json'), 'w') as f:
+            json.dump({'codec': self.codec, 'chunks': self.chunks}, f)
+        return size
+
+
+def read_pack(path):
+    """Yield (hash, data) for every chunk in a pack, decompressing as it goes"""
+    path = Path(path)
+    with open(path.with_suffix('.json')) as f:
+        index = json.load(f)
+    with open(path, 'rb') as f:
+        header = f.read(len(PACK_MAGIC) + 4)
+        if header[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{path} is not a backup pack")
+        codec = header[len(PACK_MAGIC):].rstrip(b'\0').decode()
+        if codec == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise ImportError("zstandard is required to read this backup (pip install zstandard)")
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+            for digest, length in index['chunks']:
+                data = reader.read(length)
+                while len(data) < length:
+                    more = reader.read(length - len(data))
+                    if not more:
+                        raise ValueError(f"{path} is truncated")
+                    data += more
+                yield digest, data
+        else:
+            decompressor = zlib.decompressobj()
+            buffer = b''
+            for digest, length in index['chunks']:
+                while len(buffer) < length:
+                    block = f.read(READ_SIZE)
+                    if not block:
+                        buffer += decompressor.flush()
+                        if len(buffer) < length:
+                            raise ValueError(f"{path} is truncated")
+                        break
+                    buffer += decompressor.decompress(block)
+                yield digest, buffer[:length]
+                buffer = buffer[length:]
+
+
+class BackupManager:
+    """Create, list, restore and prune incremental database snapshots"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db', backup_path=None,
+                 chunk_pages=DEFAULT_CHUNK_PAGES, step_pages=DEFAULT_STEP_PAGES, level=3):
+        """Initialize backup manager
+
+        Args:
+            db_path: Path to SQLite database
+            backup_path: Backup directory (default: BACKUP_PATH)
+            chunk_pages: Database pages per stored chunk
+            step_pages: Pages copied per online backup step
+            level: Compression level
+        """
+        self.db_path = db_path
+        self.backup_path = Path(backup_path or os.getenv('BACKUP_PATH', DEFAULT_BACKUP_PATH))
+        self.snapshot_path = self.backup_path / 'snapshots'
+        self.pack_path = self.backup_path / 'packs'
+        self.chunk_pages = chunk_pages
+        self.step_pages = step_pages
+        self.level = level
+
+    def _ensure_dirs(self):
+        self.snapshot_path.mkdir(parents=True, exist_ok=True)
+        self.pack_path.mkdir(parents=True, exist_ok=True)
+
+    def stored_chunks(self):
+        """Every stored chunk hash and the pack holding it
+
+        Returns:
+            dict: hash -> pack file
+        """
+        stored = {}
+        for index_file in sorted(self.pack_path.glob('*.json')):
+            with open(index_file) as f:
+                for digest, _ in json.load(f)['chunks']:
+                    stored.setdefault(digest, index_file.with_suffix('.pack'))
+        return stored
+
+    def _copy_online(self, staging):
+        """Online backup into staging in steps, finishing in one step if writers keep restarting it"""
+        restarts = [0]
+        remaining_before = [None]
+
+        def progress(status, remaining, total):
+            if remaining_before[0] is not None and remaining > remaining_before[0]:
+                restarts[0] += 1
+                if restarts[0] > MAX_RESTARTS:
+                    # Raising from the callback aborts the stepped copy where it is
+                    raise _Restarted()
+            remaining_before[0] = remaining
+
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(staging)
+        try:
+            try:
+                source.backup(target, pages=self.step_pages, progress=progress, sleep=STEP_SLEEP)
+            except _Restarted:
+                # Busy database: one step holds a read snapshot; in WAL mode writers carry on
+                source.backup(target, pages=-1)
+            page_size = target.execute('PRAGMA page_size').fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+        return page_size, restarts[0]
+
+    def create(self):
+        """Take a snapshot, storing only chunks not already in the backup
+
+        Returns:
+            dict: Snapshot manifest with chunk counts, bytes and timings
+        """
+        self._ensure_dirs()
+        started = time.monotonic()
+        snapshot_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        staging = self.backup_path / f'.staging-{snapshot_id}.db'
+
+        try:
+            page_size, restarts = self._copy_online(staging)
+            copied = time.monotonic()
+
+            stored = self.stored_chunks()
+            chunk_size = page_size * self.chunk_pages
+            chunks = []
+            pack = None
+            new_bytes = 0
+            with open(staging, 'rb') as f:
+                for data in iter(lambda: f.read(chunk_size), b''):
+                    digest = chunk_hash(data)
+                    chunks.append(digest)
+                    if digest in stored:
+                        continue
+                    if pack is None:
+                        pack = PackWriter(self.pack_path / f'{snapshot_id}.pack',
+                                          'zstd' if ZSTD_AVAILABLE else 'zlib', self.level)
+                    pack.add(digest, data)
+                    stored[digest] = pack.path
+                    new_bytes += len(data)
+                size = f.tell()
+            packed_bytes = pack.close() if pack else 0
+        finally:
+            if staging.exists():
+                staging.unlink()
+
+        manifest = {
+            'snapshot': snapshot_id,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'source': str(self.db_path),
+            'page_size': page_size,
+            'size': size,
+            'chunk_size': chunk_size,
+            'chunks': chunks,
+            'new_chunks': len(pack.chunks) if pack else 0,
+            'new_bytes': new_bytes,
+            'packed_bytes': packed_bytes,
+            'restarts': restarts,
+            'copy_seconds': round(copied - started, 3),
+            'total_seconds': round(time.monotonic() - started, 3),
+        }
+        with open(self.snapshot_path / f'{snapshot_id}.json', 'w') as f:
+            json.dump(manifest, f)
+        return manifest
+
+    def list_snapshots(self):
+        """Snapshot manifests, oldest first (without chunk lists)
+
+        Returns:
+            list: Dicts of manifest fields
+        """
+        snapshots = []
+        for path in sorted(self.snapshot_path.glob('*.json')):
+            with open(path) as f:
+                manifest = json.load(f)
+            manifest['chunk_count'] = len(manifest.pop('chunks'))
+            snapshots.append(manifest)
+        return snapshots
+
+    def _manifest(self, snapshot_id=None):
+        if snapshot_id is None:
+            paths = sorted(self.snapshot_path.glob('*.json'))
+            if not paths:
+                raise FileNotFoundError("No snapshots in backup")
+            path = paths[-1]
+        else:
+            path = self.snapshot_path / f'{snapshot_id}.json'
+        with open(path) as f:
+            return json.load(f)
+
+    def restore(self, output_path, snapshot_id=None, verify=True):
+        """Rebuild a database file from a snapshot
+
+        Args:
+            output_path: Database file to write (must not exist)
+            snapshot_id: Snapshot (default: latest)
+            verify: Run PRAGMA integrity_check on the result
+
+        Returns:
+            dict: snapshot, size and integrity result
+        """
+        output_path = Path(output_path)
+        if output_path.exists():
+            raise FileExistsError(f"{output_path} already exists")
+        manifest = self._manifest(snapshot_id)
+        stored = self.stored_chunks()
+
+        positions = {}
+        for i, digest in enumerate(manifest['chunks']):
+            if digest not in stored:
+                raise ValueError(f"Chunk {digest} of snapshot {manifest['snapshot']} is missing")
+            positions.setdefault(digest, []).append(i * manifest['chunk_size'])
+        packs = sorted({stored[digest] for digest in positions})
+
+        partial = output_path.with_name(output_path.name + '.partial')
+        with open(partial, 'wb') as out:
+            out.truncate(manifest['size'])
+            for pack in packs:
+                for digest, data in read_pack(pack):
+                    offsets = positions.pop(digest, None)
+                    if offsets is None:
+                        continue
+                    if chunk_hash(data) != digest:
+                        raise ValueError(f"Chunk {digest} in {pack.name} is corrupt")
+                    for offset in offsets:
+                        out.seek(offset)
+                        out.write(data)
+        if positions:
+            partial.unlink()
+            raise ValueError(f"{len(positions)} chunks could not be read")
+        partial.rename(output_path)
+
+        integrity = None
+        if verify:
+            conn = sqlite3.connect(output_path)
+            try:
+                integrity = conn.execute('PRAGMA integrity_check').fetchone()[0]
+            finally:
+                conn.close()
+        return {'snapshot': manifest['snapshot'], 'size': manifest['size'], 'integrity': integrity}
+
+    def prune(self, keep):
+        """Delete all but the newest snapshots, and packs no kept snapshot uses
+
+        Args:
+            keep: Number of snapshots to keep
+
+        Returns:
+            tuple: (snapshots deleted, packs deleted, bytes freed)
+        """
+        paths = sorted(self.snapshot_path.glob('*.json'))
+        doomed = paths[:max(len(paths) - keep, 0)]
+        for path in doomed:
+            path.unlink()
+
+        referenced = set()
+        for path in paths[len(doomed):]:
+            with open(path) as f:
+                referenced.update(json.load(f)['chunks'])
+
+        packs_deleted = 0
+        freed = 0
+        for index_file in sorted(self.pack_path.glob('*.json')):
+            with open(index_file) as f:
+                digests = [digest for digest, _ in json.load(f)['chunks']]
+            if referenced.isdisjoint(digests):
+                pack = index_file.with_suffix('.pack')
+                freed += pack.stat().st_size if pack.exists() else 0
+                pack.unlink(missing_ok=True)
+                index_file.unlink()
+                packs_deleted += 1
+        return len(doomed), packs_deleted, freed
+
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
 
 def main():
-    print("Backup - Full implementation pending")
-    print("This script will backup all precision agriculture data")
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Incremental backups of the precision agriculture database'
+    )
+    parser.add_argument('--backup-location', help='Backup directory (default: BACKUP_PATH)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help='Take a snapshot')
+    create_parser.add_argument('--chunk-pages', type=int, default=DEFAULT_CHUNK_PAGES,
+                               help=f'Pages per stored chunk (default: {DEFAULT_CHUNK_PAGES})')
+    create_parser.add_argument('--step-pages', type=int, default=DEFAULT_STEP_PAGES,
+                               help=f'Pages copied per backup step (default: {DEFAULT_STEP_PAGES})')
+    create_parser.add_argument('--level', type=int, default=3, help='Compression level (default: 3)')
+
+    subparsers.add_parser('list', help='List snapshots')
+
+    restore_parser = subparsers.add_parser('restore', help='Restore a snapshot to a new file')
+    restore_parser.add_argument('--snapshot', help='Snapshot ID (default: latest)')
+    restore_parser.add_argument('--output', required=True, help='Database file to create')
+    restore_parser.add_argument('--no-verify', action='store_true', help='Skip the integrity check')
+
+    prune_parser = subparsers.add_parser('prune', help='Delete old snapshots')
+    prune_parser.add_argument('--keep', required=True, type=int, help='Snapshots to keep')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    manager = BackupManager(db_path=db_path, backup_path=args.backup_location,
+                            chunk_pages=getattr(args, 'chunk_pages', DEFAULT_CHUNK_PAGES),
+                            step_pages=getattr(args, 'step_pages', DEFAULT_STEP_PAGES),
+                            level=getattr(args, 'level', 3))
+
+    if args.command == 'create':
+        if not os.path.exists(db_path):
+            print(f"✗ Database not found: {db_path}")
+            return 1
+        try:
+            manifest = manager.create()
+        except (sqlite3.Error, OSError) as e:
+            print(f"✗ Backup failed: {e}")
+            return 1
+        print(f"✓ Snapshot {manifest['snapshot']}")
+        print(f"  Database:     {format_bytes(manifest['size'])} in {len(manifest['chunks']):,} chunks")
+        print(f"  New chunks:   {manifest['new_chunks']:,} ({format_bytes(manifest['new_bytes'])})")
+        print(f"  Written:      {format_bytes(manifest['packed_bytes'])} compressed")
+        print(f"  Time:         {manifest['copy_seconds']:.1f}s copy, {manifest['total_seconds']:.1f}s total")
+        if manifest['restarts']:
+            print(f"  Copy restarted {manifest['restarts']} times by concurrent writes")
+
+    elif args.command == 'list':
+        snapshots = manager.list_snapshots()
+        if not snapshots:
+            print("No snapshots")
+            return 0
+        print(f"{'Snapshot':<24} {'Created':<26} {'Size':>10} {'New':>10} {'Written':>10}")
+        for snapshot in snapshots:
+            print(f"{snapshot['snapshot']:<24} {snapshot['created']:<26} {format_bytes(snapshot['size']):>10} "
+                  f"{format_bytes(snapshot['new_bytes']):>10} {format_bytes(snapshot['packed_bytes']):>10}")
+
+    elif args.command == 'restore':
+        try:
+            result = manager.restore(args.output, args.snapshot, verify=not args.no_verify)
+        except (OSError, ValueError, ImportError, sqlite3.Error) as e:
+            print(f"✗ Restore failed: {e}")
+            return 1
+        print(f"✓ Restored snapshot {result['snapshot']} to {args.output} ({format_bytes(result['size'])})")
+        if result['integrity'] is not None:
+            if result['integrity'] != 'ok':
+                print(f"✗ Integrity check: {result['integrity']}")
+                return 1
+            print("✓ Integrity check passed")
+
+    elif args.command == 'prune':
+        snapshots, packs, freed = manager.prune(args.keep)
+        print(f"✓ Deleted {snapshots} snapshots and {packs} packs, freed {format_bytes(freed)}")
+
     return 0
 
+
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+"""
+Coverage Mapping for Plug-and-Play Precision Agriculture
+Measure covered, double-applied and skipped area from as-applied tracks
+
+Every field gets a bitmap of small cells (default 0.5 m) on a grid
+anchored on the field centroid. Each track segment between two fixes is
+buffered by the implement width into a rectangle, and the cells whose
+centers fall inside it are counted as applied. Per cell the map keeps:
+
+    count   times applied (saturating at 255)
+    last    odometer of the run when the cell was last covered
+    run     which run (machine pass sequence) covered it last
+
+A cell covered again by the same run is only counted once more when the
+machine has travelled more than one implement width since, so adjacent
+segments and the inside of a turn do not show up as overlap while the
+next pass or a second machine does.
+
+Cells inside the field within the headland width of the boundary form the
+headland; the rest is the interior. Totals per zone are updated with each
+batch of segments, so statistics are available after every 10 Hz fix
+without rescanning the map. Stored maps remember the last gps_tracks
+chunk they include; updating one replays only chunks logged since.
+"""
+
+import sys
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from geometry import M2_PER_ACRE, boundary_rings, local_xy
+from nmea import NMEAParser, NMEAReader
+from track_logger import decode_chunk
+
+
+COVERAGE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS coverage_maps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        field_id INTEGER NOT NULL,
+        operation_id INTEGER,
+        season INTEGER,
+        width REAL NOT NULL,
+        cell_size REAL NOT NULL,
+        map_path TEXT NOT NULL,
+        last_track_id INTEGER NOT NULL DEFAULT 0,
+        field_acres REAL,
+        covered_acres REAL,
+        overlap_acres REAL,
+        skipped_acres REAL,
+        headland_overlap_acres REAL,
+        off_field_acres REAL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_coverage_maps_field ON coverage_maps(field_id, operation_id, season);
+'''
+
+DEFAULT_CELL_SIZE = 0.5     # metres
+DEFAULT_MAX_GAP = 2.0       # seconds between fixes before the track is broken
+DEFAULT_MIN_SPEED = 0.3     # m/s; slower segments (standing still) are not painted
+MAX_SPEED = 30.0            # m/s; faster steps are position jumps, not driving
+BLOCK_CELLS = 4_000_000     # candidate cells evaluated per step in batch replay
+DEFAULT_DATA_PATH = '/var/lib/precision-ag/coverage'
+
+OUTSIDE, HEADLAND, INTERIOR = 0, 1, 2
+
+
+def _erode(mask, radius):
+    """Cells of mask whose (2 * radius + 1)^2 neighbourhood lies entirely in mask"""
+    if radius <= 0:
+        return mask.copy()
+    size = 2 * radius + 1
+    padded = np.pad(mask.astype(np.int32), radius + 1)
+    table = padded.cumsum(axis=0).cumsum(axis=1)
+    rows, cols = mask.shape
+    total = (table[size:size + rows, size:size + cols] - table[:rows, size:size + cols]
+             - table[size:size + rows, :cols] + table[:rows, :cols])
+    return mask & (total == size * size)
+
+
+class CoverageMap:
+    """Applied-area bitmap for one field"""
+
+    def __init__(self, boundary, width, cell_size=DEFAULT_CELL_SIZE, headland_width=None,
+                 origin_lat=None, origin_lon=None):
+        """Initialize an empty coverage map
+
+        Args:
+            boundary: Field boundary (GeoJSON geometry or JSON string)
+            width: Implement working width in metres
+            cell_size: Cell edge in metres
+            headland_width: Headland depth in metres (default: twice the width)
+            origin_lat, origin_lon: Grid origin (default: mean of boundary vertices)
+        """
+        self.width = float(width)
+        self.cell_size = float(cell_size)
+        self.headland_width = 2 * self.width if headland_width is None else float(headland_width)
+
+        rings = [np.asarray(ring, dtype='f8') for ring in boundary_rings(boundary)]
+        lon = np.concatenate([ring[:, 0] for ring in rings])
+        lat = np.concatenate([ring[:, 1] for ring in rings])
+        self.origin_lat = float(lat.mean()) if origin_lat is None else origin_lat
+        self.origin_lon = float(lon.mean()) if origin_lon is None else origin_lon
+        xy_rings = [local_xy(ring[:, 1], ring[:, 0], self.origin_lat, self.origin_lon) for ring in rings]
+        x_all = np.concatenate([xs for xs, _ in xy_rings])
+        y_all = np.concatenate([ys for _, ys in xy_rings])
+
+        # Field bounding box plus one implement width for overspray past the edge
+        margin = self.width
+        size = self.cell_size
+        self.x0 = float(np.floor((x_all.min() - margin) / size) * size)
+        self.y0 = float(np.floor((y_all.min() - margin) / size) * size)
+        self.cols = int(np.ceil((x_all.max() + margin - self.x0) / size))
+        self.rows = int(np.ceil((y_all.max() + margin - self.y0) / size))
+
+        inside = self._scanline(xy_rings)
+        interior = _erode(inside, int(np.ceil(self.headland_width / size)))
+        self.zone = np.where(interior, INTERIOR, np.where(inside, HEADLAND, OUTSIDE)).astype(np.uint8)
+
+        self.count = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        self.last = np.zeros((self.rows, self.cols), dtype=np.float32)
+        self.run = np.zeros((self.rows, self.cols), dtype=np.uint16)
+        self.runs = {}  # run -> [time, x, y, odometer] of the last fix
+        self.zone_cells = np.bincount(self.zone.ravel(), minlength=3)
+        self._recount()
+
+    def _scanline(self, rings):
+        """Cells whose centers are inside the rings (even-odd), one crossing list per grid row"""
+        size = self.cell_size
+        parity = np.zeros((self.rows, self.cols + 1), dtype=np.int8)
+        for xs, ys in rings:
+            x1, y1 = xs, ys
+            x2, y2 = np.roll(xs, -1), np.roll(ys, -1)
+            # Grid rows (counted from the south) whose center line each edge crosses
+            low = np.ceil((np.minimum(y1, y2) - self.y0) / size - 0.5).astype(np.int64)
+            high = np.ceil((np.maximum(y1, y2) - self.y0) / size - 0.5).astype(np.int64)
+            spans = np.maximum(high - low, 0)
+            edge = np.repeat(np.arange(len(xs)), spans)
+            j = low[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(spans) - spans, spans)
+            yc = self.y0 + (j + 0.5) * size
+            xc = x1[edge] + (yc - y1[edge]) * (x2[edge] - x1[edge]) / (y2[edge] - y1[edge])
+            col = np.clip(np.ceil((xc - self.x0) / size - 0.5), 0, self.cols).astype(np.int64)
+            keep = (j >= 0) & (j < self.rows)
+            np.add.at(parity, (self.rows - 1 - j[keep], col[keep]), 1)
+        return (np.cumsum(parity[:, :-1], axis=1) % 2).astype(bool)
+
+    def _recount(self):
+        zone = self.zone.ravel()
+        count = self.count.ravel()
+        self.covered = np.bincount(zone, weights=count > 0, minlength=3)
+        self.overlap = np.bincount(zone, weights=count > 1, minlength=3)
+        self.applied = np.bincount(zone, weights=count, minlength=3)
+
+    def add_fix(self, timestamp, lat, lon, run=1, max_gap=DEFAULT_MAX_GAP, min_speed=DEFAULT_MIN_SPEED):
+        """Paint the segment from the run's previous fix to this one
+
+        Args:
+            timestamp: Epoch seconds
+            lat, lon: Implement position in degrees
+            run: Run number (one per machine)
+            max_gap, min_speed: As for add_track
+
+        Returns:
+            int: Cells newly applied
+        """
+        return self.add_track(np.array([timestamp], dtype='f8'), np.array([lat], dtype='f8'),
+                              np.array([lon], dtype='f8'), run, max_gap, min_speed)
+
+    def add_track(self, time, lat, lon, run=1, max_gap=DEFAULT_MAX_GAP, min_speed=DEFAULT_MIN_SPEED,
+                  offset=0.0):
+        """Paint a time-ordered block of fixes, continuing the run's previous block
+
+        The track is broken where fixes are more than max_gap seconds apart
+        or jump faster than MAX_SPEED; segments slower than min_speed are not
+        painted.
+
+        Args:
+            time: Epoch seconds per fix
+            lat, lon: Implement positions in degrees
+            run: Run number (one per machine), 1-65535
+            max_gap: Longest gap bridged between fixes in seconds
+            min_speed: Slowest painted segment in m/s
+            offset: Implement centre offset to the right of the antenna in metres
+
+        Returns:
+            int: Cells newly applied
+        """
+        time = np.asarray(time, dtype='f8')
+        x, y = local_xy(np.asarray(lat, dtype='f8'), np.asarray(lon, dtype='f8'),
+                        self.origin_lat, self.origin_lon)
+        finite = np.isfinite(time) & np.isfinite(x) & np.isfinite(y)
+        time, x, y = time[finite], x[finite], y[finite]
+        if len(time) == 0:
+            return 0
+
+        previous = self.runs.get(run)
+        odometer = 0.0
+        if previous is not None:
+            odometer = previous[3]
+            time = np.concatenate(([previous[0]], time))
+            x = np.concatenate(([previous[1]], x))
+            y = np.concatenate(([previous[2]], y))
+
+        step = np.hypot(np.diff(x), np.diff(y))
+        dt = np.diff(time)
+        odo = odometer + np.concatenate(([0.0], np.cumsum(step)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speed = step / dt
+        paint = (dt > 0) & (dt <= max_gap) & (speed >= min_speed) & (speed <= MAX_SPEED)
+        self.runs[run] = [float(time[-1]), float(x[-1]), float(y[-1]), float(odo[-1])]
+        if not paint.any():
+            return 0
+
+        segments = np.flatnonzero(paint)
+        return self._paint(x[segments], y[segments], x[segments + 1], y[segments + 1],
+                           odo[segments], run, offset)
+
+    def _paint(self, x1, y1, x2, y2, odo, run, offset=0.0):
+        length = np.hypot(x2 - x1, y2 - y1)
+        ux, uy = (x2 - x1) / length, (y2 - y1) / length
+        half = self.width / 2
+        # Shift the centre line to the right by the implement offset
+        x1 = x1 + uy * offset
+        y1 = y1 - ux * offset
+        x2 = x2 + uy * offset
+        y2 = y2 - ux * offset
+
+        size = self.cell_size
+        x_min = np.minimum(x1, x2) - np.abs(uy) * half
+        x_max = np.maximum(x1, x2) + np.abs(uy) * half
+        y_min = np.minimum(y1, y2) - np.abs(ux) * half
+        y_max = np.maximum(y1, y2) + np.abs(ux) * half
+        c0 = np.clip(np.ceil((x_min - self.x0) / size - 0.5), 0, self.cols).astype(np.int64)
+        c1 = np.clip(np.floor((x_max - self.x0) / size - 0.5), -1, self.cols - 1).astype(np.int64)
+        j0 = np.clip(np.ceil((y_min - self.y0) / size - 0.5), 0, self.rows).astype(np.int64)
+        j1 = np.clip(np.floor((y_max - self.y0) / size - 0.5), -1, self.rows - 1).astype(np.int64)
+        ncols = np.maximum(c1 - c0 + 1, 0)
+        nrows = np.maximum(j1 - j0 + 1, 0)
+        candidates = ncols * nrows
+
+        applied = 0
+        total = np.cumsum(candidates)
+        start = 0
+        while start < len(candidates):
+            limit = (total[start - 1] if start else 0) + BLOCK_CELLS
+            end = max(int(np.searchsorted(total, limit, side='right')), start + 1)
+            block = slice(start, end)
+            start = end
+
+            counts = candidates[block]
+            n = int(counts.sum())
+            if n == 0:
+                continue
+            seg = np.repeat(np.arange(len(counts)), counts)
+            k = np.arange(n) - np.repeat(np.cumsum(counts) - counts, counts)
+            width = ncols[block][seg]
+            col = c0[block][seg] + k % width
+            j = j0[block][seg] + k // width
+
+            px = self.x0 + (col + 0.5) * size - x1[block][seg]
+            py = self.y0 + (j + 0.5) * size - y1[block][seg]
+            along = px * ux[block][seg] + py * uy[block][seg]
+            across = py * ux[block][seg] - px * uy[block][seg]
+            hit = (along >= 0) & (along < length[block][seg]) & (np.abs(across) <= half)
+            cells = (self.rows - 1 - j[hit]) * self.cols + col[hit]
+            applied += self._apply(cells, odo[block][seg][hit] + along[hit], run)
+        return applied
+
+    def _apply(self, cells, odo, run):
+        """Count hits in odometer order, once per cell per width travelled"""
+        if len(cells) == 0:
+            return 0
+        order = np.lexsort((odo, cells))
+        cells, odo = cells[order], odo[order]
+        first = np.concatenate(([True], cells[1:] != cells[:-1]))
+        starts = np.flatnonzero(first)
+        unique = cells[starts]
+
+        count = self.count.ravel()
+        last = self.last.ravel()
+        owner = self.run.ravel()
+        previous = np.empty(len(cells))
+        previous[1:] = odo[:-1]
+        own = owner[unique] == run
+        previous[starts] = np.where(own, last[unique], -np.inf)
+        counted = (odo - previous > self.width).astype(np.int64)
+
+        old = count[unique].astype(np.int64)
+        new = np.minimum(old + np.add.reduceat(counted, starts), 255)
+        ends = np.concatenate((starts[1:], [len(cells)])) - 1
+
+        zone = self.zone.ravel()[unique]
+        self.covered += np.bincount(zone, weights=(old == 0) & (new > 0), minlength=3)
+        self.overlap += np.bincount(zone, weights=(old < 2) & (new > 1), minlength=3)
+        self.applied += np.bincount(zone, weights=new - old, minlength=3)
+        count[unique] = new
+        last[unique] = odo[ends]
+        owner[unique] = run
+        return int(np.count_nonzero(old == 0))
+
+    def stats(self):
+        """Covered, overlapping and skipped area
+
+        Returns:
+            dict: Acres field, covered, overlap (covered two or more times),
+            double_applied (area applied beyond once), skipped (uncovered
+            interior), headland_missed, headland_overlap and off_field, plus
+            coverage_pct
+        """
+        acres = self.cell_size ** 2 / M2_PER_ACRE
+        field = self.zone_cells[HEADLAND] + self.zone_cells[INTERIOR]
+        covered = self.covered[HEADLAND] + self.covered[INTERIOR]
+        applied = self.applied[HEADLAND] + self.applied[INTERIOR]
+        return {
+            'field_acres': float(field * acres),
+            'covered_acres': float(covered * acres),
+            'overlap_acres': float((self.overlap[HEADLAND] + self.overlap[INTERIOR]) * acres),
+            'double_applied_acres': float((applied - covered) * acres),
+            'skipped_acres': float((self.zone_cells[INTERIOR] - self.covered[INTERIOR]) * acres),
+            'headland_missed_acres': float((self.zone_cells[HEADLAND] - self.covered[HEADLAND]) * acres),
+            'headland_overlap_acres': float(self.overlap[HEADLAND] * acres),
+            'off_field_acres': float(self.covered[OUTSIDE] * acres),
+            'coverage_pct': float(covered / field * 100) if field else 0.0,
+        }
+
+    def save(self, path):
+        """Write the map to an .npz file"""
+        meta = {key: getattr(self, key) for key in
+                ('width', 'cell_size', 'headland_width', 'origin_lat', 'origin_lon', 'x0', 'y0')}
+        meta['runs'] = {str(run): state for run, state in self.runs.items()}
+        np.savez_compressed(path, zone=self.zone, count=self.count, last=self.last, run=self.run,
+                            meta=json.dumps(meta))
+
+    @classmethod
+    def load(cls, path):
+        """Read a map written by save()"""
+        self = cls.__new__(cls)
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            self.zone = data['zone']
+            self.count = data['count']
+            self.last = data['last']
+            self.run = data['run']
+        for key in ('width', 'cell_size', 'headland_width', 'origin_lat', 'origin_lon', 'x0', 'y0'):
+            setattr(self, key, meta[key])
+        self.runs = {int(run): state for run, state in meta['runs'].items()}
+        self.rows, self.cols = self.count.shape
+        self.zone_cells = np.bincount(self.zone.ravel(), minlength=3)
+        self._recount()
+        return self
+
+
+class CoverageEngine:
+    """Build and store coverage maps from logged GPS tracks"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db', data_path=None):
+        """Initialize coverage engine
+
+        Args:
+            db_path: Path to SQLite database
+            data_path: Directory for map files (default: COVERAGE_DATA_PATH)
+        """
+        self.db_path = db_path
+        self.data_path = Path(data_path or os.getenv('COVERAGE_DATA_PATH', DEFAULT_DATA_PATH))
+        self.conn = None
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        try:
+            self.conn = sqlite3.connect(self.db_path)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.executescript(COVERAGE_SCHEMA)
+            return True
+        except sqlite3.Error as e:
+            print(f"✗ Failed to connect to database: {e}")
+            return False
+
+    def disconnect(self):
+        """Disconnect from database"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def new_map(self, field_id, width, cell_size=DEFAULT_CELL_SIZE, headland_width=None):
+        """Empty coverage map for a field
+
+        Returns:
+            CoverageMap: Map, or None if the field does not exist
+        """
+        row = self.conn.execute(
+            'SELECT boundary_polygon, centroid_lat, centroid_lon FROM fields WHERE id = ?', (field_id,)
+        ).fetchone()
+        if not row:
+            return None
+        return CoverageMap(row['boundary_polygon'], width, cell_size, headland_width,
+                           row['centroid_lat'], row['centroid_lon'])
+
+    def _stored(self, field_id, operation_id, season):
+        return self.conn.execute('''
+            SELECT * FROM coverage_maps WHERE field_id = ? AND operation_id IS ? AND season IS ?
+        ''', (field_id, operation_id, season)).fetchone()
+
+    def update(self, field_id, width, operation_id=None, season=None, implement_id=None,
+               cell_size=DEFAULT_CELL_SIZE, headland_width=None, refresh=False,
+               max_gap=DEFAULT_MAX_GAP, min_speed=DEFAULT_MIN_SPEED):
+        """Bring a field's stored coverage map up to date with logged tracks
+
+        Only gps_tracks chunks logged after the map's last update are
+        replayed; a new map (or a changed width, cell size or headland
+        width) replays all of them. Each implement's track is painted as its own run.
+
+        Args:
+            field_id: Field ID
+            width: Implement working width in metres
+            operation_id: Only tracks of this operation
+            season: Only tracks from this calendar year (UTC)
+            implement_id: Only tracks of this implement
+            cell_size: Cell edge in metres
+            headland_width: Headland depth in metres (default: twice the width)
+            refresh: Rebuild from scratch
+            max_gap, min_speed: As for CoverageMap.add_track
+
+        Returns:
+            tuple: (CoverageMap, chunks replayed), or (None, 0) if the field does not exist
+        """
+        stored = self._stored(field_id, operation_id, season)
+        coverage = None
+        last_track_id = 0
+        if stored and not refresh and stored['width'] == width and stored['cell_size'] == cell_size \
+                and os.path.exists(stored['map_path']):
+            coverage = CoverageMap.load(stored['map_path'])
+            last_track_id = stored['last_track_id']
+            if coverage.headland_width != (2 * float(width) if headland_width is None
+                                           else float(headland_width)):
+                coverage, last_track_id = None, 0
+        if coverage is None:
+            coverage = self.new_map(field_id, width, cell_size, headland_width)
+            if coverage is None:
+                return None, 0
+
+        bounds = self.conn.execute(
+            'SELECT min_lat, min_lon, max_lat, max_lon FROM fields WHERE id = ?', (field_id,)
+        ).fetchone()
+        query = '''
+            SELECT id, implement_id, data FROM gps_tracks
+            WHERE id > ? AND max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?
+        '''
+        params = [last_track_id, bounds['min_lat'], bounds['max_lat'], bounds['min_lon'], bounds['max_lon']]
+        if operation_id is not None:
+            query += ' AND operation_id = ?'
+            params.append(operation_id)
+        if implement_id is not None:
+            query += ' AND implement_id = ?'
+            params.append(implement_id)
+        if season is not None:
+            query += ' AND chunk_start >= ? AND chunk_start < ?'
+            params += [datetime(season, 1, 1, tzinfo=timezone.utc).timestamp(),
+                       datetime(season + 1, 1, 1, tzinfo=timezone.utc).timestamp()]
+        query += ' ORDER BY implement_id, chunk_start'
+
+        replayed = 0
+        for row in self.conn.execute(query, params):
+            fixes = decode_chunk(row['data'])
+            run = (row['implement_id'] or 0) % 65535 + 1
+            coverage.add_track(fixes['time'], fixes['lat'], fixes['lon'], run, max_gap, min_speed)
+            last_track_id = max(last_track_id, row['id'])
+            replayed += 1
+
+        self._save(field_id, operation_id, season, coverage, last_track_id, stored)
+        return coverage, replayed
+
+    def _save(self, field_id, operation_id, season, coverage, last_track_id, stored):
+        name = f"coverage_op{operation_id if operation_id is not None else 'all'}" \
+               f"_{season if season is not None else 'all'}.npz"
+        map_path = self.data_path / f"field_{field_id}" / name
+        map_path.parent.mkdir(parents=True, exist_ok=True)
+        coverage.save(map_path)
+
+        stats = coverage.stats()
+        values = (coverage.width, coverage.cell_size, str(map_path), last_track_id,
+                  stats['field_acres'], stats['covered_acres'], stats['overlap_acres'],
+                  stats['skipped_acres'], stats['headland_overlap_acres'], stats['off_field_acres'])
+        if stored:
+            self.conn.execute('''
+                UPDATE coverage_maps SET width = ?, cell_size = ?, map_path = ?, last_track_id = ?,
+                    field_acres = ?, covered_acres = ?, overlap_acres = ?, skipped_acres = ?,
+                    headland_overlap_acres = ?, off_field_acres = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', values + (stored['id'],))
+        else:
+            self.conn.execute('''
+                INSERT INTO coverage_maps (field_id, operation_id, season, width, cell_size, map_path,
+                    last_track_id, field_acres, covered_acres, overlap_acres, skipped_acres,
+                    headland_overlap_acres, off_field_acres)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (field_id, operation_id, season) + values)
+        self.conn.commit()
+
+    def list_maps(self, field_id=None):
+        """Stored coverage maps with their last computed totals
+
+        Returns:
+            list: Dicts of coverage_maps rows
+        """
+        query = 'SELECT * FROM coverage_maps'
+        params = []
+        if field_id is not None:
+            query += ' WHERE field_id = ?'
+            params.append(field_id)
+        query += ' ORDER BY field_id, season, operation_id'
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+
+def print_coverage(stats, title):
+    """Print coverage statistics"""
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+    print(f"Field:             {stats['field_acres']:10.2f} ac")
+    print(f"Covered:           {stats['covered_acres']:10.2f} ac ({stats['coverage_pct']:.1f}%)")
+    print(f"Overlap:           {stats['overlap_acres']:10.2f} ac")
+    print(f"Double-applied:    {stats['double_applied_acres']:10.2f} ac")
+    print(f"Skipped interior:  {stats['skipped_acres']:10.2f} ac")
+    print(f"Headland missed:   {stats['headland_missed_acres']:10.2f} ac")
+    print(f"Headland overlap:  {stats['headland_overlap_acres']:10.2f} ac")
+    print(f"Off field:         {stats['off_field_acres']:10.2f} ac")
+    print("=" * 60)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Map covered, overlapping and skipped area from GPS tracks'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_map_options(sub):
+        sub.add_argument('--field-id', required=True, type=int, help='Field ID')
+        sub.add_argument('--width', required=True, type=float, help='Implement working width in metres')
+        sub.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE,
+                         help=f'Cell size in metres (default: {DEFAULT_CELL_SIZE:g})')
+        sub.add_argument('--headland-width', type=float,
+                         help='Headland depth in metres (default: twice the width)')
+        sub.add_argument('--min-speed', type=float, default=DEFAULT_MIN_SPEED,
+                         help=f'Slowest applied speed in m/s (default: {DEFAULT_MIN_SPEED:g})')
+
+    build_parser = subparsers.add_parser('build', help='Update a stored map from logged tracks')
+    add_map_options(build_parser)
+    build_parser.add_argument('--operation-id', type=int, help='Only tracks of this operation')
+    build_parser.add_argument('--season', type=int, help='Only tracks from this year')
+    build_parser.add_argument('--implement-id', type=int, help='Only tracks of this implement')
+    build_parser.add_argument('--refresh', action='store_true', help='Rebuild from all tracks')
+
+    live_parser = subparsers.add_parser('live', help='Map coverage from a receiver or NMEA log as it arrives')
+    add_map_options(live_parser)
+    live_parser.add_argument('--port', default=os.getenv('GPS_PORT', '/dev/ttyUSB0'),
+                             help='Serial port (default: GPS_PORT or /dev/ttyUSB0)')
+    live_parser.add_argument('--baudrate', type=int, default=int(os.getenv('GPS_BAUDRATE', '9600')),
+                             help='Serial baud rate (default: GPS_BAUDRATE or 9600)')
+    live_parser.add_argument('--nmea-file', help='Replay a recorded NMEA log instead of the port')
+    live_parser.add_argument('--realtime', action='store_true', help='Replay the log at its recorded rate')
+    live_parser.add_argument('--duration', type=float, help='Seconds to run (default: until Ctrl-C)')
+    live_parser.add_argument('--output', help='Save the final map to this .npz file')
+
+    list_parser = subparsers.add_parser('list', help='List stored coverage maps')
+    list_parser.add_argument('--field-id', type=int, help='Field ID')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    engine = CoverageEngine(db_path=db_path)
+    if not engine.connect():
+        return 1
+
+    try:
+        if args.command == 'build':
+            coverage, replayed = engine.update(
+                args.field_id, args.width, args.operation_id, args.season, args.implement_id,
+                args.cell_size, args.headland_width, args.refresh, min_speed=args.min_speed)
+            if coverage is None:
+                print(f"✗ Field {args.field_id} not found")
+                return 1
+            print(f"✓ Replayed {replayed:,} track chunks")
+            print_coverage(coverage.stats(), f"COVERAGE - Field {args.field_id}")
+
+        elif args.command == 'live':
+            coverage = engine.new_map(args.field_id, args.width, args.cell_size, args.headland_width)
+            if coverage is None:
+                print(f"✗ Field {args.field_id} not found")
+                return 1
+            reader = NMEAReader(NMEAParser(), port=args.port, baudrate=args.baudrate,
+                                nmea_file=args.nmea_file)
+            try:
+                reader.open()
+            except (OSError, ValueError) as e:
+                print(f"✗ Failed to open NMEA source: {e}")
+                return 1
+            shown = [None]
+
+            def on_fix(fix):
+                if fix['quality'] == 0:
+                    return
+                timestamp = reader.parser.timestamp(fix)
+                if timestamp is None:
+                    return
+                timestamp = timestamp.timestamp()
+                coverage.add_fix(timestamp, float(fix['lat']), float(fix['lon']), min_speed=args.min_speed)
+                second = int(timestamp)
+                if second != shown[0]:
+                    shown[0] = second
+                    stats = coverage.stats()
+                    print(f"{datetime.fromtimestamp(timestamp, tz=timezone.utc):%H:%M:%S}  "
+                          f"covered {stats['covered_acres']:8.2f} ac ({stats['coverage_pct']:5.1f}%)  "
+                          f"overlap {stats['overlap_acres']:6.2f} ac  off field {stats['off_field_acres']:6.2f} ac")
+
+            try:
+                asyncio.run(reader.run(duration=args.duration, on_fix=on_fix, realtime=args.realtime))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                reader.close()
+            print_coverage(coverage.stats(), f"COVERAGE - Field {args.field_id}")
+            if args.output:
+                coverage.save(args.output)
+                print(f"\n✓ Map saved to {args.output}")
+
+        elif args.command == 'list':
+            maps = engine.list_maps(args.field_id)
+            if not maps:
+                print("No coverage maps stored")
+                return 0
+            print(f"{'Field':<6} {'Operation':<10} {'Season':<7} {'Width m':>8} {'Covered ac':>11} "
+                  f"{'Overlap ac':>11} {'Skipped ac':>11} {'Updated'}")
+            for row in maps:
+                operation = row['operation_id'] if row['operation_id'] is not None else '-'
+                season = row['season'] if row['season'] is not None else '-'
+                print(f"{row['field_id']:<6} {operation:<10} {season:<7} {row['width']:>8g} "
+                      f"{row['covered_acres']:>11.2f} {row['overlap_acres']:>11.2f} "
+                      f"{row['skipped_acres']:>11.2f} {row['updated_at']}")
+    finally:
+        engine.disconnect()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
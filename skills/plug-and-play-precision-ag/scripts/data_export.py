@@ -1,15 +1,395 @@
 #!/usr/bin/env python3
 """
-Data Export (Stub)
-Full implementation would export data in various formats
+Data Export for Plug-and-Play Precision Agriculture
+Stream tables, tracks and yield points to CSV, GeoJSON or Parquet
+
+Every export reads its source in batches (cursor.fetchmany, one decoded
+track chunk, or a slice of a memory-mapped yield point array) and writes
+each batch before reading the next, so a multi-gigabyte database exports
+in constant memory. GeoJSON is written feature by feature; Parquet goes
+through a pyarrow ParquetWriter one row group per batch.
+
+Data types:
+
+    fields              field attributes with the boundary as geometry
+    gps_tracks          one row per logged fix (point geometry)
+    yield_points        one row per yield monitor point (point geometry)
+    prescription_zones  one row per management zone (polygon geometry)
+    <table>             any other table in TABLES, rows as stored
 """
 
 import sys
+import argparse
+import csv
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from track_logger import TRACK_COLUMNS, decode_chunk
+from yield_processor import POINT_DTYPE, YieldProcessor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+DEFAULT_BATCH_ROWS = 10000
+FORMATS = ('csv', 'geojson', 'parquet')
+
+# Plain tables and the column their --season filter applies to
+TABLES = {
+    'operations': "strftime('%Y', start_date)",
+    'implements': None,
+    'weather_data': "strftime('%Y', timestamp)",
+    'operation_logs': "strftime('%Y', timestamp)",
+    'yield_data': "strftime('%Y', harvest_date)",
+    'yield_rasters': 'season',
+    'coverage_maps': 'season',
+    'guidance_lines': None,
+    'prescriptions': None,
+}
+
+# Columns left out of plain table exports (exported by their own data type)
+HEAVY_COLUMNS = {'zones_data', 'yield_data_json', 'lines_data', 'configuration_json', 'data'}
+
+SQL_KINDS = {'INTEGER': 'int', 'BOOLEAN': 'int', 'REAL': 'float'}
+
+
+def _kind(declared):
+    return SQL_KINDS.get((declared or '').upper(), 'text')
+
+
+class Source:
+    """A data type to export: column names and kinds, geometry and a batch iterator"""
+
+    def __init__(self, columns, batches, geometry=None):
+        """
+        Args:
+            columns: [(name, kind)] with kind int, float or text
+            batches: Iterator of column lists, one list per column
+            geometry: None, 'point' (lat/lon columns) or 'json' (geometry column)
+        """
+        self.columns = columns
+        self.batches = batches
+        self.geometry = geometry
+
+
+def _query_batches(conn, query, params, batch_rows):
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield [list(column) for column in zip(*rows)]
+
+
+def table_source(conn, table, field_id=None, season=None, batch_rows=DEFAULT_BATCH_ROWS):
+    """Rows of a plain table"""
+    info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    if not info:
+        raise ValueError(f"Table {table} does not exist")
+    columns = [(row[1], _kind(row[2])) for row in info if row[1] not in HEAVY_COLUMNS]
+    query = f"SELECT {', '.join(name for name, _ in columns)} FROM {table} WHERE 1 = 1"
+    params = []
+    if field_id is not None and any(row[1] == 'field_id' for row in info):
+        query += ' AND field_id = ?'
+        params.append(field_id)
+    if season is not None and TABLES.get(table):
+        query += f' AND CAST({TABLES[table]} AS INTEGER) = ?'
+        params.append(season)
+    query += ' ORDER BY rowid'
+    return Source(columns, _query_batches(conn, query, params, batch_rows))
+
+
+def fields_source(conn, field_id=None, season=None, batch_rows=DEFAULT_BATCH_ROWS):
+    """Field attributes with boundaries"""
+    columns = [('id', 'int'), ('name', 'text'), ('area_acres', 'float'), ('perimeter_m', 'float'),
+               ('centroid_lat', 'float'), ('centroid_lon', 'float'), ('crop_type', 'text'),
+               ('soil_type', 'text'), ('geometry', 'text')]
+    query = f"SELECT {', '.join(name for name, _ in columns[:-1])}, boundary_polygon FROM fields"
+    params = []
+    if field_id is not None:
+        query += ' WHERE id = ?'
+        params.append(field_id)
+    query += ' ORDER BY id'
+    return Source(columns, _query_batches(conn, query, params, batch_rows), geometry='json')
+
+
+def tracks_source(conn, field_id=None, season=None, batch_rows=DEFAULT_BATCH_ROWS, implement_id=None):
+    """Logged GPS fixes, decoded one chunk at a time"""
+    columns = [('implement_id', 'int'), ('operation_id', 'int'), ('field_id', 'int')] + \
+              [(name, 'int' if name == 'quality' else 'float') for name, _, _ in TRACK_COLUMNS]
+    query = 'SELECT implement_id, operation_id, field_id, data FROM gps_tracks WHERE 1 = 1'
+    params = []
+    if field_id is not None:
+        query += ' AND field_id = ?'
+        params.append(field_id)
+    if implement_id is not None:
+        query += ' AND implement_id = ?'
+        params.append(implement_id)
+    if season is not None:
+        query += " AND CAST(strftime('%Y', chunk_start, 'unixepoch') AS INTEGER) = ?"
+        params.append(season)
+    query += ' ORDER BY implement_id, chunk_start'
+
+    def batches():
+        for implement, operation, field, data in conn.execute(query, params):
+            fixes = decode_chunk(data)
+            n = len(fixes)
+            yield [[implement] * n, [operation] * n, [field] * n] + \
+                  [fixes[name].astype(np.int64 if name == 'quality' else 'f8').tolist()
+                   for name, _, _ in TRACK_COLUMNS]
+
+    return Source(columns, batches(), geometry='point')
+
+
+def yield_source(conn, field_id=None, season=None, batch_rows=DEFAULT_BATCH_ROWS, db_path=None):
+    """Yield monitor points, sliced from the memory-mapped point arrays"""
+    processor = YieldProcessor(db_path)
+    processor.conn = conn
+    names = POINT_DTYPE.names
+    columns = [('yield_id', 'int'), ('field_id', 'int')] + \
+              [(name, 'float' if POINT_DTYPE[name].kind == 'f' else 'int') for name in names]
+    query = 'SELECT id, field_id FROM yield_data WHERE 1 = 1'
+    params = []
+    if field_id is not None:
+        query += ' AND field_id = ?'
+        params.append(field_id)
+    if season is not None:
+        query += " AND CAST(strftime('%Y', harvest_date) AS INTEGER) = ?"
+        params.append(season)
+    query += ' ORDER BY id'
+
+    def batches():
+        for yield_id, field in conn.execute(query, params).fetchall():
+            points = processor.load_points(yield_id, mmap=True)
+            if points is None:
+                continue
+            for start in range(0, len(points), batch_rows):
+                block = points[start:start + batch_rows]
+                n = len(block)
+                yield [[yield_id] * n, [field] * n] + [block[name].tolist() for name in names]
+
+    return Source(columns, batches(), geometry='point')
+
+
+def zones_source(conn, field_id=None, season=None, batch_rows=DEFAULT_BATCH_ROWS):
+    """Prescription management zones, one prescription at a time"""
+    columns = [('prescription_id', 'int'), ('field_id', 'int'), ('prescription_name', 'text'),
+               ('input_type', 'text'), ('rate_unit', 'text'), ('zone', 'int'), ('rate', 'float'),
+               ('acres', 'float'), ('geometry', 'text')]
+    query = 'SELECT id FROM prescriptions'
+    params = []
+    if field_id is not None:
+        query += ' WHERE field_id = ?'
+        params.append(field_id)
+    query += ' ORDER BY id'
+
+    def batches():
+        for (prescription_id,) in conn.execute(query, params).fetchall():
+            row = conn.execute('''
+                SELECT id, field_id, prescription_name, input_type, rate_unit, zones_data
+                FROM prescriptions WHERE id = ?
+            ''', (prescription_id,)).fetchone()
+            features = json.loads(row[5]).get('features', [])
+            if not features:
+                continue
+            rows = [(row[0], row[1], row[2], row[3], row[4], feature['properties'].get('zone'),
+                     feature['properties'].get('rate'), feature['properties'].get('acres'),
+                     feature['geometry']) for feature in features]
+            yield [list(column) for column in zip(*rows)]
+
+    return Source(columns, batches(), geometry='json')
+
+
+SOURCES = {
+    'fields': fields_source,
+    'gps_tracks': tracks_source,
+    'yield_points': yield_source,
+    'prescription_zones': zones_source,
+}
+
+
+def _geometry(value):
+    if value is None:
+        return None
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _finite(values):
+    """Float column with NaN and infinities as None (null in JSON)"""
+    return [None if value is None or not np.isfinite(value) else value for value in values]
+
+
+class CSVExporter:
+    """Write batches as CSV rows; geometry columns are GeoJSON text"""
+
+    def __init__(self, output_path, source):
+        self.file = open(output_path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in source.columns])
+        self.json_column = [name for name, _ in source.columns].index('geometry') \
+            if source.geometry == 'json' else None
+
+    def write(self, batch):
+        if self.json_column is not None:
+            batch = list(batch)
+            batch[self.json_column] = [value if isinstance(value, str) or value is None else json.dumps(value)
+                                       for value in batch[self.json_column]]
+        self.writer.writerows(zip(*batch))
+
+    def close(self):
+        self.file.close()
+
+
+class GeoJSONExporter:
+    """Write batches as a FeatureCollection, one feature at a time"""
+
+    def __init__(self, output_path, source):
+        if source.geometry is None:
+            raise ValueError("This data type has no geometry; export it as csv or parquet")
+        self.names = [name for name, _ in source.columns]
+        self.floats = {i for i, (_, kind) in enumerate(source.columns) if kind == 'float'}
+        self.geometry = source.geometry
+        self.file = open(output_path, 'w')
+        self.file.write('{"type": "FeatureCollection", "features": [\n')
+        self.first = True
+
+    def write(self, batch):
+        names = self.names
+        if self.geometry == 'point':
+            lat, lon = batch[names.index('lat')], batch[names.index('lon')]
+            geometries = ({'type': 'Point', 'coordinates': [x, y]} if None not in _finite([x, y]) else None
+                          for x, y in zip(lon, lat))
+            keep = [i for i, name in enumerate(names) if name not in ('lat', 'lon')]
+        else:
+            column = names.index('geometry')
+            geometries = (_geometry(value) for value in batch[column])
+            keep = [i for i in range(len(names)) if i != column]
+        properties = zip(*(_finite(batch[i]) if i in self.floats else batch[i] for i in keep))
+        keys = [names[i] for i in keep]
+        parts = []
+        for geometry, values in zip(geometries, properties):
+            parts.append(json.dumps({'type': 'Feature', 'geometry': geometry,
+                                     'properties': dict(zip(keys, values))}, allow_nan=False))
+        if parts:
+            self.file.write(('' if self.first else ',\n') + ',\n'.join(parts))
+            self.first = False
+
+    def close(self):
+        self.file.write('\n]}\n')
+        self.file.close()
+
+
+class ParquetExporter:
+    """Write batches as Parquet row groups"""
+
+    ARROW_TYPES = {'int': 'int64', 'float': 'float64', 'text': 'string'}
+
+    def __init__(self, output_path, source):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet export (pip install pyarrow)")
+        self.schema = pa.schema([(name, getattr(pa, self.ARROW_TYPES[kind])()) for name, kind in source.columns])
+        self.json_column = [name for name, _ in source.columns].index('geometry') \
+            if source.geometry == 'json' else None
+        self.writer = pq.ParquetWriter(output_path, self.schema, compression='zstd')
+
+    def write(self, batch):
+        if self.json_column is not None:
+            batch = list(batch)
+            batch[self.json_column] = [value if isinstance(value, str) or value is None else json.dumps(value)
+                                       for value in batch[self.json_column]]
+        arrays = [pa.array(values, type=field.type) for values, field in zip(batch, self.schema)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+EXPORTERS = {
+    'csv': CSVExporter,
+    'geojson': GeoJSONExporter,
+    'parquet': ParquetExporter,
+}
+
+
+def export(db_path, data_type, output_format, output_path, field_id=None, season=None,
+           implement_id=None, batch_rows=DEFAULT_BATCH_ROWS):
+    """Stream one data type to a file
+
+    Args:
+        db_path: Path to SQLite database
+        data_type: Key of SOURCES or TABLES
+        output_format: csv, geojson or parquet
+        output_path: Output file
+        field_id: Only this field
+        season: Only this year
+        implement_id: Only this implement (gps_tracks)
+        batch_rows: Rows read and written per batch
+
+    Returns:
+        int: Rows written
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if data_type == 'gps_tracks':
+            source = tracks_source(conn, field_id, season, batch_rows, implement_id)
+        elif data_type == 'yield_points':
+            source = yield_source(conn, field_id, season, batch_rows, db_path)
+        elif data_type in SOURCES:
+            source = SOURCES[data_type](conn, field_id, season, batch_rows)
+        elif data_type in TABLES:
+            source = table_source(conn, data_type, field_id, season, batch_rows)
+        else:
+            raise ValueError(f"Unknown data type: {data_type}")
+
+        exporter = EXPORTERS[output_format](output_path, source)
+        rows = 0
+        try:
+            for batch in source.batches:
+                exporter.write(batch)
+                rows += len(batch[0])
+        finally:
+            exporter.close()
+        return rows
+    finally:
+        conn.close()
+
 
 def main():
-    print("Data export - Full implementation pending")
-    print("This script will export precision agriculture data")
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Export precision agriculture data'
+    )
+    parser.add_argument('--data-type', required=True, choices=sorted(list(SOURCES) + list(TABLES)),
+                        help='What to export')
+    parser.add_argument('--format', default='csv', choices=FORMATS, help='Output format (default: csv)')
+    parser.add_argument('--output-path', required=True, help='Output file')
+    parser.add_argument('--field-id', type=int, help='Only this field')
+    parser.add_argument('--season', type=int, help='Only this year')
+    parser.add_argument('--implement-id', type=int, help='Only this implement (gps_tracks)')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f'Rows per batch (default: {DEFAULT_BATCH_ROWS})')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    try:
+        rows = export(db_path, args.data_type, args.format, args.output_path, args.field_id,
+                      args.season, args.implement_id, args.batch_rows)
+    except (ValueError, ImportError, OSError, sqlite3.Error) as e:
+        print(f"✗ Export failed: {e}")
+        return 1
+
+    print(f"✓ Exported {rows:,} {args.data_type} rows to {args.output_path}")
     return 0
 
+
 if __name__ == '__main__':
     sys.exit(main())
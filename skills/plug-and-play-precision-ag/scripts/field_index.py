@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Field Spatial Index for Plug-and-Play Precision Agriculture
+Find the field a GPS position falls in, for one fix or millions of points
+
+Field bounding boxes are kept in an SQLite R*Tree (field_rtree), maintained
+by triggers on the fields table, so creating, updating or deleting a field
+updates the index in the same transaction. Every change is also appended
+to field_index_log; an in-memory FieldIndex replays the log on refresh()
+and reloads only the fields that changed.
+
+Bulk tagging sorts the points into grid buckets once, takes each field's
+bounding box as a few slices of that order, and runs vectorized ray
+casting against the field's boundary for the points in its box. Where fields
+overlap, the lowest field ID wins.
+"""
+
+import sys
+import argparse
+import csv
+import os
+import sqlite3
+
+import numpy as np
+
+from geometry import boundary_rings, measure_boundaries, points_in_rings
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+
+# Bounding box and perimeter columns the index triggers read, added to older fields tables
+GEOMETRY_COLUMNS = {
+    'perimeter_m': 'REAL',
+    'min_lat': 'REAL',
+    'min_lon': 'REAL',
+    'max_lat': 'REAL',
+    'max_lon': 'REAL',
+}
+
+INDEX_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS field_rtree USING rtree(
+        id, min_lon, max_lon, min_lat, max_lat
+    );
+
+    CREATE TABLE IF NOT EXISTS field_index_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        field_id INTEGER NOT NULL
+    );
+
+    CREATE TRIGGER IF NOT EXISTS field_rtree_insert AFTER INSERT ON fields
+    BEGIN
+        INSERT INTO field_rtree (id, min_lon, max_lon, min_lat, max_lat)
+        SELECT NEW.id, NEW.min_lon, NEW.max_lon, NEW.min_lat, NEW.max_lat
+        WHERE NEW.min_lat IS NOT NULL;
+        INSERT INTO field_index_log (field_id) VALUES (NEW.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS field_rtree_update
+    AFTER UPDATE OF boundary_polygon, min_lon, max_lon, min_lat, max_lat ON fields
+    BEGIN
+        DELETE FROM field_rtree WHERE id = OLD.id;
+        INSERT INTO field_rtree (id, min_lon, max_lon, min_lat, max_lat)
+        SELECT NEW.id, NEW.min_lon, NEW.max_lon, NEW.min_lat, NEW.max_lat
+        WHERE NEW.min_lat IS NOT NULL;
+        INSERT INTO field_index_log (field_id) VALUES (NEW.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS field_rtree_delete AFTER DELETE ON fields
+    BEGIN
+        DELETE FROM field_rtree WHERE id = OLD.id;
+        INSERT INTO field_index_log (field_id) VALUES (OLD.id);
+    END;
+'''
+
+
+def ensure_index_schema(conn):
+    """Create the R*Tree and its triggers; index existing fields if the tree is new
+
+    Fields tables from before the index get their geometry columns first,
+    since the triggers and the rebuild read them.
+
+    Args:
+        conn: SQLite connection with a fields table
+    """
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(fields)')}
+    for name, kind in GEOMETRY_COLUMNS.items():
+        if name not in columns:
+            conn.execute(f'ALTER TABLE fields ADD COLUMN {name} {kind}')
+    conn.commit()
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'field_rtree'"
+    ).fetchone()
+    conn.executescript(INDEX_SCHEMA)
+    if not exists:
+        rebuild_index(conn)
+
+
+def rebuild_index(conn):
+    """Rebuild the R*Tree from fields, measuring any boundary without a bounding box
+
+    Args:
+        conn: SQLite connection
+
+    Returns:
+        int: Number of fields indexed
+    """
+    missing = conn.execute('''
+        SELECT id, boundary_polygon FROM fields WHERE min_lat IS NULL
+    ''').fetchall()
+    if missing:
+        metrics = measure_boundaries([row[1] for row in missing])
+        conn.executemany('''
+            UPDATE fields SET min_lat = ?, min_lon = ?, max_lat = ?, max_lon = ? WHERE id = ?
+        ''', [(float(metrics['min_lat'][i]), float(metrics['min_lon'][i]),
+               float(metrics['max_lat'][i]), float(metrics['max_lon'][i]), row[0])
+              for i, row in enumerate(missing) if np.isfinite(metrics['min_lat'][i])])
+
+    conn.execute('DELETE FROM field_rtree')
+    conn.execute('''
+        INSERT INTO field_rtree (id, min_lon, max_lon, min_lat, max_lat)
+        SELECT id, min_lon, max_lon, min_lat, max_lat FROM fields WHERE min_lat IS NOT NULL
+    ''')
+    conn.execute('DELETE FROM field_index_log')
+    conn.commit()
+    return conn.execute('SELECT COUNT(*) FROM field_rtree').fetchone()[0]
+
+
+def fields_at(conn, lat, lon):
+    """IDs of fields containing a single position, from the R*Tree and an exact test
+
+    Args:
+        conn: SQLite connection
+        lat, lon: Position in degrees
+
+    Returns:
+        list: Field IDs, lowest first (empty when outside every field)
+    """
+    rows = conn.execute('''
+        SELECT f.id, f.boundary_polygon
+        FROM field_rtree r JOIN fields f ON f.id = r.id
+        WHERE r.min_lon <= ? AND r.max_lon >= ? AND r.min_lat <= ? AND r.max_lat >= ?
+        ORDER BY f.id
+    ''', (lon, lon, lat, lat)).fetchall()
+    inside = []
+    for field_id, boundary in rows:
+        rings = [(np.asarray(ring, dtype='f8')[:, 0], np.asarray(ring, dtype='f8')[:, 1])
+                 for ring in boundary_rings(boundary)]
+        if points_in_rings(np.array([lon]), np.array([lat]), rings)[0]:
+            inside.append(field_id)
+    return inside
+
+
+class FieldIndex:
+    """In-memory field boundaries for bulk point tagging"""
+
+    def __init__(self, conn):
+        """Initialize field index
+
+        Args:
+            conn: SQLite connection; the index schema is created if missing
+        """
+        self.conn = conn
+        ensure_index_schema(conn)
+        self.rings = {}
+        self.last_seq = None
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4))
+        self.refresh()
+
+    def refresh(self):
+        """Reload fields changed since the last refresh
+
+        Returns:
+            int: Number of fields reloaded
+        """
+        row = self.conn.execute('SELECT MIN(seq), MAX(seq) FROM field_index_log').fetchone()
+        first, last = row[0], row[1] or 0
+
+        if self.last_seq is None or last < self.last_seq or (first is not None and first > self.last_seq + 1):
+            # First load, or the log was cleared by a rebuild
+            self.rings = {}
+            changed = None
+        else:
+            changed = [field_id for (field_id,) in self.conn.execute(
+                'SELECT DISTINCT field_id FROM field_index_log WHERE seq > ?', (self.last_seq,))]
+            if not changed:
+                return 0
+
+        query = 'SELECT id, boundary_polygon FROM fields'
+        params = []
+        if changed is not None:
+            query += f" WHERE id IN ({','.join('?' * len(changed))})"
+            params = changed
+            for field_id in changed:
+                self.rings.pop(field_id, None)
+
+        loaded = 0
+        for field_id, boundary in self.conn.execute(query, params):
+            try:
+                rings = [np.asarray(ring, dtype='f8')[:, :2] for ring in boundary_rings(boundary)]
+            except (ValueError, TypeError, KeyError, IndexError):
+                continue
+            rings = [(ring[:, 0], ring[:, 1]) for ring in rings if len(ring) >= 3]
+            if rings:
+                self.rings[field_id] = rings
+                loaded += 1
+
+        self.ids = np.array(sorted(self.rings), dtype=np.int64)
+        self.boxes = np.array([[min(xs.min() for xs, _ in self.rings[i]), max(xs.max() for xs, _ in self.rings[i]),
+                                min(ys.min() for _, ys in self.rings[i]), max(ys.max() for _, ys in self.rings[i])]
+                               for i in self.ids]).reshape(-1, 4)
+        self.last_seq = last
+        return loaded
+
+    def tag(self, lat, lon):
+        """Field ID for every point
+
+        Points are bucketed on a grid about one field across, so each field
+        only tests the points in the few buckets its bounding box covers.
+
+        Args:
+            lat, lon: Arrays of positions in degrees
+
+        Returns:
+            numpy.ndarray: Field ID per point, 0 outside every field
+        """
+        lat = np.asarray(lat, dtype='f8')
+        lon = np.asarray(lon, dtype='f8')
+        result = np.zeros(len(lat), dtype=np.int64)
+        finite = np.isfinite(lat) & np.isfinite(lon)
+        if not finite.any() or len(self.ids) == 0:
+            return result
+
+        boxes = self.boxes
+        lon0, lat0 = lon[finite].min(), lat[finite].min()
+        lon1, lat1 = lon[finite].max(), lat[finite].max()
+        overlapping = np.flatnonzero((boxes[:, 0] <= lon1) & (boxes[:, 1] >= lon0) &
+                                     (boxes[:, 2] <= lat1) & (boxes[:, 3] >= lat0))
+        if len(overlapping) == 0:
+            return result
+
+        # Bucket grid sized to a typical field
+        width = max(float(np.median(boxes[overlapping, 1] - boxes[overlapping, 0])), 1e-7)
+        height = max(float(np.median(boxes[overlapping, 3] - boxes[overlapping, 2])), 1e-7)
+        cols = int((lon1 - lon0) / width) + 1
+        rows = int((lat1 - lat0) / height) + 1
+        col = np.where(finite, np.floor((lon - lon0) / width), -1).astype(np.int64)
+        row = np.where(finite, np.floor((lat - lat0) / height), 0).astype(np.int64)
+        bucket = col * rows + row
+        order = np.argsort(bucket, kind='stable')
+        sorted_bucket = bucket[order]
+
+        def cell(value, origin, size, count):
+            return np.clip(np.floor((value - origin) / size).astype(np.int64), 0, count - 1)
+
+        col_min, col_max = cell(boxes[:, 0], lon0, width, cols), cell(boxes[:, 1], lon0, width, cols)
+        row_min, row_max = cell(boxes[:, 2], lat0, height, rows), cell(boxes[:, 3], lat0, height, rows)
+
+        for k in overlapping:
+            first_col = np.arange(col_min[k], col_max[k] + 1) * rows
+            starts = np.searchsorted(sorted_bucket, first_col + row_min[k], side='left')
+            ends = np.searchsorted(sorted_bucket, first_col + row_max[k], side='right')
+            candidates = np.concatenate([order[a:b] for a, b in zip(starts, ends)])
+            if len(candidates) == 0:
+                continue
+            box = boxes[k]
+            in_box = (lon[candidates] >= box[0]) & (lon[candidates] <= box[1]) & \
+                     (lat[candidates] >= box[2]) & (lat[candidates] <= box[3]) & (result[candidates] == 0)
+            candidates = candidates[in_box]
+            if len(candidates) == 0:
+                continue
+            inside = points_in_rings(lon[candidates], lat[candidates], self.rings[self.ids[k]])
+            result[candidates[inside]] = self.ids[k]
+        return result
+
+
+def tag_csv(conn, input_file, output_file, lat_column='lat', lon_column='lon'):
+    """Add a field_id column to a CSV of positions
+
+    Args:
+        conn: SQLite connection
+        input_file: CSV with latitude and longitude columns
+        output_file: CSV to write
+        lat_column, lon_column: Position column names
+
+    Returns:
+        tuple: (points, points inside a field)
+    """
+    index = FieldIndex(conn)
+    if PANDAS_AVAILABLE:
+        frame = pd.read_csv(input_file)
+        frame['field_id'] = index.tag(frame[lat_column].to_numpy(), frame[lon_column].to_numpy())
+        frame.to_csv(output_file, index=False)
+        tagged = frame['field_id'].to_numpy()
+    else:
+        with open(input_file, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = list(reader)
+        lat = np.array([row[header.index(lat_column)] or 'nan' for row in rows], dtype='f8')
+        lon = np.array([row[header.index(lon_column)] or 'nan' for row in rows], dtype='f8')
+        tagged = index.tag(lat, lon)
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header + ['field_id'])
+            for row, field_id in zip(rows, tagged):
+                writer.writerow(row + [int(field_id)])
+    return len(tagged), int(np.count_nonzero(tagged))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Find which field GPS positions fall in'
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Command to execute')
+
+    subparsers.add_parser('rebuild', help='Rebuild the field spatial index')
+
+    locate_parser = subparsers.add_parser('locate', help='Find the field at a position')
+    locate_parser.add_argument('--lat', required=True, type=float, help='Latitude')
+    locate_parser.add_argument('--lon', required=True, type=float, help='Longitude')
+
+    tag_parser = subparsers.add_parser('tag', help='Add field IDs to a CSV of positions')
+    tag_parser.add_argument('--input-file', required=True, help='CSV with position columns')
+    tag_parser.add_argument('--output', required=True, help='Output CSV')
+    tag_parser.add_argument('--lat-column', default='lat', help='Latitude column (default: lat)')
+    tag_parser.add_argument('--lon-column', default='lon', help='Longitude column (default: lon)')
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    try:
+        conn = sqlite3.connect(db_path)
+        ensure_index_schema(conn)
+    except sqlite3.Error as e:
+        print(f"✗ Failed to open field index: {e}")
+        return 1
+
+    try:
+        if args.command == 'rebuild':
+            count = rebuild_index(conn)
+            print(f"✓ Indexed {count} fields")
+        elif args.command == 'locate':
+            field_ids = fields_at(conn, args.lat, args.lon)
+            if not field_ids:
+                print(f"✗ {args.lat:.7f}, {args.lon:.7f} is not inside any field")
+                return 1
+            for field_id in field_ids:
+                name = conn.execute('SELECT name FROM fields WHERE id = ?', (field_id,)).fetchone()[0]
+                print(f"✓ Field {field_id}: {name}")
+        elif args.command == 'tag':
+            try:
+                points, inside = tag_csv(conn, args.input_file, args.output, args.lat_column, args.lon_column)
+            except (OSError, KeyError, ValueError) as e:
+                print(f"✗ Failed to tag positions: {e}")
+                return 1
+            print(f"✓ Tagged {points:,} positions, {inside:,} inside a field")
+            print(f"  Written to {args.output}")
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
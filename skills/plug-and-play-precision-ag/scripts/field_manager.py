@@ -11,6 +11,11 @@ import json
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
+from field_index import ensure_index_schema
+from geometry import measure_boundaries, measure_boundary
+
 
 class FieldManager:
     """Manage field boundaries and properties"""
@@ -36,6 +41,7 @@ class FieldManager:
 
             self.conn = sqlite3.connect(self.db_path)
             self.conn.row_factory = sqlite3.Row
+            self._ensure_geometry_columns()
             return True
         except sqlite3.Error as e:
             print(f"✗ Failed to connect to database: {e}")
@@ -46,6 +52,14 @@ class FieldManager:
         if self.conn:
             self.conn.close()
 
+    def _ensure_geometry_columns(self):
+        """Add bbox and perimeter columns to an existing fields table and index it"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fields'"
+        ).fetchone()
+        if exists:
+            ensure_index_schema(self.conn)
+
     def initialize_database(self):
         """Initialize database schema"""
         cursor = self.conn.cursor()
@@ -59,6 +73,11 @@ class FieldManager:
                 area_acres REAL,
                 centroid_lat REAL,
                 centroid_lon REAL,
+                perimeter_m REAL,
+                min_lat REAL,
+                min_lon REAL,
+                max_lat REAL,
+                max_lon REAL,
                 crop_type TEXT,
                 soil_type TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -77,12 +96,14 @@ class FieldManager:
                 product TEXT,
                 rate REAL,
                 acres_treated REAL,
+                uniform_rate REAL,
                 notes TEXT,
                 FOREIGN KEY (field_id) REFERENCES fields(id)
             )
         ''')
 
         self.conn.commit()
+        ensure_index_schema(self.conn)
         print("✓ Database initialized")
 
     def create_field(self, name, boundary_polygon, crop_type=None, soil_type=None):
@@ -99,21 +120,27 @@ class FieldManager:
         """
         cursor = self.conn.cursor()
 
-        try:
-            # Calculate area and centroid
-            area_acres = self._calculate_area_acres(boundary_polygon)
-            centroid = self._calculate_centroid(boundary_polygon)
+        geometry = measure_boundary(boundary_polygon)
+        if geometry is None:
+            print(f"✗ Invalid boundary polygon for field '{name}'")
+            return None
 
-            # Insert field
+        try:
             cursor.execute('''
-                INSERT INTO fields (name, boundary_polygon, area_acres, centroid_lat, centroid_lon, crop_type, soil_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO fields (name, boundary_polygon, area_acres, centroid_lat, centroid_lon,
+                                    perimeter_m, min_lat, min_lon, max_lat, max_lon, crop_type, soil_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 name,
                 json.dumps(boundary_polygon),
-                area_acres,
-                centroid[0] if centroid else None,
-                centroid[1] if centroid else None,
+                geometry['area_acres'],
+                geometry['centroid_lat'],
+                geometry['centroid_lon'],
+                geometry['perimeter_m'],
+                geometry['min_lat'],
+                geometry['min_lon'],
+                geometry['max_lat'],
+                geometry['max_lon'],
                 crop_type,
                 soil_type
             ))
@@ -122,9 +149,8 @@ class FieldManager:
             self.conn.commit()
 
             print(f"✓ Field created: {name} (ID: {field_id})")
-            print(f"  Area: {area_acres:.2f} acres")
-            if centroid:
-                print(f"  Centroid: {centroid[0]:.6f}, {centroid[1]:.6f}")
+            print(f"  Area: {geometry['area_acres']:.2f} acres")
+            print(f"  Centroid: {geometry['centroid_lat']:.6f}, {geometry['centroid_lon']:.6f}")
 
             return field_id
 
@@ -215,18 +241,16 @@ class FieldManager:
             updates.append("boundary_polygon = ?")
             params.append(json.dumps(boundary_polygon))
 
-            # Recalculate area and centroid
-            area_acres = self._calculate_area_acres(boundary_polygon)
-            centroid = self._calculate_centroid(boundary_polygon)
-
-            updates.append("area_acres = ?")
-            params.append(area_acres)
+            # Recalculate area, centroid, perimeter and bounding box
+            geometry = measure_boundary(boundary_polygon)
+            if geometry is None:
+                print(f"✗ Invalid boundary polygon for field {field_id}")
+                return False
 
-            if centroid:
-                updates.append("centroid_lat = ?")
-                params.append(centroid[0])
-                updates.append("centroid_lon = ?")
-                params.append(centroid[1])
+            for column in ('area_acres', 'centroid_lat', 'centroid_lon', 'perimeter_m',
+                           'min_lat', 'min_lon', 'max_lat', 'max_lon'):
+                updates.append(f"{column} = ?")
+                params.append(geometry[column])
 
         if crop_type:
             updates.append("crop_type = ?")
@@ -276,74 +300,49 @@ class FieldManager:
             print(f"✗ Field {field_id} not found")
             return False
 
-    def _calculate_area_acres(self, boundary_polygon):
-        """Calculate area in acres from polygon
-
-        Args:
-            boundary_polygon: GeoJSON polygon coordinates
-
-        Returns:
-            float: Area in acres
-        """
-        # Simplified area calculation using shoelace formula
-        # For production use, consider using shapely for accurate calculations
-
-        try:
-            coords = boundary_polygon['coordinates'][0]  # Exterior ring
-
-            # Remove closing point (duplicate of first)
-            if coords[0] == coords[-1]:
-                coords = coords[:-1]
-
-            # Convert to meters (rough approximation for small areas)
-            # Assumes WGS84 coordinates
-            lat_avg = sum(c[1] for c in coords) / len(coords)
-            meters_per_degree_lat = 111320.0
-            meters_per_degree_lon = 111320.0 * abs(0.0000001 / (1 / 3600.0))
+    def recompute_geometry(self, field_ids=None):
+        """Recompute area, centroid, perimeter and bounding box from stored boundaries
 
-            # Apply shoelace formula
-            area_m2 = 0.0
-            n = len(coords)
-            for i in range(n):
-                j = (i + 1) % n
-                area_m2 += coords[i][0] * coords[j][1]
-                area_m2 -= coords[j][0] * coords[i][1]
-
-            area_m2 = abs(area_m2) * meters_per_degree_lat * meters_per_degree_lon / 2.0
-
-            # Convert to acres
-            area_acres = area_m2 / 4046.86
-
-            return area_acres
-
-        except Exception as e:
-            print(f"Warning: Could not calculate area: {e}")
-            return 0.0
-
-    def _calculate_centroid(self, boundary_polygon):
-        """Calculate centroid of polygon
+        All boundaries are measured in one batch, so this is fast enough to run
+        after importing thousands of fields.
 
         Args:
-            boundary_polygon: GeoJSON polygon coordinates
+            field_ids: Fields to update (default: all)
 
         Returns:
-            tuple: (latitude, longitude) or None
+            int: Number of fields updated
         """
-        try:
-            coords = boundary_polygon['coordinates'][0]
-
-            # Remove closing point
-            if coords[0] == coords[-1]:
-                coords = coords[:-1]
-
-            # Simple average (not accurate for complex polygons)
-            avg_lat = sum(c[1] for c in coords) / len(coords)
-            avg_lon = sum(c[0] for c in coords) / len(coords)
+        query = 'SELECT id, boundary_polygon FROM fields'
+        params = []
+        if field_ids:
+            query += f" WHERE id IN ({','.join('?' * len(field_ids))})"
+            params = list(field_ids)
+        rows = self.conn.execute(query, params).fetchall()
+        if not rows:
+            print("No fields found")
+            return 0
 
-            return (avg_lat, avg_lon)
+        metrics = measure_boundaries([row['boundary_polygon'] for row in rows])
+        columns = ('area_acres', 'centroid_lat', 'centroid_lon', 'perimeter_m',
+                   'min_lat', 'min_lon', 'max_lat', 'max_lon')
+        updates = []
+        invalid = []
+        for i, row in enumerate(rows):
+            if not np.isfinite(metrics['area_m2'][i]):
+                invalid.append(row['id'])
+                continue
+            updates.append([float(metrics[column][i]) for column in columns] + [row['id']])
+
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        self.conn.executemany(f'''
+            UPDATE fields SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', updates)
+        self.conn.commit()
 
-        except Exception:
-            return None
+        print(f"✓ Recomputed geometry for {len(updates)} fields")
+        if invalid:
+            print(f"✗ Invalid boundary polygon for field(s): {', '.join(map(str, invalid))}")
+        return len(updates)
 
 
 def main():
@@ -379,6 +378,10 @@ def main():
     delete_parser = subparsers.add_parser('delete', help='Delete a field')
     delete_parser.add_argument('--field-id', required=True, type=int, help='Field ID')
 
+    # Recompute command
+    recompute_parser = subparsers.add_parser('recompute', help='Recompute area, centroid and bounding boxes')
+    recompute_parser.add_argument('--field-id', type=int, nargs='+', help='Field ID(s) (default: all)')
+
     # Init command
     subparsers.add_parser('init', help='Initialize database')
 
@@ -432,6 +435,8 @@ def main():
             )
         elif args.command == 'delete':
             manager.delete_field(args.field_id)
+        elif args.command == 'recompute':
+            manager.recompute_geometry(args.field_id)
         else:
             parser.print_help()
     finally:
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Field Geometry for Plug-and-Play Precision Agriculture
+Vectorized polygon measurement and local projections
+
+Areas, centroids and perimeters are computed in a Lambert azimuthal
+equal-area projection on the WGS84 ellipsoid, centered on each polygon,
+so acreage is exact up to floating point and lengths are true to well
+under 0.01% across a field. Many polygons are measured in one pass: all
+ring vertices are packed into flat arrays and reduced per ring and per
+polygon with NumPy.
+
+The fast equirectangular local_xy/local_latlon pair is kept for gridding
+point data (yield rasters, prescriptions), where cells only need to line
+up, not to be measured.
+"""
+
+import json
+
+import numpy as np
+
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+_E = np.sqrt(WGS84_E2)
+_QP = 1 - (1 - WGS84_E2) / (2 * _E) * np.log((1 - _E) / (1 + _E))
+AUTHALIC_RADIUS = WGS84_A * np.sqrt(_QP / 2)
+
+# Series for geodetic latitude from authalic latitude (Snyder 3-18)
+_E4, _E6 = WGS84_E2 ** 2, WGS84_E2 ** 3
+_FROM_AUTHALIC = (WGS84_E2 / 3 + 31 * _E4 / 180 + 517 * _E6 / 5040,
+                  23 * _E4 / 360 + 251 * _E6 / 3780,
+                  761 * _E6 / 45360)
+
+M2_PER_ACRE = 4046.8564224
+
+METERS_PER_DEG_LAT = 110574.0
+METERS_PER_DEG_LON = 111320.0
+
+
+def local_xy(lat, lon, lat0, lon0):
+    """Project lat/lon arrays to metres east/north of (lat0, lon0)"""
+    x = (np.asarray(lon) - lon0) * METERS_PER_DEG_LON * np.cos(np.radians(lat0))
+    y = (np.asarray(lat) - lat0) * METERS_PER_DEG_LAT
+    return x, y
+
+
+def local_latlon(x, y, lat0, lon0):
+    """Inverse of local_xy"""
+    lat = lat0 + np.asarray(y) / METERS_PER_DEG_LAT
+    lon = lon0 + np.asarray(x) / (METERS_PER_DEG_LON * np.cos(np.radians(lat0)))
+    return lat, lon
+
+
+def _authalic(phi):
+    sin_phi = np.sin(phi)
+    q = (1 - WGS84_E2) * (sin_phi / (1 - WGS84_E2 * sin_phi ** 2)
+                          - np.log((1 - _E * sin_phi) / (1 + _E * sin_phi)) / (2 * _E))
+    return np.arcsin(np.clip(q / _QP, -1, 1))
+
+
+def _geodetic(beta):
+    c1, c2, c3 = _FROM_AUTHALIC
+    return beta + c1 * np.sin(2 * beta) + c2 * np.sin(4 * beta) + c3 * np.sin(6 * beta)
+
+
+def _laea_center(lat0):
+    """Authalic latitude and the D scale factor at the projection center"""
+    phi0 = np.radians(lat0)
+    beta0 = _authalic(phi0)
+    m0 = np.cos(phi0) / np.sqrt(1 - WGS84_E2 * np.sin(phi0) ** 2)
+    d = WGS84_A * m0 / (AUTHALIC_RADIUS * np.cos(beta0))
+    return beta0, d
+
+
+def laea_xy(lat, lon, lat0, lon0):
+    """Lambert azimuthal equal-area projection (ellipsoidal, oblique)
+
+    Args:
+        lat, lon: Arrays of coordinates in degrees
+        lat0, lon0: Projection center in degrees (scalars or per-point arrays)
+
+    Returns:
+        tuple: (x, y) in metres east/north of the center
+    """
+    beta = _authalic(np.radians(lat))
+    beta0, d = _laea_center(np.asarray(lat0, dtype='f8'))
+    dlon = np.radians(np.asarray(lon) - lon0)
+    b = AUTHALIC_RADIUS * np.sqrt(2 / (1 + np.sin(beta0) * np.sin(beta)
+                                       + np.cos(beta0) * np.cos(beta) * np.cos(dlon)))
+    x = b * d * np.cos(beta) * np.sin(dlon)
+    y = (b / d) * (np.cos(beta0) * np.sin(beta) - np.sin(beta0) * np.cos(beta) * np.cos(dlon))
+    return x, y
+
+
+def laea_latlon(x, y, lat0, lon0):
+    """Inverse of laea_xy
+
+    Returns:
+        tuple: (lat, lon) in degrees
+    """
+    beta0, d = _laea_center(np.asarray(lat0, dtype='f8'))
+    x = np.asarray(x, dtype='f8')
+    y = np.asarray(y, dtype='f8')
+    rho = np.hypot(x / d, d * y)
+    c = 2 * np.arcsin(np.clip(rho / (2 * AUTHALIC_RADIUS), -1, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.where(rho > 0, np.arcsin(np.cos(c) * np.sin(beta0)
+                                           + d * y * np.sin(c) * np.cos(beta0) / rho), beta0)
+    dlon = np.arctan2(x * np.sin(c),
+                      d * rho * np.cos(beta0) * np.cos(c) - d * d * y * np.sin(beta0) * np.sin(c))
+    return np.degrees(_geodetic(beta)), np.asarray(lon0) + np.degrees(dlon)
+
+
+def polygon_parts(boundary):
+    """Polygons of a GeoJSON Polygon, MultiPolygon, Feature or JSON string
+
+    Returns:
+        list: Polygons, each a list of rings (exterior first) of [lon, lat] pairs
+    """
+    if isinstance(boundary, str):
+        boundary = json.loads(boundary)
+    if boundary.get('type') == 'Feature':
+        boundary = boundary['geometry']
+    if boundary.get('type') == 'Polygon':
+        return [boundary['coordinates']]
+    if boundary.get('type') == 'MultiPolygon':
+        return list(boundary['coordinates'])
+    raise ValueError(f"Unsupported boundary geometry: {boundary.get('type')}")
+
+
+def boundary_rings(boundary):
+    """All rings of a boundary as [[lon, lat], ...] lists"""
+    return [ring for polygon in polygon_parts(boundary) for ring in polygon]
+
+
+def points_in_rings(x, y, rings, block_cells=2_000_000):
+    """Even-odd point in polygon test for arrays of points
+
+    Holes are handled by the even-odd rule, so rings may be passed in any
+    order. Crossings are counted for blocks of edges at a time, sized so a
+    block is about block_cells point/edge pairs.
+
+    Args:
+        x, y: Point coordinates
+        rings: List of (xs, ys) vertex arrays
+        block_cells: Point/edge pairs evaluated per step
+
+    Returns:
+        numpy.ndarray: Boolean array shaped like x, True inside
+    """
+    shape = np.shape(x)
+    x = np.asarray(x, dtype='f8').ravel()
+    y = np.asarray(y, dtype='f8').ravel()
+    if not rings or len(x) == 0:
+        return np.zeros(shape, dtype=bool)
+
+    x1 = np.concatenate([np.asarray(xs, dtype='f8') for xs, _ in rings])
+    y1 = np.concatenate([np.asarray(ys, dtype='f8') for _, ys in rings])
+    x2 = np.concatenate([np.roll(np.asarray(xs, dtype='f8'), -1) for xs, _ in rings])
+    y2 = np.concatenate([np.roll(np.asarray(ys, dtype='f8'), -1) for _, ys in rings])
+    sloped = y1 != y2
+    x1, y1, x2, y2 = x1[sloped], y1[sloped], x2[sloped], y2[sloped]
+    slope = (x2 - x1) / (y2 - y1)
+
+    crossings = np.zeros(len(x), dtype=np.int64)
+    step = max(1, block_cells // len(x))
+    px, py = x[:, None], y[:, None]
+    for start in range(0, len(x1), step):
+        edges = slice(start, start + step)
+        crosses = (y1[edges] > py) != (y2[edges] > py)
+        x_cross = slope[edges] * (py - y1[edges]) + x1[edges]
+        crossings += np.count_nonzero(crosses & (px < x_cross), axis=1)
+    return (crossings % 2 == 1).reshape(shape)
+
+
+def pack_boundaries(boundaries):
+    """Flatten boundaries into vertex arrays for batch measurement
+
+    Closing vertices are dropped. Boundaries that cannot be parsed get no
+    vertices and measure as NaN.
+
+    Args:
+        boundaries: GeoJSON geometries (dicts or JSON strings)
+
+    Returns:
+        dict: lat, lon, ring (ring index per vertex), ring_start, ring_owner
+              (boundary index per ring) and ring_hole (True for interior rings)
+    """
+    lons, lats, ring_owner, ring_hole, ring_length = [], [], [], [], []
+    for index, boundary in enumerate(boundaries):
+        try:
+            polygons = polygon_parts(boundary)
+        except (ValueError, TypeError, KeyError, AttributeError, json.JSONDecodeError):
+            continue
+        for polygon in polygons:
+            for k, ring in enumerate(polygon):
+                if len(ring) > 1 and ring[0] == ring[-1]:
+                    ring = ring[:-1]
+                if len(ring) < 3:
+                    continue
+                lons.extend(point[0] for point in ring)
+                lats.extend(point[1] for point in ring)
+                ring_owner.append(index)
+                ring_hole.append(k > 0)
+                ring_length.append(len(ring))
+
+    ring_length = np.asarray(ring_length, dtype=np.int64)
+    ring_start = np.cumsum(ring_length) - ring_length
+    return {
+        'lon': np.asarray(lons, dtype='f8'),
+        'lat': np.asarray(lats, dtype='f8'),
+        'ring': np.repeat(np.arange(len(ring_length)), ring_length),
+        'ring_start': ring_start,
+        'ring_length': ring_length,
+        'ring_owner': np.asarray(ring_owner, dtype=np.int64),
+        'ring_hole': np.asarray(ring_hole, dtype=bool),
+    }
+
+
+def measure_boundaries(boundaries):
+    """Area, centroid, perimeter and bounding box of many boundaries at once
+
+    Each boundary is projected to an equal-area frame centered on the mean
+    of its exterior vertices. Holes are subtracted from area and centroid
+    and counted in the perimeter.
+
+    Args:
+        boundaries: GeoJSON geometries (dicts or JSON strings)
+
+    Returns:
+        dict: Arrays area_m2, area_acres, centroid_lat, centroid_lon,
+              perimeter_m, min_lat, min_lon, max_lat, max_lon (NaN where a
+              boundary could not be measured)
+    """
+    n = len(boundaries)
+    packed = pack_boundaries(boundaries)
+    result = {key: np.full(n, np.nan) for key in
+              ('area_m2', 'area_acres', 'centroid_lat', 'centroid_lon', 'perimeter_m',
+               'min_lat', 'min_lon', 'max_lat', 'max_lon')}
+    if len(packed['lat']) == 0:
+        return result
+
+    lat, lon, ring = packed['lat'], packed['lon'], packed['ring']
+    owner = packed['ring_owner']
+    vertex_owner = owner[ring]
+    exterior = ~packed['ring_hole'][ring]
+
+    # Projection center per boundary: mean of its exterior vertices
+    count = np.bincount(vertex_owner, weights=exterior, minlength=n)
+    with np.errstate(invalid='ignore'):
+        lat0 = np.bincount(vertex_owner, weights=lat * exterior, minlength=n) / count
+        lon0 = np.bincount(vertex_owner, weights=lon * exterior, minlength=n) / count
+    x, y = laea_xy(lat, lon, lat0[vertex_owner], lon0[vertex_owner])
+
+    # Next vertex within the same ring
+    following = np.arange(len(x)) + 1
+    ends = packed['ring_start'] + packed['ring_length'] - 1
+    following[ends] = packed['ring_start']
+    x2, y2 = x[following], y[following]
+
+    cross = x * y2 - x2 * y
+    rings = len(packed['ring_start'])
+    ring_area = np.bincount(ring, weights=cross, minlength=rings) / 2
+    ring_mx = np.bincount(ring, weights=(x + x2) * cross, minlength=rings) / 6
+    ring_my = np.bincount(ring, weights=(y + y2) * cross, minlength=rings) / 6
+
+    # Exteriors add and holes subtract whatever their winding
+    sign = np.where(packed['ring_hole'], -1.0, 1.0) * np.sign(ring_area)
+    area = np.bincount(owner, weights=sign * ring_area, minlength=n)
+    mx = np.bincount(owner, weights=sign * ring_mx, minlength=n)
+    my = np.bincount(owner, weights=sign * ring_my, minlength=n)
+    perimeter = np.bincount(vertex_owner, weights=np.hypot(x2 - x, y2 - y), minlength=n)
+
+    measured = np.bincount(owner, minlength=n) > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cx, cy = mx / area, my / area
+    centroid_lat, centroid_lon = laea_latlon(cx, cy, lat0, lon0)
+
+    result['area_m2'][measured] = area[measured]
+    result['area_acres'][measured] = area[measured] / M2_PER_ACRE
+    result['centroid_lat'][measured] = centroid_lat[measured]
+    result['centroid_lon'][measured] = centroid_lon[measured]
+    result['perimeter_m'][measured] = perimeter[measured]
+
+    # Bounding boxes: vertices are grouped by boundary, so reduce over runs
+    starts = np.flatnonzero(np.diff(vertex_owner, prepend=-1))
+    ids = vertex_owner[starts]
+    result['min_lat'][ids] = np.minimum.reduceat(lat, starts)
+    result['max_lat'][ids] = np.maximum.reduceat(lat, starts)
+    result['min_lon'][ids] = np.minimum.reduceat(lon, starts)
+    result['max_lon'][ids] = np.maximum.reduceat(lon, starts)
+    return result
+
+
+def measure_boundary(boundary):
+    """Measurements of a single boundary
+
+    Returns:
+        dict: Same keys as measure_boundaries with float values, or None if
+              the boundary could not be measured
+    """
+    metrics = {key: float(values[0]) for key, values in measure_boundaries([boundary]).items()}
+    if not np.isfinite(metrics['area_m2']):
+        return None
+    return metrics
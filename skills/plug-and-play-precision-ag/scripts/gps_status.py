@@ -6,26 +6,30 @@ Checks GPS receiver status, accuracy, and fix type
 
 import sys
 import argparse
-import serial
+import asyncio
 import time
-from datetime import datetime
+
+from nmea import FIX_QUALITY, NMEAParser, NMEAReader, format_fix
 
 
 class GPSStatusChecker:
     """Check and report GPS receiver status"""
 
-    def __init__(self, port='/dev/ttyUSB0', baudrate=9600, timeout=10):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=9600, timeout=10, nmea_file=None):
         """Initialize GPS checker
 
         Args:
             port: Serial port for GPS receiver
             baudrate: Serial communication baud rate
             timeout: Timeout in seconds
+            nmea_file: Recorded NMEA log to check instead of the port
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
-        self.serial_conn = None
+        self.nmea_file = nmea_file
+        self.parser = NMEAParser()
+        self.reader = NMEAReader(self.parser, port=port, baudrate=baudrate, nmea_file=nmea_file)
 
         # GPS data
         self.satellites = []
@@ -36,6 +40,7 @@ class GPSStatusChecker:
         self.hdop = None  # Horizontal dilution of precision
         self.vdop = None  # Vertical dilution of precision
         self.pdop = None  # Position dilution of precision
+        self.sigma_horizontal = None  # From GST, meters
 
     def connect(self):
         """Connect to GPS receiver via serial port
@@ -44,161 +49,74 @@ class GPSStatusChecker:
             bool: True if connection successful
         """
         try:
-            self.serial_conn = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=1
-            )
-            print(f"✓ Connected to GPS on {self.port}")
-            print(f"  Baudrate: {self.baudrate}")
-            return True
-        except serial.SerialException as e:
+            self.reader.open()
+        except (OSError, ValueError) as e:
             print(f"✗ Failed to connect to GPS: {e}")
             return False
+        if self.nmea_file:
+            print(f"✓ Reading NMEA log {self.nmea_file}")
+        else:
+            print(f"✓ Connected to GPS on {self.port}")
+            print(f"  Baudrate: {self.baudrate}")
+        return True
 
     def disconnect(self):
         """Disconnect from GPS receiver"""
-        if self.serial_conn and self.serial_conn.is_open:
-            self.serial_conn.close()
+        if self.reader.fd is not None:
+            self.reader.close()
             print("✓ Disconnected from GPS")
 
-    def parse_nmea_sentence(self, sentence):
-        """Parse NMEA sentence
-
-        Args:
-            sentence: NMEA sentence string
-
-        Returns:
-            tuple: (sentence_type, data) or (None, None)
-        """
-        if not sentence.startswith('$'):
-            return None, None
-
-        parts = sentence.split('*')[0].split(',')
-        sentence_type = parts[0][1:5]  # Get GPRMC, GPGGA, etc.
-
-        return sentence_type, parts
-
-    def process_gpgga(self, parts):
-        """Process GPGGA sentence (Global Positioning System Fix Data)
-
-        Args:
-            parts: NMEA sentence parts
-        """
-        if len(parts) < 15:
+    def update_from_parser(self):
+        """Copy the latest fix and satellite state from the parser"""
+        fix = self.parser.fixes.last()
+        if fix is None:
             return
-
-        # Parse fix type (field 6)
-        # 0 = Invalid, 1 = GPS fix, 2 = DGPS fix
-        try:
-            self.fix_type = int(parts[6])
-        except (ValueError, IndexError):
-            self.fix_type = 0
-
-        # Parse satellites (field 7)
-        try:
-            num_sats = int(parts[7])
-        except (ValueError, IndexError):
-            num_sats = 0
-
-        # Parse HDOP (field 8)
-        try:
-            self.hdop = float(parts[8])
-        except (ValueError, IndexError):
-            self.hdop = None
-
-        # Parse altitude (field 9)
-        try:
-            self.altitude = float(parts[9])
-        except (ValueError, IndexError):
-            self.altitude = None
-
-        # Parse latitude (field 2) and longitude (field 4)
-        try:
-            lat_deg = float(parts[2][:2])
-            lat_min = float(parts[2][2:]) / 60.0
-            lat_dir = parts[3]
-            self.latitude = lat_deg + lat_min
-            if lat_dir == 'S':
-                self.latitude = -self.latitude
-
-            lon_deg = float(parts[4][:3])
-            lon_min = float(parts[4][3:]) / 60.0
-            lon_dir = parts[5]
-            self.longitude = lon_deg + lon_min
-            if lon_dir == 'W':
-                self.longitude = -self.longitude
-        except (ValueError, IndexError):
-            pass
-
-        return num_sats
-
-    def process_gprmc(self, parts):
-        """Process GPRMC sentence (Recommended Minimum sentence)
-
-        Args:
-            parts: NMEA sentence parts
-        """
-        # RMC provides date and time, and fix status
-        if len(parts) < 12:
-            return
-
-        # Fix status (field 2): A = valid, V = invalid
-        fix_status = parts[2]
-        if fix_status == 'A':
-            return True
-        return False
+        self.fix_type = int(fix['quality'])
+        if fix['quality'] > 0:
+            self.latitude = float(fix['lat'])
+            self.longitude = float(fix['lon'])
+        self.altitude = float(fix['alt']) if fix['alt'] == fix['alt'] else None
+        self.hdop = float(fix['hdop']) if fix['hdop'] == fix['hdop'] else None
+        sigma = float((fix['sigma_lat'] ** 2 + fix['sigma_lon'] ** 2) ** 0.5)
+        self.sigma_horizontal = sigma if sigma == sigma else None
+        self.pdop = self.parser.pdop
+        self.vdop = self.parser.vdop
+        self.satellites = [sat for sats in self.parser.satellites_in_view.values() for sat in sats]
 
     def read_nmea_sentences(self, duration=10):
         """Read and process NMEA sentences
 
+        Prints one status line per second of fix time, however fast the
+        receiver outputs fixes. A recorded log is read to the end.
+
         Args:
             duration: Duration to read in seconds
-        """
-        print(f"\nReading GPS data for {duration} seconds...")
-        print(f"{'Time':<20} {'Type':<10} {'Sats':<6} {'Fix':<6} {'HDOP':<8} {'Lat':<12} {'Lon':<13}")
-
-        start_time = time.time()
-        num_sats = 0
-        sentences_read = 0
-
-        while (time.time() - start_time) < duration:
-            if not self.serial_conn or not self.serial_conn.is_open:
-                break
-
-            try:
-                line = self.serial_conn.readline().decode('ascii', errors='ignore').strip()
-                if not line:
-                    continue
-
-                sentence_type, parts = self.parse_nmea_sentence(line)
-                if not sentence_type:
-                    continue
 
-                sentences_read += 1
-
-                if sentence_type == 'GPGGA':
-                    sats = self.process_gpgga(parts)
-                    if sats is not None:
-                        num_sats = sats
-
-                    # Print status line
-                    timestamp = datetime.now().strftime('%H:%M:%S')
-                    fix_text = self.get_fix_type_text()
-                    hdop_text = f"{self.hdop:.1f}" if self.hdop else "N/A"
-                    lat_text = f"{self.latitude:.6f}" if self.latitude else "N/A"
-                    lon_text = f"{self.longitude:.6f}" if self.longitude else "N/A"
+        Returns:
+            int: Number of valid sentences read
+        """
+        if self.nmea_file:
+            print("\nReading recorded GPS data...")
+        else:
+            print(f"\nReading GPS data for {duration} seconds...")
+        print(f"{'UTC':<10} {'Fix':<10} {'Sats':<5} {'HDOP':<6} {'Lat':<13} {'Lon':<14} {'km/h':<7} {'Sigma m'}")
 
-                    print(f"{timestamp:<20} {sentence_type:<10} {num_sats:<6} {fix_text:<6} {hdop_text:<8} {lat_text:<12} {lon_text:<13}")
+        printed = [None]
 
-                elif sentence_type == 'GPRMC':
-                    self.process_gprmc(parts)
+        def on_fix(fix):
+            second = int(fix['utc']) if fix['utc'] == fix['utc'] else None
+            if second is None or second != printed[0]:
+                printed[0] = second
+                utc_text = time.strftime('%H:%M:%S', time.gmtime(second)) if second is not None else "N/A"
+                print(f"{utc_text:<10} {format_fix(fix)}")
 
-            except Exception as e:
-                print(f"Error parsing NMEA sentence: {e}")
-                continue
+        try:
+            asyncio.run(self.reader.run(duration=None if self.nmea_file else duration, on_fix=on_fix))
+        except KeyboardInterrupt:
+            pass
 
-        return sentences_read
+        self.update_from_parser()
+        return self.parser.stats()['sentences']
 
     def get_fix_type_text(self):
         """Get human-readable fix type
@@ -206,30 +124,26 @@ class GPSStatusChecker:
         Returns:
             str: Fix type description
         """
-        fix_types = {
-            0: "No Fix",
-            1: "GPS",
-            2: "DGPS",
-            3: "PPS",
-            4: "RTK",
-            5: "Float RTK",
-            6: "Estimated"
-        }
-        return fix_types.get(self.fix_type, "Unknown")
+        return FIX_QUALITY.get(self.fix_type, "Unknown")
 
     def estimate_accuracy(self):
-        """Estimate position accuracy based on HDOP
+        """Estimate position accuracy from GST error statistics, or HDOP
 
         Returns:
             tuple: (accuracy_estimate, accuracy_description)
         """
-        if not self.hdop:
+        if self.sigma_horizontal is not None:
+            # Receiver-reported 1-sigma horizontal error
+            accuracy_m = self.sigma_horizontal
+        elif self.hdop:
+            # Accuracy estimate based on HDOP (rough approximation)
+            accuracy_m = self.hdop * 2.0  # Rough conversion
+        else:
             return None, "Unknown"
 
-        # Accuracy estimate based on HDOP (rough approximation)
-        accuracy_m = self.hdop * 2.0  # Rough conversion
-
-        if accuracy_m < 1.0:
+        if accuracy_m < 0.05:
+            description = "RTK (centimeter)"
+        elif accuracy_m < 1.0:
             description = "Excellent (sub-meter)"
         elif accuracy_m < 3.0:
             description = "Good (1-3 meters)"
@@ -269,13 +183,26 @@ class GPSStatusChecker:
         else:
             print("Altitude: Not available")
 
+        print(f"Satellites in view: {self.parser.satellites_in_view_count()}")
+
         if self.hdop is not None:
-            accuracy, description = self.estimate_accuracy()
             print(f"HDOP: {self.hdop:.1f}")
-            print(f"Estimated Accuracy: {accuracy:.1f}m ({description})")
+            if self.pdop is not None and self.vdop is not None:
+                print(f"PDOP: {self.pdop:.1f}  VDOP: {self.vdop:.1f}")
         else:
             print("HDOP: Not available")
 
+        accuracy, description = self.estimate_accuracy()
+        if accuracy is not None:
+            print(f"Estimated Accuracy: {accuracy:.3f}m ({description})")
+
+        stats = self.parser.stats()
+        print(f"\nChecksum errors: {stats['checksum_errors']}")
+        if stats['fix_rate_hz']:
+            print(f"Fix rate: {stats['fix_rate_hz']:.1f} Hz (longest gap {stats['max_interval_s']:.2f}s)")
+        if stats['latency_mean_ms'] is not None:
+            print(f"Latency: {stats['latency_mean_ms']:.0f} ms mean, {stats['latency_p95_ms']:.0f} ms p95")
+
         print("\n" + "=" * 80)
 
     def run(self, duration=10):
@@ -317,13 +244,18 @@ def main():
         default=10,
         help='Duration to check GPS in seconds (default: 10)'
     )
+    parser.add_argument(
+        '--nmea-file',
+        help='Check a recorded NMEA log instead of the serial port'
+    )
 
     args = parser.parse_args()
 
     checker = GPSStatusChecker(
         port=args.port,
         baudrate=args.baudrate,
-        timeout=args.duration
+        timeout=args.duration,
+        nmea_file=args.nmea_file
     )
 
     success = checker.run(duration=args.duration)
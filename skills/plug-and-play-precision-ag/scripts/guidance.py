@@ -1,15 +1,741 @@
 #!/usr/bin/env python3
 """
-Guidance Line Setup Script (Stub)
-Full implementation would create A-B lines, curved lines, etc.
+Guidance Lines for Plug-and-Play Precision Agriculture
+Create AB, A+heading, curved and contour guidance and follow it per fix
+
+Lines are laid out in an equal-area frame centered on the field (true to
+well under a centimetre per kilometre) with parallel swaths every
+implement width:
+
+    ab        straight line through two points
+    heading   straight line through one point at a compass heading
+    curve     a recorded pass (or any polyline), extended straight past
+              both ends and offset left and right to cover the field
+    contour   rounds following the field boundary inwards, the first
+              one half a width inside the edge
+
+Straight swaths need no search: the swath number and cross-track error
+are one projection onto the line normal. Curved swaths are offset once
+when the line is loaded, and their segments are bucketed into a grid of
+cells one swath wide, so each fix only measures the segments in the 3x3
+cells around it instead of every segment of every swath.
 """
 
 import sys
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from geometry import boundary_rings, laea_latlon, laea_xy
+from nmea import NMEAParser, NMEAReader
+from track_logger import TrackLogger
+
+
+GUIDANCE_TYPES = ('ab', 'heading', 'curve', 'contour')
+
+MITER_LIMIT = 4.0       # longest vertex offset, in offset distances, at sharp bends
+CURVE_SPACING = 1.0     # metres between vertices kept from a recorded pass
+
+
+def _segments(points, closed):
+    """Start and end vertices of a polyline's segments"""
+    end = np.roll(points, -1, axis=0) if closed else points[1:]
+    start = points if closed else points[:-1]
+    return start, end
+
+
+def offset_polyline(points, distance, closed=False):
+    """Parallel polyline at a signed distance (positive to the right)
+
+    Vertices are moved along the bisector of their two segments, capped at
+    MITER_LIMIT times the distance. Where the offset reverses a segment
+    (tight bends on the inside), the vertices of the loop are dropped.
+
+    Args:
+        points: (n, 2) vertices in metres
+        distance: Offset in metres, positive to the right of travel
+        closed: The polyline is a ring (last vertex joins the first)
+
+    Returns:
+        numpy.ndarray: (m, 2) offset vertices, m may be smaller than n
+    """
+    start, end = _segments(points, closed)
+    direction = end - start
+    direction /= np.hypot(direction[:, 0], direction[:, 1])[:, None]
+    normal = np.stack([direction[:, 1], -direction[:, 0]], axis=1)
+
+    before = np.roll(normal, 1, axis=0) if closed else np.vstack([normal[:1], normal])
+    after = normal if closed else np.vstack([normal, normal[-1:]])
+    miter = before + after
+    scale = 1.0 + np.sum(before * after, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miter = miter / scale[:, None]
+    length = np.hypot(miter[:, 0], miter[:, 1])
+    miter = np.where((length > MITER_LIMIT)[:, None] | ~np.isfinite(miter),
+                     after * np.fmin(length, MITER_LIMIT)[:, None], miter)
+    offset = points + distance * miter
+
+    # Drop vertices that make a segment run backwards against the original
+    keep = np.arange(len(points))
+    for _ in range(len(points)):
+        if len(keep) < (3 if closed else 2):
+            break
+        a, b = _segments(offset[keep], closed)
+        oa, ob = _segments(points[keep], closed)
+        reversed_ = np.sum((b - a) * (ob - oa), axis=1) <= 0
+        if not reversed_.any():
+            break
+        drop = np.flatnonzero(reversed_) + 1
+        drop = drop[drop < len(keep)] if not closed else drop % len(keep)
+        keep = np.delete(keep, np.unique(drop))
+    return offset[keep]
+
+
+def _ring_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def _thin(points, spacing):
+    """Keep vertices at least spacing apart along the path"""
+    step = np.hypot(*np.diff(points, axis=0).T)
+    distance = np.concatenate(([0.0], np.cumsum(step)))
+    keep = np.flatnonzero(np.diff(np.floor(distance / spacing), prepend=-1) > 0)
+    if keep[-1] != len(points) - 1:
+        keep = np.append(keep, len(points) - 1)
+    return points[keep]
+
+
+class GuidanceLine:
+    """A guidance line with precomputed swaths and a segment index"""
+
+    def __init__(self, guidance_type, spacing, boundary, lines_data):
+        """Build swaths for a line
+
+        Args:
+            guidance_type: ab, heading, curve or contour
+            spacing: Swath spacing (implement width) in metres
+            boundary: Field boundary (GeoJSON geometry or JSON string)
+            lines_data: Line definition as stored in guidance_lines.lines_data
+        """
+        self.guidance_type = guidance_type
+        self.spacing = float(spacing)
+        self.data = lines_data
+        self.origin_lat, self.origin_lon = lines_data['origin']
+
+        rings = [np.asarray(ring, dtype='f8')[:, :2] for ring in boundary_rings(boundary)]
+        self.field_rings = [np.stack(self.to_xy(ring[:, 1], ring[:, 0]), axis=1) for ring in rings]
+        vertices = np.vstack(self.field_rings)
+        self.extent = (vertices.min(axis=0), vertices.max(axis=0))
+
+        if guidance_type in ('ab', 'heading'):
+            self._build_straight()
+        elif guidance_type == 'curve':
+            self._build_curve()
+        elif guidance_type == 'contour':
+            self._build_contour()
+        else:
+            raise ValueError(f"Unknown guidance type: {guidance_type}")
+
+    def to_xy(self, lat, lon):
+        """Project positions into the line's frame (metres)"""
+        return laea_xy(np.asarray(lat, dtype='f8'), np.asarray(lon, dtype='f8'),
+                       self.origin_lat, self.origin_lon)
+
+    def to_latlon(self, x, y):
+        """Positions in the line's frame back to (lat, lon)"""
+        return laea_latlon(x, y, self.origin_lat, self.origin_lon)
+
+    def _field_offsets(self, distance_to_base):
+        """Swath numbers covering the field, from signed distances of its vertices"""
+        low = int(np.floor(distance_to_base.min() / self.spacing))
+        high = int(np.ceil(distance_to_base.max() / self.spacing))
+        return np.arange(low, high + 1)
+
+    def _build_straight(self):
+        a = np.array(self.to_xy(*self.data['a']), dtype='f8')
+        if self.guidance_type == 'ab':
+            b = np.array(self.to_xy(*self.data['b']), dtype='f8')
+            heading = np.degrees(np.arctan2(b[0] - a[0], b[1] - a[1])) % 360
+        else:
+            heading = float(self.data['heading']) % 360
+        self.heading = heading
+        self.a = a
+        self.u = np.array([np.sin(np.radians(heading)), np.cos(np.radians(heading))])
+        self.n = np.array([self.u[1], -self.u[0]])
+        vertices = np.vstack(self.field_rings)
+        self.swaths = self._field_offsets((vertices - a) @ self.n)
+
+    def _build_curve(self):
+        lon, lat = np.asarray(self.data['curve'], dtype='f8')[:, :2].T
+        base = _thin(np.stack(self.to_xy(lat, lon), axis=1), CURVE_SPACING)
+        if len(base) < 2:
+            raise ValueError("A curve needs at least two distinct points")
+
+        # Run straight off both ends far enough to cross the field
+        reach = float(np.hypot(*(self.extent[1] - self.extent[0]))) + self.spacing
+        head = base[0] - base[1]
+        tail = base[-1] - base[-2]
+        head /= np.hypot(*head)
+        tail /= np.hypot(*tail)
+        base = np.vstack([base[0] + head * reach, base, base[-1] + tail * reach])
+        self.base = base
+
+        vertices = np.vstack(self.field_rings)
+        signed = self._nearest(vertices[:, 0], vertices[:, 1], *self._segment_arrays([(0, base)]),
+                               brute_force=True)[1]
+        polylines = [(k, offset_polyline(base, k * self.spacing)) for k in self._field_offsets(signed)]
+        self._index(polylines, closed=False)
+
+    def _build_contour(self):
+        ring = self.field_rings[0]
+        if np.allclose(ring[0], ring[-1]):
+            ring = ring[:-1]
+        inward = -1.0 if _ring_area(ring) > 0 else 1.0
+        area = abs(_ring_area(ring))
+        polylines = []
+        k = 0
+        while True:
+            offset = offset_polyline(ring, inward * (k + 0.5) * self.spacing, closed=True)
+            offset_area = _ring_area(offset) * -inward if len(offset) >= 3 else 0.0
+            if offset_area < self.spacing ** 2 or offset_area > area:
+                break
+            polylines.append((k, offset))
+            k += 1
+        if not polylines:
+            raise ValueError("Field is too small for one contour round")
+        self._index(polylines, closed=True)
+
+    def _segment_arrays(self, polylines, closed=False):
+        starts, ends, swath, along = [], [], [], []
+        for k, points in polylines:
+            start, end = _segments(points, closed)
+            length = np.hypot(*(end - start).T)
+            starts.append(start)
+            ends.append(end)
+            swath.append(np.full(len(start), k))
+            along.append(np.cumsum(length) - length)
+        return (np.vstack(starts), np.vstack(ends), np.concatenate(swath), np.concatenate(along))
+
+    def _index(self, polylines, closed):
+        """Bucket swath segments into a grid of cells one spacing across"""
+        start, end, swath, along = self._segment_arrays(polylines, closed)
+        self.seg_start, self.seg_end, self.seg_swath, self.seg_along = start, end, swath, along
+        self.swaths = np.array([k for k, _ in polylines])
+        self.polylines = dict(polylines)
+
+        size = self.spacing
+        margin = 3 * size
+        self.grid_x0 = float(self.extent[0][0] - margin)
+        self.grid_y0 = float(self.extent[0][1] - margin)
+        self.grid_cols = int(np.ceil((self.extent[1][0] + margin - self.grid_x0) / size))
+        self.grid_rows = int(np.ceil((self.extent[1][1] + margin - self.grid_y0) / size))
+
+        lo = np.minimum(start, end)
+        hi = np.maximum(start, end)
+        c0 = np.clip(np.floor((lo[:, 0] - self.grid_x0) / size), 0, self.grid_cols).astype(np.int64)
+        c1 = np.clip(np.floor((hi[:, 0] - self.grid_x0) / size), -1, self.grid_cols - 1).astype(np.int64)
+        r0 = np.clip(np.floor((lo[:, 1] - self.grid_y0) / size), 0, self.grid_rows).astype(np.int64)
+        r1 = np.clip(np.floor((hi[:, 1] - self.grid_y0) / size), -1, self.grid_rows - 1).astype(np.int64)
+        ncols = np.maximum(c1 - c0 + 1, 0)
+        counts = ncols * np.maximum(r1 - r0 + 1, 0)
+
+        segment = np.repeat(np.arange(len(start)), counts)
+        k = np.arange(len(segment)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell = (r0[segment] + k // ncols[segment]) * self.grid_cols + c0[segment] + k % ncols[segment]
+        order = np.argsort(cell, kind='stable')
+        self.cell_segments = segment[order]
+        self.cell_start = np.searchsorted(cell[order], np.arange(self.grid_rows * self.grid_cols + 1))
+
+    def _candidates(self, x, y):
+        """(point, segment) pairs from the 3x3 cells around each point"""
+        col = np.floor((x - self.grid_x0) / self.spacing).astype(np.int64)
+        row = np.floor((y - self.grid_y0) / self.spacing).astype(np.int64)
+        dc = np.tile(np.arange(-1, 2), 3)
+        dr = np.repeat(np.arange(-1, 2), 3)
+        cols = col[:, None] + dc
+        rows = row[:, None] + dr
+        # Only points whose whole neighbourhood is on the grid, so the nearest swath is never missed
+        inside = (col >= 1) & (col < self.grid_cols - 1) & (row >= 1) & (row < self.grid_rows - 1)
+        valid = inside[:, None] & np.ones(9, dtype=bool)
+        cells = np.where(valid, rows * self.grid_cols + cols, 0)
+        first = np.where(valid, self.cell_start[cells], 0).ravel()
+        counts = np.where(valid, self.cell_start[cells + 1], 0).ravel() - first
+        point = np.repeat(np.repeat(np.arange(len(x)), 9), counts)
+        k = np.arange(len(point)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return point, self.cell_segments[np.repeat(first, counts) + k]
+
+    def _nearest(self, x, y, start, end, swath, along, brute_force=False):
+        """Nearest segment per point: (segment, signed distance, along distance)"""
+        if brute_force:
+            point = np.repeat(np.arange(len(x)), len(start))
+            segment = np.tile(np.arange(len(start)), len(x))
+        else:
+            point, segment = self._candidates(x, y)
+
+        n = len(x)
+        best = np.full(n, -1, dtype=np.int64)
+        signed = np.full(n, np.nan)
+        position = np.full(n, np.nan)
+        if len(point) == 0:
+            return best, signed, position
+
+        a, b = start[segment], end[segment]
+        d = b - a
+        length = np.hypot(d[:, 0], d[:, 1])
+        px, py = x[point] - a[:, 0], y[point] - a[:, 1]
+        t = np.clip((px * d[:, 0] + py * d[:, 1]) / length ** 2, 0, 1)
+        distance = np.hypot(px - t * d[:, 0], py - t * d[:, 1])
+
+        order = np.lexsort((distance, point))
+        firsts = order[np.concatenate(([True], np.diff(point[order]) != 0))]
+        hit = point[firsts]
+        chosen = segment[firsts]
+        best[hit] = chosen
+        cross = (px[firsts] * d[firsts, 1] - py[firsts] * d[firsts, 0]) / length[firsts]
+        signed[hit] = np.where(cross < 0, -1.0, 1.0) * distance[firsts]
+        position[hit] = along[chosen] + t[firsts] * length[firsts]
+        return best, signed, position
+
+    def locate(self, lat, lon):
+        """Nearest swath and cross-track error for fixes
+
+        Args:
+            lat, lon: Fix positions in degrees (scalars or arrays)
+
+        Returns:
+            dict: Arrays found (a swath is near), swath (number, 0 = the line
+            itself, negative to its left), xte (metres, positive right of the
+            line's direction), along (metres along the swath) and heading
+            (line direction in degrees); NaN, and swath 0, where not found
+        """
+        x, y = self.to_xy(np.atleast_1d(lat), np.atleast_1d(lon))
+        if self.guidance_type in ('ab', 'heading'):
+            px, py = x - self.a[0], y - self.a[1]
+            offset = px * self.n[0] + py * self.n[1]
+            swath = np.rint(offset / self.spacing)
+            found = np.isfinite(offset)
+            return {
+                'found': found,
+                'swath': np.where(found, swath, 0).astype(np.int64),
+                'xte': offset - swath * self.spacing,
+                'along': px * self.u[0] + py * self.u[1],
+                'heading': np.full(len(x), self.heading),
+            }
+
+        segment, signed, along = self._nearest(x, y, self.seg_start, self.seg_end,
+                                               self.seg_swath, self.seg_along)
+        found = segment >= 0
+        d = self.seg_end[segment] - self.seg_start[segment]
+        heading = np.where(found, np.degrees(np.arctan2(d[:, 0], d[:, 1])) % 360, np.nan)
+        return {
+            'found': found,
+            'swath': np.where(found, self.seg_swath[segment], 0),
+            'xte': signed,
+            'along': along,
+            'heading': heading,
+        }
+
+    def swath_lines(self):
+        """Swaths as (number, lat, lon) vertex arrays, clipped to the field's box"""
+        lo, hi = self.extent
+        if self.guidance_type in ('ab', 'heading'):
+            reach = float(np.hypot(*(hi - lo)))
+            centre = (lo + hi) / 2
+            t = (centre - self.a) @ self.u
+            lines = []
+            for k in self.swaths:
+                mid = self.a + self.n * k * self.spacing + self.u * t
+                ends = np.vstack([mid - self.u * reach / 2, mid + self.u * reach / 2])
+                lines.append((int(k), *self.to_latlon(ends[:, 0], ends[:, 1])))
+            return lines
+        lines = []
+        for k, points in self.polylines.items():
+            inside = np.all((points >= lo - self.spacing) & (points <= hi + self.spacing), axis=1)
+            if self.guidance_type == 'contour':
+                points = np.vstack([points, points[:1]])
+                inside = np.append(inside, inside[0])
+            if inside.any():
+                points = points[inside]
+                lines.append((int(k), *self.to_latlon(points[:, 0], points[:, 1])))
+        return lines
+
+
+class GuidanceManager:
+    """Create, store and load guidance lines"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db'):
+        """Initialize guidance manager
+
+        Args:
+            db_path: Path to SQLite database
+        """
+        self.db_path = db_path
+        self.conn = None
+        self.cache = {}  # line ID -> GuidanceLine
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        try:
+            self.conn = sqlite3.connect(self.db_path)
+            self.conn.row_factory = sqlite3.Row
+            return True
+        except sqlite3.Error as e:
+            print(f"✗ Failed to connect to database: {e}")
+            return False
+
+    def disconnect(self):
+        """Disconnect from database"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _field(self, field_id):
+        row = self.conn.execute(
+            'SELECT boundary_polygon, centroid_lat, centroid_lon FROM fields WHERE id = ?', (field_id,)
+        ).fetchone()
+        if not row:
+            raise ValueError(f"Field {field_id} not found")
+        return row
+
+    def create_line(self, field_id, guidance_type, spacing, name=None, a=None, b=None, heading=None,
+                    curve=None):
+        """Create and store a guidance line
+
+        Args:
+            field_id: Field ID
+            guidance_type: ab, heading, curve or contour
+            spacing: Swath spacing (implement width) in metres
+            name: Line name
+            a, b: (lat, lon) points for ab; a only for heading
+            heading: Compass heading in degrees for heading lines
+            curve: [[lon, lat], ...] for curve lines
+
+        Returns:
+            int: Guidance line ID
+        """
+        field = self._field(field_id)
+        origin = [field['centroid_lat'], field['centroid_lon']]
+        if origin[0] is None:
+            rings = boundary_rings(field['boundary_polygon'])
+            vertices = np.asarray(rings[0], dtype='f8')
+            origin = [float(vertices[:, 1].mean()), float(vertices[:, 0].mean())]
+
+        data = {'name': name, 'origin': origin}
+        if guidance_type == 'ab':
+            data.update(a=list(a), b=list(b))
+        elif guidance_type == 'heading':
+            data.update(a=list(a), heading=float(heading))
+        elif guidance_type == 'curve':
+            data.update(curve=[[float(lon), float(lat)] for lon, lat in curve])
+        elif guidance_type != 'contour':
+            raise ValueError(f"Unknown guidance type: {guidance_type}")
+
+        # Build once to validate and to record the heading
+        line = GuidanceLine(guidance_type, spacing, field['boundary_polygon'], data)
+        orientation = getattr(line, 'heading', None)
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO guidance_lines (field_id, guidance_type, spacing, orientation, lines_data)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (field_id, guidance_type, spacing, orientation, json.dumps(data)))
+        self.conn.commit()
+        self.cache[cursor.lastrowid] = line
+        return cursor.lastrowid
+
+    def boundary_ab(self, field_id):
+        """Ends of the longest straight edge of a field's boundary
+
+        Returns:
+            tuple: ((lat, lon), (lat, lon))
+        """
+        ring = np.asarray(boundary_rings(self._field(field_id)['boundary_polygon'])[0], dtype='f8')
+        lat0, lon0 = ring[:, 1].mean(), ring[:, 0].mean()
+        x, y = laea_xy(ring[:, 1], ring[:, 0], lat0, lon0)
+        length = np.hypot(np.diff(x), np.diff(y))
+        i = int(np.argmax(length))
+        return (float(ring[i, 1]), float(ring[i, 0])), (float(ring[i + 1, 1]), float(ring[i + 1, 0]))
+
+    def load(self, line_id):
+        """Guidance line with its swaths and index, built once per manager
+
+        Returns:
+            GuidanceLine: Line, or None if not found
+        """
+        if line_id in self.cache:
+            return self.cache[line_id]
+        row = self.conn.execute('''
+            SELECT g.guidance_type, g.spacing, g.lines_data, f.boundary_polygon
+            FROM guidance_lines g JOIN fields f ON f.id = g.field_id
+            WHERE g.id = ?
+        ''', (line_id,)).fetchone()
+        if not row:
+            return None
+        line = GuidanceLine(row['guidance_type'], row['spacing'], row['boundary_polygon'],
+                            json.loads(row['lines_data']))
+        self.cache[line_id] = line
+        return line
+
+    def list_lines(self, field_id=None):
+        """Stored guidance lines
+
+        Returns:
+            list: Dicts with id, field_id, name, guidance_type, spacing, orientation, created_at
+        """
+        query = 'SELECT id, field_id, guidance_type, spacing, orientation, lines_data, created_at FROM guidance_lines'
+        params = []
+        if field_id is not None:
+            query += ' WHERE field_id = ?'
+            params.append(field_id)
+        query += ' ORDER BY field_id, id'
+        lines = []
+        for row in self.conn.execute(query, params):
+            line = dict(row)
+            line['name'] = json.loads(line.pop('lines_data')).get('name')
+            lines.append(line)
+        return lines
+
+    def delete_line(self, line_id):
+        """Delete a guidance line
+
+        Returns:
+            bool: True if a line was deleted
+        """
+        cursor = self.conn.execute('DELETE FROM guidance_lines WHERE id = ?', (line_id,))
+        self.conn.commit()
+        self.cache.pop(line_id, None)
+        return cursor.rowcount > 0
+
+
+def track_errors(line, lat, lon):
+    """Cross-track error statistics of a driven track against a line
+
+    Returns:
+        dict: fixes, fixes_on_line, rms_m, p95_m, max_m and per-swath RMS
+    """
+    result = line.locate(lat, lon)
+    found = result['found']
+    xte = np.abs(result['xte'][found])
+    swaths = result['swath'][found]
+    per_swath = {}
+    if len(xte):
+        for k in np.unique(swaths):
+            values = xte[swaths == k]
+            per_swath[int(k)] = float(np.sqrt(np.mean(values ** 2)))
+    return {
+        'fixes': len(result['xte']),
+        'fixes_on_line': int(found.sum()),
+        'rms_m': float(np.sqrt(np.mean(xte ** 2))) if len(xte) else None,
+        'p95_m': float(np.percentile(xte, 95)) if len(xte) else None,
+        'max_m': float(xte.max()) if len(xte) else None,
+        'per_swath': per_swath,
+    }
+
 
 def main():
-    print("Guidance line setup - Full implementation pending")
-    print("This script will create guidance lines for field operations")
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Create guidance lines and follow them'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_parser = subparsers.add_parser('create', help='Create a guidance line')
+    create_parser.add_argument('--field-id', required=True, type=int, help='Field ID')
+    create_parser.add_argument('--guidance-type', required=True, choices=GUIDANCE_TYPES, help='Line type')
+    create_parser.add_argument('--spacing', required=True, type=float, help='Swath spacing in metres')
+    create_parser.add_argument('--name', help='Line name')
+    create_parser.add_argument('--a', nargs=2, type=float, metavar=('LAT', 'LON'), help='Point A')
+    create_parser.add_argument('--b', nargs=2, type=float, metavar=('LAT', 'LON'), help='Point B (ab lines)')
+    create_parser.add_argument('--heading', type=float, help='Heading in degrees (heading lines)')
+    create_parser.add_argument('--from-boundary', action='store_true',
+                               help='AB line along the longest boundary edge')
+    create_parser.add_argument('--implement-id', type=int, help='Curve from this implement\'s logged track')
+    create_parser.add_argument('--start', type=float, help='Track start (epoch seconds)')
+    create_parser.add_argument('--end', type=float, help='Track end (epoch seconds)')
+
+    list_parser = subparsers.add_parser('list', help='List guidance lines')
+    list_parser.add_argument('--field-id', type=int, help='Field ID')
+
+    export_parser = subparsers.add_parser('export', help='Export swaths as GeoJSON')
+    export_parser.add_argument('--line-id', required=True, type=int, help='Guidance line ID')
+    export_parser.add_argument('--output', required=True, help='GeoJSON file')
+
+    follow_parser = subparsers.add_parser('follow', help='Cross-track error from a receiver or NMEA log')
+    follow_parser.add_argument('--line-id', required=True, type=int, help='Guidance line ID')
+    follow_parser.add_argument('--port', default=os.getenv('GPS_PORT', '/dev/ttyUSB0'),
+                               help='Serial port (default: GPS_PORT or /dev/ttyUSB0)')
+    follow_parser.add_argument('--baudrate', type=int, default=int(os.getenv('GPS_BAUDRATE', '9600')),
+                               help='Serial baud rate (default: GPS_BAUDRATE or 9600)')
+    follow_parser.add_argument('--nmea-file', help='Replay a recorded NMEA log instead of the port')
+    follow_parser.add_argument('--realtime', action='store_true', help='Replay the log at its recorded rate')
+    follow_parser.add_argument('--duration', type=float, help='Seconds to run (default: until Ctrl-C)')
+    follow_parser.add_argument('--every', type=int, default=1, help='Print every Nth fix (default: 1)')
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='Cross-track error of a logged track')
+    evaluate_parser.add_argument('--line-id', required=True, type=int, help='Guidance line ID')
+    evaluate_parser.add_argument('--implement-id', type=int, help='Implement ID')
+    evaluate_parser.add_argument('--operation-id', type=int, help='Operation ID')
+    evaluate_parser.add_argument('--start', type=float, help='Start time (epoch seconds)')
+    evaluate_parser.add_argument('--end', type=float, help='End time (epoch seconds)')
+
+    delete_parser = subparsers.add_parser('delete', help='Delete a guidance line')
+    delete_parser.add_argument('--line-id', required=True, type=int, help='Guidance line ID')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    manager = GuidanceManager(db_path=db_path)
+    if not manager.connect():
+        return 1
+
+    try:
+        if args.command == 'create':
+            a, b, curve = args.a, args.b, None
+            if args.from_boundary:
+                a, b = manager.boundary_ab(args.field_id)
+            if args.guidance_type == 'curve':
+                if args.implement_id is None:
+                    print("✗ Curve lines need --implement-id (and --start/--end) of a recorded pass")
+                    return 1
+                logger = TrackLogger(db_path)
+                if not logger.connect():
+                    return 1
+                try:
+                    track = logger.load(args.implement_id, start=args.start, end=args.end)
+                finally:
+                    logger.disconnect()
+                curve = list(zip(track['lon'], track['lat']))
+            elif args.guidance_type in ('ab', 'heading') and a is None:
+                print("✗ Straight lines need --a (or --from-boundary)")
+                return 1
+            elif args.guidance_type == 'ab' and b is None:
+                print("✗ AB lines need --b (or --from-boundary)")
+                return 1
+            elif args.guidance_type == 'heading' and args.heading is None:
+                print("✗ Heading lines need --heading")
+                return 1
+            try:
+                line_id = manager.create_line(args.field_id, args.guidance_type, args.spacing, args.name,
+                                              a, b, args.heading, curve)
+            except ValueError as e:
+                print(f"✗ Failed to create guidance line: {e}")
+                return 1
+            line = manager.load(line_id)
+            print(f"✓ Created {args.guidance_type} line {line_id} with {len(line.swaths)} swaths "
+                  f"at {args.spacing:g} m")
+
+        elif args.command == 'list':
+            lines = manager.list_lines(args.field_id)
+            if not lines:
+                print("No guidance lines stored")
+                return 0
+            print(f"{'ID':<5} {'Field':<6} {'Type':<9} {'Spacing m':>10} {'Heading':>8}  Name")
+            for line in lines:
+                heading = f"{line['orientation']:.1f}" if line['orientation'] is not None else '-'
+                print(f"{line['id']:<5} {line['field_id']:<6} {line['guidance_type']:<9} "
+                      f"{line['spacing']:>10g} {heading:>8}  {line['name'] or ''}")
+
+        elif args.command == 'export':
+            line = manager.load(args.line_id)
+            if line is None:
+                print(f"✗ Guidance line {args.line_id} not found")
+                return 1
+            features = [{
+                'type': 'Feature',
+                'geometry': {'type': 'LineString',
+                             'coordinates': [[round(float(lo), 8), round(float(la), 8)] for la, lo in zip(lat, lon)]},
+                'properties': {'swath': k},
+            } for k, lat, lon in line.swath_lines()]
+            with open(args.output, 'w') as f:
+                json.dump({'type': 'FeatureCollection', 'features': features}, f)
+            print(f"✓ Exported {len(features)} swaths to {args.output}")
+
+        elif args.command == 'follow':
+            line = manager.load(args.line_id)
+            if line is None:
+                print(f"✗ Guidance line {args.line_id} not found")
+                return 1
+            reader = NMEAReader(NMEAParser(), port=args.port, baudrate=args.baudrate,
+                                nmea_file=args.nmea_file)
+            try:
+                reader.open()
+            except (OSError, ValueError) as e:
+                print(f"✗ Failed to open NMEA source: {e}")
+                return 1
+            print(f"{'Swath':>6} {'XTE cm':>8} {'Side':<6} {'Heading err':>12}")
+            seen = [0]
+
+            def on_fix(fix):
+                if fix['quality'] == 0:
+                    return
+                seen[0] += 1
+                if seen[0] % args.every:
+                    return
+                result = line.locate(fix['lat'], fix['lon'])
+                if not result['found'][0]:
+                    print(f"{'-':>6} {'no line nearby':>8}")
+                    return
+                xte = float(result['xte'][0])
+                error = 'N/A'
+                if np.isfinite(fix['course']):
+                    error = (float(fix['course']) - float(result['heading'][0]) + 180) % 360 - 180
+                    if abs(error) > 90:
+                        # Driving the swath the other way
+                        error = (error + 360) % 360 - 180
+                        xte = -xte
+                    error = f"{error:+.1f}"
+                side = 'right' if xte > 0 else 'left'
+                print(f"{int(result['swath'][0]):>6} {abs(xte) * 100:>8.1f} {side:<6} {error:>12}")
+
+            try:
+                asyncio.run(reader.run(duration=args.duration, on_fix=on_fix, realtime=args.realtime))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                reader.close()
+
+        elif args.command == 'evaluate':
+            line = manager.load(args.line_id)
+            if line is None:
+                print(f"✗ Guidance line {args.line_id} not found")
+                return 1
+            logger = TrackLogger(db_path)
+            if not logger.connect():
+                return 1
+            try:
+                track = logger.load(args.implement_id, args.operation_id, start=args.start, end=args.end)
+            finally:
+                logger.disconnect()
+            errors = track_errors(line, track['lat'], track['lon'])
+            if not errors['fixes_on_line']:
+                print("✗ No logged fixes near the line")
+                return 1
+            print(f"Fixes:     {errors['fixes_on_line']:,} of {errors['fixes']:,} near a swath")
+            print(f"XTE RMS:   {errors['rms_m'] * 100:.1f} cm")
+            print(f"XTE p95:   {errors['p95_m'] * 100:.1f} cm")
+            print(f"XTE max:   {errors['max_m'] * 100:.1f} cm")
+            for k, rms in sorted(errors['per_swath'].items()):
+                print(f"  Swath {k:>4}: {rms * 100:6.1f} cm RMS")
+
+        elif args.command == 'delete':
+            if not manager.delete_line(args.line_id):
+                print(f"✗ Guidance line {args.line_id} not found")
+                return 1
+            print(f"✓ Deleted guidance line {args.line_id}")
+    finally:
+        manager.disconnect()
+
     return 0
 
+
 if __name__ == '__main__':
     sys.exit(main())
@@ -8,6 +8,8 @@ import sqlite3
 import os
 from pathlib import Path
 
+from field_index import ensure_index_schema
+
 
 def init_database(db_path='/var/lib/precision-ag/precision-ag.db'):
     """Initialize database with schema
@@ -36,6 +38,11 @@ def init_database(db_path='/var/lib/precision-ag/precision-ag.db'):
             area_acres REAL,
             centroid_lat REAL,
             centroid_lon REAL,
+            perimeter_m REAL,
+            min_lat REAL,
+            min_lon REAL,
+            max_lat REAL,
+            max_lon REAL,
             crop_type TEXT,
             soil_type TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -67,6 +74,11 @@ def init_database(db_path='/var/lib/precision-ag/precision-ag.db'):
             prescription_name TEXT NOT NULL,
             input_type TEXT NOT NULL,
             zones_data TEXT NOT NULL,
+            rate_unit TEXT,
+            source TEXT,
+            input_hash TEXT,
+            acres REAL,
+            total_product REAL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
         )
@@ -84,6 +96,7 @@ def init_database(db_path='/var/lib/precision-ag/precision-ag.db'):
             product TEXT,
             rate REAL,
             acres_treated REAL,
+            uniform_rate REAL,
             notes TEXT,
             FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
         )
@@ -107,6 +120,30 @@ def init_database(db_path='/var/lib/precision-ag/precision-ag.db'):
     ''')
     print("✓ Created 'yield_data' table")
 
+    # Create yield_rasters table (cached yield maps per field and season)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS yield_rasters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            cell_size REAL NOT NULL,
+            source_hash TEXT NOT NULL,
+            raster_path TEXT NOT NULL,
+            origin_lat REAL,
+            origin_lon REAL,
+            x0 REAL,
+            y0 REAL,
+            rows INTEGER,
+            cols INTEGER,
+            cells INTEGER,
+            mean_yield REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(field_id, season, cell_size),
+            FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
+        )
+    ''')
+    print("✓ Created 'yield_rasters' table")
+
     # Create weather_data table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS weather_data (
@@ -157,11 +194,122 @@ def init_database(db_path='/var/lib/precision-ag/precision-ag.db'):
     ''')
     print("✓ Created 'operation_logs' table")
 
+    # Create gps_tracks table (delta-compressed GPS track chunks)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gps_tracks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            implement_id INTEGER,
+            operation_id INTEGER,
+            field_id INTEGER,
+            chunk_start REAL NOT NULL,
+            chunk_end REAL NOT NULL,
+            points INTEGER NOT NULL,
+            min_lat REAL,
+            min_lon REAL,
+            max_lat REAL,
+            max_lon REAL,
+            data BLOB NOT NULL,
+            FOREIGN KEY (implement_id) REFERENCES implements(id) ON DELETE CASCADE,
+            FOREIGN KEY (operation_id) REFERENCES operations(id) ON DELETE CASCADE
+        )
+    ''')
+    print("✓ Created 'gps_tracks' table")
+
+    # Create coverage_maps table (applied-area bitmaps per field)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coverage_maps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id INTEGER NOT NULL,
+            operation_id INTEGER,
+            season INTEGER,
+            width REAL NOT NULL,
+            cell_size REAL NOT NULL,
+            map_path TEXT NOT NULL,
+            last_track_id INTEGER NOT NULL DEFAULT 0,
+            field_acres REAL,
+            covered_acres REAL,
+            overlap_acres REAL,
+            skipped_acres REAL,
+            headland_overlap_acres REAL,
+            off_field_acres REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
+        )
+    ''')
+    print("✓ Created 'coverage_maps' table")
+
+    # Create ROI tables (input costs, crop prices, investments and cached results)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS input_costs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product TEXT NOT NULL,
+            season INTEGER NOT NULL DEFAULT 0,
+            unit TEXT,
+            cost_per_unit REAL NOT NULL,
+            UNIQUE(product, season)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crop_prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            crop TEXT NOT NULL,
+            season INTEGER NOT NULL DEFAULT 0,
+            price_per_unit REAL NOT NULL,
+            UNIQUE(crop, season)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS precision_investments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            cost REAL NOT NULL DEFAULT 0,
+            annual_cost REAL NOT NULL DEFAULT 0,
+            start_season INTEGER NOT NULL,
+            life_years INTEGER NOT NULL DEFAULT 5,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roi_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            field_id INTEGER NOT NULL,
+            season INTEGER NOT NULL,
+            input_hash TEXT NOT NULL,
+            crop TEXT,
+            acres REAL,
+            mean_yield REAL,
+            baseline_yield REAL,
+            revenue REAL,
+            input_cost REAL,
+            input_savings REAL,
+            overlap_acres REAL,
+            overlap_savings REAL,
+            yield_benefit REAL,
+            total_benefit REAL,
+            investment_cost REAL,
+            net_benefit REAL,
+            roi_percentage REAL,
+            computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(field_id, season),
+            FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
+        )
+    ''')
+    print("✓ Created ROI tables")
+
+    # Create field spatial index (R*Tree over field bounding boxes)
+    ensure_index_schema(conn)
+    print("✓ Created 'field_rtree' spatial index")
+
     # Create indexes for performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_operations_field ON operations(field_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_yield_data_field ON yield_data(field_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_prescriptions_field_name ON prescriptions(field_id, prescription_name)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_weather_field_time ON weather_data(field_id, timestamp)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_operation_logs_field_time ON operation_logs(field_id, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_gps_tracks_implement_time ON gps_tracks(implement_id, chunk_start)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_gps_tracks_operation ON gps_tracks(operation_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_gps_tracks_field ON gps_tracks(field_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coverage_maps_field ON coverage_maps(field_id, operation_id, season)')
     print("✓ Created indexes")
 
     # Commit changes
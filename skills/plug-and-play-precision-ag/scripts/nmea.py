@@ -0,0 +1,666 @@
+#!/usr/bin/env python3
+"""
+NMEA Stream Parser for Plug-and-Play Precision Agriculture
+Parse GNSS receiver output at RTK rates (10-20 Hz) from a serial port,
+a pseudo-terminal or a recorded NMEA log
+
+Sentences are checksum-validated and parsed from any talker (GP, GN, GL,
+GA, GB), so multi-constellation receivers sending GNGGA/GNRMC work the
+same as GPS-only ones. Each GGA (or RMC, on receivers without GGA) adds a
+fix to a preallocated ring buffer; RMC, VTG and GST sentences for the
+same epoch fill in speed, course and position error on that fix.
+
+NMEAReader reads the port without blocking from an asyncio event loop,
+so guidance, logging and display code can run alongside it.
+"""
+
+import sys
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except ImportError:
+    SERIAL_AVAILABLE = False
+
+
+KNOTS_TO_MPS = 0.514444
+
+FIX_QUALITY = {
+    0: "No Fix",
+    1: "GPS",
+    2: "DGPS",
+    3: "PPS",
+    4: "RTK",
+    5: "Float RTK",
+    6: "Estimated",
+    7: "Manual",
+    8: "Simulation"
+}
+
+# One row per fix; utc is seconds since midnight UTC, received is the
+# system clock when the fix arrived (NaN when replaying a file)
+FIX_DTYPE = np.dtype([
+    ('received', 'f8'),
+    ('utc', 'f8'),
+    ('lat', 'f8'),
+    ('lon', 'f8'),
+    ('alt', 'f4'),
+    ('quality', 'i1'),
+    ('satellites', 'i1'),
+    ('hdop', 'f4'),
+    ('speed', 'f4'),
+    ('course', 'f4'),
+    ('sigma_lat', 'f4'),
+    ('sigma_lon', 'f4'),
+    ('sigma_alt', 'f4'),
+])
+
+
+def nmea_checksum(body):
+    """XOR checksum of the characters between '$' and '*'
+
+    Args:
+        body: Sentence body as bytes or str
+
+    Returns:
+        int: Checksum
+    """
+    if isinstance(body, str):
+        body = body.encode('ascii', errors='ignore')
+    checksum = 0
+    for byte in body:
+        checksum ^= byte
+    return checksum
+
+
+def split_sentence(line, require_checksum=True):
+    """Validate an NMEA sentence and split it into fields
+
+    Args:
+        line: Sentence as str, with or without line ending
+        require_checksum: Reject sentences without a '*hh' checksum
+
+    Returns:
+        tuple: (talker, sentence_type, fields) or None if invalid; fields[0]
+        is the address, e.g. 'GNGGA'
+    """
+    line = line.strip()
+    if len(line) < 7 or line[0] not in '$!':
+        return None
+
+    star = line.rfind('*')
+    if star >= 0:
+        body = line[1:star]
+        try:
+            if int(line[star + 1:star + 3], 16) != nmea_checksum(body):
+                return None
+        except ValueError:
+            return None
+    elif require_checksum:
+        return None
+    else:
+        body = line[1:]
+
+    fields = body.split(',')
+    address = fields[0]
+    if len(address) < 5:
+        return None
+    if address[0] == 'P':
+        # Proprietary sentence ($PUBX, $PSTI, ...)
+        return 'P', address[1:], fields
+    return address[:2], address[2:], fields
+
+
+def parse_coordinate(value, hemisphere):
+    """Convert NMEA ddmm.mmmm / dddmm.mmmm to signed decimal degrees
+
+    Args:
+        value: Coordinate field
+        hemisphere: 'N', 'S', 'E' or 'W'
+
+    Returns:
+        float: Decimal degrees, NaN when empty
+    """
+    if not value:
+        return float('nan')
+    raw = float(value)
+    degrees = int(raw // 100)
+    decimal = degrees + (raw - degrees * 100) / 60.0
+    return -decimal if hemisphere in ('S', 'W') else decimal
+
+
+def parse_time(value):
+    """Convert NMEA hhmmss.ss to seconds since midnight
+
+    Args:
+        value: Time field
+
+    Returns:
+        float: Seconds of day, NaN when empty
+    """
+    if len(value) < 6:
+        return float('nan')
+    return int(value[0:2]) * 3600 + int(value[2:4]) * 60 + float(value[4:])
+
+
+def _float(value, default=float('nan')):
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def _int(value, default=0):
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+class FixBuffer:
+    """Preallocated ring buffer of fixes"""
+
+    def __init__(self, capacity=72000):
+        """Initialize fix buffer
+
+        Args:
+            capacity: Number of fixes kept (default one hour at 20 Hz)
+        """
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=FIX_DTYPE)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, values):
+        """Add a fix, overwriting the oldest when full
+
+        Args:
+            values: Tuple in FIX_DTYPE field order
+        """
+        self.data[self.count % self.capacity] = values
+        self.count += 1
+
+    def update_last(self, **values):
+        """Set fields on the most recent fix
+
+        Args:
+            **values: Field names and values
+        """
+        if self.count == 0:
+            return
+        row = (self.count - 1) % self.capacity
+        for name, value in values.items():
+            self.data[name][row] = value
+
+    def last(self):
+        """Most recent fix
+
+        Returns:
+            numpy.void: Fix record or None when empty
+        """
+        if self.count == 0:
+            return None
+        return self.data[(self.count - 1) % self.capacity].copy()
+
+    def latest(self, n=None):
+        """Most recent fixes, oldest first
+
+        Args:
+            n: Number of fixes (default all buffered)
+
+        Returns:
+            numpy.ndarray: Fix records (a copy)
+        """
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        return self.data[np.arange(self.count - n, self.count) % self.capacity]
+
+
+class NMEAParser:
+    """Parse NMEA sentences into fixes, satellite and accuracy state"""
+
+    def __init__(self, capacity=72000, require_checksum=True):
+        """Initialize parser
+
+        Args:
+            capacity: Ring buffer size in fixes
+            require_checksum: Reject sentences without a checksum
+        """
+        self.fixes = FixBuffer(capacity)
+        self.require_checksum = require_checksum
+        self.counts = {}
+        self.checksum_errors = 0
+        self.partial = b''
+
+        # Latest values, carried onto the next fix
+        self.date = None
+        self.speed = float('nan')
+        self.course = float('nan')
+        self.sigma = (float('nan'), float('nan'), float('nan'))
+        self.fix_mode = None  # GSA: 1 = none, 2 = 2D, 3 = 3D
+        self.pdop = None
+        self.vdop = None
+        self.satellites_used = {}
+        self.satellites_in_view = {}
+        self._gsv = {}
+        self._epoch_utc = None
+
+        self.handlers = {
+            'GGA': self.process_gga,
+            'RMC': self.process_rmc,
+            'GSA': self.process_gsa,
+            'GSV': self.process_gsv,
+            'VTG': self.process_vtg,
+            'GST': self.process_gst,
+        }
+
+    def feed(self, data, received=None):
+        """Parse a chunk of raw receiver output
+
+        Args:
+            data: Bytes as read from the port; partial lines are kept
+            received: Arrival time (default now; NaN for recorded data)
+
+        Returns:
+            int: Number of new fixes
+        """
+        if received is None:
+            received = time.time()
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        before = self.fixes.count
+        for line in lines:
+            self.parse_line(line.decode('ascii', errors='ignore'), received)
+        return self.fixes.count - before
+
+    def parse_line(self, line, received=None):
+        """Parse one sentence
+
+        Args:
+            line: NMEA sentence
+            received: Arrival time (default now)
+
+        Returns:
+            str: Sentence type (e.g. 'GGA') or None if invalid or unsupported
+        """
+        parsed = split_sentence(line, self.require_checksum)
+        if parsed is None:
+            if '*' in line:
+                self.checksum_errors += 1
+            return None
+
+        talker, sentence_type, fields = parsed
+        self.counts[sentence_type] = self.counts.get(sentence_type, 0) + 1
+        handler = self.handlers.get(sentence_type)
+        if handler is None:
+            return None
+        try:
+            handler(talker, fields, time.time() if received is None else received)
+        except (ValueError, IndexError):
+            return None
+        return sentence_type
+
+    def _add_fix(self, received, utc, lat, lon, alt=float('nan'), quality=0,
+                 satellites=0, hdop=float('nan')):
+        self._epoch_utc = utc
+        self.fixes.append((received, utc, lat, lon, alt, quality, satellites, hdop,
+                           self.speed, self.course) + self.sigma)
+
+    def _same_epoch(self, utc):
+        if self.fixes.count == 0 or self._epoch_utc is None:
+            return False
+        return bool(np.isnan(utc) or abs(utc - self._epoch_utc) < 1e-3)
+
+    def process_gga(self, talker, fields, received):
+        """GGA: time, position, fix quality, satellites, HDOP, altitude"""
+        if len(fields) < 10:
+            return
+        quality = _int(fields[6])
+        lat = parse_coordinate(fields[2], fields[3]) if quality else float('nan')
+        lon = parse_coordinate(fields[4], fields[5]) if quality else float('nan')
+        self._add_fix(received, parse_time(fields[1]), lat, lon,
+                      alt=_float(fields[9]), quality=quality,
+                      satellites=_int(fields[7]), hdop=_float(fields[8]))
+
+    def process_rmc(self, talker, fields, received):
+        """RMC: time, date, validity, position, speed and course"""
+        if len(fields) < 10:
+            return
+        utc = parse_time(fields[1])
+        if len(fields[9]) == 6:
+            self.date = (2000 + int(fields[9][4:6]), int(fields[9][2:4]), int(fields[9][0:2]))
+        valid = fields[2] == 'A'
+        self.speed = _float(fields[7]) * KNOTS_TO_MPS if valid else float('nan')
+        self.course = _float(fields[8]) if valid else float('nan')
+
+        if self.counts.get('GGA'):
+            if self._same_epoch(utc):
+                self.fixes.update_last(speed=self.speed, course=self.course)
+        else:
+            # Receiver without GGA output: RMC carries the fix
+            self._add_fix(received, utc,
+                          parse_coordinate(fields[3], fields[4]) if valid else float('nan'),
+                          parse_coordinate(fields[5], fields[6]) if valid else float('nan'),
+                          quality=1 if valid else 0)
+
+    def process_gsa(self, talker, fields, received):
+        """GSA: 2D/3D mode, satellites used and DOP"""
+        if len(fields) < 18:
+            return
+        self.fix_mode = _int(fields[2])
+        system = fields[18] if len(fields) > 18 and fields[18] else talker
+        self.satellites_used[system] = [int(prn) for prn in fields[3:15] if prn]
+        self.pdop = _float(fields[15], None)
+        self.vdop = _float(fields[17], None)
+
+    def process_gsv(self, talker, fields, received):
+        """GSV: satellites in view, sent as a numbered group of sentences"""
+        if len(fields) < 4:
+            return
+        total, number = int(fields[1]), int(fields[2])
+        groups = (len(fields) - 4) // 4
+        signal = fields[4 + groups * 4] if len(fields) > 4 + groups * 4 else ''
+        key = (talker, signal)
+        if number == 1:
+            self._gsv[key] = []
+        satellites = self._gsv.setdefault(key, [])
+        for i in range(groups):
+            prn, elevation, azimuth, snr = fields[4 + i * 4:8 + i * 4]
+            if prn:
+                satellites.append((int(prn), _int(elevation, None), _int(azimuth, None), _int(snr, None)))
+        if number == total:
+            self.satellites_in_view[key] = self._gsv.pop(key)
+
+    def process_vtg(self, talker, fields, received):
+        """VTG: course and speed over ground"""
+        if len(fields) < 8:
+            return
+        if len(fields) > 9 and fields[9] == 'N':
+            # Mode indicator: data not valid
+            return
+        self.course = _float(fields[1])
+        kmh = _float(fields[7])
+        self.speed = kmh / 3.6 if not np.isnan(kmh) else _float(fields[5]) * KNOTS_TO_MPS
+        if self._same_epoch(float('nan')):
+            self.fixes.update_last(speed=self.speed, course=self.course)
+
+    def process_gst(self, talker, fields, received):
+        """GST: position error statistics (1-sigma, meters)"""
+        if len(fields) < 9:
+            return
+        self.sigma = (_float(fields[6]), _float(fields[7]), _float(fields[8]))
+        if self._same_epoch(parse_time(fields[1])):
+            self.fixes.update_last(sigma_lat=self.sigma[0], sigma_lon=self.sigma[1],
+                                   sigma_alt=self.sigma[2])
+
+    def satellites_in_view_count(self):
+        """Satellites in view across constellations (each counted once)"""
+        seen = set()
+        for (talker, _), satellites in self.satellites_in_view.items():
+            seen.update((talker, sat[0]) for sat in satellites)
+        return len(seen)
+
+    def timestamp(self, fix):
+        """UTC datetime of a fix, using the date from the last RMC
+
+        Args:
+            fix: Fix record
+
+        Returns:
+            datetime: Timestamp or None without a date
+        """
+        if self.date is None or np.isnan(fix['utc']):
+            return None
+        midnight = datetime(*self.date, tzinfo=timezone.utc).timestamp()
+        return datetime.fromtimestamp(midnight + float(fix['utc']), tz=timezone.utc)
+
+    def stats(self, window=None):
+        """Fix-rate and latency statistics over the buffered fixes
+
+        Latency is the system clock at arrival minus the fix time, so it
+        includes receiver processing and transport but assumes the system
+        clock is synchronised (NTP, or GPS-disciplined).
+
+        Args:
+            window: Number of most recent fixes (default all buffered)
+
+        Returns:
+            dict: sentences, checksum_errors, fixes, fix_rate_hz,
+            max_interval_s, latency_mean_ms, latency_p95_ms
+        """
+        fixes = self.fixes.latest(window)
+        result = {
+            'sentences': sum(self.counts.values()),
+            'counts': dict(self.counts),
+            'checksum_errors': self.checksum_errors,
+            'fixes': self.fixes.count,
+            'fix_rate_hz': None,
+            'max_interval_s': None,
+            'latency_mean_ms': None,
+            'latency_p95_ms': None,
+        }
+        utc = fixes['utc'][np.isfinite(fixes['utc'])]
+        if len(utc) > 1:
+            intervals = np.diff(utc)
+            intervals[intervals < -43200] += 86400  # Midnight rollover
+            intervals = intervals[intervals > 0]
+            if len(intervals):
+                result['fix_rate_hz'] = float(1.0 / np.median(intervals))
+                result['max_interval_s'] = float(intervals.max())
+
+        live = np.isfinite(fixes['received']) & np.isfinite(fixes['utc'])
+        if live.any():
+            latency = (fixes['received'][live] % 86400) - fixes['utc'][live]
+            latency = (latency + 43200) % 86400 - 43200
+            result['latency_mean_ms'] = float(latency.mean() * 1000)
+            result['latency_p95_ms'] = float(np.percentile(latency, 95) * 1000)
+        return result
+
+
+class NMEAReader:
+    """Non-blocking NMEA reader for an asyncio event loop"""
+
+    def __init__(self, parser=None, port='/dev/ttyUSB0', baudrate=9600, nmea_file=None):
+        """Initialize reader
+
+        Args:
+            parser: NMEAParser to feed (a new one by default)
+            port: Serial port or pseudo-terminal
+            baudrate: Serial baud rate
+            nmea_file: Recorded NMEA log to replay instead of the port
+        """
+        self.parser = parser or NMEAParser()
+        self.port = port
+        self.baudrate = baudrate
+        self.nmea_file = nmea_file
+        self.serial_conn = None
+        self.fd = None
+
+    def open(self):
+        """Open the port in non-blocking mode (no-op when replaying a file)"""
+        if self.nmea_file:
+            if not os.path.exists(self.nmea_file):
+                raise FileNotFoundError(self.nmea_file)
+            return
+        if SERIAL_AVAILABLE:
+            self.serial_conn = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=0)
+            self.fd = self.serial_conn.fileno()
+        else:
+            # Without pyserial the port must already be configured (e.g. a pty)
+            self.fd = os.open(self.port, os.O_RDONLY | os.O_NONBLOCK | os.O_NOCTTY)
+
+    def close(self):
+        """Close the port"""
+        if self.serial_conn is not None:
+            self.serial_conn.close()
+        elif self.fd is not None:
+            os.close(self.fd)
+        self.serial_conn = None
+        self.fd = None
+
+    async def run(self, duration=None, on_fix=None, realtime=False):
+        """Read until the duration elapses, the file ends or the task is cancelled
+
+        Args:
+            duration: Seconds to read (default until cancelled or end of file)
+            on_fix: Called with each new fix record
+            realtime: When replaying a file, pace fixes by their timestamps
+
+        Returns:
+            int: Number of fixes read
+        """
+        start = self.parser.fixes.count
+        if self.nmea_file:
+            await self._replay(duration, on_fix, realtime)
+        else:
+            await self._read_port(duration, on_fix)
+        return self.parser.fixes.count - start
+
+    def _dispatch(self, new, on_fix):
+        if on_fix is None or new == 0:
+            return
+        for fix in self.parser.fixes.latest(min(new, self.parser.fixes.capacity)):
+            on_fix(fix)
+
+    async def _read_port(self, duration, on_fix):
+        loop = asyncio.get_running_loop()
+        if self.fd is None:
+            self.open()
+        closed = loop.create_future()
+
+        def readable():
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # Pseudo-terminal with no writer left, or device unplugged
+                if not closed.done():
+                    closed.set_exception(e)
+                return
+            if not data:
+                if not closed.done():
+                    closed.set_result(None)
+                return
+            self._dispatch(self.parser.feed(data), on_fix)
+
+        loop.add_reader(self.fd, readable)
+        try:
+            await asyncio.wait_for(closed, timeout=duration)
+        except asyncio.TimeoutError:
+            pass
+        except OSError:
+            pass
+        finally:
+            loop.remove_reader(self.fd)
+
+    async def _replay(self, duration, on_fix, realtime):
+        loop = asyncio.get_running_loop()
+        deadline = None if duration is None else loop.time() + duration
+        nan = float('nan')
+        previous_utc = None
+        with open(self.nmea_file, 'rb') as f:
+            for data in iter(lambda: f.read(65536), b''):
+                if realtime:
+                    # Feed line by line so fixes arrive at the recorded rate
+                    for line in data.splitlines(keepends=True):
+                        new = self.parser.feed(line, nan)
+                        if new:
+                            utc = float(self.parser.fixes.last()['utc'])
+                            if previous_utc is not None and 0 < utc - previous_utc < 60:
+                                await asyncio.sleep(utc - previous_utc)
+                            previous_utc = utc
+                            self._dispatch(new, on_fix)
+                        if deadline is not None and loop.time() >= deadline:
+                            return
+                else:
+                    self._dispatch(self.parser.feed(data, nan), on_fix)
+                    await asyncio.sleep(0)
+                if deadline is not None and loop.time() >= deadline:
+                    return
+            self._dispatch(self.parser.feed(b'\n', nan), on_fix)
+
+
+def format_fix(fix):
+    """One-line summary of a fix"""
+    fix_text = FIX_QUALITY.get(int(fix['quality']), "Unknown")
+    lat = f"{fix['lat']:.7f}" if np.isfinite(fix['lat']) else "N/A"
+    lon = f"{fix['lon']:.7f}" if np.isfinite(fix['lon']) else "N/A"
+    hdop = f"{fix['hdop']:.1f}" if np.isfinite(fix['hdop']) else "N/A"
+    speed = f"{fix['speed'] * 3.6:.1f}" if np.isfinite(fix['speed']) else "N/A"
+    sigma = np.hypot(fix['sigma_lat'], fix['sigma_lon'])
+    sigma_text = f"{sigma:.3f}" if np.isfinite(sigma) else "N/A"
+    return f"{fix_text:<10} {int(fix['satellites']):<5} {hdop:<6} {lat:<13} {lon:<14} {speed:<7} {sigma_text}"
+
+
+def print_stats(parser):
+    """Print stream statistics"""
+    stats = parser.stats()
+    counts = ', '.join(f"{name} {count}" for name, count in sorted(stats['counts'].items()))
+    print(f"Sentences: {stats['sentences']} ({counts})")
+    print(f"Checksum errors: {stats['checksum_errors']}")
+    print(f"Fixes: {stats['fixes']}")
+    if stats['fix_rate_hz']:
+        print(f"Fix rate: {stats['fix_rate_hz']:.1f} Hz (longest gap {stats['max_interval_s']:.2f}s)")
+    if stats['latency_mean_ms'] is not None:
+        print(f"Latency: {stats['latency_mean_ms']:.0f} ms mean, {stats['latency_p95_ms']:.0f} ms p95")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Read and parse an NMEA stream from a GNSS receiver'
+    )
+    parser.add_argument('--port', default=os.getenv('GPS_PORT', '/dev/ttyUSB0'),
+                        help='Serial port or pseudo-terminal (default: GPS_PORT or /dev/ttyUSB0)')
+    parser.add_argument('--baudrate', type=int, default=int(os.getenv('GPS_BAUDRATE', '9600')),
+                        help='Serial baud rate (default: GPS_BAUDRATE or 9600)')
+    parser.add_argument('--nmea-file', help='Replay a recorded NMEA log instead of the port')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Replay the log at its recorded rate')
+    parser.add_argument('--duration', type=float, help='Seconds to read (default: until end or Ctrl-C)')
+    parser.add_argument('--every', type=int, default=0,
+                        help='Print every Nth fix (default: 0, statistics only)')
+
+    args = parser.parse_args()
+
+    reader = NMEAReader(port=args.port, baudrate=args.baudrate, nmea_file=args.nmea_file)
+    try:
+        reader.open()
+    except (OSError, ValueError) as e:
+        print(f"✗ Failed to open NMEA source: {e}")
+        return 1
+
+    seen = [0]
+
+    def print_every(fix):
+        seen[0] += 1
+        if seen[0] % args.every == 0:
+            print(format_fix(fix))
+
+    on_fix = print_every if args.every > 0 else None
+    if on_fix:
+        print(f"{'Fix':<10} {'Sats':<5} {'HDOP':<6} {'Lat':<13} {'Lon':<14} {'km/h':<7} {'Sigma m'}")
+
+    try:
+        asyncio.run(reader.run(duration=args.duration, on_fix=on_fix, realtime=args.realtime))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+    print_stats(reader.parser)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
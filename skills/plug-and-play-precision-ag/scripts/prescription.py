@@ -1,15 +1,974 @@
 #!/usr/bin/env python3
 """
-Prescription Map Creator (Stub)
-Full implementation would create variable rate prescription maps
+Prescription Map Creator for Plug-and-Play Precision Agriculture
+Create variable rate prescriptions from zone rasters and rate rules
+
+A prescription is built on a regular grid anchored on the field centroid
+(the same grid yield_map.py uses, so yield rasters line up cell for cell):
+
+1. A value raster is sampled for the field: relative yield averaged over
+   the seasons on record, or soil test / imagery samples interpolated from
+   a CSV, or any raster saved by yield_map.py --output-format npz.
+2. Cells whose centers fall outside the field boundary are dropped, gaps
+   are filled from neighbouring cells and the values are smoothed.
+3. A rate rule gives every cell a rate: quantile zones with one rate per
+   zone, or a linear response clipped to a range and rounded to a step.
+4. Cells with the same rate are dissolved into management-zone polygons.
+
+Zones are stored as GeoJSON in prescriptions.zones_data together with a
+hash of the inputs; a field whose boundary, source data and rules have not
+changed is not recomputed. Fields are processed in parallel across worker
+processes. Prescriptions export as ISO 11783-10 TASKDATA.XML treatment
+zones, ESRI shapefiles or GeoJSON.
 """
 
 import sys
+import argparse
+import csv
+import hashlib
+import json
+import os
+import struct
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from geometry import M2_PER_ACRE, boundary_rings, local_latlon, local_xy, points_in_rings
+from yield_map import DEFAULT_CELL_SIZE, YieldMapGenerator, sources_hash
+from yield_processor import COLUMN_ALIASES
+
+
+SAMPLE_MARGIN = 400.0  # metres around a field within which samples are used
+
+# Rate unit: (ISO 11783-11 DDI of the setpoint, factor to DDI units, area unit in m2)
+RATE_UNITS = {
+    'seeds/ac': ('000B', 1000.0 / M2_PER_ACRE, M2_PER_ACRE),        # 0.001 seeds/m2
+    'seeds/ha': ('000B', 1000.0 / 10000.0, 10000.0),
+    'lb/ac': ('0006', 453592.37 / M2_PER_ACRE, M2_PER_ACRE),        # mg/m2
+    'kg/ha': ('0006', 1e6 / 10000.0, 10000.0),
+    'gal/ac': ('0001', 3785411.784 / M2_PER_ACRE, M2_PER_ACRE),     # mm3/m2
+    'l/ha': ('0001', 1e6 / 10000.0, 10000.0),
+}
+
+DEFAULT_RATE_UNITS = {
+    'seed': 'seeds/ac',
+    'fertilizer': 'lb/ac',
+    'lime': 'lb/ac',
+    'chemical': 'gal/ac',
+}
+
+# Columns added to prescriptions on databases created before they existed
+PRESCRIPTION_COLUMNS = {
+    'rate_unit': 'TEXT',
+    'source': 'TEXT',
+    'input_hash': 'TEXT',
+    'acres': 'REAL',
+    'total_product': 'REAL',
+}
+
+WGS84_PRJ = ('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+             'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]')
+
+
+def _box(grid):
+    """Sum of each cell and its eight neighbours"""
+    padded = np.pad(grid, 1)
+    rows, cols = grid.shape
+    return sum(padded[i:i + rows, j:j + cols] for i in range(3) for j in range(3))
+
+
+def fill_gaps(grid, mask):
+    """Fill empty cells inside mask with the mean of their filled neighbours, growing inwards"""
+    grid = np.where(mask, grid, np.nan)
+    for _ in range(sum(grid.shape)):
+        valid = np.isfinite(grid)
+        missing = mask & ~valid
+        if not missing.any() or not valid.any():
+            break
+        total = _box(np.where(valid, grid, 0.0))
+        count = _box(valid.astype('f8'))
+        fill = missing & (count > 0)
+        grid[fill] = total[fill] / count[fill]
+    return grid
+
+
+def smooth_grid(grid, mask, iterations=1):
+    """3x3 mean filter over the cells inside mask"""
+    for _ in range(iterations):
+        valid = np.isfinite(grid) & mask
+        total = _box(np.where(valid, grid, 0.0))
+        count = _box(valid.astype('f8'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            grid = np.where(valid, total / count, np.nan)
+    return grid
+
+
+def idw(sample_x, sample_y, values, x, y, power=2.0, chunk=4096):
+    """Inverse distance weighted interpolation at (x, y) from samples"""
+    result = np.empty(len(x))
+    for start in range(0, len(x), chunk):
+        dx = x[start:start + chunk, None] - sample_x[None, :]
+        dy = y[start:start + chunk, None] - sample_y[None, :]
+        weights = 1.0 / np.maximum(dx * dx + dy * dy, 1e-6) ** (power / 2)
+        result[start:start + chunk] = weights @ values / weights.sum(axis=1)
+    return result
+
+
+def sample_raster(raster, lat, lon):
+    """Nearest cell value of a yield_map raster at each lat/lon (NaN off the grid)"""
+    grid = raster['grid']
+    rows, cols = grid.shape
+    x, y = local_xy(lat, lon, raster['origin_lat'], raster['origin_lon'])
+    col = np.floor((x - raster['x0']) / raster['cell_size']).astype(np.int64)
+    row = rows - 1 - np.floor((y - raster['y0']) / raster['cell_size']).astype(np.int64)
+    on_grid = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+    values = np.full(np.shape(lat), np.nan)
+    values[on_grid] = grid[row[on_grid], col[on_grid]]
+    return values
+
+
+def read_samples(path, value_column):
+    """Read lat, lon and a value column from a soil test or imagery CSV
+
+    Returns:
+        tuple: (lat, lon, value) arrays
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        rows = [row for row in reader if row]
+
+    def column(names):
+        for name in names:
+            if name in header:
+                return header.index(name)
+        raise ValueError(f"Missing column: {names[0]}")
+
+    index = [column(COLUMN_ALIASES['lat']), column(COLUMN_ALIASES['lon']), column([value_column.lower()])]
+    data = np.array([[row[i] if row[i].strip() else 'nan' for i in index] for row in rows], dtype='f8')
+    data = data[np.isfinite(data).all(axis=1)]
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+class FieldGrid:
+    """Grid over a field boundary, aligned with the yield raster grid"""
+
+    def __init__(self, boundary, cell_size, origin_lat=None, origin_lon=None):
+        rings = boundary_rings(boundary)
+        lon = np.concatenate([np.asarray(ring, dtype='f8')[:, 0] for ring in rings])
+        lat = np.concatenate([np.asarray(ring, dtype='f8')[:, 1] for ring in rings])
+        self.origin_lat = float(lat.mean()) if origin_lat is None else origin_lat
+        self.origin_lon = float(lon.mean()) if origin_lon is None else origin_lon
+        self.cell_size = cell_size
+
+        xy_rings = []
+        for ring in rings:
+            ring = np.asarray(ring, dtype='f8')
+            xy_rings.append(local_xy(ring[:, 1], ring[:, 0], self.origin_lat, self.origin_lon))
+        x_all = np.concatenate([xs for xs, _ in xy_rings])
+        y_all = np.concatenate([ys for _, ys in xy_rings])
+
+        self.x0 = float(np.floor(x_all.min() / cell_size) * cell_size)
+        self.y0 = float(np.floor(y_all.min() / cell_size) * cell_size)
+        self.cols = int(np.ceil((x_all.max() - self.x0) / cell_size)) or 1
+        self.rows = int(np.ceil((y_all.max() - self.y0) / cell_size)) or 1
+
+        x = self.x0 + (np.arange(self.cols) + 0.5) * cell_size
+        y = self.y0 + (self.rows - np.arange(self.rows) - 0.5) * cell_size
+        self.x, self.y = np.meshgrid(x, y)
+        self.lat, self.lon = local_latlon(self.x, self.y, self.origin_lat, self.origin_lon)
+        self.mask = points_in_rings(self.x, self.y, xy_rings)
+
+    def to_latlon(self, i, j):
+        """Grid vertex (column i, row j counted from the south edge) to lat/lon"""
+        return local_latlon(self.x0 + np.asarray(i) * self.cell_size,
+                            self.y0 + np.asarray(j) * self.cell_size,
+                            self.origin_lat, self.origin_lon)
+
+
+def classify(values, mask, rule):
+    """Rate per cell from a rate rule
+
+    Args:
+        values: Value grid
+        mask: Cells inside the field
+        rule: {'type': 'zones', 'rates': [...], 'breaks': [...] (optional)} or
+              {'type': 'linear', 'intercept', 'slope', 'min_rate', 'max_rate', 'step'}
+
+    Returns:
+        tuple: (zone grid with 0 outside the field, rate per zone starting at zone 1)
+    """
+    inside = mask & np.isfinite(values)
+    zones = np.zeros(values.shape, dtype=np.int32)
+    if not inside.any():
+        return zones, np.zeros(0)
+
+    if rule['type'] == 'zones':
+        rates = np.asarray(rule['rates'], dtype='f8')
+        breaks = rule.get('breaks')
+        if breaks is None:
+            breaks = np.quantile(values[inside], np.linspace(0, 1, len(rates) + 1)[1:-1])
+        zones[inside] = np.digitize(values[inside], breaks) + 1
+        return zones, rates
+
+    rate = rule['intercept'] + rule['slope'] * values[inside]
+    rate = np.clip(rate, rule.get('min_rate', -np.inf), rule.get('max_rate', np.inf))
+    step = rule.get('step') or 0
+    if step:
+        rate = np.round(rate / step) * step
+    rates, inverse = np.unique(rate, return_inverse=True)
+    zones[inside] = inverse.ravel() + 1
+    return zones, rates
+
+
+# Directed cell edges, counter-clockwise around each cell (interior on the left):
+# (row offset of the neighbour, column offset, start vertex, direction)
+_EDGES = [
+    (1, 0, (0, 0), 0),    # south side, heading east
+    (0, 1, (1, 0), 1),    # east side, heading north
+    (-1, 0, (1, 1), 2),   # north side, heading west
+    (0, -1, (0, 1), 3),   # west side, heading south
+]
+_STEPS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+
+def dissolve(zones):
+    """Trace the outline of every zone in a zone grid
+
+    Cells sharing a zone are merged; outer rings come out counter-clockwise
+    and holes clockwise, in grid vertex coordinates (column, row from the
+    south edge). Cells touching only at a corner stay separate polygons.
+
+    Args:
+        zones: Integer grid, 0 for no zone
+
+    Returns:
+        dict: zone -> list of polygons, each [outer ring, hole rings...]
+    """
+    rows, cols = zones.shape
+    padded = np.pad(zones, 1)
+    r, c = np.nonzero(zones)
+    zone_of = zones[r, c]
+
+    starts, dirs, labels = [], [], []
+    for dr, dc, (vi, vj), direction in _EDGES:
+        boundary = padded[r + 1 + dr, c + 1 + dc] != zone_of
+        starts.append(np.stack([c[boundary] + vi, rows - r[boundary] - 1 + vj], axis=1))
+        dirs.append(np.full(boundary.sum(), direction))
+        labels.append(zone_of[boundary])
+    starts = np.concatenate(starts)
+    dirs = np.concatenate(dirs)
+    labels = np.concatenate(labels)
+
+    result = {}
+    for zone in np.unique(labels):
+        selected = labels == zone
+        rings = _trace_rings(starts[selected], dirs[selected])
+        result[int(zone)] = _nest_rings(rings)
+    return result
+
+
+def _trace_rings(starts, dirs):
+    """Chain directed edges into closed rings, turning left at shared corners"""
+    outgoing = {}
+    for k, (vertex, direction) in enumerate(zip(map(tuple, starts.tolist()), dirs.tolist())):
+        outgoing.setdefault(vertex, {})[direction] = k
+    used = np.zeros(len(dirs), dtype=bool)
+    rings = []
+
+    for first in range(len(dirs)):
+        if used[first]:
+            continue
+        ring = []
+        k = first
+        while True:
+            used[k] = True
+            vertex = tuple(starts[k])
+            direction = int(dirs[k])
+            ring.append((vertex, direction))
+            step = _STEPS[direction]
+            end = (vertex[0] + step[0], vertex[1] + step[1])
+            options = outgoing.get(end, {})
+            k = None
+            for turn in (1, 0, 3):
+                candidate = options.get((direction + turn) % 4)
+                if candidate is not None and (not used[candidate] or candidate == first):
+                    k = candidate
+                    break
+            if k is None or k == first:
+                break
+        # A ring that passes a corner twice (cells of another zone meeting
+        # diagonally) is split there into simple rings
+        loop, seen = [], {}
+        for edge in ring:
+            if edge[0] in seen:
+                start = seen[edge[0]]
+                for vertex, _ in loop[start:]:
+                    del seen[vertex]
+                rings.append(_corners(loop[start:]))
+                del loop[start:]
+            seen[edge[0]] = len(loop)
+            loop.append(edge)
+        rings.append(_corners(loop))
+    return rings
+
+
+def _corners(edges):
+    """Closed ring of the vertices where direction changes"""
+    corners = [vertex for i, (vertex, direction) in enumerate(edges) if direction != edges[i - 1][1]]
+    corners.append(corners[0])
+    return corners
+
+
+def _ring_contains(xs, ys, px, py):
+    """Even-odd test of one point against one closed ring"""
+    x1, y1, x2, y2 = xs[:-1], ys[:-1], xs[1:], ys[1:]
+    crosses = (y1 > py) != (y2 > py)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = (x2 - x1) * (py - y1) / (y2 - y1) + x1
+    return bool(np.count_nonzero(crosses & (px < x_cross)) % 2)
+
+
+def _nest_rings(rings):
+    """Group holes (clockwise) under the smallest outer ring containing them"""
+    arrays = [np.array(ring, dtype='f8') for ring in rings]
+    areas = [0.5 * float(np.sum(a[:-1, 0] * a[1:, 1] - a[1:, 0] * a[:-1, 1])) for a in arrays]
+    outers = [i for i, area in enumerate(areas) if area > 0]
+    polygons = {i: [rings[i]] for i in outers}
+    boxes = np.array([[*arrays[i].min(axis=0), *arrays[i].max(axis=0)] for i in outers]).reshape(-1, 4)
+
+    for k, area in enumerate(areas):
+        if area >= 0:
+            continue
+        # Center of the zone cell to the left of the hole's first edge
+        (x1, y1), (x2, y2) = rings[k][0], rings[k][1]
+        dx, dy = np.sign(x2 - x1), np.sign(y2 - y1)
+        px, py = x1 + 0.5 * (dx - dy), y1 + 0.5 * (dy + dx)
+        candidates = np.flatnonzero((boxes[:, 0] < px) & (boxes[:, 2] > px) &
+                                    (boxes[:, 1] < py) & (boxes[:, 3] > py))
+        containing = [outers[c] for c in candidates
+                      if _ring_contains(arrays[outers[c]][:, 0], arrays[outers[c]][:, 1], px, py)]
+        if containing:
+            polygons[min(containing, key=lambda i: areas[i])].append(rings[k])
+    return list(polygons.values())
+
+
+def zone_features(grid, zones, rates, values, dissolved):
+    """GeoJSON features, one MultiPolygon per zone, in lon/lat"""
+    cell_acres = grid.cell_size ** 2 / M2_PER_ACRE
+    features = []
+    for zone, polygons in sorted(dissolved.items()):
+        in_zone = zones == zone
+        coordinates = []
+        for polygon in polygons:
+            rings = []
+            for ring in polygon:
+                i, j = np.array(ring, dtype='f8').T
+                lat, lon = grid.to_latlon(i, j)
+                rings.append([[round(float(a), 8), round(float(b), 8)] for a, b in zip(lon, lat)])
+            coordinates.append(rings)
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'MultiPolygon', 'coordinates': coordinates},
+            'properties': {
+                'zone': zone,
+                'rate': round(float(rates[zone - 1]), 4),
+                'acres': round(float(in_zone.sum() * cell_acres), 3),
+                'value_min': round(float(np.nanmin(values[in_zone])), 4),
+                'value_max': round(float(np.nanmax(values[in_zone])), 4),
+            },
+        })
+    return features
+
+
+def source_values(grid, field_id, spec, db_path, data_path):
+    """Value grid for a field from the prescription source
+
+    Returns:
+        numpy.ndarray: Values per cell (NaN where there is no data)
+    """
+    source = spec['source']
+    if source == 'yield':
+        # Relative yield (cell / field mean) averaged over seasons
+        generator = YieldMapGenerator(db_path, data_path)
+        if not generator.connect():
+            raise RuntimeError('Could not open database')
+        try:
+            seasons = spec.get('seasons') or generator.seasons(field_id)
+            layers = []
+            for season in seasons:
+                raster = generator.raster(field_id, season, grid.cell_size)
+                if raster is None:
+                    continue
+                values = sample_raster(raster, grid.lat, grid.lon)
+                mean = np.nanmean(values[grid.mask]) if np.isfinite(values[grid.mask]).any() else np.nan
+                if mean > 0:
+                    layers.append(values / mean)
+        finally:
+            generator.disconnect()
+        if not layers:
+            return np.full(grid.mask.shape, np.nan)
+        with np.errstate(invalid='ignore'):
+            stack = np.stack(layers)
+            count = np.isfinite(stack).sum(axis=0)
+            return np.where(count > 0, np.nansum(stack, axis=0) / np.maximum(count, 1), np.nan)
+
+    if source == 'raster':
+        return sample_raster(YieldMapGenerator.load(spec['source_file']), grid.lat, grid.lon)
+
+    # Point samples: interpolate sparse samples, bin dense ones
+    lat, lon, value = read_samples(spec['source_file'], spec.get('value_column', 'value'))
+    x, y = local_xy(lat, lon, grid.origin_lat, grid.origin_lon)
+    # Samples from a farm-wide file: keep those near this field
+    near = ((x > grid.x0 - SAMPLE_MARGIN) & (x < grid.x0 + grid.cols * grid.cell_size + SAMPLE_MARGIN) &
+            (y > grid.y0 - SAMPLE_MARGIN) & (y < grid.y0 + grid.rows * grid.cell_size + SAMPLE_MARGIN))
+    if near.sum() >= 3:
+        x, y, value = x[near], y[near], value[near]
+    values = np.full(grid.mask.shape, np.nan)
+    if len(value) == 0:
+        return values
+    if len(value) <= grid.mask.sum():
+        values[grid.mask] = idw(x, y, value, grid.x[grid.mask], grid.y[grid.mask])
+        return values
+    col = np.floor((x - grid.x0) / grid.cell_size).astype(np.int64)
+    row = grid.rows - 1 - np.floor((y - grid.y0) / grid.cell_size).astype(np.int64)
+    on_grid = (row >= 0) & (row < grid.rows) & (col >= 0) & (col < grid.cols)
+    cell = row[on_grid] * grid.cols + col[on_grid]
+    total = np.bincount(cell, weights=value[on_grid], minlength=grid.rows * grid.cols)
+    count = np.bincount(cell, minlength=grid.rows * grid.cols)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(count > 0, total / count, np.nan).reshape(grid.rows, grid.cols)
+    return values
+
+
+def build_prescription(db_path, data_path, field, spec):
+    """Compute one field's prescription
+
+    Args:
+        db_path: Path to SQLite database
+        data_path: Yield data directory
+        field: Field row as a dict
+        spec: Prescription spec (see PrescriptionGenerator.generate)
+
+    Returns:
+        dict: Zone features and totals
+    """
+    grid = FieldGrid(field['boundary_polygon'], spec['cell_size'],
+                     field.get('centroid_lat'), field.get('centroid_lon'))
+    values = source_values(grid, field['id'], spec, db_path, data_path)
+    if not np.isfinite(values[grid.mask]).any():
+        raise ValueError('no source data inside the field boundary')
+
+    values = fill_gaps(values, grid.mask)
+    values = smooth_grid(values, grid.mask, spec.get('smooth', 1))
+    zones, rates = classify(values, grid.mask, spec['rule'])
+    features = zone_features(grid, zones, rates, values, dissolve(zones))
+
+    area_m2 = RATE_UNITS[spec['rate_unit']][2]
+    cell_area = grid.cell_size ** 2 / area_m2
+    counts = np.bincount(zones.ravel(), minlength=len(rates) + 1)[1:]
+    return {
+        'field_id': field['id'],
+        'features': features,
+        'acres': float(counts.sum() * grid.cell_size ** 2 / M2_PER_ACRE),
+        'total_product': float((counts * rates).sum() * cell_area),
+    }
+
+
+def _build_task(task):
+    """Worker entry point; returns (field_id, result, error)"""
+    db_path, data_path, field, spec = task
+    try:
+        return field['id'], build_prescription(db_path, data_path, field, spec), None
+    except Exception as e:
+        return field['id'], None, str(e)
+
+
+class PrescriptionGenerator:
+    """Create, cache and export variable rate prescriptions"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db', data_path=None):
+        """Initialize prescription generator
+
+        Args:
+            db_path: Path to SQLite database
+            data_path: Yield data directory (default: YIELD_DATA_PATH)
+        """
+        self.db_path = db_path
+        self.maps = YieldMapGenerator(db_path, data_path)
+        self.data_path = str(self.maps.data_path)
+        self.conn = None
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        if not self.maps.connect():
+            return False
+        self.conn = self.maps.conn
+        existing = {row['name'] for row in self.conn.execute('PRAGMA table_info(prescriptions)')}
+        if not existing:
+            print("✗ prescriptions table not found; run init_db.py first")
+            return False
+        for name, kind in PRESCRIPTION_COLUMNS.items():
+            if name not in existing:
+                self.conn.execute(f'ALTER TABLE prescriptions ADD COLUMN {name} {kind}')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_prescriptions_field_name
+            ON prescriptions(field_id, prescription_name)
+        ''')
+        self.conn.commit()
+        return True
+
+    def disconnect(self):
+        """Disconnect from database"""
+        self.maps.disconnect()
+
+    def input_hash(self, field, spec):
+        """Hash of everything a field's prescription depends on"""
+        if spec['source'] == 'yield':
+            seasons = spec.get('seasons') or self.maps.seasons(field['id'])
+            source = [sources_hash(self.maps.sources(field['id'], season)) for season in seasons]
+        else:
+            stat = os.stat(spec['source_file'])
+            source = [os.path.abspath(spec['source_file']), stat.st_mtime_ns, stat.st_size]
+        key = {
+            'boundary': field['boundary_polygon'],
+            'origin': [field['centroid_lat'], field['centroid_lon']],
+            'source': source,
+            'spec': {k: v for k, v in spec.items() if k != 'name'},
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def generate(self, field_ids, spec, workers=None, refresh=False):
+        """Generate a prescription for each field, skipping fields whose inputs are unchanged
+
+        Args:
+            field_ids: Field IDs
+            spec: dict with name, input_type, rate_unit, source ('yield', 'samples' or
+                  'raster'), source_file, value_column, seasons, cell_size, smooth and rule
+            workers: Worker processes (default: CPU count)
+            refresh: Recompute even when cached
+
+        Returns:
+            list: (field_id, prescription_id or None, status) with status
+                  'created', 'updated', 'cached' or an error message
+        """
+        placeholders = ','.join('?' * len(field_ids))
+        fields = {row['id']: dict(row) for row in self.conn.execute(f'''
+            SELECT id, name, boundary_polygon, centroid_lat, centroid_lon
+            FROM fields WHERE id IN ({placeholders})
+        ''', list(field_ids))}
+
+        results = []
+        tasks = []
+        hashes = {}
+        for field_id in field_ids:
+            field = fields.get(field_id)
+            if field is None:
+                results.append((field_id, None, 'field not found'))
+                continue
+            hashes[field_id] = self.input_hash(field, spec)
+            existing = self._existing(field_id, spec['name'])
+            if existing and existing['input_hash'] == hashes[field_id] and not refresh:
+                results.append((field_id, existing['id'], 'cached'))
+                continue
+            tasks.append((self.db_path, self.data_path, field, spec))
+
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(_build_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        else:
+            outcomes = [_build_task(task) for task in tasks]
+
+        for field_id, result, error in outcomes:
+            if error:
+                results.append((field_id, None, error))
+                continue
+            prescription_id, status = self._save(result, spec, hashes[field_id])
+            results.append((field_id, prescription_id, status))
+        self.conn.commit()
+        return results
+
+    def _existing(self, field_id, name):
+        return self.conn.execute('''
+            SELECT id, input_hash FROM prescriptions
+            WHERE field_id = ? AND prescription_name = ?
+            ORDER BY id DESC LIMIT 1
+        ''', (field_id, name)).fetchone()
+
+    def _save(self, result, spec, input_hash):
+        zones_data = json.dumps({'type': 'FeatureCollection', 'features': result['features']})
+        values = (spec['input_type'], zones_data, spec['rate_unit'], spec['source'], input_hash,
+                  result['acres'], result['total_product'])
+        existing = self._existing(result['field_id'], spec['name'])
+        if existing:
+            self.conn.execute('''
+                UPDATE prescriptions SET input_type = ?, zones_data = ?, rate_unit = ?, source = ?,
+                    input_hash = ?, acres = ?, total_product = ?, created_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', values + (existing['id'],))
+            return existing['id'], 'updated'
+        cursor = self.conn.execute('''
+            INSERT INTO prescriptions (input_type, zones_data, rate_unit, source, input_hash,
+                                       acres, total_product, field_id, prescription_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', values + (result['field_id'], spec['name']))
+        return cursor.lastrowid, 'created'
+
+    def get(self, prescription_id):
+        """Prescription row with its zones parsed
+
+        Returns:
+            dict: Prescription or None
+        """
+        row = self.conn.execute('''
+            SELECT p.*, f.name AS field_name, f.boundary_polygon
+            FROM prescriptions p JOIN fields f ON f.id = p.field_id
+            WHERE p.id = ?
+        ''', (prescription_id,)).fetchone()
+        if not row:
+            return None
+        prescription = dict(row)
+        prescription['zones'] = json.loads(prescription.pop('zones_data'))['features']
+        return prescription
+
+    def list_prescriptions(self, field_id=None):
+        """List prescriptions
+
+        Args:
+            field_id: Only this field (default: all)
+
+        Returns:
+            list: Prescription summaries
+        """
+        query = '''
+            SELECT p.id, p.field_id, f.name AS field_name, p.prescription_name, p.input_type,
+                   p.rate_unit, p.acres, p.total_product, p.created_at
+            FROM prescriptions p JOIN fields f ON f.id = p.field_id
+        '''
+        params = ()
+        if field_id is not None:
+            query += ' WHERE p.field_id = ?'
+            params = (field_id,)
+        rows = [dict(row) for row in self.conn.execute(query + ' ORDER BY f.name, p.prescription_name', params)]
+
+        if not rows:
+            print("No prescriptions found")
+            return []
+        print(f"\n{'ID':<6} {'Field':<24} {'Name':<24} {'Input':<12} {'Acres':>9} {'Total':>14} {'Unit':<9}")
+        print("-" * 104)
+        for row in rows:
+            print(f"{row['id']:<6} {row['field_name']:<24} {row['prescription_name']:<24} {row['input_type']:<12} "
+                  f"{row['acres'] or 0:>9.1f} {row['total_product'] or 0:>14,.0f} {row['rate_unit'] or '':<9}")
+        return rows
+
+    def export(self, prescription_ids, output_path, output_format='isoxml'):
+        """Export prescriptions
+
+        ISO-XML writes one task per prescription into a single TASKDATA.XML;
+        shapefile and GeoJSON write one record per zone with a field_id column.
+
+        Args:
+            prescription_ids: Prescription IDs
+            output_path: Output file (for shapefiles, the .shp path)
+            output_format: isoxml, shapefile or geojson
+
+        Returns:
+            int: Number of zones written
+        """
+        prescriptions = []
+        for prescription_id in prescription_ids:
+            prescription = self.get(prescription_id)
+            if prescription is None:
+                raise ValueError(f"Prescription {prescription_id} not found")
+            prescriptions.append(prescription)
+
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        if output_format == 'isoxml':
+            write_isoxml(prescriptions, output_path)
+        elif output_format == 'shapefile':
+            write_shapefile(prescriptions, output_path)
+        else:
+            features = []
+            for prescription in prescriptions:
+                for feature in prescription['zones']:
+                    feature = dict(feature, properties=dict(feature['properties'],
+                                                             field_id=prescription['field_id'],
+                                                             rate_unit=prescription['rate_unit']))
+                    features.append(feature)
+            with open(output_path, 'w') as f:
+                json.dump({'type': 'FeatureCollection', 'features': features}, f)
+        return sum(len(prescription['zones']) for prescription in prescriptions)
+
+
+# ISO 11783-10 PLN polygon types
+PLN_PARTFIELD_BOUNDARY = 1
+PLN_TREATMENT_ZONE = 2
+
+
+def _isoxml_polygon(parent, rings, polygon_type):
+    polygon = ET.SubElement(parent, 'PLN', A=str(polygon_type))
+    for k, ring in enumerate(rings):
+        line = ET.SubElement(polygon, 'LSG', A='1' if k == 0 else '2')
+        for lon, lat in ring:
+            ET.SubElement(line, 'PNT', A='2', C=f"{lat:.9f}", D=f"{lon:.9f}")
+
+
+def write_isoxml(prescriptions, output_path):
+    """Write prescriptions as ISO 11783-10 treatment zones
+
+    Each prescription becomes a task on its field's partfield. Zone rates are
+    setpoint process data in DDI units; zone 0 is the default rate (area
+    weighted mean) used while position is lost, zone 254 is out of field.
+
+    Args:
+        prescriptions: Prescriptions from PrescriptionGenerator.get()
+        output_path: TASKDATA.XML path
+    """
+    root = ET.Element('ISO11783_TaskData', VersionMajor='4', VersionMinor='0',
+                      ManagementSoftwareManufacturer='Plug-and-Play Precision Ag',
+                      ManagementSoftwareVersion='1.0', DataTransferOrigin='1')
+    partfields = {}
+    for prescription in prescriptions:
+        field_id = prescription['field_id']
+        if field_id in partfields:
+            continue
+        partfields[field_id] = f"PFD{len(partfields) + 1}"
+        partfield = ET.SubElement(root, 'PFD', A=partfields[field_id], C=prescription['field_name'],
+                                  D=str(int(round((prescription['acres'] or 0) * M2_PER_ACRE))))
+        outline = [[[float(lon), float(lat)] for lon, lat in ring]
+                   for ring in boundary_rings(prescription['boundary_polygon'])]
+        _isoxml_polygon(partfield, outline, PLN_PARTFIELD_BOUNDARY)
+
+    for n, prescription in enumerate(prescriptions, start=1):
+        ddi, factor, _ = RATE_UNITS[prescription['rate_unit']]
+        product = f"PDT{n}"
+        ET.SubElement(root, 'PDT', A=product, B=f"{prescription['prescription_name']} {prescription['input_type']}")
+        task = ET.SubElement(root, 'TSK', A=f"TSK{n}", B=prescription['prescription_name'],
+                             E=partfields[prescription['field_id']], G='1', H='0', I='0', J='254')
+
+        zones = prescription['zones']
+        acres = sum(zone['properties']['acres'] for zone in zones) or 1.0
+        default = sum(zone['properties']['rate'] * zone['properties']['acres'] for zone in zones) / acres
+        default_zone = ET.SubElement(task, 'TZN', A='0', B='Default')
+        ET.SubElement(default_zone, 'PDV', A=ddi, B=str(int(round(default * factor))), C=product)
+        for zone in zones:
+            properties = zone['properties']
+            element = ET.SubElement(task, 'TZN', A=str(properties['zone']), B=f"Zone {properties['zone']}")
+            ET.SubElement(element, 'PDV', A=ddi, B=str(int(round(properties['rate'] * factor))), C=product)
+            for polygon in zone['geometry']['coordinates']:
+                _isoxml_polygon(element, polygon, PLN_TREATMENT_ZONE)
+        outside = ET.SubElement(task, 'TZN', A='254', B='Out of field')
+        ET.SubElement(outside, 'PDV', A=ddi, B='0', C=product)
+
+    ET.indent(root)
+    ET.ElementTree(root).write(output_path, encoding='UTF-8', xml_declaration=True)
+
+
+def write_shapefile(prescriptions, output_path):
+    """Write zones as a polygon shapefile (.shp, .shx, .dbf, .prj) in WGS84
+
+    Attributes are FIELD_ID, NAME, ZONE, RATE, UNIT and ACRES, one record per zone.
+
+    Args:
+        prescriptions: Prescriptions from PrescriptionGenerator.get()
+        output_path: .shp path; the other files are written alongside
+    """
+    base = os.path.splitext(output_path)[0]
+    records = []
+    for prescription in prescriptions:
+        for zone in prescription['zones']:
+            parts = []
+            for polygon in zone['geometry']['coordinates']:
+                # Shapefile outer rings are clockwise, holes counter-clockwise
+                parts.extend([list(reversed(ring)) for ring in polygon])
+            records.append((parts, [prescription['field_id'], prescription['prescription_name'],
+                                    zone['properties']['zone'], zone['properties']['rate'],
+                                    prescription['rate_unit'], zone['properties']['acres']]))
+
+    shapes = []
+    for parts, _ in records:
+        points = np.array([point for ring in parts for point in ring], dtype='<f8').reshape(-1, 2)
+        offsets = np.cumsum([0] + [len(ring) for ring in parts[:-1]]).astype('<i4')
+        box = (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max())
+        content = struct.pack('<i4d2i', 5, *box, len(parts), len(points)) + offsets.tobytes() + points.tobytes()
+        shapes.append((content, box))
+
+    boxes = np.array([box for _, box in shapes]) if shapes else np.zeros((1, 4))
+    extent = (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+
+    def header(length_bytes):
+        return (struct.pack('>7i', 9994, 0, 0, 0, 0, 0, length_bytes // 2)
+                + struct.pack('<2i4d4d', 1000, 5, *extent, 0, 0, 0, 0))
+
+    shp_length = 100 + sum(8 + len(content) for content, _ in shapes)
+    with open(base + '.shp', 'wb') as shp, open(base + '.shx', 'wb') as shx:
+        shp.write(header(shp_length))
+        shx.write(header(100 + 8 * len(shapes)))
+        offset = 100
+        for number, (content, _) in enumerate(shapes, start=1):
+            shp.write(struct.pack('>2i', number, len(content) // 2) + content)
+            shx.write(struct.pack('>2i', offset // 2, len(content) // 2))
+            offset += 8 + len(content)
+
+    # dBase III attribute table: (name, type, length, decimals)
+    columns = [('FIELD_ID', 'N', 10, 0), ('NAME', 'C', 40, 0), ('ZONE', 'N', 5, 0),
+               ('RATE', 'N', 14, 3), ('UNIT', 'C', 10, 0), ('ACRES', 'N', 12, 3)]
+    record_length = 1 + sum(length for _, _, length, _ in columns)
+    today = date.today()
+    with open(base + '.dbf', 'wb') as dbf:
+        dbf.write(struct.pack('<4BIHH20x', 3, today.year - 1900, today.month, today.day,
+                              len(records), 33 + 32 * len(columns), record_length))
+        for name, kind, length, decimals in columns:
+            dbf.write(struct.pack('<11sc4xBB14x', name.encode(), kind.encode(), length, decimals))
+        dbf.write(b'\r')
+        for _, values in records:
+            row = b' '
+            for (name, kind, length, decimals), value in zip(columns, values):
+                text = f"{value:.{decimals}f}".rjust(length) if kind == 'N' else str(value).ljust(length)
+                row += text.encode('latin-1', 'replace')[:length]
+            dbf.write(row)
+        dbf.write(b'\x1a')
+
+    with open(base + '.prj', 'w') as prj:
+        prj.write(WGS84_PRJ)
+
+
+def parse_rule(args):
+    """Rate rule from command line arguments"""
+    if args.rates:
+        rule = {'type': 'zones', 'rates': [float(rate) for rate in args.rates.split(',')]}
+        if args.breaks:
+            rule['breaks'] = [float(value) for value in args.breaks.split(',')]
+            if len(rule['breaks']) != len(rule['rates']) - 1:
+                raise ValueError('--breaks needs one value fewer than --rates')
+        return rule
+    if args.slope is None or args.intercept is None:
+        raise ValueError('Give --rates for zone rates, or --intercept and --slope for a linear rule')
+    rule = {'type': 'linear', 'intercept': args.intercept, 'slope': args.slope, 'step': args.step}
+    if args.min_rate is not None:
+        rule['min_rate'] = args.min_rate
+    if args.max_rate is not None:
+        rule['max_rate'] = args.max_rate
+    return rule
+
 
 def main():
-    print("Prescription map creator - Full implementation pending")
-    print("This script will create variable rate application prescriptions")
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Create variable rate prescription maps'
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Command to execute')
+
+    create_parser = subparsers.add_parser('create', help='Create prescriptions for one or more fields')
+    target = create_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--field-id', type=int, nargs='+', help='Field ID(s)')
+    target.add_argument('--all-fields', action='store_true', help='Every field in the database')
+    create_parser.add_argument('--name', required=True, help='Prescription name')
+    create_parser.add_argument('--input-type', required=True, choices=sorted(DEFAULT_RATE_UNITS),
+                               help='Input applied')
+    create_parser.add_argument('--rate-unit', choices=sorted(RATE_UNITS),
+                               help='Rate unit (default depends on input type)')
+    create_parser.add_argument('--source', choices=['yield', 'samples', 'raster'], default='yield',
+                               help='Zone source: yield history, a CSV of soil/imagery samples, '
+                                    'or an .npz raster (default: yield)')
+    create_parser.add_argument('--source-file', help='Samples CSV or .npz raster')
+    create_parser.add_argument('--value-column', default='value', help='Samples CSV value column')
+    create_parser.add_argument('--seasons', help='Yield seasons to use, comma separated (default: all)')
+    create_parser.add_argument('--rates', help='Rate per zone, lowest value zone first, comma separated')
+    create_parser.add_argument('--breaks', help='Zone value breaks (default: quantiles)')
+    create_parser.add_argument('--intercept', type=float, help='Linear rule: rate at value 0')
+    create_parser.add_argument('--slope', type=float, help='Linear rule: rate change per unit of value')
+    create_parser.add_argument('--min-rate', type=float, help='Linear rule: lowest rate')
+    create_parser.add_argument('--max-rate', type=float, help='Linear rule: highest rate')
+    create_parser.add_argument('--step', type=float, default=0, help='Linear rule: round rates to this step')
+    create_parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE,
+                               help=f'Grid cell size in metres (default: {DEFAULT_CELL_SIZE:g})')
+    create_parser.add_argument('--smooth', type=int, default=1, help='Smoothing passes (default: 1)')
+    create_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    create_parser.add_argument('--refresh', action='store_true', help='Recompute cached prescriptions')
+
+    list_parser = subparsers.add_parser('list', help='List prescriptions')
+    list_parser.add_argument('--field-id', type=int, help='Field ID')
+
+    export_parser = subparsers.add_parser('export', help='Export prescriptions')
+    export_parser.add_argument('--prescription-id', required=True, type=int, nargs='+', help='Prescription ID(s)')
+    export_parser.add_argument('--format', choices=['isoxml', 'shapefile', 'geojson'], default='isoxml',
+                               help='Export format (default: isoxml)')
+    export_parser.add_argument('--output', required=True, help='Output file (TASKDATA.XML, .shp or .geojson)')
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    generator = PrescriptionGenerator(db_path=db_path)
+
+    if not generator.connect():
+        return 1
+
+    try:
+        if args.command == 'create':
+            if args.source != 'yield' and not args.source_file:
+                print(f"✗ --source-file required for source '{args.source}'")
+                return 1
+            try:
+                rule = parse_rule(args)
+            except ValueError as e:
+                print(f"✗ {e}")
+                return 1
+            spec = {
+                'name': args.name,
+                'input_type': args.input_type,
+                'rate_unit': args.rate_unit or DEFAULT_RATE_UNITS[args.input_type],
+                'source': args.source,
+                'source_file': args.source_file,
+                'value_column': args.value_column,
+                'seasons': [int(season) for season in args.seasons.split(',')] if args.seasons else None,
+                'cell_size': args.cell_size,
+                'smooth': args.smooth,
+                'rule': rule,
+            }
+            if args.all_fields:
+                field_ids = [row['id'] for row in generator.conn.execute('SELECT id FROM fields ORDER BY id')]
+            else:
+                field_ids = args.field_id
+
+            results = generator.generate(field_ids, spec, args.workers, args.refresh)
+            failed = 0
+            for field_id, prescription_id, status in results:
+                if prescription_id is None:
+                    failed += 1
+                    print(f"✗ Field {field_id}: {status}")
+                else:
+                    print(f"✓ Field {field_id}: prescription {prescription_id} {status}")
+            counts = {status: sum(1 for r in results if r[2] == status) for status in ('created', 'updated', 'cached')}
+            print(f"\n{counts['created']} created, {counts['updated']} updated, "
+                  f"{counts['cached']} unchanged, {failed} failed")
+            return 1 if failed else 0
+
+        if args.command == 'list':
+            generator.list_prescriptions(args.field_id)
+        elif args.command == 'export':
+            try:
+                zones = generator.export(args.prescription_id, args.output, args.format)
+            except ValueError as e:
+                print(f"✗ {e}")
+                return 1
+            print(f"✓ Exported {zones} zones to {args.output}")
+    finally:
+        generator.disconnect()
+
     return 0
 
+
 if __name__ == '__main__':
     sys.exit(main())
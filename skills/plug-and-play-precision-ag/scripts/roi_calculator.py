@@ -1,133 +1,632 @@
 #!/usr/bin/env python3
 """
 ROI Calculator for Precision Agriculture
-Calculate return on investment for precision practices
+Calculate per-field, per-season and whole-farm return on investment
+
+Benefits are derived from the records the other tools keep:
+
+    input savings    (uniform_rate - rate) x acres_treated x product cost for
+                     every variable rate operation with a uniform baseline
+    overlap savings  (baseline overlap - measured overlap) acres from the
+                     coverage maps, valued at the operation's product cost
+                     per acre plus the machine cost of a pass
+    yield benefit    mean yield from the season's yield raster minus the
+                     field's mean yield for the same crop before adoption,
+                     times acres and crop price
+
+Costs are the precision investments (depreciated straight line over their
+life, plus any annual subscription) shared between the fields farmed that
+season by acreage. Product costs and crop prices are looked up for the
+season first and fall back to an undated (season 0) price.
+
+Every input is aggregated for the whole farm with a handful of grouped
+queries and combined with NumPy, so multi-year farm reports take seconds.
+Results are stored per (field, season) in roi_results with a hash of their
+inputs and rewritten only when those change; yield rasters are rebuilt
+only where their point files changed (yield_rasters.source_hash).
 """
 
 import sys
 import argparse
-import sqlite3
+import hashlib
 import json
+import os
 from datetime import datetime
 
+import numpy as np
+
+from yield_map import DEFAULT_CELL_SIZE, YieldMapGenerator, sources_hash
+
+
+ROI_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS input_costs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product TEXT NOT NULL,
+        season INTEGER NOT NULL DEFAULT 0,
+        unit TEXT,
+        cost_per_unit REAL NOT NULL,
+        UNIQUE(product, season)
+    );
+
+    CREATE TABLE IF NOT EXISTS crop_prices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        crop TEXT NOT NULL,
+        season INTEGER NOT NULL DEFAULT 0,
+        price_per_unit REAL NOT NULL,
+        UNIQUE(crop, season)
+    );
+
+    CREATE TABLE IF NOT EXISTS precision_investments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        cost REAL NOT NULL DEFAULT 0,
+        annual_cost REAL NOT NULL DEFAULT 0,
+        start_season INTEGER NOT NULL,
+        life_years INTEGER NOT NULL DEFAULT 5,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS roi_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        field_id INTEGER NOT NULL,
+        season INTEGER NOT NULL,
+        input_hash TEXT NOT NULL,
+        crop TEXT,
+        acres REAL,
+        mean_yield REAL,
+        baseline_yield REAL,
+        revenue REAL,
+        input_cost REAL,
+        input_savings REAL,
+        overlap_acres REAL,
+        overlap_savings REAL,
+        yield_benefit REAL,
+        total_benefit REAL,
+        investment_cost REAL,
+        net_benefit REAL,
+        roi_percentage REAL,
+        computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(field_id, season),
+        FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
+    );
+'''
+
+OPERATION_COLUMNS = {
+    'uniform_rate': 'REAL',
+}
+
+DEFAULT_BASELINE_OVERLAP = 10.0  # percent of covered area overlapped without guidance/section control
+DEFAULT_PASS_COST = 0.0          # machine and fuel cost per acre per pass
+
+SEASON = "CAST(strftime('%Y', {}) AS INTEGER)"
+
+# Application operations with their season and product cost (season price, else undated price)
+OPERATION_COSTS = f'''
+    WITH op_costs AS (
+        SELECT o.id, o.field_id, {SEASON.format('o.start_date')} AS season,
+               COALESCE(o.rate, 0) AS rate, o.uniform_rate, COALESCE(o.acres_treated, 0) AS acres,
+               COALESCE(c.cost_per_unit, c0.cost_per_unit, 0) AS unit_cost
+        FROM operations o
+        LEFT JOIN input_costs c ON c.product = o.product AND c.season = {SEASON.format('o.start_date')}
+        LEFT JOIN input_costs c0 ON c0.product = o.product AND c0.season = 0
+        WHERE o.start_date IS NOT NULL
+    )
+'''
+
+RESULT_COLUMNS = ('crop', 'acres', 'mean_yield', 'baseline_yield', 'revenue', 'input_cost',
+                  'input_savings', 'overlap_acres', 'overlap_savings', 'yield_benefit',
+                  'total_benefit', 'investment_cost', 'net_benefit', 'roi_percentage')
+
+SUM_COLUMNS = ('acres', 'revenue', 'input_cost', 'input_savings', 'overlap_acres', 'overlap_savings',
+               'yield_benefit', 'total_benefit', 'investment_cost', 'net_benefit')
+
+
+def _roi(benefit, cost):
+    """ROI percentage of a benefit over its cost (None without cost)"""
+    return (benefit - cost) / cost * 100 if cost > 0 else None
+
+
+def _value(x):
+    """Plain float for JSON and SQLite, None for NaN"""
+    x = float(x)
+    return None if np.isnan(x) else round(x, 4)
+
+
+class ROICalculator:
+    """Compute and cache precision agriculture ROI per field and season"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db', data_path=None):
+        """Initialize ROI calculator
+
+        Args:
+            db_path: Path to SQLite database
+            data_path: Yield data directory (default: YIELD_DATA_PATH)
+        """
+        self.db_path = db_path
+        self.maps = YieldMapGenerator(db_path, data_path)
+        self.conn = None
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        if not self.maps.connect():
+            return False
+        self.conn = self.maps.conn
+        existing = {row['name'] for row in self.conn.execute('PRAGMA table_info(operations)')}
+        if not existing:
+            print("✗ operations table not found; run init_db.py first")
+            return False
+        for name, kind in OPERATION_COLUMNS.items():
+            if name not in existing:
+                self.conn.execute(f'ALTER TABLE operations ADD COLUMN {name} {kind}')
+        self.conn.executescript(ROI_SCHEMA)
+        self.conn.commit()
+        return True
+
+    def disconnect(self):
+        """Disconnect from database"""
+        self.maps.disconnect()
+
+    def set_input_cost(self, product, cost_per_unit, unit=None, season=0):
+        """Set the cost of a product (season 0 applies to any season without its own price)"""
+        self.conn.execute('''
+            INSERT INTO input_costs (product, season, unit, cost_per_unit) VALUES (?, ?, ?, ?)
+            ON CONFLICT (product, season) DO UPDATE SET
+                unit = excluded.unit, cost_per_unit = excluded.cost_per_unit
+        ''', (product, season or 0, unit, cost_per_unit))
+        self.conn.commit()
+
+    def set_crop_price(self, crop, price_per_unit, season=0):
+        """Set the price of a crop per yield unit (season 0 applies to any season)"""
+        self.conn.execute('''
+            INSERT INTO crop_prices (crop, season, price_per_unit) VALUES (?, ?, ?)
+            ON CONFLICT (crop, season) DO UPDATE SET price_per_unit = excluded.price_per_unit
+        ''', (crop, season or 0, price_per_unit))
+        self.conn.commit()
+
+    def add_investment(self, name, start_season, cost=0.0, life_years=5, annual_cost=0.0):
+        """Record a precision investment
+
+        Args:
+            name: Description (e.g. 'RTK receiver')
+            start_season: First season it is used
+            cost: Purchase cost, depreciated over life_years
+            life_years: Useful life in seasons
+            annual_cost: Recurring cost per season (subscriptions, corrections)
+
+        Returns:
+            int: Investment ID
+        """
+        cursor = self.conn.execute('''
+            INSERT INTO precision_investments (name, cost, annual_cost, start_season, life_years)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (name, cost, annual_cost, start_season, max(1, life_years)))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def list_investments(self):
+        """All precision investments, oldest first"""
+        return [dict(row) for row in self.conn.execute(
+            'SELECT * FROM precision_investments ORDER BY start_season, id'
+        )]
+
+    def refresh_rasters(self, field_ids=None, seasons=None, cell_size=DEFAULT_CELL_SIZE, refresh=False):
+        """Build yield rasters that are missing or whose point files changed
+
+        Returns:
+            int: Rasters built
+        """
+        cached = {(row['field_id'], row['season']): row['source_hash'] for row in self.conn.execute(
+            'SELECT field_id, season, source_hash FROM yield_rasters WHERE cell_size = ?', (cell_size,)
+        )}
+        pairs = self.conn.execute(f'''
+            SELECT DISTINCT field_id, {SEASON.format('harvest_date')} AS season FROM yield_data
+        ''').fetchall()
+        built = 0
+        for row in pairs:
+            key = (row['field_id'], row['season'])
+            if (field_ids and key[0] not in field_ids) or (seasons and key[1] not in seasons):
+                continue
+            sources = self.maps.sources(*key)
+            if not sources or (cached.get(key) == sources_hash(sources) and not refresh):
+                continue
+            if self.maps.raster(*key, cell_size, refresh=refresh) is not None:
+                built += 1
+        return built
+
+    def _inputs(self, settings):
+        """Aggregate every ROI input per (field, season) for the whole farm
+
+        Returns:
+            dict: Column name -> NumPy array, one entry per (field, season)
+        """
+        conn = self.conn
+        operations = {(r['field_id'], r['season']): r for r in conn.execute(OPERATION_COSTS + '''
+            SELECT field_id, season,
+                   SUM(rate * acres * unit_cost) AS input_cost,
+                   SUM(CASE WHEN uniform_rate IS NOT NULL
+                            THEN (uniform_rate - rate) * acres * unit_cost ELSE 0 END) AS input_savings
+            FROM op_costs GROUP BY field_id, season
+        ''')}
+
+        coverage = {(r['field_id'], r['season']): r for r in conn.execute(OPERATION_COSTS + '''
+            SELECT m.field_id, COALESCE(m.season, o.season) AS season,
+                   SUM(m.overlap_acres) AS overlap_acres,
+                   SUM((? / 100.0 * COALESCE(m.covered_acres, 0) - COALESCE(m.overlap_acres, 0))
+                       * (COALESCE(o.rate * o.unit_cost, 0) + ?)) AS overlap_savings
+            FROM coverage_maps m LEFT JOIN op_costs o ON o.id = m.operation_id
+            GROUP BY m.field_id, COALESCE(m.season, o.season)
+        ''', (settings['baseline_overlap'], settings['pass_cost']))}
+
+        yields = {(r['field_id'], r['season']): r for r in conn.execute(f'''
+            WITH crops AS (
+                SELECT field_id, {SEASON.format('harvest_date')} AS season, crop,
+                       ROW_NUMBER() OVER (PARTITION BY field_id, {SEASON.format('harvest_date')}
+                                          ORDER BY COUNT(*) DESC, crop) AS rank
+                FROM yield_data GROUP BY field_id, season, crop
+            )
+            SELECT r.field_id, r.season, r.mean_yield, c.crop,
+                   COALESCE(p.price_per_unit, p0.price_per_unit, 0) AS price
+            FROM yield_rasters r
+            LEFT JOIN crops c ON c.field_id = r.field_id AND c.season = r.season AND c.rank = 1
+            LEFT JOIN crop_prices p ON p.crop = c.crop AND p.season = r.season
+            LEFT JOIN crop_prices p0 ON p0.crop = c.crop AND p0.season = 0
+            WHERE r.cell_size = ? AND r.mean_yield IS NOT NULL
+        ''', (settings['cell_size'],))}
+
+        fields = {r['id']: r for r in conn.execute('SELECT id, name, area_acres FROM fields')}
+        keys = sorted(k for k in set(operations) | set(coverage) | set(yields)
+                      if k[0] in fields and k[1] is not None)
+
+        def column(source, name, default=np.nan):
+            return np.array([source[k][name] if k in source and source[k][name] is not None else default
+                             for k in keys], dtype='f8')
+
+        crops = [yields[k]['crop'] if k in yields else None for k in keys]
+        return {
+            'keys': keys,
+            'field_id': np.array([k[0] for k in keys], dtype='i8'),
+            'season': np.array([k[1] for k in keys], dtype='i8'),
+            'name': [fields[k[0]]['name'] for k in keys],
+            'acres': np.array([fields[k[0]]['area_acres'] or 0.0 for k in keys], dtype='f8'),
+            'input_cost': column(operations, 'input_cost', 0.0),
+            'input_savings': column(operations, 'input_savings', 0.0),
+            'overlap_acres': column(coverage, 'overlap_acres', 0.0),
+            'overlap_savings': column(coverage, 'overlap_savings', 0.0),
+            'mean_yield': column(yields, 'mean_yield'),
+            'price': column(yields, 'price', 0.0),
+            'crop': crops,
+        }
+
+    def _investment_costs(self, seasons):
+        """Depreciation plus annual cost of all investments for each season"""
+        investments = self.list_investments()
+        if not investments or len(seasons) == 0:
+            return np.zeros(len(seasons)), None
+        start = np.array([i['start_season'] for i in investments], dtype='i8')
+        life = np.array([i['life_years'] for i in investments], dtype='i8')
+        cost = np.array([i['cost'] for i in investments], dtype='f8')
+        annual = np.array([i['annual_cost'] for i in investments], dtype='f8')
+        s = np.asarray(seasons, dtype='i8')[:, None]
+        started = s >= start
+        depreciating = started & (s < start + life)
+        return (depreciating * (cost / life)).sum(axis=1) + (started * annual).sum(axis=1), int(start.min())
+
+    def compute(self, field_ids=None, seasons=None, baseline_overlap=DEFAULT_BASELINE_OVERLAP,
+                pass_cost=DEFAULT_PASS_COST, adoption_season=None, cell_size=DEFAULT_CELL_SIZE,
+                refresh=False):
+        """ROI per field and season, from cache where the inputs are unchanged
+
+        Args:
+            field_ids: Field IDs (default: all)
+            seasons: Seasons (default: all with data)
+            baseline_overlap: Percent overlap assumed without precision guidance
+            pass_cost: Machine and fuel cost per acre per pass
+            adoption_season: First precision season (default: first investment);
+                             earlier seasons form the yield baseline
+            cell_size: Yield raster cell size in metres
+            refresh: Rebuild yield rasters and rewrite every result
+
+        Returns:
+            list: Result dicts ordered by season and field, each with a 'status'
+                  of 'computed' or 'cached'
+        """
+        field_ids = set(field_ids) if field_ids else None
+        seasons = set(seasons) if seasons else None
+        self.refresh_rasters(field_ids, seasons, cell_size, refresh)
+
+        settings = {'baseline_overlap': baseline_overlap, 'pass_cost': pass_cost, 'cell_size': cell_size}
+        data = self._inputs(settings)
+        n = len(data['keys'])
+        unique_seasons, season_idx = np.unique(data['season'], return_inverse=True)
+        season_investment, first_investment = self._investment_costs(unique_seasons)
+        if adoption_season is None:
+            adoption_season = first_investment
+
+        # Yield baseline: mean yield of the same field and crop before adoption
+        acres, season, mean_yield = data['acres'], data['season'], data['mean_yield']
+        baseline = np.full(n, np.nan)
+        if adoption_season is not None and n:
+            group_keys = [(k[0], c) for k, c in zip(data['keys'], data['crop'])]
+            _, group = np.unique(np.array([f'{f}:{c}' for f, c in group_keys]), return_inverse=True)
+            pre = (season < adoption_season) & np.isfinite(mean_yield)
+            sums = np.bincount(group, weights=np.where(pre, mean_yield, 0.0))
+            counts = np.bincount(group, weights=pre.astype('f8'))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                baseline = np.where(counts[group] > 0, sums[group] / counts[group], np.nan)
+            baseline[season < adoption_season] = np.nan
+        gain = mean_yield - baseline
+        yield_benefit = np.where(np.isfinite(gain), gain * acres * data['price'], 0.0)
+        revenue = np.where(np.isfinite(mean_yield), mean_yield * acres * data['price'], 0.0)
+
+        # Investment shared by acreage among the fields farmed each season
+        season_acres = np.bincount(season_idx, weights=acres, minlength=len(unique_seasons))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(season_acres[season_idx] > 0, acres / season_acres[season_idx], 0.0)
+        investment = season_investment[season_idx] * share if n else np.zeros(0)
+
+        total_benefit = data['input_savings'] + data['overlap_savings'] + yield_benefit
+        net_benefit = total_benefit - investment
+
+        cached = {(r['field_id'], r['season']): r for r in self.conn.execute('SELECT * FROM roi_results')}
+        results = []
+        for i, key in enumerate(data['keys']):
+            if (field_ids and key[0] not in field_ids) or (seasons and key[1] not in seasons):
+                continue
+            inputs = [data['crop'][i], settings] + [_value(x[i]) for x in (
+                acres, mean_yield, baseline, data['price'], data['input_cost'], data['input_savings'],
+                data['overlap_acres'], data['overlap_savings'], investment)]
+            input_hash = hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+            previous = cached.get(key)
+            if previous is not None and previous['input_hash'] == input_hash and not refresh:
+                row = {c: previous[c] for c in RESULT_COLUMNS}
+                row.update(computed_at=previous['computed_at'], status='cached')
+            else:
+                row = {
+                    'crop': data['crop'][i],
+                    'acres': _value(acres[i]),
+                    'mean_yield': _value(mean_yield[i]),
+                    'baseline_yield': _value(baseline[i]),
+                    'revenue': _value(revenue[i]),
+                    'input_cost': _value(data['input_cost'][i]),
+                    'input_savings': _value(data['input_savings'][i]),
+                    'overlap_acres': _value(data['overlap_acres'][i]),
+                    'overlap_savings': _value(data['overlap_savings'][i]),
+                    'yield_benefit': _value(yield_benefit[i]),
+                    'total_benefit': _value(total_benefit[i]),
+                    'investment_cost': _value(investment[i]),
+                    'net_benefit': _value(net_benefit[i]),
+                    'roi_percentage': _roi(total_benefit[i], investment[i]),
+                }
+                if row['roi_percentage'] is not None:
+                    row['roi_percentage'] = _value(row['roi_percentage'])
+                row.update(computed_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), status='computed')
+                self.conn.execute(f'''
+                    INSERT INTO roi_results (field_id, season, input_hash, computed_at, {', '.join(RESULT_COLUMNS)})
+                    VALUES (?, ?, ?, ?, {', '.join('?' * len(RESULT_COLUMNS))})
+                    ON CONFLICT (field_id, season) DO UPDATE SET
+                        input_hash = excluded.input_hash, computed_at = excluded.computed_at,
+                        {', '.join(f'{c} = excluded.{c}' for c in RESULT_COLUMNS)}
+                ''', (key[0], key[1], input_hash, row['computed_at']) + tuple(row[c] for c in RESULT_COLUMNS))
+            results.append({'field_id': key[0], 'field_name': data['name'][i], 'season': key[1], **row})
+        self.conn.commit()
+        results.sort(key=lambda r: (r['season'], r['field_id']))
+        return results
+
+
+def summarize(results):
+    """Whole-farm totals per season and over all seasons
+
+    Returns:
+        dict: 'seasons' list of per-season totals and 'total'
+    """
+    def totals(rows):
+        summary = {c: round(sum(r[c] or 0.0 for r in rows), 2) for c in SUM_COLUMNS}
+        summary['fields'] = len({r['field_id'] for r in rows})
+        roi = _roi(summary['total_benefit'], summary['investment_cost'])
+        summary['roi_percentage'] = round(roi, 1) if roi is not None else None
+        return summary
+
+    by_season = {}
+    for row in results:
+        by_season.setdefault(row['season'], []).append(row)
+    return {
+        'seasons': [{'season': s, **totals(rows)} for s, rows in sorted(by_season.items())],
+        'total': totals(results),
+    }
 
-def calculate_roi(db_path, season=None, fields=None):
+
+def parse_seasons(value):
+    """Parse '2024', '2021-2024', '2022,2024' or 'all' into a list of years (None for all)"""
+    if not value or value == 'all':
+        return None
+    seasons = []
+    for part in value.split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            seasons.extend(range(int(first), int(last) + 1))
+        else:
+            seasons.append(int(part))
+    return seasons
+
+
+def calculate_roi(db_path, season=None, fields=None, **options):
     """Calculate ROI for precision practices
 
     Args:
         db_path: Path to database
-        season: Year/season
-        fields: Comma-separated list of field IDs
+        season: Year, range ('2021-2024') or None for all seasons
+        fields: List of field IDs (default: all)
+        **options: Passed to ROICalculator.compute
 
     Returns:
-        dict: ROI results
+        dict: Per-field results and whole-farm summary, or None on error
     """
+    calculator = ROICalculator(db_path)
+    if not calculator.connect():
+        return None
+    try:
+        seasons = parse_seasons(str(season)) if season is not None else None
+        results = calculator.compute([int(f) for f in fields] if fields else None, seasons, **options)
+    finally:
+        calculator.disconnect()
+    return {'season': season or 'all', 'fields': results, **summarize(results)}
 
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    # Get input savings from variable rate application
-    cursor.execute('''
-        SELECT SUM((traditional_rate - precision_rate) * acres_treated * cost_per_unit) as savings
-        FROM operations
-        WHERE operation_type = 'application' AND precision_rate IS NOT NULL
-    ''')
-
-    input_savings = cursor.fetchone()['savings'] or 0
-
-    # Get yield improvement
-    cursor.execute('''
-        SELECT AVG(precision_yield - traditional_yield) as avg_improvement
-        FROM yield_data
-        WHERE harvest_year = ?
-    ''', (season,))
-
-    yield_improvement = cursor.fetchone()['avg_improvement'] or 0
-
-    # Get fuel savings from reduced overlap
-    fuel_savings = 500  # Placeholder
-
-    total_benefit = input_savings + yield_improvement + fuel_savings
-    initial_investment = 10000  # Example: $10,000 total investment
-    roi_percentage = (total_benefit / initial_investment) * 100
-
-    results = {
-        'season': season,
-        'input_savings': input_savings,
-        'yield_improvement': yield_improvement,
-        'fuel_savings': fuel_savings,
-        'total_benefit': total_benefit,
-        'initial_investment': initial_investment,
-        'roi_percentage': roi_percentage
-    }
 
-    return results
+def _money(x):
+    return f"${x:,.2f}" if x is not None else '-'
 
 
-def print_roi_results(results):
+def print_roi_results(results, detail=False):
     """Print ROI results
 
     Args:
         results: ROI calculation results
+        detail: Also list every field
     """
-
     print("\n" + "=" * 60)
     print(f"PRECISION AGRICULTURE ROI - {results['season']}")
     print("=" * 60)
 
-    print(f"\nSavings:")
-    print(f"  Input savings:     ${results['input_savings']:,.2f}")
-    print(f"  Yield improvement: ${results['yield_improvement']:,.2f}")
-    print(f"  Fuel savings:      ${results['fuel_savings']:,.2f}")
-
-    print(f"\nTotal Benefit:      ${results['total_benefit']:,.2f}")
-    print(f"Initial Investment: ${results['initial_investment']:,.2f}")
-    print(f"ROI:                {results['roi_percentage']:.1f}%")
-
-    if results['total_benefit'] > results['initial_investment']:
-        print(f"\nPayback achieved in {results['initial_investment'] / (results['total_benefit'] / 12):.1f} months")
+    for summary in results['seasons']:
+        print(f"\n{summary['season']}  ({summary['fields']} fields, {summary['acres']:,.1f} ac)")
+        print(f"  Input savings:     {_money(summary['input_savings'])}")
+        print(f"  Overlap savings:   {_money(summary['overlap_savings'])}")
+        print(f"  Yield improvement: {_money(summary['yield_benefit'])}")
+        print(f"  Investment cost:   {_money(summary['investment_cost'])}")
+        roi = summary['roi_percentage']
+        print(f"  ROI:               {f'{roi:.1f}%' if roi is not None else '-'}")
+
+    if detail and results['fields']:
+        print(f"\n{'Season':<8}{'Field':<20}{'Acres':>8}{'Yield':>8}{'Base':>8}{'Benefit':>13}{'Cost':>12}")
+        for row in results['fields']:
+            base = f"{row['baseline_yield']:.1f}" if row['baseline_yield'] is not None else '-'
+            yld = f"{row['mean_yield']:.1f}" if row['mean_yield'] is not None else '-'
+            print(f"{row['season']:<8}{row['field_name'][:19]:<20}{row['acres']:>8.1f}{yld:>8}{base:>8}"
+                  f"{_money(row['total_benefit']):>13}{_money(row['investment_cost']):>12}")
+
+    total = results['total']
+    print(f"\nTotal Benefit:      {_money(total['total_benefit'])}")
+    print(f"Investment Cost:    {_money(total['investment_cost'])}")
+    print(f"Net Benefit:        {_money(total['net_benefit'])}")
+    if total['roi_percentage'] is not None:
+        print(f"ROI:                {total['roi_percentage']:.1f}%")
+
+    years = len(results['seasons'])
+    if years and total['total_benefit'] > 0 and total['investment_cost'] > 0:
+        monthly = total['total_benefit'] / (12 * years)
+        print(f"\nPayback in {total['investment_cost'] / monthly:.1f} months")
 
     print("=" * 60)
 
 
 def main():
     """Main function"""
-    import os
-
     parser = argparse.ArgumentParser(
         description='Calculate ROI for precision agriculture'
     )
-    parser.add_argument(
-        '--season',
-        default=str(datetime.now().year),
-        help='Season/year for calculation'
-    )
-    parser.add_argument(
-        '--fields',
-        default='all',
-        help='Comma-separated list of field IDs'
-    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = subparsers.add_parser('report', help='Calculate ROI per field and season')
+    report_parser.add_argument('--season', default=str(datetime.now().year),
+                               help="Season, range (2021-2024), list or 'all' (default: this year)")
+    report_parser.add_argument('--fields', default='all', help='Comma-separated list of field IDs')
+    report_parser.add_argument('--baseline-overlap', type=float, default=DEFAULT_BASELINE_OVERLAP,
+                               help=f'Percent overlap without precision guidance (default: {DEFAULT_BASELINE_OVERLAP:g})')
+    report_parser.add_argument('--pass-cost', type=float, default=DEFAULT_PASS_COST,
+                               help='Machine and fuel cost per acre per pass')
+    report_parser.add_argument('--adoption-season', type=int,
+                               help='First precision season (default: first investment)')
+    report_parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE,
+                               help=f'Yield raster cell size in metres (default: {DEFAULT_CELL_SIZE:g})')
+    report_parser.add_argument('--refresh', action='store_true', help='Recompute even when cached')
+    report_parser.add_argument('--detail', action='store_true', help='List every field')
+    report_parser.add_argument('--output', help='JSON output file (default: roi_<season>.json in the data directory)')
+
+    cost_parser = subparsers.add_parser('cost', help='Set the cost of an input product')
+    cost_parser.add_argument('--product', required=True, help='Product name as recorded in operations')
+    cost_parser.add_argument('--cost-per-unit', required=True, type=float, help='Cost per rate unit')
+    cost_parser.add_argument('--unit', help='Unit (e.g. lb, gal, seeds)')
+    cost_parser.add_argument('--season', type=int, default=0, help='Season (default: any)')
+
+    price_parser = subparsers.add_parser('price', help='Set the price of a crop')
+    price_parser.add_argument('--crop', required=True, help='Crop as recorded in yield data')
+    price_parser.add_argument('--price-per-unit', required=True, type=float, help='Price per yield unit')
+    price_parser.add_argument('--season', type=int, default=0, help='Season (default: any)')
+
+    invest_parser = subparsers.add_parser('invest', help='Record a precision investment')
+    invest_parser.add_argument('--name', required=True, help='Investment name')
+    invest_parser.add_argument('--start-season', required=True, type=int, help='First season in use')
+    invest_parser.add_argument('--cost', type=float, default=0.0, help='Purchase cost')
+    invest_parser.add_argument('--life-years', type=int, default=5, help='Useful life in seasons (default: 5)')
+    invest_parser.add_argument('--annual-cost', type=float, default=0.0, help='Recurring cost per season')
+
+    subparsers.add_parser('investments', help='List precision investments')
 
     args = parser.parse_args()
 
     db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
 
-    results = calculate_roi(
-        db_path,
-        season=args.season,
-        fields=args.fields.split(',') if args.fields != 'all' else None
-    )
-
-    print_roi_results(results)
-
-    # Export to JSON
-    output_file = f"/var/lib/precision-ag/roi_{args.season}.json"
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
-
-    print(f"\n✓ Results saved to {output_file}")
+    if args.command == 'report':
+        results = calculate_roi(
+            db_path,
+            season=args.season,
+            fields=args.fields.split(',') if args.fields != 'all' else None,
+            baseline_overlap=args.baseline_overlap,
+            pass_cost=args.pass_cost,
+            adoption_season=args.adoption_season,
+            cell_size=args.cell_size,
+            refresh=args.refresh,
+        )
+        if results is None:
+            return 1
+        if not results['fields']:
+            print(f"✗ No records for season {args.season}")
+            return 1
+
+        print_roi_results(results, detail=args.detail)
+        computed = sum(1 for row in results['fields'] if row['status'] == 'computed')
+        print(f"✓ {computed} computed, {len(results['fields']) - computed} cached")
+
+        output_file = args.output or os.path.join(os.path.dirname(db_path), f"roi_{args.season}.json")
+        with open(output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results saved to {output_file}")
+        return 0
+
+    calculator = ROICalculator(db_path)
+    if not calculator.connect():
+        return 1
+    try:
+        if args.command == 'cost':
+            calculator.set_input_cost(args.product, args.cost_per_unit, args.unit, args.season)
+            print(f"✓ {args.product}: ${args.cost_per_unit:g}/{args.unit or 'unit'}"
+                  f"{f' in {args.season}' if args.season else ''}")
+
+        elif args.command == 'price':
+            calculator.set_crop_price(args.crop, args.price_per_unit, args.season)
+            print(f"✓ {args.crop}: ${args.price_per_unit:g}/unit{f' in {args.season}' if args.season else ''}")
+
+        elif args.command == 'invest':
+            investment_id = calculator.add_investment(args.name, args.start_season, args.cost,
+                                                      args.life_years, args.annual_cost)
+            print(f"✓ Recorded investment {investment_id}: {args.name}")
+
+        elif args.command == 'investments':
+            investments = calculator.list_investments()
+            if not investments:
+                print("No investments recorded")
+            for inv in investments:
+                print(f"{inv['id']:>4}  {inv['name']:<30} {_money(inv['cost']):>12}  from {inv['start_season']}"
+                      f" over {inv['life_years']} seasons  + {_money(inv['annual_cost'])}/season")
+    finally:
+        calculator.disconnect()
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -40,9 +40,9 @@ if [ -d "venv" ]; then
 fi
 
 # Default values
-DEFAULT_GUIDANCE_TYPE="ab_lines"
-DEFAULT_SPACING="30"  # feet
-DEFAULT_EXPORT_FORMAT="shapefile"
+DEFAULT_GUIDANCE_TYPE="ab"
+DEFAULT_SPACING="9.144"  # metres (30 ft)
+DEFAULT_EXPORT_FORMAT="csv"
 
 # Function to show help
 show_help() {
@@ -70,7 +70,7 @@ Commands:
 Options:
   --field-id FIELD     Specify field ID
   --operation-type TYPE Specify operation type (planting, spraying, harvest)
-  --format FORMAT      Specify export format (shapefile, geojson, csv)
+  --format FORMAT      Specify export format (csv, geojson, parquet)
   --output PATH        Specify output path
   --verbose            Enable verbose output
   --quiet              Suppress output
@@ -78,8 +78,8 @@ Options:
 Examples:
   ./run.sh gps-status
   ./run.sh create-field --name "North Field" --gps-source /dev/ttyUSB0
-  ./run.sh setup-guidance --field-id 1 --type ab_lines --spacing 30
-  ./run.sh create-prescription --field-id 1 --zones prescription.json
+  ./run.sh setup-guidance --field-id 1 --guidance-type ab --spacing 9.144 --from-boundary
+  ./run.sh create-prescription --field-id 1 --name "Spring N" --rates 120,150,180
   ./run.sh monitor --field-id 1 --operation-type planting
   ./run.sh calculate-roi --season 2025
 
@@ -149,15 +149,17 @@ setup_guidance() {
     FIELD_ID=""
     GUIDANCE_TYPE="$DEFAULT_GUIDANCE_TYPE"
     SPACING="$DEFAULT_SPACING"
+    EXTRA_ARGS=()
 
-    # Parse arguments
+    # Parse arguments; anything else (--name, --a, --b, --heading,
+    # --from-boundary, --implement-id, ...) is passed to guidance.py
     while [[ $# -gt 0 ]]; do
         case $1 in
             --field-id)
                 FIELD_ID="$2"
                 shift 2
                 ;;
-            --type)
+            --guidance-type|--type)
                 GUIDANCE_TYPE="$2"
                 shift 2
                 ;;
@@ -166,6 +168,7 @@ setup_guidance() {
                 shift 2
                 ;;
             *)
+                EXTRA_ARGS+=("$1")
                 shift
                 ;;
         esac
@@ -176,7 +179,8 @@ setup_guidance() {
         exit 1
     fi
 
-    python3 scripts/guidance.py setup --field-id "$FIELD_ID" --type "$GUIDANCE_TYPE" --spacing "$SPACING"
+    python3 scripts/guidance.py create --field-id "$FIELD_ID" --guidance-type "$GUIDANCE_TYPE" \
+        --spacing "$SPACING" "${EXTRA_ARGS[@]}"
 }
 
 # Function to create prescription
@@ -184,18 +188,20 @@ create_prescription() {
     print_info "Creating variable rate prescription map..."
 
     FIELD_ID=""
-    ZONES_FILE=""
+    NAME=""
     INPUT_TYPE="fertilizer"
+    EXTRA_ARGS=()
 
-    # Parse arguments
+    # Parse arguments; the rate rule (--rates, or --intercept and --slope)
+    # and zone source options are passed to prescription.py
     while [[ $# -gt 0 ]]; do
         case $1 in
             --field-id)
                 FIELD_ID="$2"
                 shift 2
                 ;;
-            --zones)
-                ZONES_FILE="$2"
+            --name)
+                NAME="$2"
                 shift 2
                 ;;
             --input-type)
@@ -203,17 +209,19 @@ create_prescription() {
                 shift 2
                 ;;
             *)
+                EXTRA_ARGS+=("$1")
                 shift
                 ;;
         esac
     done
 
-    if [ -z "$FIELD_ID" ] || [ -z "$ZONES_FILE" ]; then
-        print_error "Field ID and zones file required"
+    if [ -z "$FIELD_ID" ] || [ -z "$NAME" ]; then
+        print_error "Field ID and prescription name required (--field-id, --name)"
         exit 1
     fi
 
-    python3 scripts/prescription.py create --field-id "$FIELD_ID" --zones "$ZONES_FILE" --input-type "$INPUT_TYPE"
+    python3 scripts/prescription.py create --field-id "$FIELD_ID" --name "$NAME" \
+        --input-type "$INPUT_TYPE" "${EXTRA_ARGS[@]}"
 }
 
 # Function to monitor operation
@@ -253,31 +261,29 @@ import_yield() {
     print_info "Importing yield data..."
 
     INPUT_FILE=""
-    FIELD_ID=""
+    EXTRA_ARGS=()
 
-    # Parse arguments
+    # Parse arguments; --field-id, --crop, --harvest-date and the cleaning
+    # options are passed to yield_processor.py
     while [[ $# -gt 0 ]]; do
         case $1 in
-            --file)
+            --input-file|--file)
                 INPUT_FILE="$2"
                 shift 2
                 ;;
-            --field-id)
-                FIELD_ID="$2"
-                shift 2
-                ;;
             *)
+                EXTRA_ARGS+=("$1")
                 shift
                 ;;
         esac
     done
 
     if [ -z "$INPUT_FILE" ]; then
-        print_error "Input file required (--file)"
+        print_error "Input file required (--input-file)"
         exit 1
     fi
 
-    python3 scripts/yield_processor.py import --file "$INPUT_FILE" --field-id "${FIELD_ID}"
+    python3 scripts/yield_processor.py import --input-file "$INPUT_FILE" "${EXTRA_ARGS[@]}"
 }
 
 # Function to generate yield map
@@ -285,20 +291,28 @@ generate_yield_map() {
     print_info "Generating yield map..."
 
     FIELD_ID=""
-    OUTPUT_FORMAT="$DEFAULT_EXPORT_FORMAT"
+    SEASON=""
+    OUTPUT_FORMAT="geojson"
+    EXTRA_ARGS=()
 
-    # Parse arguments
+    # Parse arguments; --output, --cell-size and --refresh are passed to
+    # yield_map.py
     while [[ $# -gt 0 ]]; do
         case $1 in
             --field-id)
                 FIELD_ID="$2"
                 shift 2
                 ;;
-            --format)
+            --season)
+                SEASON="$2"
+                shift 2
+                ;;
+            --output-format|--format)
                 OUTPUT_FORMAT="$2"
                 shift 2
                 ;;
             *)
+                EXTRA_ARGS+=("$1")
                 shift
                 ;;
         esac
@@ -309,7 +323,8 @@ generate_yield_map() {
         exit 1
     fi
 
-    python3 scripts/yield_map.py generate --field-id "$FIELD_ID" --format "$OUTPUT_FORMAT"
+    python3 scripts/yield_map.py --field-id "$FIELD_ID" --season "${SEASON:-$(date +%Y)}" \
+        --output-format "$OUTPUT_FORMAT" "${EXTRA_ARGS[@]}"
 }
 
 # Function to calculate ROI
@@ -336,7 +351,7 @@ calculate_roi() {
         esac
     done
 
-    python3 scripts/roi_calculator.py --season "${SEASON:-$(date +%Y)}" --fields "${FIELDS:-all}"
+    python3 scripts/roi_calculator.py report --season "${SEASON:-$(date +%Y)}" --fields "${FIELDS:-all}"
 }
 
 # Function to export data
@@ -346,8 +361,10 @@ export_data() {
     DATA_TYPE=""
     FORMAT="$DEFAULT_EXPORT_FORMAT"
     OUTPUT_PATH=""
+    EXTRA_ARGS=()
 
-    # Parse arguments
+    # Parse arguments; --field-id, --season and --implement-id are passed
+    # to data_export.py
     while [[ $# -gt 0 ]]; do
         case $1 in
             --data-type)
@@ -358,11 +375,12 @@ export_data() {
                 FORMAT="$2"
                 shift 2
                 ;;
-            --output)
+            --output-path|--output)
                 OUTPUT_PATH="$2"
                 shift 2
                 ;;
             *)
+                EXTRA_ARGS+=("$1")
                 shift
                 ;;
         esac
@@ -373,7 +391,8 @@ export_data() {
         exit 1
     fi
 
-    python3 scripts/data_export.py --data-type "$DATA_TYPE" --format "$FORMAT" --output "${OUTPUT_PATH}"
+    python3 scripts/data_export.py --data-type "$DATA_TYPE" --format "$FORMAT" \
+        --output-path "${OUTPUT_PATH:-$DATA_TYPE.$FORMAT}" "${EXTRA_ARGS[@]}"
 }
 
 # Function to backup data
@@ -382,7 +401,7 @@ backup_data() {
 
     BACKUP_LOCATION="${BACKUP_PATH:-/var/backups/precision-ag}"
 
-    python3 scripts/backup.py --location "$BACKUP_LOCATION"
+    python3 scripts/backup.py --backup-location "$BACKUP_LOCATION" create
 }
 
 # Function to import weather
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+GPS Track Logger for Plug-and-Play Precision Agriculture
+Record where machines drove, compactly enough to keep whole seasons
+
+Fixes are buffered per (implement, operation) and written as one row per
+time chunk (default 5 minutes) in gps_tracks. Each chunk is a BLOB of
+delta-encoded fixed-point columns:
+
+    time      milliseconds, first differences
+    lat, lon  1e-7 degrees (~1 cm), second differences
+    alt       centimetres, first differences
+    speed     cm/s, first differences
+    quality   GGA fix quality, first differences
+
+Each column is stored at the narrowest integer width its differences fit
+and the chunk is zlib-compressed. A column with missing values (NaN, e.g.
+a receiver that reports no altitude) carries a presence flag, plus a bit
+mask when only some fixes lack it, and decodes those values as NaN.
+Steady driving at 10 Hz makes nearly every difference zero or a few
+units, so a fix with RTK noise costs two to three bytes against roughly
+60 as a table row. Decoding is a couple of cumulative sums per column.
+"""
+
+import sys
+import argparse
+import asyncio
+import csv
+import os
+import sqlite3
+import struct
+import zlib
+
+import numpy as np
+
+from field_index import FieldIndex
+from nmea import NMEAParser, NMEAReader
+
+
+TRACK_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS gps_tracks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        implement_id INTEGER,
+        operation_id INTEGER,
+        field_id INTEGER,
+        chunk_start REAL NOT NULL,
+        chunk_end REAL NOT NULL,
+        points INTEGER NOT NULL,
+        min_lat REAL,
+        min_lon REAL,
+        max_lat REAL,
+        max_lon REAL,
+        data BLOB NOT NULL,
+        FOREIGN KEY (implement_id) REFERENCES implements(id) ON DELETE CASCADE,
+        FOREIGN KEY (operation_id) REFERENCES operations(id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_gps_tracks_implement_time
+        ON gps_tracks(implement_id, chunk_start);
+    CREATE INDEX IF NOT EXISTS idx_gps_tracks_operation ON gps_tracks(operation_id);
+    CREATE INDEX IF NOT EXISTS idx_gps_tracks_field ON gps_tracks(field_id);
+'''
+
+DEFAULT_CHUNK_SECONDS = 300
+
+# (name, fixed-point scale, difference order)
+TRACK_COLUMNS = (
+    ('time', 1000, 1),
+    ('lat', 1e7, 2),
+    ('lon', 1e7, 2),
+    ('alt', 100, 1),
+    ('speed', 100, 1),
+    ('quality', 1, 1),
+)
+
+TRACK_MAGIC = b'TRK2'
+WIDTHS = (np.int8, np.int16, np.int32, np.int64)
+
+FIX_DTYPE = np.dtype([(name, 'f8') for name, _, _ in TRACK_COLUMNS])
+
+# Per-column presence flag
+ALL_PRESENT, NONE_PRESENT, MASKED = 0, 1, 2
+
+
+def ensure_track_schema(conn):
+    """Create the gps_tracks table and its indexes
+
+    Args:
+        conn: SQLite connection
+    """
+    conn.executescript(TRACK_SCHEMA)
+
+
+def encode_chunk(fixes):
+    """Delta-encode a time-ordered block of fixes
+
+    Missing values (NaN) are flagged so they decode as NaN; in the
+    integer stream they repeat the previous value to keep deltas small.
+
+    Args:
+        fixes: Structured array with FIX_DTYPE fields (time in epoch seconds)
+
+    Returns:
+        bytes: Encoded chunk
+    """
+    n = len(fixes)
+    parts = [struct.pack('<I', n)]
+    for name, scale, order in TRACK_COLUMNS:
+        values = fixes[name]
+        missing = ~np.isfinite(values)
+        presence = ALL_PRESENT if not missing.any() else NONE_PRESENT if missing.all() else MASKED
+        if presence != ALL_PRESENT:
+            # Carry the last known value forward (zero before the first)
+            index = np.where(missing, 0, np.arange(n))
+            np.maximum.accumulate(index, out=index)
+            values = np.where(missing[index], 0.0, values[index])
+        scaled = np.round(values * scale).astype(np.int64)
+
+        heads = []
+        for _ in range(order):
+            heads.append(int(scaled[0]) if len(scaled) else 0)
+            scaled = np.diff(scaled)
+        peak = int(np.abs(scaled).max()) if len(scaled) else 0
+        width = next(i for i, dtype in enumerate(WIDTHS) if peak <= np.iinfo(dtype).max)
+        parts.append(struct.pack(f'<BB{order}q', presence, width, *heads))
+        parts.append(scaled.astype(WIDTHS[width]).tobytes())
+        if presence == MASKED:
+            parts.append(np.packbits(missing).tobytes())
+    return TRACK_MAGIC + zlib.compress(b''.join(parts), 6)
+
+
+def decode_chunk(blob):
+    """Decode a chunk written by encode_chunk
+
+    Args:
+        blob: Encoded chunk
+
+    Returns:
+        numpy.ndarray: Structured array with FIX_DTYPE fields
+    """
+    if blob[:4] != TRACK_MAGIC:
+        raise ValueError("Not a track chunk")
+    data = zlib.decompress(blob[4:])
+    n = struct.unpack_from('<I', data, 0)[0]
+    offset = 4
+    fixes = np.empty(n, dtype=FIX_DTYPE)
+    for name, scale, order in TRACK_COLUMNS:
+        header = struct.Struct(f'<BB{order}q')
+        presence, width, *heads = header.unpack_from(data, offset)
+        offset += header.size
+        dtype = np.dtype(WIDTHS[width])
+        count = max(n - order, 0)
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset).astype(np.int64)
+        offset += count * dtype.itemsize
+        for head in reversed(heads):
+            values = np.concatenate(([head], head + np.cumsum(values)))
+        fixes[name] = values[:n] / scale
+        if presence == NONE_PRESENT:
+            fixes[name] = np.nan
+        elif presence == MASKED:
+            size = (n + 7) // 8
+            missing = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=size, offset=offset),
+                                    count=n).astype(bool)
+            offset += size
+            fixes[name][missing] = np.nan
+    return fixes
+
+
+class TrackLogger:
+    """Buffer GPS fixes and store them as compressed track chunks"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db',
+                 chunk_seconds=DEFAULT_CHUNK_SECONDS):
+        """Initialize track logger
+
+        Args:
+            db_path: Path to SQLite database
+            chunk_seconds: Length of a stored chunk in seconds
+        """
+        self.db_path = db_path
+        self.chunk_seconds = chunk_seconds
+        self.conn = None
+        self.field_index = None
+        self.buffers = {}  # (implement_id, operation_id) -> [chunk key, array, count]
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        try:
+            self.conn = sqlite3.connect(self.db_path)
+            self.conn.row_factory = sqlite3.Row
+            ensure_track_schema(self.conn)
+            return True
+        except sqlite3.Error as e:
+            print(f"✗ Failed to connect to database: {e}")
+            return False
+
+    def disconnect(self):
+        """Flush buffered fixes and disconnect from database"""
+        if self.conn:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+    def log_fix(self, implement_id, operation_id, timestamp, lat, lon,
+                alt=float('nan'), speed=float('nan'), quality=1):
+        """Buffer one fix, writing the previous chunk when a new one starts
+
+        Args:
+            implement_id: Implement (machine) ID
+            operation_id: Operation ID or None
+            timestamp: Epoch seconds
+            lat, lon: Position in degrees
+            alt: Altitude in metres
+            speed: Ground speed in m/s
+            quality: GGA fix quality
+        """
+        key = (implement_id, operation_id)
+        chunk = int(timestamp // self.chunk_seconds)
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer[0] != chunk:
+            if buffer is not None:
+                self._write(key)
+            buffer = self.buffers[key] = [chunk, np.empty(1024, dtype=FIX_DTYPE), 0]
+        if buffer[2] == len(buffer[1]):
+            buffer[1] = np.resize(buffer[1], 2 * len(buffer[1]))
+        buffer[1][buffer[2]] = (timestamp, lat, lon, alt, speed, quality)
+        buffer[2] += 1
+
+    def log_fixes(self, implement_id, operation_id, timestamps, lat, lon,
+                  alt=None, speed=None, quality=None):
+        """Store a time-ordered batch of fixes (e.g. an imported log)
+
+        Args:
+            implement_id: Implement (machine) ID
+            operation_id: Operation ID or None
+            timestamps: Epoch seconds per fix
+            lat, lon: Positions in degrees
+            alt, speed, quality: Optional arrays as for log_fix
+
+        Returns:
+            int: Number of chunks written
+        """
+        n = len(timestamps)
+        fixes = np.empty(n, dtype=FIX_DTYPE)
+        fixes['time'] = timestamps
+        fixes['lat'] = lat
+        fixes['lon'] = lon
+        fixes['alt'] = np.nan if alt is None else alt
+        fixes['speed'] = np.nan if speed is None else speed
+        fixes['quality'] = 1 if quality is None else quality
+        fixes = fixes[np.isfinite(fixes['lat']) & np.isfinite(fixes['lon'])]
+        if len(fixes) == 0:
+            return 0
+
+        chunks = (fixes['time'] // self.chunk_seconds).astype(np.int64)
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(chunks)) + 1, [len(fixes)]))
+        rows = [self._chunk_row(implement_id, operation_id, fixes[a:b])
+                for a, b in zip(bounds[:-1], bounds[1:])]
+        self._insert(rows)
+        return len(rows)
+
+    def flush(self):
+        """Write every buffered chunk"""
+        rows = [self._chunk_row(key[0], key[1], buffer[1][:buffer[2]])
+                for key, buffer in self.buffers.items() if buffer[2]]
+        self.buffers = {}
+        self._insert(rows)
+
+    def _write(self, key):
+        buffer = self.buffers.pop(key)
+        if buffer[2]:
+            self._insert([self._chunk_row(key[0], key[1], buffer[1][:buffer[2]])])
+
+    def _chunk_row(self, implement_id, operation_id, fixes):
+        if self.field_index is None:
+            self.field_index = FieldIndex(self.conn)
+        else:
+            self.field_index.refresh()
+        fields = self.field_index.tag(fixes['lat'], fixes['lon'])
+        fields = fields[fields > 0]
+        field_id = int(np.bincount(fields).argmax()) if len(fields) else None
+        return (implement_id, operation_id, field_id,
+                float(fixes['time'][0]), float(fixes['time'][-1]), len(fixes),
+                float(fixes['lat'].min()), float(fixes['lon'].min()),
+                float(fixes['lat'].max()), float(fixes['lon'].max()),
+                encode_chunk(fixes))
+
+    def _insert(self, rows):
+        if not rows:
+            return
+        self.conn.executemany('''
+            INSERT INTO gps_tracks
+            (implement_id, operation_id, field_id, chunk_start, chunk_end, points,
+             min_lat, min_lon, max_lat, max_lon, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        self.conn.commit()
+
+    def load(self, implement_id=None, operation_id=None, field_id=None, start=None, end=None):
+        """Decode stored fixes for a time range
+
+        Args:
+            implement_id: Only this implement
+            operation_id: Only this operation
+            field_id: Only chunks tagged with this field
+            start, end: Epoch seconds (inclusive range)
+
+        Returns:
+            dict: NumPy arrays time, lat, lon, alt, speed, quality and
+            implement_id, ordered by implement then time
+        """
+        query = 'SELECT implement_id, data FROM gps_tracks WHERE 1 = 1'
+        params = []
+        for column, value in (('implement_id', implement_id), ('operation_id', operation_id),
+                              ('field_id', field_id)):
+            if value is not None:
+                query += f' AND {column} = ?'
+                params.append(value)
+        if start is not None:
+            query += ' AND chunk_end >= ?'
+            params.append(start)
+        if end is not None:
+            query += ' AND chunk_start <= ?'
+            params.append(end)
+        query += ' ORDER BY implement_id, chunk_start'
+
+        chunks = []
+        implements = []
+        for row in self.conn.execute(query, params):
+            fixes = decode_chunk(row['data'])
+            chunks.append(fixes)
+            implements.append(np.full(len(fixes), -1 if row['implement_id'] is None else row['implement_id']))
+        fixes = np.concatenate(chunks) if chunks else np.empty(0, dtype=FIX_DTYPE)
+        implement = np.concatenate(implements) if implements else np.empty(0, dtype=np.int64)
+
+        keep = np.ones(len(fixes), dtype=bool)
+        if start is not None:
+            keep &= fixes['time'] >= start
+        if end is not None:
+            keep &= fixes['time'] <= end
+        track = {name: fixes[name][keep] for name, _, _ in TRACK_COLUMNS}
+        track['quality'] = track['quality'].astype(np.int8)
+        track['implement_id'] = implement[keep]
+        return track
+
+    def summary(self, implement_id=None):
+        """Stored track totals per implement and operation
+
+        Args:
+            implement_id: Only this implement
+
+        Returns:
+            list: Dicts with implement_id, operation_id, chunks, points,
+            start, end and bytes
+        """
+        query = '''
+            SELECT implement_id, operation_id, COUNT(*) AS chunks, SUM(points) AS points,
+                   MIN(chunk_start) AS start, MAX(chunk_end) AS end, SUM(LENGTH(data)) AS bytes
+            FROM gps_tracks
+        '''
+        params = []
+        if implement_id is not None:
+            query += ' WHERE implement_id = ?'
+            params.append(implement_id)
+        query += ' GROUP BY implement_id, operation_id ORDER BY implement_id, start'
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def record(self, implement_id, operation_id, reader, duration=None):
+        """Log fixes from an NMEA reader until it stops
+
+        Args:
+            implement_id: Implement (machine) ID
+            operation_id: Operation ID or None
+            reader: NMEAReader
+            duration: Seconds to record (default until cancelled or end of file)
+
+        Returns:
+            int: Number of fixes logged
+        """
+        parser = reader.parser
+        logged = [0]
+
+        def on_fix(fix):
+            if fix['quality'] == 0:
+                return
+            timestamp = parser.timestamp(fix)
+            if timestamp is None:
+                return
+            self.log_fix(implement_id, operation_id, timestamp.timestamp(),
+                         float(fix['lat']), float(fix['lon']), float(fix['alt']),
+                         float(fix['speed']), int(fix['quality']))
+            logged[0] += 1
+
+        try:
+            asyncio.run(reader.run(duration=duration, on_fix=on_fix))
+        except KeyboardInterrupt:
+            pass
+        self.flush()
+        return logged[0]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Record and read compressed GPS tracks'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Record fixes from a receiver or NMEA log')
+    record_parser.add_argument('--implement-id', required=True, type=int, help='Implement ID')
+    record_parser.add_argument('--operation-id', type=int, help='Operation ID')
+    record_parser.add_argument('--port', default=os.getenv('GPS_PORT', '/dev/ttyUSB0'),
+                               help='Serial port (default: GPS_PORT or /dev/ttyUSB0)')
+    record_parser.add_argument('--baudrate', type=int, default=int(os.getenv('GPS_BAUDRATE', '9600')),
+                               help='Serial baud rate (default: GPS_BAUDRATE or 9600)')
+    record_parser.add_argument('--nmea-file', help='Import a recorded NMEA log instead of the port')
+    record_parser.add_argument('--duration', type=float, help='Seconds to record (default: until Ctrl-C)')
+    record_parser.add_argument('--chunk-seconds', type=int, default=DEFAULT_CHUNK_SECONDS,
+                               help=f'Chunk length in seconds (default: {DEFAULT_CHUNK_SECONDS})')
+
+    list_parser = subparsers.add_parser('list', help='List stored tracks')
+    list_parser.add_argument('--implement-id', type=int, help='Implement ID')
+
+    export_parser = subparsers.add_parser('export', help='Export fixes to CSV')
+    export_parser.add_argument('--implement-id', type=int, help='Implement ID')
+    export_parser.add_argument('--operation-id', type=int, help='Operation ID')
+    export_parser.add_argument('--field-id', type=int, help='Field ID')
+    export_parser.add_argument('--start', type=float, help='Start time (epoch seconds)')
+    export_parser.add_argument('--end', type=float, help='End time (epoch seconds)')
+    export_parser.add_argument('--output', required=True, help='CSV file')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    logger = TrackLogger(db_path=db_path, chunk_seconds=getattr(args, 'chunk_seconds', DEFAULT_CHUNK_SECONDS))
+
+    if not logger.connect():
+        return 1
+
+    try:
+        if args.command == 'record':
+            reader = NMEAReader(NMEAParser(), port=args.port, baudrate=args.baudrate,
+                                nmea_file=args.nmea_file)
+            try:
+                reader.open()
+            except (OSError, ValueError) as e:
+                print(f"✗ Failed to open NMEA source: {e}")
+                return 1
+            try:
+                logged = logger.record(args.implement_id, args.operation_id, reader, args.duration)
+            finally:
+                reader.close()
+            print(f"✓ Logged {logged:,} fixes for implement {args.implement_id}")
+
+        elif args.command == 'list':
+            tracks = logger.summary(args.implement_id)
+            if not tracks:
+                print("No tracks stored")
+                return 0
+            print(f"{'Implement':<10} {'Operation':<10} {'Chunks':>7} {'Fixes':>12} {'Hours':>8} {'Bytes/fix':>10}")
+            for track in tracks:
+                hours = (track['end'] - track['start']) / 3600
+                operation = track['operation_id'] if track['operation_id'] is not None else '-'
+                print(f"{track['implement_id']:<10} {operation:<10} {track['chunks']:>7,} {track['points']:>12,} "
+                      f"{hours:>8.1f} {track['bytes'] / track['points']:>10.2f}")
+
+        elif args.command == 'export':
+            track = logger.load(args.implement_id, args.operation_id, args.field_id, args.start, args.end)
+            columns = ['implement_id'] + [name for name, _, _ in TRACK_COLUMNS]
+            with open(args.output, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(zip(*(track[name].tolist() for name in columns)))
+            print(f"✓ Exported {len(track['time']):,} fixes to {args.output}")
+    finally:
+        logger.disconnect()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
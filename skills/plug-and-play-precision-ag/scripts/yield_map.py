@@ -1,15 +1,381 @@
 #!/usr/bin/env python3
 """
-Yield Map Generator (Stub)
-Full implementation would generate yield maps from data
+Yield Map Generator for Plug-and-Play Precision Agriculture
+Generate gridded yield maps from cleaned yield data
+
+Cleaned points from every harvest of a field in a season are binned into
+a regular grid (area-weighted mean yield per cell). Grids are anchored on
+the field centroid so cells line up from one season to the next. Each
+raster is cached as an .npz next to the point arrays and recorded in
+yield_rasters; it is rebuilt only when the underlying point files change.
 """
 
 import sys
+import argparse
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from geometry import local_latlon, local_xy
+from yield_processor import YieldProcessor, point_acres
+
+
+RASTER_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS yield_rasters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        field_id INTEGER NOT NULL,
+        season INTEGER NOT NULL,
+        cell_size REAL NOT NULL,
+        source_hash TEXT NOT NULL,
+        raster_path TEXT NOT NULL,
+        origin_lat REAL,
+        origin_lon REAL,
+        x0 REAL,
+        y0 REAL,
+        rows INTEGER,
+        cols INTEGER,
+        cells INTEGER,
+        mean_yield REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(field_id, season, cell_size),
+        FOREIGN KEY (field_id) REFERENCES fields(id) ON DELETE CASCADE
+    )
+'''
+
+DEFAULT_CELL_SIZE = 10.0  # metres
+
+
+def rasterize(x, y, values, weights, cell_size, x0=None, y0=None):
+    """Bin points into a grid of weighted mean values
+
+    Args:
+        x, y: Point coordinates in metres
+        values: Value per point
+        weights: Weight per point (e.g. harvested area)
+        cell_size: Cell edge in metres
+        x0, y0: Grid west and south edges (default: snapped to the data)
+
+    Returns:
+        dict: grid (rows x cols, NaN where empty, row 0 = north), count, x0, y0
+    """
+    if x0 is None:
+        x0 = np.floor(x.min() / cell_size) * cell_size
+    if y0 is None:
+        y0 = np.floor(y.min() / cell_size) * cell_size
+    cols = int(np.floor((x.max() - x0) / cell_size)) + 1
+    rows = int(np.floor((y.max() - y0) / cell_size)) + 1
+
+    col = np.floor((x - x0) / cell_size).astype(np.int64)
+    row = rows - 1 - np.floor((y - y0) / cell_size).astype(np.int64)
+    cell = row * cols + col
+
+    total = np.bincount(cell, weights=values * weights, minlength=rows * cols)
+    weight = np.bincount(cell, weights=weights, minlength=rows * cols)
+    count = np.bincount(cell, minlength=rows * cols)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grid = np.where(weight > 0, total / weight, np.nan)
+
+    return {
+        'grid': grid.reshape(rows, cols).astype('f4'),
+        'count': count.reshape(rows, cols).astype('i4'),
+        'x0': float(x0),
+        'y0': float(y0),
+    }
+
+
+def sources_hash(sources):
+    """Hash of yield data ids and point file stats; changes when any source changes"""
+    return hashlib.sha1(json.dumps([s[0:1] + s[2:] for s in sources]).encode()).hexdigest()
+
+
+class YieldMapGenerator:
+    """Build, cache and export yield rasters per field and season"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db', data_path=None):
+        """Initialize yield map generator
+
+        Args:
+            db_path: Path to SQLite database
+            data_path: Directory for point arrays and rasters (default: YIELD_DATA_PATH)
+        """
+        self.processor = YieldProcessor(db_path, data_path)
+        self.data_path = self.processor.data_path
+        self.conn = None
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        if not self.processor.connect():
+            return False
+        self.conn = self.processor.conn
+        self.conn.execute(RASTER_SCHEMA)
+        self.conn.commit()
+        return True
+
+    def disconnect(self):
+        """Disconnect from database"""
+        self.processor.disconnect()
+
+    def seasons(self, field_id):
+        """Harvest years with yield data for a field
+
+        Returns:
+            list: Years, oldest first
+        """
+        rows = self.conn.execute('''
+            SELECT DISTINCT CAST(strftime('%Y', harvest_date) AS INTEGER) AS season
+            FROM yield_data WHERE field_id = ? ORDER BY season
+        ''', (field_id,)).fetchall()
+        return [row['season'] for row in rows]
+
+    def sources(self, field_id, season):
+        """Point files behind a field's raster for one season
+
+        Returns:
+            list: (yield_id, points_file, mtime_ns, size) tuples
+        """
+        rows = self.conn.execute('''
+            SELECT id FROM yield_data
+            WHERE field_id = ? AND CAST(strftime('%Y', harvest_date) AS INTEGER) = ?
+            ORDER BY id
+        ''', (field_id, season)).fetchall()
+        sources = []
+        for row in rows:
+            metadata = self.processor.metadata(row['id'])
+            if metadata and os.path.exists(metadata['points_file']):
+                stat = os.stat(metadata['points_file'])
+                sources.append((row['id'], metadata['points_file'], stat.st_mtime_ns, stat.st_size))
+        return sources
+
+    def _origin(self, field_id, points):
+        row = self.conn.execute(
+            'SELECT centroid_lat, centroid_lon FROM fields WHERE id = ?', (field_id,)
+        ).fetchone()
+        if row and row['centroid_lat'] is not None:
+            return row['centroid_lat'], row['centroid_lon']
+        return float(points['lat'].mean()), float(points['lon'].mean())
+
+    def raster(self, field_id, season, cell_size=DEFAULT_CELL_SIZE, refresh=False):
+        """Yield raster for a field and season, from cache when current
+
+        Args:
+            field_id: Field ID
+            season: Harvest year
+            cell_size: Cell edge in metres
+            refresh: Rebuild even if the cache is current
+
+        Returns:
+            dict: Raster and metadata, or None if the field has no yield data
+        """
+        sources = self.sources(field_id, season)
+        if not sources:
+            return None
+        source_hash = sources_hash(sources)
+
+        cached = self.conn.execute('''
+            SELECT * FROM yield_rasters WHERE field_id = ? AND season = ? AND cell_size = ?
+        ''', (field_id, season, cell_size)).fetchone()
+        if cached and not refresh and cached['source_hash'] == source_hash \
+                and os.path.exists(cached['raster_path']):
+            return self.load(cached['raster_path'])
+
+        # Valid points only, straight from the memory-mapped arrays
+        parts = []
+        for _, path, _, _ in sources:
+            points = np.load(path, mmap_mode='r')
+            parts.append(points[points['flags'] == 0])
+        points = np.concatenate(parts)
+        if len(points) == 0:
+            return None
+
+        origin_lat, origin_lon = self._origin(field_id, points)
+        x, y = local_xy(points['lat'], points['lon'], origin_lat, origin_lon)
+        result = rasterize(x, y, points['yield'].astype('f8'), point_acres(points), cell_size)
+        result.update(field_id=field_id, season=season, cell_size=cell_size,
+                      origin_lat=origin_lat, origin_lon=origin_lon)
+
+        raster_path = self.data_path / f"field_{field_id}" / f"raster_{season}_{cell_size:g}m.npz"
+        raster_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(raster_path, grid=result['grid'], count=result['count'],
+                 meta=json.dumps({key: result[key] for key in
+                                  ('field_id', 'season', 'cell_size', 'origin_lat', 'origin_lon', 'x0', 'y0')}))
+
+        grid = result['grid']
+        cells = int(np.isfinite(grid).sum())
+        self.conn.execute('''
+            INSERT INTO yield_rasters (field_id, season, cell_size, source_hash, raster_path, origin_lat,
+                                       origin_lon, x0, y0, rows, cols, cells, mean_yield)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (field_id, season, cell_size) DO UPDATE SET
+                source_hash = excluded.source_hash, raster_path = excluded.raster_path,
+                origin_lat = excluded.origin_lat, origin_lon = excluded.origin_lon,
+                x0 = excluded.x0, y0 = excluded.y0, rows = excluded.rows, cols = excluded.cols,
+                cells = excluded.cells, mean_yield = excluded.mean_yield,
+                created_at = CURRENT_TIMESTAMP
+        ''', (field_id, season, cell_size, source_hash, str(raster_path), origin_lat, origin_lon,
+              result['x0'], result['y0'], grid.shape[0], grid.shape[1], cells,
+              float(np.nanmean(grid)) if cells else None))
+        self.conn.commit()
+        result['path'] = str(raster_path)
+        return result
+
+    @staticmethod
+    def load(raster_path):
+        """Load a cached raster file
+
+        Returns:
+            dict: grid, count and metadata
+        """
+        with np.load(raster_path) as data:
+            result = json.loads(str(data['meta']))
+            result['grid'] = data['grid']
+            result['count'] = data['count']
+        result['path'] = str(raster_path)
+        return result
+
+    @staticmethod
+    def cell_centers(raster):
+        """Latitude and longitude of every cell center
+
+        Returns:
+            tuple: (lat, lon) arrays shaped like the grid
+        """
+        rows, cols = raster['grid'].shape
+        size = raster['cell_size']
+        x = raster['x0'] + (np.arange(cols) + 0.5) * size
+        y = raster['y0'] + (rows - np.arange(rows) - 0.5) * size
+        xx, yy = np.meshgrid(x, y)
+        return local_latlon(xx, yy, raster['origin_lat'], raster['origin_lon'])
+
+    def export(self, raster, output_path, output_format='geojson'):
+        """Export a raster as CSV cell centers, GeoJSON cell polygons or NPZ
+
+        Args:
+            raster: Raster from raster()
+            output_path: Output file
+            output_format: csv, geojson or npz
+
+        Returns:
+            int: Number of cells written
+        """
+        grid = raster['grid']
+        rows, cols = np.nonzero(np.isfinite(grid))
+
+        if output_format == 'npz':
+            np.savez(output_path, grid=grid, count=raster['count'],
+                     meta=json.dumps({key: raster[key] for key in
+                                      ('field_id', 'season', 'cell_size', 'origin_lat', 'origin_lon',
+                                       'x0', 'y0')}))
+            return len(rows)
+
+        lat, lon = self.cell_centers(raster)
+        if output_format == 'csv':
+            with open(output_path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['row', 'col', 'lat', 'lon', 'yield_bu_ac', 'points'])
+                for r, c in zip(rows, cols):
+                    writer.writerow([r, c, f"{lat[r, c]:.7f}", f"{lon[r, c]:.7f}",
+                                     f"{grid[r, c]:.1f}", int(raster['count'][r, c])])
+            return len(rows)
+
+        # GeoJSON polygons: cell corners from the local grid
+        size = raster['cell_size']
+        x_west = raster['x0'] + cols * size
+        y_north = raster['y0'] + (grid.shape[0] - rows) * size
+        corners_x = np.stack([x_west, x_west + size, x_west + size, x_west, x_west], axis=1)
+        corners_y = np.stack([y_north, y_north, y_north - size, y_north - size, y_north], axis=1)
+        corner_lat, corner_lon = local_latlon(corners_x, corners_y, raster['origin_lat'], raster['origin_lon'])
+
+        features = []
+        for i, (r, c) in enumerate(zip(rows, cols)):
+            ring = [[round(float(corner_lon[i, k]), 7), round(float(corner_lat[i, k]), 7)] for k in range(5)]
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                'properties': {'yield_bu_ac': round(float(grid[r, c]), 1), 'points': int(raster['count'][r, c])},
+            })
+        with open(output_path, 'w') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features}, f)
+        return len(features)
+
+
+def print_raster_summary(raster):
+    """Print yield map statistics
+
+    Args:
+        raster: Raster from YieldMapGenerator.raster()
+    """
+    grid = raster['grid']
+    values = grid[np.isfinite(grid)]
+
+    print("\n" + "=" * 60)
+    print(f"YIELD MAP - Field {raster['field_id']}, {raster['season']}")
+    print("=" * 60)
+    print(f"Grid:        {grid.shape[0]} x {grid.shape[1]} cells of {raster['cell_size']:g} m")
+    print(f"Cells:       {len(values):,} with data")
+    if len(values):
+        print(f"Mean yield:  {values.mean():.1f} bu/ac")
+        print(f"Range:       {values.min():.1f} - {values.max():.1f} bu/ac")
+        print(f"CV:          {values.std() / values.mean() * 100:.1f}%")
+        print("\nYield classes (quintiles):")
+        edges = np.percentile(values, [0, 20, 40, 60, 80, 100])
+        counts, _ = np.histogram(values, bins=edges)
+        for low, high, count in zip(edges[:-1], edges[1:], counts):
+            print(f"  {low:6.1f} - {high:6.1f} bu/ac  {count:>7,} cells")
+    print("=" * 60)
+
 
 def main():
-    print("Yield map generator - Full implementation pending")
-    print("This script will generate yield maps from cleaned data")
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Generate yield maps from cleaned yield data'
+    )
+    parser.add_argument('--field-id', required=True, type=int, help='Field ID')
+    parser.add_argument('--season', required=True, type=int, help='Harvest year')
+    parser.add_argument(
+        '--cell-size',
+        type=float,
+        default=DEFAULT_CELL_SIZE,
+        help=f'Grid cell size in metres (default: {DEFAULT_CELL_SIZE:g})'
+    )
+    parser.add_argument(
+        '--output-format',
+        choices=['geojson', 'csv', 'npz'],
+        default='geojson',
+        help='Export format (default: geojson)'
+    )
+    parser.add_argument('--output', help='Export file (default: print summary only)')
+    parser.add_argument('--refresh', action='store_true', help='Rebuild the cached raster')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    generator = YieldMapGenerator(db_path=db_path)
+
+    if not generator.connect():
+        return 1
+
+    try:
+        raster = generator.raster(args.field_id, args.season, args.cell_size, args.refresh)
+        if raster is None:
+            print(f"✗ No cleaned yield data for field {args.field_id} in {args.season}")
+            return 1
+
+        print_raster_summary(raster)
+        if args.output:
+            cells = generator.export(raster, args.output, args.output_format)
+            print(f"\n✓ Exported {cells:,} cells to {args.output}")
+    finally:
+        generator.disconnect()
+
     return 0
 
+
 if __name__ == '__main__':
     sys.exit(main())
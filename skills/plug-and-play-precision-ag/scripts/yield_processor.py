@@ -1,15 +1,594 @@
 #!/usr/bin/env python3
 """
-Yield Data Processor (Stub)
-Full implementation would import and clean yield monitor data
+Yield Data Processor for Plug-and-Play Precision Agriculture
+Import and clean yield monitor data
+
+Points are kept in NumPy arrays on disk (one .npy file per harvest under
+YIELD_DATA_PATH) instead of a JSON blob in the database; the yield_data
+row holds the summary and a pointer to the array file. Cleaning applies
+the standard yield monitor filters to whole arrays at once:
+
+- header up: points logged with the header raised
+- flow delay: grain flow is shifted back onto the position it was cut at
+- pass ends: fill/drain time at the start and end of each pass
+- speed: implausible speeds and abrupt speed changes
+- overlap: ground already harvested by an earlier pass
+- yield outliers: robust z-score beyond YIELD_OUTLIER_THRESHOLD
 """
 
 import sys
+import argparse
+import csv
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from field_index import FieldIndex
+from geometry import local_xy
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+
+DEFAULT_DATA_PATH = '/var/lib/precision-ag/yield_data'
+
+# crop: (test weight lb/bu, standard moisture %)
+CROP_CONSTANTS = {
+    'corn': (56.0, 15.5),
+    'soybeans': (60.0, 13.0),
+    'wheat': (60.0, 13.5),
+    'oats': (32.0, 14.0),
+    'sorghum': (56.0, 14.0),
+}
+
+POINT_DTYPE = np.dtype([
+    ('time', 'f8'),       # seconds since epoch
+    ('lat', 'f8'),
+    ('lon', 'f8'),
+    ('flow', 'f4'),       # wet mass flow, lb/s
+    ('moisture', 'f4'),   # %
+    ('speed', 'f4'),      # mph
+    ('swath', 'f4'),      # ft
+    ('header', 'i1'),     # 1 = header down / logging
+    ('pass_id', 'i4'),
+    ('yield', 'f4'),      # dry bu/ac after cleaning
+    ('flags', 'u1'),      # FLAG_* bits; 0 = valid
+])
+
+FLAG_HEADER_UP = 1
+FLAG_FLOW_DELAY = 2
+FLAG_PASS_ENDS = 4
+FLAG_SPEED = 8
+FLAG_OVERLAP = 16
+FLAG_OUTLIER = 32
+
+FLAG_NAMES = {
+    FLAG_HEADER_UP: 'header_up',
+    FLAG_FLOW_DELAY: 'flow_delay',
+    FLAG_PASS_ENDS: 'pass_ends',
+    FLAG_SPEED: 'speed',
+    FLAG_OVERLAP: 'overlap',
+    FLAG_OUTLIER: 'yield_outlier',
+}
+
+DEFAULT_FILTERS = {
+    'flow_delay': 12.0,      # s from cutting to the mass flow sensor
+    'start_delay': 4.0,      # s of fill time dropped at pass start
+    'end_delay': 4.0,        # s of drain time dropped at pass end
+    'pass_gap': 5.0,         # s without data that starts a new pass
+    'turn_angle': 100.0,     # degrees of heading change that starts a new pass
+    'min_speed': 1.0,        # mph
+    'max_speed': 10.0,       # mph
+    'speed_change': 0.35,    # fraction away from the local median speed
+    'overlap_cell': 0.5,     # overlap grid cell as a fraction of the swath
+    'outlier_z': float(os.getenv('YIELD_OUTLIER_THRESHOLD', '3.0')),
+}
+
+# Accepted column names (lowercase) for each point field
+COLUMN_ALIASES = {
+    'time': ['time', 'timestamp', 'time_s', 'datetime', 'date_time'],
+    'lat': ['lat', 'latitude', 'y'],
+    'lon': ['lon', 'long', 'longitude', 'x'],
+    'flow': ['flow', 'mass_flow', 'flow_lb_s', 'flow (lb/s)', 'yld mass(wet)(lb/s)'],
+    'moisture': ['moisture', 'moisture_pct', 'moisture (%)', 'moisture(%)'],
+    'speed': ['speed', 'speed_mph', 'speed (mph)', 'speed(mph)'],
+    'swath': ['swath', 'swath_ft', 'swath_width', 'swath width (ft)', 'swath width(ft)'],
+    'header': ['header', 'header_status', 'header status'],
+}
+
+MPH_TO_FT_S = 5280.0 / 3600.0
+SQFT_PER_ACRE = 43560.0
+
+
+def _parse_times(values):
+    """Seconds since epoch from numeric seconds or ISO timestamps"""
+    try:
+        return np.asarray(values, dtype='f8')
+    except (TypeError, ValueError):
+        pass
+    if PANDAS_AVAILABLE:
+        return pd.to_datetime(pd.Series(values)).astype('int64').to_numpy() / 1e9
+    return np.array([datetime.fromisoformat(v).timestamp() for v in values], dtype='f8')
+
+
+def read_points(path):
+    """Read a yield monitor CSV export into a point array
+
+    Args:
+        path: CSV file with at least time, lat, lon and flow columns
+
+    Returns:
+        numpy.ndarray: Structured array of POINT_DTYPE sorted by time
+    """
+    if PANDAS_AVAILABLE:
+        frame = pd.read_csv(path)
+        columns = {name.strip().lower(): frame[name] for name in frame.columns}
+        raw = {key: columns[name].to_numpy() for key, names in COLUMN_ALIASES.items()
+               for name in names if name in columns}
+    else:
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = [name.strip().lower() for name in next(reader)]
+            rows = list(reader)
+        raw = {}
+        for key, names in COLUMN_ALIASES.items():
+            for name in names:
+                if name in header:
+                    i = header.index(name)
+                    raw[key] = [row[i] for row in rows]
+                    break
+
+    missing = [key for key in ('time', 'lat', 'lon', 'flow') if key not in raw]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    n = len(raw['time'])
+    points = np.zeros(n, dtype=POINT_DTYPE)
+    points['time'] = _parse_times(raw['time'])
+    for key in ('lat', 'lon', 'flow', 'moisture', 'speed', 'swath'):
+        if key in raw:
+            points[key] = np.asarray(raw[key], dtype='f8')
+    points['header'] = np.asarray(raw['header'], dtype='f8') if 'header' in raw else 1
+    if 'moisture' not in raw:
+        # Unknown, so cleaning assumes the crop's standard moisture
+        points['moisture'] = np.nan
+    if 'swath' not in raw:
+        points['swath'] = 30.0
+
+    points.sort(order='time', kind='stable')
+    if 'speed' not in raw:
+        x, y = local_xy(points['lat'], points['lon'], points['lat'].mean(), points['lon'].mean())
+        dt = np.diff(points['time'], prepend=np.nan)
+        step = np.hypot(np.diff(x, prepend=np.nan), np.diff(y, prepend=np.nan))
+        points['speed'] = np.nan_to_num(step / dt / 0.44704)
+    return points
+
+
+def _rolling_median(values, window):
+    """Centered rolling median with edge padding"""
+    half = window // 2
+    padded = np.pad(values, half, mode='edge')
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+
+
+def assign_passes(points, x, y, pass_gap, turn_angle):
+    """Number passes, breaking on time gaps, header changes and turns"""
+    n = len(points)
+    breaks = np.zeros(n, dtype=bool)
+    if n == 0:
+        return breaks
+
+    breaks[1:] |= np.diff(points['time']) > pass_gap
+    breaks[1:] |= points['header'][1:] != points['header'][:-1]
+
+    # Heading over the last and next few points; a large change is a turn
+    k = 3
+    if n > 2 * k:
+        back = np.arctan2(x[k:-k] - x[:-2 * k], y[k:-k] - y[:-2 * k])
+        ahead = np.arctan2(x[2 * k:] - x[k:-k], y[2 * k:] - y[k:-k])
+        change = np.degrees(np.abs((ahead - back + np.pi) % (2 * np.pi) - np.pi))
+        turning = np.zeros(n, dtype=bool)
+        turning[k:-k] = change > turn_angle
+        # Break once where a turn starts
+        breaks[1:] |= turning[1:] & ~turning[:-1]
+
+    points['pass_id'] = np.cumsum(breaks)
+    return breaks
+
+
+def logging_intervals(time, max_gap):
+    """Seconds each point represents; gaps and the first point use the median interval"""
+    interval = np.diff(time, prepend=np.nan)
+    typical = float(np.nanmedian(interval)) if len(time) > 1 else 1.0
+    interval = np.where(np.isfinite(interval) & (interval > 0) & (interval <= max_gap), interval, typical)
+    return interval, typical
+
+
+def point_acres(points, max_gap=DEFAULT_FILTERS['pass_gap']):
+    """Area covered by each point in acres"""
+    interval, _ = logging_intervals(points['time'], max_gap)
+    return points['speed'] * MPH_TO_FT_S * interval * points['swath'] / SQFT_PER_ACRE
+
+
+def clean_points(points, crop='corn', lat0=None, lon0=None, filters=None):
+    """Compute dry yield and apply cleaning filters in place
+
+    Args:
+        points: Structured array of POINT_DTYPE sorted by time
+        crop: Crop name for test weight and standard moisture
+        lat0, lon0: Projection origin (defaults to the point centroid)
+        filters: Overrides for DEFAULT_FILTERS
+
+    Returns:
+        dict: Number of points removed by each filter and points kept
+    """
+    params = dict(DEFAULT_FILTERS)
+    params.update(filters or {})
+    test_weight, standard_moisture = CROP_CONSTANTS.get((crop or '').lower(), CROP_CONSTANTS['corn'])
+
+    n = len(points)
+    flags = np.zeros(n, dtype='u1')
+    if n == 0:
+        points['flags'] = flags
+        return {'points': 0, 'valid': 0}
+
+    lat0 = points['lat'].mean() if lat0 is None else lat0
+    lon0 = points['lon'].mean() if lon0 is None else lon0
+    x, y = local_xy(points['lat'], points['lon'], lat0, lon0)
+    time = points['time']
+
+    assign_passes(points, x, y, params['pass_gap'], params['turn_angle'])
+    pass_id = points['pass_id']
+    flags[points['header'] == 0] |= FLAG_HEADER_UP
+
+    interval, typical = logging_intervals(time, params['pass_gap'])
+
+    # Flow delay: flow measured at t + delay belongs to the position logged at t
+    target = time + params['flow_delay']
+    source = np.clip(np.searchsorted(time, target), 0, n - 1)
+    aligned = (np.abs(time[source] - target) <= typical) & (pass_id[source] == pass_id)
+    flow = np.where(aligned, points['flow'][source], np.nan)
+    moisture = np.where(aligned, points['moisture'][source], np.nan)
+    flags[~aligned] |= FLAG_FLOW_DELAY
+
+    # Start/end of pass fill and drain time
+    starts = np.full(pass_id.max() + 1, np.inf)
+    ends = np.full(pass_id.max() + 1, -np.inf)
+    np.minimum.at(starts, pass_id, time)
+    np.maximum.at(ends, pass_id, time)
+    pass_ends = (time - starts[pass_id] < params['start_delay']) | \
+                (ends[pass_id] - time < params['end_delay'])
+    flags[pass_ends] |= FLAG_PASS_ENDS
+
+    # Speed limits and abrupt changes against the local median
+    speed = points['speed'].astype('f8')
+    local = _rolling_median(speed, 5) if n >= 5 else speed
+    abrupt = np.abs(speed - local) > params['speed_change'] * np.maximum(local, 1e-6)
+    flags[(speed < params['min_speed']) | (speed > params['max_speed']) | abrupt] |= FLAG_SPEED
+
+    # Dry yield in bu/ac
+    area_ac = speed * MPH_TO_FT_S * interval * points['swath'] / SQFT_PER_ACRE
+    moisture = np.clip(np.nan_to_num(moisture, nan=standard_moisture), 0, 60)
+    dry_bu = flow * interval / test_weight * (100.0 - moisture) / (100.0 - standard_moisture)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yields = dry_bu / area_ac
+    points['yield'] = np.where(np.isfinite(yields), yields, np.nan)
+
+    # Overlap: cells first harvested by an earlier pass
+    kept = flags == 0
+    cell = max(float(np.median(points['swath'])) * 0.3048 * params['overlap_cell'], 0.5)
+    cx = np.floor(x / cell).astype(np.int64)
+    cy = np.floor(y / cell).astype(np.int64)
+    keys = (cx - cx.min()) * (cy.max() - cy.min() + 1) + (cy - cy.min())
+    kept_index = np.flatnonzero(kept)
+    if len(kept_index):
+        _, first, inverse = np.unique(keys[kept_index], return_index=True, return_inverse=True)
+        first_pass = pass_id[kept_index][first][inverse]
+        overlap = pass_id[kept_index] != first_pass
+        flags[kept_index[overlap]] |= FLAG_OVERLAP
+
+    # Yield outliers by robust z-score among the remaining points
+    kept = (flags == 0) & np.isfinite(points['yield']) & (points['yield'] > 0)
+    flags[(flags == 0) & ~kept] |= FLAG_OUTLIER
+    values = points['yield'][kept]
+    if len(values) > 10:
+        median = np.median(values)
+        mad = np.median(np.abs(values - median)) * 1.4826
+        scale = mad if mad > 0 else values.std() or 1.0
+        outlier = np.abs(points['yield'] - median) / scale > params['outlier_z']
+        flags[kept & outlier] |= FLAG_OUTLIER
+
+    points['flags'] = flags
+
+    removed = {}
+    already = np.zeros(n, dtype=bool)
+    for bit, name in FLAG_NAMES.items():
+        hit = (flags & bit).astype(bool) & ~already
+        removed[name] = int(hit.sum())
+        already |= hit
+    removed['points'] = n
+    removed['valid'] = int((flags == 0).sum())
+    return removed
+
+
+def summarize(points):
+    """Harvest totals from cleaned points
+
+    Returns:
+        dict: Mean yield, moisture, harvested acres and dry bushels
+    """
+    valid = points['flags'] == 0
+    if not valid.any():
+        return {'mean_yield': None, 'mean_moisture': None, 'acres': 0.0, 'bushels': 0.0}
+
+    area = point_acres(points)[valid]
+    yields = points['yield'][valid]
+    moisture = points['moisture'][valid]
+    measured = np.isfinite(moisture)
+    return {
+        'mean_yield': float(np.average(yields, weights=area)) if area.sum() > 0 else float(yields.mean()),
+        'mean_moisture': float(moisture[measured].mean()) if measured.any() else None,
+        'acres': float(area.sum()),
+        'bushels': float((yields * area).sum()),
+    }
+
+
+class YieldProcessor:
+    """Import, store and clean yield monitor points"""
+
+    def __init__(self, db_path='/var/lib/precision-ag/precision-ag.db', data_path=None):
+        """Initialize yield processor
+
+        Args:
+            db_path: Path to SQLite database
+            data_path: Directory for point arrays (default: YIELD_DATA_PATH)
+        """
+        self.db_path = db_path
+        self.data_path = Path(data_path or os.getenv('YIELD_DATA_PATH', DEFAULT_DATA_PATH))
+        self.conn = None
+
+    def connect(self):
+        """Connect to database
+
+        Returns:
+            bool: True if connection successful
+        """
+        try:
+            self.conn = sqlite3.connect(self.db_path)
+            self.conn.row_factory = sqlite3.Row
+            return True
+        except sqlite3.Error as e:
+            print(f"✗ Failed to connect to database: {e}")
+            return False
+
+    def disconnect(self):
+        """Disconnect from database"""
+        if self.conn:
+            self.conn.close()
+
+    def _field_origin(self, field_id):
+        row = self.conn.execute(
+            'SELECT centroid_lat, centroid_lon FROM fields WHERE id = ?', (field_id,)
+        ).fetchone()
+        if row and row['centroid_lat'] is not None:
+            return row['centroid_lat'], row['centroid_lon']
+        return None, None
+
+    def locate_field(self, points):
+        """Field containing most of the points, from the field spatial index
+
+        Returns:
+            int: Field ID or None
+        """
+        field_ids = FieldIndex(self.conn).tag(points['lat'], points['lon'])
+        field_ids = field_ids[field_ids > 0]
+        if len(field_ids) == 0:
+            return None
+        values, counts = np.unique(field_ids, return_counts=True)
+        return int(values[np.argmax(counts)])
+
+    def import_file(self, input_file, field_id, crop='corn', harvest_date=None, filters=None):
+        """Import a yield monitor CSV, clean it and store the points
+
+        Args:
+            input_file: Yield monitor CSV export
+            field_id: Field ID (default: the field most points fall in)
+            crop: Crop harvested
+            harvest_date: Harvest date (default: date of the first point)
+            filters: Overrides for DEFAULT_FILTERS
+
+        Returns:
+            tuple: (yield_data ID, points removed per filter, harvest summary)
+        """
+        points = read_points(input_file)
+        if field_id is None:
+            field_id = self.locate_field(points)
+            if field_id is None:
+                raise ValueError('points are not inside any field boundary; pass --field-id')
+        lat0, lon0 = self._field_origin(field_id)
+        removed = clean_points(points, crop, lat0, lon0, filters)
+        summary = summarize(points)
+
+        if harvest_date is None and len(points):
+            harvest_date = datetime.fromtimestamp(points['time'][0]).strftime('%Y-%m-%d')
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO yield_data (field_id, harvest_date, crop, moisture, total_yield)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (field_id, harvest_date, crop, summary['mean_moisture'], summary['bushels']))
+        yield_id = cursor.lastrowid
+
+        points_file = self.data_path / f"field_{field_id}" / f"yield_{yield_id}.npy"
+        points_file.parent.mkdir(parents=True, exist_ok=True)
+        np.save(points_file, points)
+
+        self._save_metadata(yield_id, points_file, input_file, filters, removed, summary)
+        self.conn.commit()
+        return yield_id, removed, summary
+
+    def _save_metadata(self, yield_id, points_file, source, filters, removed, summary):
+        metadata = {
+            'points_file': str(points_file),
+            'source_file': str(source),
+            'filters': dict(DEFAULT_FILTERS, **(filters or {})),
+            'removed': removed,
+            'summary': summary,
+        }
+        self.conn.execute('''
+            UPDATE yield_data SET yield_data_json = ?, moisture = ?, total_yield = ? WHERE id = ?
+        ''', (json.dumps(metadata), summary['mean_moisture'], summary['bushels'], yield_id))
+
+    def metadata(self, yield_id):
+        """Stored metadata for a yield dataset
+
+        Returns:
+            dict: Metadata including points_file, or None
+        """
+        row = self.conn.execute(
+            'SELECT field_id, crop, harvest_date, yield_data_json FROM yield_data WHERE id = ?',
+            (yield_id,)
+        ).fetchone()
+        if not row or not row['yield_data_json']:
+            return None
+        metadata = json.loads(row['yield_data_json'])
+        if 'points_file' not in metadata:
+            return None
+        metadata.update(field_id=row['field_id'], crop=row['crop'], harvest_date=row['harvest_date'])
+        return metadata
+
+    def load_points(self, yield_id, mmap=True):
+        """Load the point array for a yield dataset
+
+        Args:
+            yield_id: yield_data ID
+            mmap: Memory-map the file instead of reading it
+
+        Returns:
+            numpy.ndarray: Points, or None if not found
+        """
+        metadata = self.metadata(yield_id)
+        if not metadata or not os.path.exists(metadata['points_file']):
+            return None
+        return np.load(metadata['points_file'], mmap_mode='r' if mmap else None)
+
+    def reclean(self, yield_id, filters=None):
+        """Re-run cleaning on stored points with different filter settings
+
+        Returns:
+            tuple: (removed counts, summary) or None if not found
+        """
+        metadata = self.metadata(yield_id)
+        points = self.load_points(yield_id, mmap=False)
+        if points is None:
+            return None
+        lat0, lon0 = self._field_origin(metadata['field_id'])
+        removed = clean_points(points, metadata['crop'], lat0, lon0, filters)
+        summary = summarize(points)
+        np.save(metadata['points_file'], points)
+        self._save_metadata(yield_id, metadata['points_file'], metadata.get('source_file'),
+                            filters, removed, summary)
+        self.conn.commit()
+        return removed, summary
+
+
+def print_cleaning_report(yield_id, removed, summary):
+    """Print cleaning results
+
+    Args:
+        yield_id: yield_data ID
+        removed: Points removed per filter
+        summary: Harvest summary
+    """
+    print("\n" + "=" * 60)
+    print(f"YIELD DATA {yield_id}")
+    print("=" * 60)
+    print(f"Points:            {removed['points']:,}")
+    for name in FLAG_NAMES.values():
+        print(f"  - {name:<16} {removed[name]:,}")
+    print(f"Valid points:      {removed['valid']:,}")
+    if summary['mean_yield'] is not None:
+        print(f"\nMean yield:        {summary['mean_yield']:.1f} bu/ac")
+        if summary['mean_moisture'] is not None:
+            print(f"Mean moisture:     {summary['mean_moisture']:.1f}%")
+        print(f"Harvested area:    {summary['acres']:.1f} ac")
+        print(f"Total (dry):       {summary['bushels']:,.0f} bu")
+    print("=" * 60)
+
+
+def _filter_overrides(args):
+    overrides = {}
+    for name in ('flow_delay', 'start_delay', 'end_delay', 'min_speed', 'max_speed', 'outlier_z'):
+        value = getattr(args, name, None)
+        if value is not None:
+            overrides[name] = value
+    return overrides
+
 
 def main():
-    print("Yield data processor - Full implementation pending")
-    print("This script will import and clean yield monitor data")
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Import and clean yield monitor data'
+    )
+    subparsers = parser.add_subparsers(dest='command', help='Command to execute')
+
+    import_parser = subparsers.add_parser('import', help='Import a yield monitor CSV export')
+    import_parser.add_argument('--input-file', required=True, help='Yield monitor CSV file')
+    import_parser.add_argument('--field-id', type=int, help='Field ID (default: found from the points)')
+    import_parser.add_argument('--crop', default='corn', help='Crop harvested (default: corn)')
+    import_parser.add_argument('--harvest-date', help='Harvest date (default: from data)')
+
+    clean_parser = subparsers.add_parser('clean', help='Re-clean stored points')
+    clean_parser.add_argument('--yield-id', required=True, type=int, help='Yield data ID')
+
+    for sub in (import_parser, clean_parser):
+        sub.add_argument('--flow-delay', type=float, help='Flow delay in seconds')
+        sub.add_argument('--start-delay', type=float, help='Seconds dropped at pass start')
+        sub.add_argument('--end-delay', type=float, help='Seconds dropped at pass end')
+        sub.add_argument('--min-speed', type=float, help='Minimum speed in mph')
+        sub.add_argument('--max-speed', type=float, help='Maximum speed in mph')
+        sub.add_argument('--outlier-z', type=float, help='Robust z-score limit for yield outliers')
+
+    args = parser.parse_args()
+
+    db_path = os.getenv('DB_PATH', '/var/lib/precision-ag/precision-ag.db')
+    processor = YieldProcessor(db_path=db_path)
+
+    if not processor.connect():
+        return 1
+
+    try:
+        if args.command == 'import':
+            try:
+                yield_id, removed, summary = processor.import_file(
+                    args.input_file, args.field_id, args.crop, args.harvest_date,
+                    _filter_overrides(args)
+                )
+            except (OSError, ValueError) as e:
+                print(f"✗ Failed to import yield data: {e}")
+                return 1
+            print(f"✓ Imported {args.input_file} as yield data {yield_id}")
+            print_cleaning_report(yield_id, removed, summary)
+        elif args.command == 'clean':
+            result = processor.reclean(args.yield_id, _filter_overrides(args))
+            if result is None:
+                print(f"✗ Yield data {args.yield_id} not found")
+                return 1
+            print_cleaning_report(args.yield_id, *result)
+        else:
+            parser.print_help()
+    finally:
+        processor.disconnect()
+
     return 0
 
+
 if __name__ == '__main__':
     sys.exit(main())